@@ -16,6 +16,8 @@ import base64
 from datetime import datetime
 from typing import Callable  # bereits importiert oben, hier nur zur Sicherheit
 
+from lookup_tables import DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT
+
 # Attribute-CRUD aus flexibler Attributtabelle (Key/Value)
 try:
     from product_attributes import (
@@ -62,19 +64,8 @@ _DEFAULT_GLOBAL_CONSTANTS_FALLBACK: Dict[str, Any] = {
     'pvgis_system_loss_default_percent': 14.0, 'annual_module_degradation_percent': 0.5,
     'maintenance_fixed_eur_pa': 50.0, 'maintenance_variable_eur_per_kwp_pa': 5.0,
     'maintenance_increase_percent_pa': 2.0, 'one_time_bonus_eur': 0.0,
-    'global_yield_adjustment_percent': 0.0, 'reference_specific_yield_pr': 1100.0,
-    'specific_yields_by_orientation_tilt': {
-        "Süd_0":1050.0, "Süd_15":1080.0, "Süd_30":1100.0, "Süd_45":1080.0, "Süd_60":1050.0,
-        "Südost_0":980.0, "Südost_15":1030.0, "Südost_30":1070.0, "Südost_45":1030.0, "Südost_60":980.0,
-        "Südwest_0":980.0, "Südwest_15":1030.0, "Südwest_30":1070.0, "Südwest_45":1030.0, "Südwest_60":980.0,
-        "Ost_0":950.0, "Ost_15":980.0, "Ost_30":1000.0, "Ost_45":980.0, "Ost_60":950.0,
-        "West_0":950.0, "West_15":980.0, "West_30":1000.0, "West_45":980.0, "West_60":950.0,
-        "Nord_0":800.0, "Nord_15":820.0, "Nord_30":850.0, "Nord_45":820.0, "Nord_60":850.0,
-        "Nordost_0":850.0, "Nordost_15":870.0, "Nordost_30":890.0, "Nordost_45":870.0, "Nordost_60":850.0,
-        "Nordwest_0":850.0, "Nordwest_15":870.0, "Nordwest_30":890.0, "Nordwest_45":870.0, "Nordwest_60":850.0,
-        "Flachdach_0":950.0, "Flachdach_15":1000.0,
-        "Sonstige_0":1000.0, "Sonstige_15":1050.0, "Sonstige_30":1080.0, "Sonstige_45":1050.0, "Sonstige_60":1000.0
-    },
+    'global_yield_adjustment_percent': 0.0, 'reference_specific_yield_pr': 1100.0, 'latitude_corrections_enabled': False,
+    'specific_yields_by_orientation_tilt': dict(DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT),
     'default_specific_yield_kwh_kwp': 950.0,
     'monthly_production_distribution': [0.03,0.05,0.08,0.11,0.13,0.14,0.13,0.12,0.09,0.06,0.04,0.02],
     'monthly_consumption_distribution': [1/12]*12, 
@@ -1296,6 +1287,7 @@ def render_general_settings_extended(load_admin_setting_func: Callable, save_adm
         col_yield1, col_yield2 = st.columns(2)
         with col_yield1: new_global_yield_adj = st.number_input(label=get_text_local("global_yield_adjustment_percent", "Globale Ertragsanpassung (%)"), value=float(current_global_constants.get('global_yield_adjustment_percent', 0.0)), key=f"gc_yield_adj{WIDGET_KEY_SUFFIX}", format="%.2f", help="Ein positiver Wert erhöht...")
         with col_yield2: new_ref_yield_pr = st.number_input(label=get_text_local("reference_specific_yield_pr", "Referenz-Spezialertrag für PR (kWh/kWp/a)"), value=float(current_global_constants.get('reference_specific_yield_pr', 1100.0)), key=f"gc_ref_yield_pr{WIDGET_KEY_SUFFIX}", format="%.0f", help="Wird für die Performance Ratio Berechnung verwendet.")
+        new_latitude_corrections = st.checkbox(label=get_text_local("latitude_corrections_enabled", "Breitengrad-Korrektur für Ertrag und Verschattung"), value=bool(current_global_constants.get('latitude_corrections_enabled', False)), key=f"gc_latitude_corr{WIDGET_KEY_SUFFIX}", help="Korrigiert manuelle Erträge und typische Verschattung über den Breitengrad des Projekts (Lookup-Tabellen). Standard: aus.")
         st.markdown("---"); st.subheader(get_text_local("admin_orientation_yields_subheader_v2", "Spezifische Jahreserträge (kWh/kWp/a)...")); st.caption(get_text_local("admin_orientation_yields_info_v2", "Basis-Ertragswerte..."))
         current_specific_yields_map = current_global_constants.get('specific_yields_by_orientation_tilt', {}); default_yield_map_template = _DEFAULT_GLOBAL_CONSTANTS_FALLBACK['specific_yields_by_orientation_tilt']; updated_specific_yields_map = {} 
         orientations_ordered = ["Süd", "Südost", "Südwest", "Ost", "West", "Nordost", "Nordwest", "Nord", "Flachdach", "Sonstige"]; tilts_ordered = ["0", "15", "30", "45", "60"] 
@@ -1314,7 +1306,7 @@ def render_general_settings_extended(load_admin_setting_func: Callable, save_adm
         with col_my1: new_sim_period = col_my1.number_input(label=get_text_local("simulation_period_years", "Simulationsdauer (Jahre)"), value=int(current_global_constants.get('simulation_period_years', 20)), min_value=1, max_value=50, step=1, key=f"gc_sim_period{WIDGET_KEY_SUFFIX}")
         with col_my2: new_elec_price_increase = col_my2.number_input(label=get_text_local("electricity_price_increase_annual_percent", "Strompreissteigerung (% p.a.)"), value=float(current_global_constants.get('electricity_price_increase_annual_percent', 3.0)), min_value=0.0, max_value=20.0, step=0.1, format="%.2f", key=f"gc_elec_increase{WIDGET_KEY_SUFFIX}")
         if st.form_submit_button(get_text_local("admin_save_economic_yield_settings_button", "Alle Wirtschafts- und Ertragsparameter speichern")):
-            current_global_constants['vat_rate_percent'] = new_vat_rate; current_global_constants['annual_module_degradation_percent'] = new_degradation; current_global_constants['maintenance_fixed_eur_pa'] = new_maintenance_fixed; current_global_constants['inflation_rate_percent'] = new_inflation; current_global_constants['maintenance_increase_percent_pa'] = new_maintenance_increase; current_global_constants['maintenance_variable_eur_per_kwp_pa'] = new_maint_var; current_global_constants['alternative_investment_interest_rate_percent'] = new_alt_invest_interest; current_global_constants['global_yield_adjustment_percent'] = new_global_yield_adj; current_global_constants['reference_specific_yield_pr'] = new_ref_yield_pr; current_global_constants['simulation_period_years'] = new_sim_period; current_global_constants['electricity_price_increase_annual_percent'] = new_elec_price_increase
+            current_global_constants['vat_rate_percent'] = new_vat_rate; current_global_constants['annual_module_degradation_percent'] = new_degradation; current_global_constants['maintenance_fixed_eur_pa'] = new_maintenance_fixed; current_global_constants['inflation_rate_percent'] = new_inflation; current_global_constants['maintenance_increase_percent_pa'] = new_maintenance_increase; current_global_constants['maintenance_variable_eur_per_kwp_pa'] = new_maint_var; current_global_constants['alternative_investment_interest_rate_percent'] = new_alt_invest_interest; current_global_constants['global_yield_adjustment_percent'] = new_global_yield_adj; current_global_constants['reference_specific_yield_pr'] = new_ref_yield_pr; current_global_constants['latitude_corrections_enabled'] = new_latitude_corrections; current_global_constants['simulation_period_years'] = new_sim_period; current_global_constants['electricity_price_increase_annual_percent'] = new_elec_price_increase
             for key_gc, default_val_gc in _DEFAULT_GLOBAL_CONSTANTS_FALLBACK.items():
                 if key_gc not in current_global_constants: current_global_constants[key_gc] = default_val_gc
                 elif isinstance(default_val_gc, dict) and isinstance(current_global_constants.get(key_gc), dict):
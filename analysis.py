@@ -24,6 +24,9 @@ from reportlab.lib import colors  # Für HexColor Zugriff
 import colorsys  # Für HLS/RGB Konvertierungen
 from datetime import datetime, timedelta
 from calculations import AdvancedCalculationsIntegrator
+import chart_render_service
+import contextvars
+from contextlib import contextmanager
 
 # HINZUGEFÜGT: Import der kompletten Finanz-Tools
 from financial_tools import (
@@ -1696,43 +1699,90 @@ def _apply_custom_style_to_fig(
         fig.update_layout(colorway=final_colorway)
 
 
-_PLOT_EXPORT_CACHE: Dict[str, bytes] = {}
+def _warn_chart_export_failed(error: Exception, texts: Dict[str, str]) -> None:
+    if "kaleido" in str(error).lower() and "st" in globals() and hasattr(st, "warning"):
+        st.warning(
+            get_text(
+                texts,
+                "analysis_chart_export_error_kaleido_v4",
+                "Hinweis: Diagramm-Export für PDF fehlgeschlagen (Kaleido?). Details: {error_details}",
+            ).format(error_details=str(error))
+        )
+
 
 def _export_plotly_fig_to_bytes(
     fig: Optional[go.Figure], texts: Dict[str, str]
 ) -> Optional[bytes]:
     if fig is None:
         return None
-    # Cache-Key über die Figure-Struktur ableiten
-    try:
-        fig_json = fig.to_json()
-        cache_key = fig_json  # bereits JSON-String
-        cached = _PLOT_EXPORT_CACHE.get(cache_key)
-        if cached:
-            return cached
-    except Exception:
-        cache_key = None
+    # Reduzierte Auflösung für schnellere Erstellung im Dashboard;
+    # Cache (Speicher + Platte) liegt im chart_render_service
     try:
-        # Reduzierte Auflösung für schnellere Erstellung im Dashboard
-        img = fig.to_image(format="png", scale=1.5, width=800, height=480)
-        if cache_key:
-            # Soft-LRU: einfache Größe begrenzen
-            if len(_PLOT_EXPORT_CACHE) > 64:
-                _PLOT_EXPORT_CACHE.clear()
-            _PLOT_EXPORT_CACHE[cache_key] = img
-        return img
+        return chart_render_service.render_png(fig)
     except Exception as e:
-        if "kaleido" in str(e).lower() and "st" in globals() and hasattr(st, "warning"):
-            st.warning(
-                get_text(
-                    texts,
-                    "analysis_chart_export_error_kaleido_v4",
-                    "Hinweis: Diagramm-Export für PDF fehlgeschlagen (Kaleido?). Details: {error_details}",
-                ).format(error_details=str(e))
-            )
+        _warn_chart_export_failed(e, texts)
         return None
 
 
+def _export_plotly_figs_to_bytes(
+    figs: Dict[str, Optional[go.Figure]], texts: Dict[str, str]
+) -> Dict[str, Optional[bytes]]:
+    """Wie _export_plotly_fig_to_bytes, aber für mehrere Diagramme parallel."""
+    return chart_render_service.render_many(
+        figs, on_error=lambda _name, e: _warn_chart_export_failed(e, texts)
+    )
+
+
+# Diagramm-Exporte eines Analyse-Laufs: Innerhalb von _deferred_chart_exports
+# sammelt _queue_chart_export die Figuren und _flush_chart_exports rendert alle
+# gemeinsam über render_many (parallel, gecacht) statt einzeln nacheinander.
+_CHART_EXPORT_BATCH: "contextvars.ContextVar[Optional[List[Tuple[Dict[str, Any], str, go.Figure]]]]" = (
+    contextvars.ContextVar("analysis_chart_export_batch", default=None)
+)
+
+
+def _queue_chart_export(
+    target: Dict[str, Any], key: str, fig: Optional[go.Figure], texts: Dict[str, str]
+) -> None:
+    """target[key] = PNG-Bytes von fig; im Sammelmodus erst beim nächsten Flush."""
+    pending = _CHART_EXPORT_BATCH.get()
+    if pending is None:
+        target[key] = _export_plotly_fig_to_bytes(fig, texts)
+        return
+    target[key] = None
+    # Ein späterer Export desselben Schlüssels ersetzt den früheren (wie bei direkter Zuweisung)
+    pending[:] = [job for job in pending if not (job[0] is target and job[1] == key)]
+    if fig is not None:
+        pending.append((target, key, fig))
+
+
+def _flush_chart_exports(texts: Dict[str, str]) -> None:
+    """Rendert alle gesammelten Diagramme in einem render_many-Aufruf und trägt die Bytes ein."""
+    pending = _CHART_EXPORT_BATCH.get()
+    if not pending:
+        return
+    jobs = list(pending)
+    pending.clear()
+    names = [key if sum(job[1] == key for job in jobs) == 1 else f"{key}#{index}" for index, (_, key, _) in enumerate(jobs)]
+    rendered = _export_plotly_figs_to_bytes({name: fig for name, (_, _, fig) in zip(names, jobs)}, texts)
+    for name, (target, key, _) in zip(names, jobs):
+        target[key] = rendered.get(name)
+
+
+@contextmanager
+def _deferred_chart_exports(texts: Dict[str, str]):
+    """Sammelmodus für _queue_chart_export; offene Exporte werden beim Verlassen gerendert."""
+    if _CHART_EXPORT_BATCH.get() is not None:  # verschachtelt: der äußere Block rendert
+        yield
+        return
+    token = _CHART_EXPORT_BATCH.set([])
+    try:
+        yield
+        _flush_chart_exports(texts)
+    finally:
+        _CHART_EXPORT_BATCH.reset(token)
+
+
 AVAILABLE_CHART_TYPES = {
     "bar": "Balkendiagramm",
     "line": "Liniendiagramm",
@@ -2092,7 +2142,7 @@ def render_daily_production_switcher(
     _apply_custom_style_to_fig(fig, viz_settings, "daily_production_switcher")
     with st.expander(title, expanded=False):
         st.plotly_chart(fig, use_container_width=True, key="analysis_daily_prod_switcher_key_v7_2d")
-    analysis_results["daily_production_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+    _queue_chart_export(analysis_results, "daily_production_switcher_chart_bytes", fig, texts)
 
 def render_tariff_cube_switcher(
     analysis_results: Dict[str, Any],
@@ -2135,7 +2185,7 @@ def render_tariff_cube_switcher(
             st.plotly_chart(
                 fig, use_container_width=True, key="analysis_daily_prod_switcher_key_v7_2d"
             )
-        analysis_results["daily_production_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+        _queue_chart_export(analysis_results, "daily_production_switcher_chart_bytes", fig, texts)
     else:
         st.error("Fehler beim Erstellen des Tagesproduktions-Diagramms")
 
@@ -2187,7 +2237,7 @@ def render_weekly_production_switcher(
             st.plotly_chart(
                 fig, use_container_width=True, key="analysis_weekly_prod_switcher_key_v7_2d"
             )
-        analysis_results["weekly_production_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+        _queue_chart_export(analysis_results, "weekly_production_switcher_chart_bytes", fig, texts)
     else:
         st.error("Fehler beim Erstellen des Wochenproduktions-Diagramms")
 
@@ -2287,7 +2337,7 @@ def render_yearly_production_switcher(
             st.plotly_chart(
                 fig, use_container_width=True, key="analysis_yearly_prod_switcher_key_v7_2d"
             )
-        analysis_results["yearly_production_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+        _queue_chart_export(analysis_results, "yearly_production_switcher_chart_bytes", fig, texts)
     else:
         st.error("Fehler beim Erstellen des Jahresproduktions-Diagramms")
 
@@ -2364,7 +2414,7 @@ def render_project_roi_matrix_switcher(
                 use_container_width=True,
                 key="analysis_project_roi_matrix_switcher_key_v7_2d",
             )
-        analysis_results["project_roi_matrix_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+        _queue_chart_export(analysis_results, "project_roi_matrix_switcher_chart_bytes", fig, texts)
     else:
         st.error("Fehler beim Erstellen des ROI-Diagramms")
 
@@ -2481,7 +2531,7 @@ def render_feed_in_revenue_switcher(
                 use_container_width=True,
                 key="analysis_feed_in_revenue_switcher_key_v7_2d",
             )
-        analysis_results["feed_in_revenue_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+        _queue_chart_export(analysis_results, "feed_in_revenue_switcher_chart_bytes", fig, texts)
     else:
         st.error("Fehler beim Erstellen des Einspeisevergütungs-Diagramms")
 
@@ -2708,9 +2758,7 @@ def render_production_vs_consumption_switcher(
         st.plotly_chart(
             fig, use_container_width=True, key="analysis_prod_vs_cons_switcher_key_v7_2d"
         )
-        analysis_results["prod_vs_cons_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(
-            fig, texts
-        )
+        _queue_chart_export(analysis_results, "prod_vs_cons_switcher_chart_bytes", fig, texts)
         
 def render_tariff_cube_switcher(
     analysis_results: Dict[str, Any],
@@ -2777,7 +2825,7 @@ def render_tariff_cube_switcher(
             use_container_width=True,
             key="analysis_tariff_cube_switcher_plot_key_v6_final",
         )
-    analysis_results["tariff_cube_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+    _queue_chart_export(analysis_results, "tariff_cube_switcher_chart_bytes", fig, texts)
 
     # Chart-Daten für universelle Funktion vorbereiten
     chart_data = {
@@ -2807,7 +2855,7 @@ def render_tariff_cube_switcher(
         _apply_custom_style_to_fig(fig, viz_settings, "tariff_cube_switcher")
         with st.expander(title, expanded=False):
             st.plotly_chart(fig, use_container_width=True, key="analysis_tariff_cube_switcher_plot")
-        analysis_results["tariff_cube_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+        _queue_chart_export(analysis_results, "tariff_cube_switcher_chart_bytes", fig, texts)
     else:
         analysis_results["tariff_cube_switcher_chart_bytes"] = None
 
@@ -2921,7 +2969,7 @@ def render_co2_savings_value_switcher(
                 use_container_width=True,
                 key="analysis_co2_savings_value_switcher_plot",
             )
-        analysis_results["co2_savings_value_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+        _queue_chart_export(analysis_results, "co2_savings_value_switcher_chart_bytes", fig, texts)
     else:
         analysis_results["co2_savings_value_switcher_chart_bytes"] = None
 
@@ -3632,9 +3680,7 @@ def render_co2_savings_value_switcher(
                 use_container_width=True,
                 key="analysis_co2_savings_value_switcher_key_v6_final",
             )
-        analysis_results["co2_savings_value_switcher_chart_bytes"] = (
-            _export_plotly_fig_to_bytes(fig, texts)
-        )
+        _queue_chart_export(analysis_results, "co2_savings_value_switcher_chart_bytes", fig, texts)
     else:
         st.warning("CO₂-Diagramm konnte nicht erstellt werden.")
         analysis_results["co2_savings_value_switcher_chart_bytes"] = None
@@ -3770,7 +3816,40 @@ def render_investment_value_switcher(
     _apply_custom_style_to_fig(fig, viz_settings, "investment_value_switcher")
     with st.expander(title, expanded=False):
         st.plotly_chart(fig, use_container_width=True, key="analysis_investment_value_switcher_plot")
-    analysis_results["investment_value_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+    _queue_chart_export(analysis_results, "investment_value_switcher_chart_bytes", fig, texts)
+
+
+def _simulated_storage_benefit_curve(
+    analysis_results: Dict[str, Any],
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Jährliche Ersparnis je Speichergröße aus der stündlichen Simulation (None ohne Daten)."""
+    grid = analysis_results.get("storage_sizing_simulation")
+    try:
+        if not grid:
+            annual_pv = float(analysis_results.get("annual_pv_production_kwh") or 0.0)
+            annual_load = float(analysis_results.get("total_consumption_kwh_yr") or 0.0)
+            if annual_pv <= 0 or annual_load <= 0:
+                return None
+            from hourly_energy_simulator import simulate_storage_sizing, storage_grid_summary
+
+            monthly = analysis_results.get("monthly_productions_sim")
+            grid = storage_grid_summary(
+                simulate_storage_sizing(
+                    annual_load,
+                    monthly_production_kwh=monthly if isinstance(monthly, list) and len(monthly) == 12 else None,
+                    annual_production_kwh=annual_pv,
+                )
+            )
+        capacities = np.asarray(grid["capacities_kwh"], dtype=float)
+        self_consumption = np.asarray(grid["self_consumption_kwh"], dtype=float)
+    except Exception as e_sim:
+        print(f"Speichersimulation für Diagramm nicht verfügbar: {e_sim}")
+        return None
+    strompreis = float(analysis_results.get("aktueller_strompreis_fuer_hochrechnung_euro_kwh") or 0.30)
+    einspeiseverguetung = float(analysis_results.get("einspeiseverguetung_eur_per_kwh") or 0.0)
+    # Jede zusätzlich selbst genutzte kWh ersetzt Netzbezug statt Einspeisung
+    savings = (self_consumption - self_consumption[0]) * max(strompreis - einspeiseverguetung, 0.0)
+    return capacities, savings
 
 
 def render_storage_effect_switcher(
@@ -3782,7 +3861,7 @@ def render_storage_effect_switcher(
         get_text(
             texts,
             "viz_storage_effect_subheader_switcher",
-            "Speicherwirkung – Kapazität vs. Nutzen (Illustrativ)",
+            "Speicherwirkung – Kapazität vs. Nutzen (Simulation)",
         )
     )
     current_storage_cap_kwh_raw = analysis_results.get(
@@ -3827,6 +3906,9 @@ def render_storage_effect_switcher(
     nutzwert_illustrativ_eur = np.nan_to_num(
         nutzwert_illustrativ_eur, nan=0.0, posinf=0.0, neginf=0.0
     )
+    simulated_curve = _simulated_storage_benefit_curve(analysis_results)
+    if simulated_curve is not None:
+        kapazitaet_range_kwh, nutzwert_illustrativ_eur = simulated_curve
     #  MODERNES 2D SHADCN CHART FÜR SPEICHERWIRKUNG 
     chart_data = {
         "x": [f"{cap:.2f} kWh" for cap in kapazitaet_range_kwh],
@@ -3843,7 +3925,9 @@ def render_storage_effect_switcher(
     # Aktueller Speicher als zusätzliche Serie
     if current_storage_cap_kwh > 0:
         current_nutzwert_on_curve_raw = (
-            current_storage_cap_kwh
+            np.interp(current_storage_cap_kwh, kapazitaet_range_kwh, nutzwert_illustrativ_eur)
+            if simulated_curve is not None
+            else current_storage_cap_kwh
             * (1 - np.exp(-0.3 * current_storage_cap_kwh))
             * scaling_factor_heuristic
         )
@@ -3872,7 +3956,7 @@ def render_storage_effect_switcher(
     _apply_custom_style_to_fig(fig, viz_settings, "storage_effect_switcher")
     with st.expander(title, expanded=False):
         st.plotly_chart(fig, use_container_width=True, key="analysis_storage_effect_switcher_plot")
-    analysis_results["storage_effect_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+    _queue_chart_export(analysis_results, "storage_effect_switcher_chart_bytes", fig, texts)
 
 
 def render_selfuse_stack_switcher(
@@ -3981,7 +4065,7 @@ def render_selfuse_stack_switcher(
             use_container_width=True,
             key="analysis_selfuse_stack_switcher_key_v6_final",
         )
-    analysis_results["selfuse_stack_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
+    _queue_chart_export(analysis_results, "selfuse_stack_switcher_chart_bytes", fig, texts)
 
 
 def render_cost_growth_switcher(
@@ -4055,9 +4139,7 @@ def render_cost_growth_switcher(
             use_container_width=True,
             key="analysis_cost_growth_switcher_key_v6_final",
         )
-    analysis_results["cost_growth_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(
-        fig, texts
-    )
+    _queue_chart_export(analysis_results, "cost_growth_switcher_chart_bytes", fig, texts)
 
 
 def render_selfuse_ratio_switcher(
@@ -4159,9 +4241,7 @@ def render_selfuse_ratio_switcher(
             use_container_width=True,
             key="analysis_selfuse_ratio_switcher_key_v6_final",
         )
-    analysis_results["selfuse_ratio_switcher_chart_bytes"] = (
-        _export_plotly_fig_to_bytes(fig, texts)
-    )
+    _queue_chart_export(analysis_results, "selfuse_ratio_switcher_chart_bytes", fig, texts)
 
 
 def render_roi_comparison_switcher(
@@ -4233,9 +4313,7 @@ def render_roi_comparison_switcher(
             use_container_width=True,
             key="analysis_roi_comparison_switcher_key_v6_final",
         )
-    analysis_results["roi_comparison_switcher_chart_bytes"] = (
-        _export_plotly_fig_to_bytes(fig, texts)
-    )
+    _queue_chart_export(analysis_results, "roi_comparison_switcher_chart_bytes", fig, texts)
 
 
 def render_scenario_comparison_switcher(
@@ -4316,9 +4394,7 @@ def render_scenario_comparison_switcher(
             use_container_width=True,
             key="analysis_scenario_comp_switcher_key_v6_final",
         )
-    analysis_results["scenario_comparison_switcher_chart_bytes"] = (
-        _export_plotly_fig_to_bytes(fig, texts)
-    )
+    _queue_chart_export(analysis_results, "scenario_comparison_switcher_chart_bytes", fig, texts)
 
 
 def render_tariff_comparison_switcher(
@@ -4426,9 +4502,7 @@ def render_tariff_comparison_switcher(
             use_container_width=True,
             key="analysis_tariff_comp_switcher_key_v6_final",
         )
-    analysis_results["tariff_comparison_switcher_chart_bytes"] = (
-        _export_plotly_fig_to_bytes(fig, texts)
-    )
+    _queue_chart_export(analysis_results, "tariff_comparison_switcher_chart_bytes", fig, texts)
 
 
 def render_income_projection_switcher(
@@ -4496,9 +4570,7 @@ def render_income_projection_switcher(
             use_container_width=True,
             key="analysis_income_proj_switcher_key_v6_final",
         )
-    analysis_results["income_projection_switcher_chart_bytes"] = (
-        _export_plotly_fig_to_bytes(fig, texts)
-    )
+    _queue_chart_export(analysis_results, "income_projection_switcher_chart_bytes", fig, texts)
 
 
 def _create_monthly_production_consumption_chart(
@@ -5053,7 +5125,7 @@ def _render_consumption_coverage_pie(
             use_container_width=True,
             key=f"{chart_key_prefix}_four_type_chart_final",
         )
-        analysis_results_local[f"{chart_key_prefix}_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts_local)
+        _queue_chart_export(analysis_results_local, f"{chart_key_prefix}_chart_bytes", fig, texts_local)
     else:
         st.info(
             get_text(
@@ -5203,7 +5275,7 @@ def _render_pv_usage_pie(
             use_container_width=True,
             key=f"{chart_key_prefix}_four_type_chart_final",
         )
-        analysis_results_local[f"{chart_key_prefix}_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts_local)
+        _queue_chart_export(analysis_results_local, f"{chart_key_prefix}_chart_bytes", fig, texts_local)
     else:
         st.info(
             get_text(
@@ -5502,11 +5574,9 @@ def render_advanced_economics(
     # NPV mit verschiedenen Diskontierungsraten
     with st.expander("NPV-Sensitivitätsanalyse", expanded=False):
         discount_rates = np.arange(0.01, 0.10, 0.01)
-        npv_values = []
-
-        for rate in discount_rates:
-            npv = integrator.calculate_npv_sensitivity(calc_results, rate)
-            npv_values.append(npv)
+        npv_values = integrator.calculate_npv_sensitivity(
+            calc_results, discount_rates
+        ).tolist()
 
         fig = go.Figure()
         fig.add_trace(
@@ -6859,12 +6929,112 @@ def render_pricing_modifications_ui():
         key="pricing_modifications_special_agreements_text",
         help="Zusätzliche Informationen oder Vereinbarungen, die im Angebot berücksichtigt werden sollen.",
     )
+    _render_live_pricing_kpis()
+
+
+def _render_live_pricing_kpis() -> None:
+    """Kennzahlen zu den aktuellen Preisänderungen, ohne die Analyse neu zu rechnen.
+
+    Die Energie-Stufe (Produktion, Eigenverbrauch, Degradation) kommt aus dem
+    letzten Ergebnis; live_pricing_engine rechnet nur den Finanz-Teil neu.
+    """
+    results = st.session_state.get("calculation_results") or {}
+    if not results.get("annual_cash_flows_sim"):
+        return
+    try:
+        from live_pricing_engine import get_evaluator
+
+        evaluator = get_evaluator(
+            results, cheat_settings=load_admin_setting("amortization_cheat_settings", None)
+        )
+        live = evaluator.evaluate_modifications(
+            {
+                "discount_percent": st.session_state.get("pricing_modifications_discount_slider", 0.0),
+                "rebates_eur": st.session_state.get("pricing_modifications_rebates_slider", 0.0),
+                "surcharge_percent": st.session_state.get("pricing_modifications_surcharge_slider", 0.0),
+                "special_costs_eur": st.session_state.get("pricing_modifications_special_costs_slider", 0.0),
+                "miscellaneous_eur": st.session_state.get("pricing_modifications_miscellaneous_slider", 0.0),
+            },
+            base_price=results.get("base_matrix_price_netto") or None,
+        )
+    except Exception as e_live:
+        print(f"Live-Kennzahlen nicht verfügbar: {e_live}")
+        return
+    st.session_state["live_pricing_kpis"] = live
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Investition netto", format_kpi_value(live["total_investment_netto"], "€", precision=2))
+    col2.metric("Amortisation", format_kpi_value(live["amortization_time_years"], "Jahre", precision=1))
+    col3.metric("Kapitalwert (NPV)", format_kpi_value(live["npv_value"], "€", precision=0))
+    col4.metric("Rendite (IRR)", format_kpi_value(live["irr_percent"], "%", precision=2))
+
+
+def _perform_calculations_cached(
+    project_inputs: Dict[str, Any],
+    texts: Dict[str, str],
+    errors_list: List[str],
+    simulation_duration_user: Optional[int] = None,
+    electricity_price_increase_user: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """perform_calculations nur bei geänderten Eingaben neu ausführen.
+
+    Preis-Slider lösen in Streamlit einen kompletten Rerun aus, ändern aber
+    weder Projektdaten noch Simulationsparameter, Admin-Einstellungen oder
+    Produkte. Letztere gehen über get_calculation_data_fingerprint (Anzahl und
+    letzte Änderung je Tabelle) in den Schlüssel ein; ohne lesbare DB wird
+    nicht gecacht.
+    """
+    try:
+        import hashlib
+        import json
+
+        from database import get_calculation_data_fingerprint
+
+        data_fingerprint = get_calculation_data_fingerprint()
+        fingerprint = hashlib.sha1(
+            json.dumps(project_inputs, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        cache_key = (
+            (
+                fingerprint,
+                simulation_duration_user,
+                electricity_price_increase_user,
+                data_fingerprint,
+            )
+            if data_fingerprint is not None
+            else None
+        )
+    except Exception:
+        cache_key = None
+
+    cached = st.session_state.get("_analysis_calculation_cache")
+    if cache_key is not None and cached and cached[0] == cache_key:
+        errors_list.extend(cached[2])
+        return dict(cached[1])
+
+    results = perform_calculations(
+        project_inputs,
+        texts,
+        errors_list,
+        simulation_duration_user=simulation_duration_user,
+        electricity_price_increase_user=electricity_price_increase_user,
+    )
+    if cache_key is not None and isinstance(results, dict) and results:
+        st.session_state["_analysis_calculation_cache"] = (cache_key, dict(results), list(errors_list))
+    return results
 
 
 
 # --- Haupt-Render-Funktion ---
 def render_analysis(
     texts: Dict[str, str], results: Optional[Dict[str, Any]] = None
+) -> None:
+    # PDF-Diagramme des Laufs gesammelt statt einzeln nacheinander exportieren
+    with _deferred_chart_exports(texts):
+        _render_analysis_page(texts, results)
+
+
+def _render_analysis_page(
+    texts: Dict[str, str], results: Optional[Dict[str, Any]] = None
 ) -> None:
     if not _ANALYSIS_DEPENDENCIES_AVAILABLE:
         st.error(
@@ -7004,7 +7174,7 @@ def render_analysis(
             st.session_state["calculation_results"] = {}
         return
     calculation_errors_for_current_run: List[str] = []
-    results_for_display = perform_calculations(
+    results_for_display = _perform_calculations_cached(
         project_inputs,
         texts,
         calculation_errors_for_current_run,
@@ -7236,9 +7406,7 @@ def render_analysis(
                     use_container_width=True,
                     key="analysis_monthly_comp_chart_final_v8_corrected",
                 )
-            results_for_display["monthly_prod_cons_chart_bytes"] = (
-                _export_plotly_fig_to_bytes(fig_monthly_comp, texts)
-            )
+            _queue_chart_export(results_for_display, "monthly_prod_cons_chart_bytes", fig_monthly_comp, texts)
         else:
             st.info(
                 get_text(
@@ -7268,9 +7436,7 @@ def render_analysis(
                     use_container_width=True,
                     key="analysis_cost_proj_chart_final_v8_corrected",
                 )
-            results_for_display["cost_projection_chart_bytes"] = (
-                _export_plotly_fig_to_bytes(fig_cost_projection, texts)
-            )
+            _queue_chart_export(results_for_display, "cost_projection_chart_bytes", fig_cost_projection, texts)
         else:
             st.info(
                 get_text(
@@ -7359,9 +7525,7 @@ def render_analysis(
                     use_container_width=True,
                     key="analysis_cum_cashflow_chart_final_v8_corrected",
                 )
-            results_for_display["cumulative_cashflow_chart_bytes"] = (
-                _export_plotly_fig_to_bytes(fig_cum_cf, texts)
-            )
+            _queue_chart_export(results_for_display, "cumulative_cashflow_chart_bytes", fig_cum_cf, texts)
         else:
             st.info(
                 get_text(
@@ -7771,6 +7935,9 @@ def render_analysis(
         else:
             st.warning(" Keine Finanzierung in Projektdaten aktiviert")
 
+    # Gesammelte Diagramm-Exporte vor dem Sichern der Ergebnisse rendern
+    _flush_chart_exports(texts)
+
     # Speichere Berechnungsergebnisse robust in Session State
     if (
         "st" in globals()
@@ -8063,14 +8230,13 @@ def render_financing_analysis(
 
                 # Speichere Daten für PDF-Export
                 st.session_state["financing_analysis_charts"] = {
-                    "tilgungsplan_chart": _export_plotly_fig_to_bytes(
-                        fig_tilgung, texts
-                    ),
-                    "zins_anteil_chart": _export_plotly_fig_to_bytes(
-                        fig_zins_anteil, texts
-                    ),
-                    "cumulative_chart": _export_plotly_fig_to_bytes(
-                        fig_cumulative, texts
+                    **_export_plotly_figs_to_bytes(
+                        {
+                            "tilgungsplan_chart": fig_tilgung,
+                            "zins_anteil_chart": fig_zins_anteil,
+                            "cumulative_chart": fig_cumulative,
+                        },
+                        texts,
                     ),
                     "tilgungsplan_data": tilgungsplan_df.to_dict("records"),
                 }
@@ -8198,14 +8364,13 @@ def render_financing_analysis(
 
                 # Speichere Leasing-Daten für PDF-Export
                 st.session_state["leasing_analysis_charts"] = {
-                    "leasing_costs_chart": _export_plotly_fig_to_bytes(
-                        fig_leasing_costs, texts
-                    ),
-                    "cashflow_comparison_chart": _export_plotly_fig_to_bytes(
-                        fig_cashflow_comparison, texts
-                    ),
-                    "monthly_burden_chart": _export_plotly_fig_to_bytes(
-                        fig_monthly_burden, texts
+                    **_export_plotly_figs_to_bytes(
+                        {
+                            "leasing_costs_chart": fig_leasing_costs,
+                            "cashflow_comparison_chart": fig_cashflow_comparison,
+                            "monthly_burden_chart": fig_monthly_burden,
+                        },
+                        texts,
                     ),
                     "leasing_data": leasing_result,
                 }
@@ -8327,8 +8492,9 @@ def render_financing_analysis(
 
                 # Speichere Szenario-Daten für PDF-Export
                 st.session_state["financing_scenarios"] = {
-                    "rates_chart": _export_plotly_fig_to_bytes(fig_rates, texts),
-                    "costs_chart": _export_plotly_fig_to_bytes(fig_total_costs, texts),
+                    **_export_plotly_figs_to_bytes(
+                        {"rates_chart": fig_rates, "costs_chart": fig_total_costs}, texts
+                    ),
                     "scenario_data": scenario_df.to_dict("records"),
                 }
 
@@ -8467,9 +8633,9 @@ def render_financing_analysis(
 
         # Speichere ROI-Daten für PDF-Export
         st.session_state["financing_roi_analysis"] = {
-            "roi_chart": _export_plotly_fig_to_bytes(fig_roi, texts),
-            "cashflow_evolution_chart": _export_plotly_fig_to_bytes(
-                fig_cashflow_evolution, texts
+            **_export_plotly_figs_to_bytes(
+                {"roi_chart": fig_roi, "cashflow_evolution_chart": fig_cashflow_evolution},
+                texts,
             ),
             "roi_data": roi_df.to_dict("records"),
         }
@@ -18,6 +18,8 @@ import os
 project_root = Path(__file__).parent.parent.parent  # Go up from apps/main to root
 sys.path.insert(0, str(project_root))
 
+import offer_tracing
+
 try:
     # Redirect stdout temporarily to avoid database messages in JSON output
     import contextlib
@@ -191,7 +193,11 @@ def perform_full_calculations(config):
         print("Starting PV calculations...", file=sys.stderr)
         
         # prepare required parameters for perform_calculations
-        texts = {}  # Empty dict for texts
+        try:
+            from locales import load_translations
+            texts = load_translations('de') or {}  # shared read-only catalog view, loaded once per worker
+        except ImportError:
+            texts = {}
         errors_list = []  # Empty list for errors
         
         results = perform_calculations(calc_input, texts, errors_list)
@@ -301,6 +307,15 @@ def calculate_live_pricing(base_results, modifications):
         # Simple ROI with new price
         new_roi_percent = (annual_savings / final_price_netto * 100) if final_price_netto > 0 else 0
         
+        # Financial KPIs: only the price-dependent tail is recomputed, the
+        # production/self-consumption stage stays cached (live_pricing_engine.py)
+        from live_pricing_engine import get_evaluator
+        evaluator = get_evaluator(base_results)
+        kpis = evaluator.evaluate(
+            evaluator.base_investment_netto + (final_price_netto - base_price),
+            modifications.get('financing'),
+        )
+        
         pricing_results = {
             'base_price_netto': base_price,
             'discount_amount': discount_amount,
@@ -311,6 +326,7 @@ def calculate_live_pricing(base_results, modifications):
             'price_change_percent': ((final_price_netto - base_price) / base_price * 100) if base_price > 0 else 0,
             'new_amortization_years': new_amortization_years,
             'new_roi_percent': new_roi_percent,
+            'kpis': kpis,
             'updated_at': pd.Timestamp.now().isoformat()
         }
         
@@ -328,16 +344,256 @@ def calculate_live_pricing(base_results, modifications):
         }
 
 
+def evaluate_scenarios(config, scenarios, max_workers=None):
+    """
+    Evaluate many variants of one configuration (see scenario_batch.py)
+    Returns one KPI row per scenario
+    """
+    try:
+        from scenario_batch import evaluate_scenarios as evaluate_scenarios_batch
+
+        calc_input = convert_configuration_to_python_format(config)
+        table = evaluate_scenarios_batch(calc_input, scenarios or [], max_workers=max_workers)
+        return {
+            'success': True,
+            'scenario_results': table.to_dict(orient='records')
+        }
+
+    except Exception as e:
+        error_msg = f"Scenario evaluation error: {str(e)}\nTraceback: {traceback.format_exc()}"
+        print(error_msg, file=sys.stderr)
+        return {
+            'success': False,
+            'error': error_msg
+        }
+
+
+# Produkt-Kommandos (Direktmodus und Worker): Kommando-Kürzel -> Kategorie in product_db
+PRODUCT_COMMAND_CATEGORIES = {
+    'pv': 'Modul',
+    'inverter': 'Wechselrichter',
+    'storage': 'Batteriespeicher',
+    'wallbox': 'Wallbox',
+    'ems': 'Energiemanagementsystem',
+    'optimizer': 'Leistungsoptimierer',
+    'carport': 'Carport',
+    'emergency_power': 'Notstromversorgung',
+    'animal_protection': 'Tierabwehrschutz',
+}
+
+
+def split_product_command(command):
+    """
+    'get_pv_models' -> ('pv', 'models'), 'get_storage_manufacturers' -> ('storage', 'manufacturers').
+    Returns None for anything that is not a product catalog command.
+    """
+    if not isinstance(command, str) or not command.startswith('get_'):
+        return None
+    for kind in ('manufacturers', 'models'):
+        suffix = '_' + kind
+        if command.endswith(suffix):
+            key = command[len('get_'):-len(suffix)]
+            if key in PRODUCT_COMMAND_CATEGORIES:
+                return key, kind
+    return None
+
+
+def run_product_command(command, manufacturer=None):
+    """
+    Manufacturer/model lookups for the product dropdowns
+    """
+    parsed = split_product_command(command)
+    if parsed is None or (parsed[1] == 'models' and not manufacturer):
+        return {
+            'success': False,
+            'error': f'Unknown command: {command}'
+        }
+
+    key, kind = parsed
+    try:
+        from product_db import list_product_brands, list_product_summaries
+    except ImportError:
+        # Fallback: return empty results
+        return []
+
+    category = PRODUCT_COMMAND_CATEGORIES[key]
+    if kind == 'manufacturers':
+        return list_product_brands(category=category)
+    # Summaries skip image_base64 and long texts; brand match stays exact
+    return [p for p in list_product_summaries(category=category, brand=manufacturer)
+            if p.get('brand') == manufacturer]
+
+
+def handle_payload(payload):
+    """
+    Dispatch a JSON payload ({'command': ..., ...}) to the calculation functions.
+    With KAKERLAKE_TRACE=1 each payload writes a stage trace; its path is
+    returned as `trace_file` for the Electron side to collect.
+    """
+    command = payload.get('command')
+    with offer_tracing.trace_request(f'calculation_bridge.{command}') as trace:
+        result = _run_payload_command(command, payload)
+    return with_trace_file(result, trace)
+
+
+def with_trace_file(result, trace):
+    if trace is not None and trace.path and isinstance(result, dict):
+        return dict(result, trace_file=trace.path)
+    return result
+
+
+def _run_payload_command(command, payload):
+    if command == 'perform_calculations':
+        return perform_full_calculations(payload.get('configuration'))
+    if command == 'calculate_live_pricing':
+        return calculate_live_pricing(payload.get('base_results'), payload.get('modifications'))
+    if command == 'evaluate_scenarios':
+        return evaluate_scenarios(payload.get('configuration'), payload.get('scenarios'), payload.get('max_workers'))
+
+    return {
+        'success': False,
+        'error': f'Unknown command: {command}'
+    }
+
+
+# ===== WORKER MODE (line-delimited JSON-RPC over stdin/stdout) =====
+#
+# Started with `python calculation_bridge.py --worker`. The process stays alive
+# between requests, so calculations.py, pandas, the DB layer and the price
+# matrix cache (_PRICE_MATRIX_CACHE) are only loaded once.
+#
+#   -> {"jsonrpc": "2.0", "id": 7, "method": "perform_calculations", "params": {"configuration": {...}}}
+#   <- {"jsonrpc": "2.0", "id": 7, "result": {"success": true, "calculation_results": {...}}}
+#   <- {"jsonrpc": "2.0", "id": 7, "error": {"code": -32601, "message": "..."}}
+#
+# After start-up the worker announces itself with a `ready` notification.
+# Only protocol messages go to stdout, everything else is redirected to stderr.
+
+JSONRPC_PARSE_ERROR = -32700
+JSONRPC_INVALID_REQUEST = -32600
+JSONRPC_METHOD_NOT_FOUND = -32601
+JSONRPC_INTERNAL_ERROR = -32603
+
+
+class UnknownMethodError(Exception):
+    pass
+
+
+def warm_up_worker():
+    """
+    Load the compiled price matrix index before the first request
+    (memory-mapped from data/price_matrix_index when the DB settings are unchanged)
+    """
+    try:
+        import calculations
+
+        calculations.load_price_matrix_index([])
+    except Exception as e:
+        print(f"Worker warm-up skipped: {e}", file=sys.stderr)
+
+
+def _json_safe(value):
+    """NaN/Infinity are not valid JSON for JSON.parse on the Electron side"""
+    if isinstance(value, float):
+        return value if value == value and value not in (float('inf'), float('-inf')) else None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def dispatch_rpc(method, params):
+    if method == 'ping':
+        return {'success': True, 'pid': os.getpid()}
+    if method in ('perform_calculations', 'calculate_live_pricing', 'evaluate_scenarios'):
+        return handle_payload(dict(params, command=method))
+    if split_product_command(method) is not None:
+        return run_product_command(method, params.get('manufacturer'))
+    raise UnknownMethodError(method)
+
+
+def _write_rpc_message(stream, message):
+    stream.write(json.dumps(_json_safe(message), default=str) + '\n')
+    stream.flush()
+
+
+def run_worker(input_stream=None, output_stream=None):
+    """
+    Serve JSON-RPC requests line by line until stdin closes or `shutdown` is received
+    """
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+
+    with contextlib.redirect_stdout(sys.stderr):
+        warm_up_worker()
+    _write_rpc_message(output_stream, {'jsonrpc': '2.0', 'method': 'ready', 'params': {'pid': os.getpid()}})
+
+    for line in input_stream:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            _write_rpc_message(output_stream, {
+                'jsonrpc': '2.0', 'id': None,
+                'error': {'code': JSONRPC_PARSE_ERROR, 'message': f'Parse error: {e}'}
+            })
+            continue
+
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            _write_rpc_message(output_stream, {
+                'jsonrpc': '2.0', 'id': request.get('id') if isinstance(request, dict) else None,
+                'error': {'code': JSONRPC_INVALID_REQUEST, 'message': 'Invalid request'}
+            })
+            continue
+
+        request_id = request.get('id')
+        method = request['method']
+        params = request.get('params') or {}
+
+        if method == 'shutdown':
+            _write_rpc_message(output_stream, {'jsonrpc': '2.0', 'id': request_id, 'result': {'success': True}})
+            break
+
+        try:
+            # calculations.py & Co. print debug output - keep stdout clean for the protocol
+            with contextlib.redirect_stdout(sys.stderr):
+                result = dispatch_rpc(method, params)
+            response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except UnknownMethodError:
+            response = {
+                'jsonrpc': '2.0', 'id': request_id,
+                'error': {'code': JSONRPC_METHOD_NOT_FOUND, 'message': f'Unknown method: {method}'}
+            }
+        except Exception as e:
+            response = {
+                'jsonrpc': '2.0', 'id': request_id,
+                'error': {
+                    'code': JSONRPC_INTERNAL_ERROR,
+                    'message': f'Bridge error: {str(e)}\nTraceback: {traceback.format_exc()}'
+                }
+            }
+
+        _write_rpc_message(output_stream, response)
+
+
 def main():
     """
-    Main bridge function - supports both JSON files and direct commands
+    Main bridge function - supports JSON files, direct commands and worker mode
     """
     try:
         if len(sys.argv) < 2:
-            print("Usage: python calculation_bridge.py <command_or_json_file> [args...]", file=sys.stderr)
+            print("Usage: python calculation_bridge.py <command_or_json_file|--worker> [args...]", file=sys.stderr)
             sys.exit(1)
             
         first_arg = sys.argv[1]
+
+        if first_arg == '--worker':
+            run_worker()
+            return
         
         # Check if first argument is a direct command or JSON file
         if first_arg.endswith('.json') or (os.path.exists(first_arg) and first_arg not in [
@@ -353,160 +609,13 @@ def main():
             with open(first_arg, 'r', encoding='utf-8') as f:
                 payload = json.load(f)
                 
-            command = payload.get('command')
-            
-            if command == 'perform_calculations':
-                config = payload.get('configuration')
-                result = perform_full_calculations(config)
-            elif command == 'calculate_live_pricing':
-                base_results = payload.get('base_results')
-                modifications = payload.get('modifications')
-                result = calculate_live_pricing(base_results, modifications)
-            else:
-                result = {
-                    'success': False,
-                    'error': f'Unknown command: {command}'
-                }
+            result = handle_payload(payload)
                 
         else:
             # Direct command mode
             command = first_arg
-            
-            try:
-                if command == 'get_pv_manufacturers':
-                    from product_db import list_products
-                    products = list_products(category='Modul')
-                    manufacturers = sorted(list(set(p.get('brand', '') for p in products if p.get('brand'))))
-                    result = manufacturers
-                    
-                elif command == 'get_pv_models' and len(sys.argv) >= 3:
-                    manufacturer = sys.argv[2]
-                    from product_db import list_products
-                    products = list_products(category='Modul')
-                    models = [p for p in products if p.get('brand') == manufacturer]
-                    result = models
-                    
-                elif command == 'get_inverter_manufacturers':
-                    from product_db import list_products
-                    products = list_products(category='Wechselrichter')
-                    manufacturers = sorted(list(set(p.get('brand', '') for p in products if p.get('brand'))))
-                    result = manufacturers
-                    
-                elif command == 'get_inverter_models' and len(sys.argv) >= 3:
-                    manufacturer = sys.argv[2]
-                    from product_db import list_products
-                    products = list_products(category='Wechselrichter')
-                    models = [p for p in products if p.get('brand') == manufacturer]
-                    result = models
-                    
-                elif command == 'get_storage_manufacturers':
-                    from product_db import list_products
-                    products = list_products(category='Batteriespeicher')
-                    manufacturers = sorted(list(set(p.get('brand', '') for p in products if p.get('brand'))))
-                    result = manufacturers
-                    
-                elif command == 'get_storage_models' and len(sys.argv) >= 3:
-                    manufacturer = sys.argv[2]
-                    from product_db import list_products
-                    products = list_products(category='Batteriespeicher')
-                    models = [p for p in products if p.get('brand') == manufacturer]
-                    result = models
-                    
-                elif command == 'get_wallbox_manufacturers':
-                    from product_db import list_products
-                    products = list_products(category='Wallbox')
-                    manufacturers = sorted(list(set(p.get('brand', '') for p in products if p.get('brand'))))
-                    result = manufacturers
-                    
-                elif command == 'get_wallbox_models' and len(sys.argv) >= 3:
-                    manufacturer = sys.argv[2]
-                    from product_db import list_products
-                    products = list_products(category='Wallbox')
-                    models = [p for p in products if p.get('brand') == manufacturer]
-                    result = models
-                    
-                elif command == 'get_ems_manufacturers':
-                    from product_db import list_products
-                    products = list_products(category='Energiemanagementsystem')
-                    manufacturers = sorted(list(set(p.get('brand', '') for p in products if p.get('brand'))))
-                    result = manufacturers
-                    
-                elif command == 'get_ems_models' and len(sys.argv) >= 3:
-                    manufacturer = sys.argv[2]
-                    from product_db import list_products
-                    products = list_products(category='Energiemanagementsystem')
-                    models = [p for p in products if p.get('brand') == manufacturer]
-                    result = models
-                    
-                elif command == 'get_optimizer_manufacturers':
-                    from product_db import list_products
-                    products = list_products(category='Leistungsoptimierer')
-                    manufacturers = sorted(list(set(p.get('brand', '') for p in products if p.get('brand'))))
-                    result = manufacturers
-                    
-                elif command == 'get_optimizer_models' and len(sys.argv) >= 3:
-                    manufacturer = sys.argv[2]
-                    from product_db import list_products
-                    products = list_products(category='Leistungsoptimierer')
-                    models = [p for p in products if p.get('brand') == manufacturer]
-                    result = models
-                    
-                elif command == 'get_carport_manufacturers':
-                    from product_db import list_products
-                    products = list_products(category='Carport')
-                    manufacturers = sorted(list(set(p.get('brand', '') for p in products if p.get('brand'))))
-                    result = manufacturers
-                    
-                elif command == 'get_carport_models' and len(sys.argv) >= 3:
-                    manufacturer = sys.argv[2]
-                    from product_db import list_products
-                    products = list_products(category='Carport')
-                    models = [p for p in products if p.get('brand') == manufacturer]
-                    result = models
-                    
-                elif command == 'get_emergency_power_manufacturers':
-                    from product_db import list_products
-                    products = list_products(category='Notstromversorgung')
-                    manufacturers = sorted(list(set(p.get('brand', '') for p in products if p.get('brand'))))
-                    result = manufacturers
-                    
-                elif command == 'get_emergency_power_models' and len(sys.argv) >= 3:
-                    manufacturer = sys.argv[2]
-                    from product_db import list_products
-                    products = list_products(category='Notstromversorgung')
-                    models = [p for p in products if p.get('brand') == manufacturer]
-                    result = models
-                    
-                elif command == 'get_animal_protection_manufacturers':
-                    from product_db import list_products
-                    products = list_products(category='Tierabwehrschutz')
-                    manufacturers = sorted(list(set(p.get('brand', '') for p in products if p.get('brand'))))
-                    result = manufacturers
-                    
-                elif command == 'get_animal_protection_models' and len(sys.argv) >= 3:
-                    manufacturer = sys.argv[2]
-                    from product_db import list_products
-                    products = list_products(category='Tierabwehrschutz')
-                    models = [p for p in products if p.get('brand') == manufacturer]
-                    result = models
-                    
-                else:
-                    result = {
-                        'success': False,
-                        'error': f'Unknown command: {command}'
-                    }
-                    
-            except ImportError as ie:
-                # Fallback: return empty results
-                if 'manufacturers' in command:
-                    result = []
-                elif 'models' in command:
-                    result = []
-                else:
-                    result = {
-                        'success': False,
-                        'error': f'Import error: {str(ie)}'
-                    }
+            manufacturer = sys.argv[2] if len(sys.argv) >= 3 else None
+            result = run_product_command(command, manufacturer)
         
         # Output result as JSON
         print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -58,6 +58,10 @@ except ImportError:
     except ImportError:
         PYPDF_AVAILABLE = False
 
+import offer_tracing
+from multi_offer_pipeline import generate_offer_zip, safe_filename
+from pdf_output_stream import PdfTarget, write_pdf
+
 # ===== TEMPLATE PATHS AND CONFIGURATIONS =====
 
 class PDFSystemConfig:
@@ -87,58 +91,10 @@ config = PDFSystemConfig(project_root)
 # ===== COORDINATE PARSING (extracted from coords/*.yml logic) =====
 
 def parse_coordinates_yml(yml_path: Path) -> List[Dict[str, Any]]:
-    """Parse coordinate YML files to extract text positions and formatting"""
-    if not yml_path.exists():
-        return []
-    
+    """Compiled coordinate layout (shared with pdf_template_engine, cached on disk)"""
     try:
-        with yml_path.open('r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Parse the custom format used in coords files
-        elements = []
-        sections = content.split('----------------------------------------')
-        
-        for section in sections:
-            section = section.strip()
-            if not section:
-                continue
-                
-            lines = section.split('\n')
-            element = {}
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('Text:'):
-                    element['text'] = line.replace('Text:', '').strip()
-                elif line.startswith('Position:'):
-                    # Parse position tuple (x1, y1, x2, y2)
-                    pos_str = line.replace('Position:', '').strip()
-                    pos_match = re.search(r'\(([^)]+)\)', pos_str)
-                    if pos_match:
-                        coords = [float(x.strip()) for x in pos_match.group(1).split(',')]
-                        if len(coords) == 4:
-                            element['position'] = coords
-                elif line.startswith('Schriftart:'):
-                    element['font'] = line.replace('Schriftart:', '').strip()
-                elif line.startswith('Schriftgröße:'):
-                    size_str = line.replace('Schriftgröße:', '').strip()
-                    try:
-                        element['font_size'] = float(size_str)
-                    except ValueError:
-                        element['font_size'] = 10.0
-                elif line.startswith('Farbe:'):
-                    color_str = line.replace('Farbe:', '').strip()
-                    try:
-                        element['color'] = int(color_str)
-                    except ValueError:
-                        element['color'] = 0  # Black
-            
-            if 'text' in element and 'position' in element:
-                elements.append(element)
-        
-        return elements
-        
+        from pdf_template_engine.coords_layout import load_layout
+        return [element for element in load_layout(yml_path) if 'text' in element and 'position' in element]
     except Exception as e:
         print(f"Error parsing YML file {yml_path}: {e}")
         return []
@@ -269,9 +225,7 @@ def create_text_overlay(elements: List[Dict[str, Any]], dynamic_data: Dict[str,
     for element in elements:
         text = element.get('text', '')
         position = element.get('position', [0, 0, 100, 20])  # x1, y1, x2, y2
-        font = element.get('font', 'Helvetica')
         font_size = element.get('font_size', 10.0)
-        color_int = element.get('color', 0)
         
         # Replace placeholders
         text = replace_placeholders_in_text(text, dynamic_data)
@@ -279,36 +233,9 @@ def create_text_overlay(elements: List[Dict[str, Any]], dynamic_data: Dict[str,
         if not text or text.strip() == "":
             continue
             
-        # Convert color integer to RGB
-        try:
-            if color_int == 0:
-                color = colors.black
-            else:
-                # Convert from integer color to RGB
-                r = (color_int >> 16) & 255
-                g = (color_int >> 8) & 255  
-                b = color_int & 255
-                color = Color(r/255.0, g/255.0, b/255.0)
-        except:
-            color = colors.black
-        
-        # Set font and color - normalize font names
-        try:
-            normalized_font = font
-            if font == 'Helvetica-Regular':
-                normalized_font = 'Helvetica'
-            elif font == 'Helvetica-Bold':
-                normalized_font = 'Helvetica-Bold'
-            elif font == 'Arial-Regular':
-                normalized_font = 'Helvetica'
-            elif font == 'Arial-Bold':
-                normalized_font = 'Helvetica-Bold'
-                
-            c.setFont(normalized_font, font_size)
-        except:
-            # Fallback to Helvetica if font not found
-            c.setFont('Helvetica', font_size)
-            
+        # Font and colour are pre-resolved in the compiled layout
+        c.setFont(element['resolved_font'], font_size)
+        color = element['fill_color']
         c.setFillColor(color)
         
         # Draw text at position (x1, y1 from bottom-left)
@@ -384,10 +311,15 @@ def merge_overlay_with_template(template_path: Path, overlay_buffer: io.BytesIO)
 # ===== MAIN PDF GENERATION FUNCTIONS =====
 
 def generate_pv_pdf(project_data: Dict[str, Any], calculation_results: Dict[str, Any], 
-                   company_info: Dict[str, Any]) -> io.BytesIO:
-    """Generate complete PV system PDF (7 pages)"""
+                   company_info: Dict[str, Any], output: Optional[PdfTarget] = None) -> Union[io.BytesIO, PdfTarget]:
+    """Generate complete PV system PDF (7 pages)
+
+    With output (path or writable stream/pipe) the PDF is written there
+    directly and output is returned instead of an in-memory buffer.
+    """
     
-    dynamic_data = build_dynamic_data(project_data, calculation_results, company_info)
+    with offer_tracing.span("dynamic_data"):
+        dynamic_data = build_dynamic_data(project_data, calculation_results, company_info)
     
     writer = PdfWriter()
     
@@ -409,27 +341,31 @@ def generate_pv_pdf(project_data: Dict[str, Any], calculation_results: Dict[str,
         elements = parse_coordinates_yml(coord_file)
         
         # Create overlay
-        overlay_buffer = create_text_overlay(elements, dynamic_data)
+        with offer_tracing.span("overlay", page=page_num):
+            overlay_buffer = create_text_overlay(elements, dynamic_data)
         
         # Merge with template
-        merged_page_buffer = merge_overlay_with_template(template_file, overlay_buffer)
+        with offer_tracing.span("merge", page=page_num):
+            merged_page_buffer = merge_overlay_with_template(template_file, overlay_buffer)
         
         # Add to final PDF
         merged_reader = PdfReader(merged_page_buffer)
         writer.add_page(merged_reader.pages[0])
     
     # Write final PDF
-    output_buffer = io.BytesIO()
-    writer.write(output_buffer)
-    output_buffer.seek(0)
-    
-    return output_buffer
+    with offer_tracing.span("write"):
+        return _write_pdf_output(writer, output)
 
 def generate_heatpump_pdf(project_data: Dict[str, Any], calculation_results: Dict[str, Any], 
-                         company_info: Dict[str, Any], page_count: int = 7) -> io.BytesIO:
-    """Generate heat pump PDF (up to 16 pages available)"""
+                         company_info: Dict[str, Any], page_count: int = 7,
+                         output: Optional[PdfTarget] = None) -> Union[io.BytesIO, PdfTarget]:
+    """Generate heat pump PDF (up to 16 pages available)
+
+    With output the PDF is written there directly (see generate_pv_pdf).
+    """
     
-    dynamic_data = build_dynamic_data(project_data, calculation_results, company_info)
+    with offer_tracing.span("dynamic_data"):
+        dynamic_data = build_dynamic_data(project_data, calculation_results, company_info)
     
     writer = PdfWriter()
     
@@ -453,52 +389,86 @@ def generate_heatpump_pdf(project_data: Dict[str, Any], calculation_results: Dic
         elements = parse_coordinates_yml(coord_file)
         
         # Create overlay
-        overlay_buffer = create_text_overlay(elements, dynamic_data)
+        with offer_tracing.span("overlay", page=page_num):
+            overlay_buffer = create_text_overlay(elements, dynamic_data)
         
         # Merge with template 
-        merged_page_buffer = merge_overlay_with_template(template_file, overlay_buffer)
+        with offer_tracing.span("merge", page=page_num):
+            merged_page_buffer = merge_overlay_with_template(template_file, overlay_buffer)
         
         # Add to final PDF
         merged_reader = PdfReader(merged_page_buffer)
         writer.add_page(merged_reader.pages[0])
     
     # Write final PDF
+    with offer_tracing.span("write"):
+        return _write_pdf_output(writer, output)
+
+def _write_pdf_output(writer: Any, output: Optional[PdfTarget]) -> Union[io.BytesIO, PdfTarget]:
+    """Write to output (file/pipe) if given, otherwise into a fresh BytesIO."""
+    if output is not None:
+        write_pdf(writer, output)
+        return output
     output_buffer = io.BytesIO()
     writer.write(output_buffer)
     output_buffer.seek(0)
-    
     return output_buffer
 
+def _render_company_pdf(job: Dict[str, Any]) -> bytes:
+    """Worker für generate_multi_company_pdfs (läuft im Prozess-Pool)."""
+    if job["pdf_type"] == "heatpump":
+        pdf_buffer = generate_heatpump_pdf(job["project_data"], job["calculation_results"], job["company"])
+    else:
+        pdf_buffer = generate_pv_pdf(job["project_data"], job["calculation_results"], job["company"])
+    return pdf_buffer.getvalue()
+
+def _company_pdf_jobs(project_data: Dict[str, Any], calculation_results: Dict[str, Any],
+                      companies: List[Dict[str, Any]], pdf_type: str) -> List[Dict[str, Any]]:
+    prefix = {"pv": "PV_Angebot", "heatpump": "Waermepumpe_Angebot"}.get(pdf_type)
+    if prefix is None:
+        return []
+    jobs = []
+    for company in companies:
+        company_name = company.get("name", "Unknown Company")
+        jobs.append({
+            "name": company_name,
+            "filename": f"{prefix}_{safe_filename(company_name)}.pdf",
+            "payload": {"pdf_type": pdf_type, "project_data": project_data,
+                        "calculation_results": calculation_results, "company": company},
+        })
+    return jobs
+
 def generate_multi_company_pdfs(project_data: Dict[str, Any], calculation_results: Dict[str, Any], 
-                               companies: List[Dict[str, Any]], pdf_type: str = "pv") -> io.BytesIO:
-    """Generate PDFs for multiple companies and return as ZIP"""
-    
-    zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        
-        for company in companies:
-            company_name = company.get("name", "Unknown Company")
-            safe_name = re.sub(r'[^\w\s-]', '', company_name).replace(' ', '_')
-            
-            try:
-                if pdf_type == "pv":
-                    pdf_buffer = generate_pv_pdf(project_data, calculation_results, company)
-                    filename = f"PV_Angebot_{safe_name}.pdf"
-                elif pdf_type == "heatpump":
-                    pdf_buffer = generate_heatpump_pdf(project_data, calculation_results, company)
-                    filename = f"Waermepumpe_Angebot_{safe_name}.pdf"
-                else:
-                    continue
-                
-                zip_file.writestr(filename, pdf_buffer.getvalue())
-                
-            except Exception as e:
-                print(f"Error generating PDF for company {company_name}: {e}")
-                continue
-    
-    zip_buffer.seek(0)
-    return zip_buffer
+                               companies: List[Dict[str, Any]], pdf_type: str = "pv",
+                               output: Optional[Union[str, io.BytesIO]] = None,
+                               max_workers: Optional[int] = None,
+                               on_progress: Optional[Any] = None) -> Union[io.BytesIO, Dict[str, Any]]:
+    """Generate PDFs for multiple companies in parallel and stream them into a ZIP.
+
+    Without output the ZIP is returned as BytesIO; with output (path or file
+    object, also a pipe) the ZIP is written there and the batch summary is
+    returned. In that case the company PDFs are spooled through temp files,
+    so no bundle-sized buffer is held in memory.
+    """
+    jobs = _company_pdf_jobs(project_data, calculation_results, companies, pdf_type)
+    target = output if output is not None else io.BytesIO()
+    summary = generate_offer_zip(jobs, _render_company_pdf, target, max_workers=max_workers,
+                                 on_progress=on_progress, spool=output is not None)
+    for failure in summary["failed"]:
+        print(f"Error generating PDF for company {failure['name']}: {failure['error']}", file=sys.stderr)
+    if output is not None:
+        return summary
+    target.seek(0)
+    return target
+
+def _file_result(output_file: str) -> Dict[str, Any]:
+    output_path = os.path.abspath(output_file)
+    return {'success': True, 'output_file': output_file, 'output_path': output_path,
+            'size_bytes': os.path.getsize(output_path)}
+
+def _print_progress(event: Dict[str, Any]) -> None:
+    # Fortschritt als JSON-Zeilen auf stderr, stdout bleibt dem Ergebnis vorbehalten
+    print(json.dumps({"progress": event}, ensure_ascii=False), file=sys.stderr, flush=True)
 
 # ===== CLI INTERFACE =====
 
@@ -511,84 +481,82 @@ def main():
             
         command = sys.argv[1]
         
-        if command == 'generate_pv_pdf':
-            if len(sys.argv) < 3:
-                print(json.dumps({'error': 'Configuration file path required'}))
-                return
+        with offer_tracing.trace_request(f"pdf_bridge.{command}") as trace:
+            if command == 'generate_pv_pdf':
+                if len(sys.argv) < 3:
+                    print(json.dumps({'error': 'Configuration file path required'}))
+                    return
                 
-            config_file = sys.argv[2]
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
+                config_file = sys.argv[2]
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    config_data = json.load(f)
             
-            project_data = config_data.get('project_data', {})
-            calculation_results = config_data.get('calculation_results', {})
-            company_info = config_data.get('company_info', {})
+                project_data = config_data.get('project_data', {})
+                calculation_results = config_data.get('calculation_results', {})
+                company_info = config_data.get('company_info', {})
             
-            pdf_buffer = generate_pv_pdf(project_data, calculation_results, company_info)
+                # Stream directly to file; Electron receives the path, not the bytes
+                output_file = config_data.get('output_file', 'pv_angebot.pdf')
+                generate_pv_pdf(project_data, calculation_results, company_info, output=output_file)
             
-            # Save to file
-            output_file = config_data.get('output_file', 'pv_angebot.pdf')
-            with open(output_file, 'wb') as f:
-                f.write(pdf_buffer.getvalue())
+                result = _file_result(output_file)
             
-            result = {'success': True, 'output_file': output_file}
-            
-        elif command == 'generate_heatpump_pdf':
-            if len(sys.argv) < 3:
-                print(json.dumps({'error': 'Configuration file path required'}))
-                return
+            elif command == 'generate_heatpump_pdf':
+                if len(sys.argv) < 3:
+                    print(json.dumps({'error': 'Configuration file path required'}))
+                    return
                 
-            config_file = sys.argv[2]
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-            
-            project_data = config_data.get('project_data', {})
-            calculation_results = config_data.get('calculation_results', {})
-            company_info = config_data.get('company_info', {})
-            page_count = config_data.get('page_count', 7)
+                config_file = sys.argv[2]
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    config_data = json.load(f)
             
-            pdf_buffer = generate_heatpump_pdf(project_data, calculation_results, company_info, page_count)
+                project_data = config_data.get('project_data', {})
+                calculation_results = config_data.get('calculation_results', {})
+                company_info = config_data.get('company_info', {})
+                page_count = config_data.get('page_count', 7)
             
-            # Save to file
-            output_file = config_data.get('output_file', 'waermepumpe_angebot.pdf')
-            with open(output_file, 'wb') as f:
-                f.write(pdf_buffer.getvalue())
+                # Stream directly to file; Electron receives the path, not the bytes
+                output_file = config_data.get('output_file', 'waermepumpe_angebot.pdf')
+                generate_heatpump_pdf(project_data, calculation_results, company_info, page_count, output=output_file)
             
-            result = {'success': True, 'output_file': output_file}
+                result = _file_result(output_file)
             
-        elif command == 'generate_multi_pdfs':
-            if len(sys.argv) < 3:
-                print(json.dumps({'error': 'Configuration file path required'}))
-                return
+            elif command == 'generate_multi_pdfs':
+                if len(sys.argv) < 3:
+                    print(json.dumps({'error': 'Configuration file path required'}))
+                    return
                 
-            config_file = sys.argv[2]
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-            
-            project_data = config_data.get('project_data', {})
-            calculation_results = config_data.get('calculation_results', {})
-            companies = config_data.get('companies', [])
-            pdf_type = config_data.get('pdf_type', 'pv')
+                config_file = sys.argv[2]
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    config_data = json.load(f)
             
-            zip_buffer = generate_multi_company_pdfs(project_data, calculation_results, companies, pdf_type)
+                project_data = config_data.get('project_data', {})
+                calculation_results = config_data.get('calculation_results', {})
+                companies = config_data.get('companies', [])
+                pdf_type = config_data.get('pdf_type', 'pv')
             
-            # Save to file
-            output_file = config_data.get('output_file', f'multi_angebote_{pdf_type}.zip')
-            with open(output_file, 'wb') as f:
-                f.write(zip_buffer.getvalue())
+                output_file = config_data.get('output_file', f'multi_angebote_{pdf_type}.zip')
+                summary = generate_multi_company_pdfs(project_data, calculation_results, companies, pdf_type,
+                                                      output=output_file, max_workers=config_data.get('max_workers'),
+                                                      on_progress=_print_progress)
             
-            result = {'success': True, 'output_file': output_file}
+                result = {**_file_result(output_file), 'success': bool(summary['succeeded']),
+                          'generated': [item['filename'] for item in summary['succeeded']],
+                          'failed': summary['failed'], 'seconds': round(summary['seconds'], 2)}
             
-        elif command == 'test_coordinates':
-            # Test coordinate parsing
-            coord_file = sys.argv[2] if len(sys.argv) > 2 else 'coords/seite1.yml'
-            coord_path = project_root / coord_file
+            elif command == 'test_coordinates':
+                # Test coordinate parsing
+                coord_file = sys.argv[2] if len(sys.argv) > 2 else 'coords/seite1.yml'
+                coord_path = project_root / coord_file
             
-            elements = parse_coordinates_yml(coord_path)
-            result = {'success': True, 'elements_count': len(elements), 'elements': elements[:5]}  # Show first 5
+                elements = parse_coordinates_yml(coord_path)
+                result = {'success': True, 'elements_count': len(elements), 'elements': elements[:5]}  # Show first 5
             
-        else:
-            result = {'error': f'Unknown command: {command}'}
+            else:
+                result = {'error': f'Unknown command: {command}'}
+        
+        if trace is not None and trace.path and isinstance(result, dict):
+            result['trace_file'] = trace.path
         
         # Output clean JSON
         print(json.dumps(result, ensure_ascii=False, indent=2))
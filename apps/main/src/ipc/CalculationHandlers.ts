@@ -2,7 +2,7 @@
 // IPC handlers for Python calculation bridge
 
 import { ipcMain } from 'electron';
-import { PythonCalculationService, SolarConfiguration, CalculationResults } from '../services/PythonCalculationService';
+import { PythonCalculationService, SolarConfiguration, CalculationResults, ScenarioOverrides } from '../services/PythonCalculationService';
 
 export class CalculationHandlers {
   private calculationService: PythonCalculationService;
@@ -72,6 +72,29 @@ export class CalculationHandlers {
       }
     });
 
+    // Batch scenario handler (N variants of one configuration)
+    ipcMain.handle('calculation:evaluate-scenarios', async (event, configuration: SolarConfiguration, scenarios: ScenarioOverrides[], maxWorkers?: number) => {
+      try {
+        console.log('🔄 Evaluating scenarios...', { count: scenarios?.length || 0 });
+
+        const result = await this.calculationService.evaluateScenarios(configuration, scenarios || [], maxWorkers);
+
+        if (result.success) {
+          console.log('✅ Scenarios evaluated successfully');
+        } else {
+          console.error('❌ Scenario evaluation failed:', result.error);
+        }
+
+        return result;
+      } catch (error) {
+        console.error('💥 Scenario handler error:', error);
+        return {
+          success: false,
+          error: `Handler error: ${error instanceof Error ? error.message : 'Unknown error'}`
+        };
+      }
+    });
+
     // Validate configuration handler
     ipcMain.handle('calculation:validate-configuration', async (event, configuration: SolarConfiguration) => {
       try {
@@ -126,6 +149,11 @@ export class CalculationHandlers {
     console.log('🚀 Calculation handlers registered successfully');
   }
 
+  // Stops the warm Python calculation workers
+  dispose(): void {
+    this.calculationService.dispose();
+  }
+
   private validateConfiguration(configuration: SolarConfiguration): {
     isValid: boolean;
     errors: string[];
@@ -30,14 +30,20 @@ function runPy(...args: string[]): Promise<string> {
 		'list_brand_logos', 'add_brand_logo', 'get_brand_logo', 'delete_brand_logo', 'init_database'
 	];
 	
+	// Produktkatalog (schlanke Listen, Bilder/Datenblätter per ID) für solar_calculator_bridge.py
+	const catalogCommands = ['products_list', 'product_image', 'product_datasheet'];
+	
 	const isSolarCommand = args.length > 0 && solarCommands.includes(args[0]);
 	const isDatabaseCommand = args.length > 0 && databaseCommands.includes(args[0]);
+	const isCatalogCommand = args.length > 0 && catalogCommands.includes(args[0]);
 	
 	let script: string;
 	if (isSolarCommand) {
 		script = path.resolve(__dirname, 'solar_calculation_bridge.py');  // Comprehensive solar script
 	} else if (isDatabaseCommand) {
 		script = path.resolve(__dirname, 'database_bridge.py');  // Database operations script
+	} else if (isCatalogCommand) {
+		script = path.resolve(process.cwd(), '..', '..', 'solar_calculator_bridge.py');  // Product catalog
 	} else {
 		script = path.resolve(process.cwd(), '..', '..', 'calculation_bridge.py');  // Original fallback
 	}
@@ -173,6 +179,7 @@ app.whenReady().then(() => {
 	
 	try {
 		const calculationHandlers = new CalculationHandlers();
+		app.on('will-quit', () => calculationHandlers.dispose());
 		console.log('Calculation handlers registered successfully');
 	} catch (error) {
 		console.error('Failed to register Calculation handlers:', error);
@@ -286,6 +293,13 @@ app.whenReady().then(() => {
 			const json = JSON.stringify(payload ?? {});
 			return JSON.parse(await runPy('products_list', json));
 		});
+		ipcMain.handle('products:image', async (_e, id: number, maxSizePx?: number) => {
+			const args = maxSizePx ? [String(id), String(maxSizePx)] : [String(id)];
+			return JSON.parse(await runPy('product_image', ...args));
+		});
+		ipcMain.handle('products:datasheet', async (_e, id: number) => {
+			return JSON.parse(await runPy('product_datasheet', String(id)));
+		});
 		ipcMain.handle('products:delete_single', async (_e, id: number) => {
 			return JSON.parse(await runPy('delete_product_single', String(id)));
 		});
@@ -93,7 +93,10 @@ contextBridge.exposeInMainWorld('importAPI', importAPI);
 const productsAPI = {
   addSingle: (data: Record<string, unknown>) => ipcRenderer.invoke('products:add_single', data),
   updateSingle: (id: number, data: Record<string, unknown>) => ipcRenderer.invoke('products:update_single', id, data),
-  list: (payload?: { category?: string; company_id?: number }) => ipcRenderer.invoke('products:list', payload ?? {}),
+  list: (payload?: { category?: string; company_id?: number; limit?: number; offset?: number; include_images?: boolean }) =>
+    ipcRenderer.invoke('products:list', payload ?? {}),
+  image: (id: number, maxSizePx?: number) => ipcRenderer.invoke('products:image', id, maxSizePx),
+  datasheet: (id: number) => ipcRenderer.invoke('products:datasheet', id),
   deleteSingle: (id: number) => ipcRenderer.invoke('products:delete_single', id),
 };
 
@@ -172,6 +175,8 @@ const calculationAPI = {
     ipcRenderer.invoke('calculation:perform-calculations', configuration),
   livePricing: (baseResults: any, modifications: any) => 
     ipcRenderer.invoke('calculation:live-pricing', baseResults, modifications),
+  evaluateScenarios: (configuration: any, scenarios: any[], maxWorkers?: number) =>
+    ipcRenderer.invoke('calculation:evaluate-scenarios', configuration, scenarios, maxWorkers),
   validateConfiguration: (configuration: any) => 
     ipcRenderer.invoke('calculation:validate-configuration', configuration),
   quickEstimate: (basicParams: any) => 
@@ -1,9 +1,10 @@
 // apps/main/src/services/PythonCalculationService.ts
 // Bridge to Python calculation pipeline - mirrors calculations.py:perform_calculations
 
-import { spawn, spawnSync } from 'child_process';
+import { spawnSync } from 'child_process';
 import * as path from 'path';
 import * as fs from 'fs';
+import { PythonWorkerPool } from './PythonWorkerPool';
 
 export interface SolarConfiguration {
   // Module Configuration
@@ -127,8 +128,38 @@ export interface CalculationResults {
   calculation_errors?: string[];
 }
 
+// One project variant for evaluateScenarios - mirrors scenario_batch.py:apply_scenario_overrides
+export interface ScenarioOverrides {
+  name?: string;
+  module_quantity?: number;
+  storage_capacity_kwh?: number;
+  electricity_price_increase_percent?: number;
+  feed_in_type?: 'Teileinspeisung' | 'Volleinspeisung';
+  simulation_duration_years?: number;
+  project_details?: Record<string, unknown>;
+  economic_data?: Record<string, unknown>;
+}
+
+export interface ScenarioResultRow {
+  scenario_index: number;
+  scenario_name: string;
+  anlage_kwp: number | null;
+  total_investment_netto: number | null;
+  annual_pv_production_kwh: number | null;
+  self_supply_rate_percent: number | null;
+  annual_financial_benefit_year1: number | null;
+  amortization_time_years: number | null;
+  npv_value: number | null;
+  irr_percent: number | null;
+  lcoe_euro_per_kwh: number | null;
+  annual_co2_savings_kg: number | null;
+  error: string | null;
+  warnings: number;
+}
+
 export class PythonCalculationService {
   private pythonExecutable: string;
+  private workerPool: PythonWorkerPool | null = null;
 
   constructor() {
     this.pythonExecutable = this.detectPython();
@@ -159,14 +190,36 @@ export class PythonCalculationService {
     return 'python';
   }
 
+  // calculation_bridge.py lives next to the bundle in dev and one level up from dist/ in builds
+  private resolveBridgeScript(): string {
+    const candidates = [
+      path.join(__dirname, 'calculation_bridge.py'),
+      path.join(__dirname, '..', 'calculation_bridge.py'),
+      path.join(process.cwd(), 'calculation_bridge.py')
+    ];
+    return candidates.find((candidate) => fs.existsSync(candidate)) ?? candidates[0];
+  }
+
+  // Warm workers are started lazily on the first request and reused afterwards
+  private getWorkerPool(): PythonWorkerPool {
+    if (!this.workerPool) {
+      const size = Number(process.env.KAKERLAKE_CALC_WORKERS || 1);
+      this.workerPool = new PythonWorkerPool({
+        pythonExecutable: this.pythonExecutable,
+        script: this.resolveBridgeScript(),
+        size: Number.isFinite(size) && size > 0 ? size : 1,
+        cwd: process.cwd()
+      });
+    }
+    return this.workerPool;
+  }
+
   // Main calculation method - mirrors calculations.py:perform_calculations
   async performCalculations(
     configuration: SolarConfiguration
   ): Promise<{ success: boolean; results?: CalculationResults; error?: string }> {
     try {
-      // Prepare payload for Python CLI
-      const payload = {
-        command: 'perform_calculations',
+      const result = await this.getWorkerPool().call('perform_calculations', {
         configuration: configuration,
         options: {
           include_charts: true,
@@ -174,83 +227,20 @@ export class PythonCalculationService {
           include_environmental_analysis: true,
           pvgis_api_enabled: true,
         }
-      };
+      }, 120000);
 
-      // Write payload to temp file
-      const tempDir = path.join(process.cwd(), 'temp');
-      if (!fs.existsSync(tempDir)) {
-        fs.mkdirSync(tempDir, { recursive: true });
+      if (!result?.success) {
+        return {
+          success: false,
+          error: result?.error || 'Calculation failed without error message'
+        };
       }
 
-      const payloadFile = path.join(tempDir, `calc_request_${Date.now()}.json`);
-      fs.writeFileSync(payloadFile, JSON.stringify(payload, null, 2), 'utf-8');
-
-      // Call Python CLI - use comprehensive solar bridge
-      const pythonScript = path.join(__dirname, 'solar_calculation_bridge.py');
-      
-      return new Promise((resolve) => {
-        const pythonProcess = spawn(this.pythonExecutable, [pythonScript, payloadFile], {
-          cwd: process.cwd(),
-          stdio: ['pipe', 'pipe', 'pipe']
-        });
-
-        let stdout = '';
-        let stderr = '';
-
-        pythonProcess.stdout.on('data', (data) => {
-          stdout += data.toString();
-        });
-
-        pythonProcess.stderr.on('data', (data) => {
-          stderr += data.toString();
-        });
-
-        pythonProcess.on('close', (code) => {
-          // Cleanup temp file
-          try {
-            fs.unlinkSync(payloadFile);
-          } catch (e) {
-            console.warn('Could not clean up temp file:', payloadFile);
-          }
-
-          if (code === 0) {
-            try {
-              const result = JSON.parse(stdout);
-              resolve({
-                success: true,
-                results: result.calculation_results,
-                error: undefined
-              });
-            } catch (parseError) {
-              resolve({
-                success: false,
-                error: `Failed to parse Python response: ${parseError instanceof Error ? parseError.message : 'Unknown error'}\nStdout: ${stdout}\nStderr: ${stderr}`
-              });
-            }
-          } else {
-            resolve({
-              success: false,
-              error: `Python process exited with code ${code}\nStderr: ${stderr}\nStdout: ${stdout}`
-            });
-          }
-        });
-
-        pythonProcess.on('error', (error) => {
-          resolve({
-            success: false,
-            error: `Failed to start Python process: ${error.message}`
-          });
-        });
-
-        // Set timeout for calculations (longer than PDF generation)
-        setTimeout(() => {
-          pythonProcess.kill();
-          resolve({
-            success: false,
-            error: 'Calculation timed out after 120 seconds'
-          });
-        }, 120000);
-      });
+      return {
+        success: true,
+        results: result.calculation_results,
+        error: undefined
+      };
 
     } catch (error) {
       return {
@@ -268,92 +258,73 @@ export class PythonCalculationService {
       surcharge_percent?: number;
       additional_costs?: number;
       custom_prices?: { [key: string]: number };
+      financing?: { interest_rate: number; duration_years: number; down_payment_eur?: number };
     }
   ): Promise<{ success: boolean; results?: any; error?: string }> {
     try {
-      const payload = {
-        command: 'calculate_live_pricing',
+      const result = await this.getWorkerPool().call('calculate_live_pricing', {
         base_results: baseResults,
         modifications: modifications
-      };
+      }, 30000);
 
-      const tempDir = path.join(process.cwd(), 'temp');
-      if (!fs.existsSync(tempDir)) {
-        fs.mkdirSync(tempDir, { recursive: true });
+      if (!result?.success) {
+        return {
+          success: false,
+          error: result?.error || 'Live pricing failed without error message'
+        };
       }
 
-      const payloadFile = path.join(tempDir, `pricing_request_${Date.now()}.json`);
-      fs.writeFileSync(payloadFile, JSON.stringify(payload, null, 2), 'utf-8');
-
-      const pythonScript = path.join(__dirname, 'solar_calculation_bridge.py');
-      
-      return new Promise((resolve) => {
-        const pythonProcess = spawn(this.pythonExecutable, [pythonScript, payloadFile], {
-          cwd: process.cwd(),
-          stdio: ['pipe', 'pipe', 'pipe']
-        });
-
-        let stdout = '';
-        let stderr = '';
-
-        pythonProcess.stdout.on('data', (data) => {
-          stdout += data.toString();
-        });
-
-        pythonProcess.stderr.on('data', (data) => {
-          stderr += data.toString();
-        });
-
-        pythonProcess.on('close', (code) => {
-          try {
-            fs.unlinkSync(payloadFile);
-          } catch (e) {
-            console.warn('Could not clean up temp file:', payloadFile);
-          }
+      return {
+        success: true,
+        results: result.pricing_results,
+        error: undefined
+      };
 
-          if (code === 0) {
-            try {
-              const result = JSON.parse(stdout);
-              resolve({
-                success: true,
-                results: result.pricing_results,
-                error: undefined
-              });
-            } catch (parseError) {
-              resolve({
-                success: false,
-                error: `Failed to parse Python response: ${parseError instanceof Error ? parseError.message : 'Unknown error'}`
-              });
-            }
-          } else {
-            resolve({
-              success: false,
-              error: `Python process exited with code ${code}\nStderr: ${stderr}`
-            });
-          }
-        });
+    } catch (error) {
+      return {
+        success: false,
+        error: `Live pricing error: ${error instanceof Error ? error.message : 'Unknown error'}`
+      };
+    }
+  }
 
-        pythonProcess.on('error', (error) => {
-          resolve({
-            success: false,
-            error: `Failed to start Python process: ${error.message}`
-          });
-        });
+  // Batch scenario evaluation - mirrors scenario_batch.py:evaluate_scenarios
+  async evaluateScenarios(
+    configuration: SolarConfiguration,
+    scenarios: ScenarioOverrides[],
+    maxWorkers?: number
+  ): Promise<{ success: boolean; results?: ScenarioResultRow[]; error?: string }> {
+    try {
+      const result = await this.getWorkerPool().call('evaluate_scenarios', {
+        configuration: configuration,
+        scenarios: scenarios,
+        max_workers: maxWorkers ?? null
+      }, 300000);
+
+      if (!result?.success) {
+        return {
+          success: false,
+          error: result?.error || 'Scenario evaluation failed without error message'
+        };
+      }
 
-        setTimeout(() => {
-          pythonProcess.kill();
-          resolve({
-            success: false,
-            error: 'Live pricing calculation timed out after 30 seconds'
-          });
-        }, 30000);
-      });
+      return {
+        success: true,
+        results: result.scenario_results,
+        error: undefined
+      };
 
     } catch (error) {
       return {
         success: false,
-        error: `Live pricing error: ${error instanceof Error ? error.message : 'Unknown error'}`
+        error: `Scenario evaluation error: ${error instanceof Error ? error.message : 'Unknown error'}`
       };
     }
   }
+
+  // Stop the warm Python workers (called on app shutdown)
+  dispose(): void {
+    this.workerPool?.dispose();
+    this.workerPool = null;
+  }
 }
@@ -49,22 +49,23 @@ export class PythonPdfService {
       // Prepare payload for new PDF generation bridge
       const pdfType = options.extended_pages ? 'pv' : (options.wp_additional_pages ? 'heatpump' : 'pv');
       
+      // Temp directory for request payload and generated PDF
+      const tempDir = path.join(process.cwd(), 'temp');
+      if (!fs.existsSync(tempDir)) {
+        fs.mkdirSync(tempDir, { recursive: true });
+      }
+
+      // Python streams the PDF straight into this file and answers with its path
       const payload = {
         project_data: projectData,
         calculation_results: analysisResults,
         company_info: options.company_info || {},
-        output_file: `${pdfType}_angebot_${Date.now()}.pdf`,
+        output_file: path.join(tempDir, `${pdfType}_angebot_${Date.now()}.pdf`),
         pdf_type: pdfType,
         page_count: options.wp_additional_pages ? 16 : 7,
         companies: options.companies || []
       };
 
-      // Write payload to temp file
-      const tempDir = path.join(process.cwd(), 'temp');
-      if (!fs.existsSync(tempDir)) {
-        fs.mkdirSync(tempDir, { recursive: true });
-      }
-
       const payloadFile = path.join(tempDir, `pdf_request_${Date.now()}.json`);
       fs.writeFileSync(payloadFile, JSON.stringify(payload, null, 2), 'utf-8');
 
@@ -106,7 +107,7 @@ export class PythonPdfService {
               const result = JSON.parse(stdout);
               resolve({
                 success: true,
-                filePath: result.output_path,
+                filePath: result.output_path || result.output_file,
                 error: undefined
               });
             } catch (parseError) {
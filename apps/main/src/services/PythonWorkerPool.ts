@@ -0,0 +1,193 @@
+// apps/main/src/services/PythonWorkerPool.ts
+// Long-lived Python workers speaking line-delimited JSON-RPC (calculation_bridge.py --worker)
+
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import * as readline from 'readline';
+
+export interface PythonWorkerPoolOptions {
+  pythonExecutable: string;
+  script: string;
+  // Number of warm worker processes (default 1)
+  size?: number;
+  // Default per-request timeout in ms (default 120s)
+  requestTimeoutMs?: number;
+  // Max time to wait for the worker "ready" notification (default 60s)
+  startupTimeoutMs?: number;
+  cwd?: string;
+}
+
+interface PendingRequest {
+  resolve: (value: any) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+}
+
+class PythonWorker {
+  private process: ChildProcessWithoutNullStreams | null = null;
+  private ready: Promise<void> | null = null;
+  private pending = new Map<number, PendingRequest>();
+  private stderrTail = '';
+
+  constructor(private readonly options: Required<Omit<PythonWorkerPoolOptions, 'cwd'>> & { cwd?: string }) {}
+
+  get load(): number {
+    return this.pending.size;
+  }
+
+  private start(): Promise<void> {
+    if (this.ready) {
+      return this.ready;
+    }
+
+    this.ready = new Promise<void>((resolve, reject) => {
+      const child = spawn(this.options.pythonExecutable, [this.options.script, '--worker'], {
+        cwd: this.options.cwd ?? process.cwd(),
+        stdio: ['pipe', 'pipe', 'pipe'],
+        windowsHide: true
+      });
+      this.process = child;
+      this.stderrTail = '';
+
+      const startupTimer = setTimeout(() => {
+        reject(new Error(`Python worker did not become ready within ${this.options.startupTimeoutMs} ms\nStderr: ${this.stderrTail}`));
+        this.restart();
+      }, this.options.startupTimeoutMs);
+
+      const lines = readline.createInterface({ input: child.stdout });
+      lines.on('line', (line) => {
+        let message: any;
+        try {
+          message = JSON.parse(line);
+        } catch {
+          // Not a protocol message - should not happen, the worker redirects prints to stderr
+          console.warn('Python worker: ignoring non-JSON stdout line:', line.slice(0, 200));
+          return;
+        }
+
+        if (message.method === 'ready') {
+          clearTimeout(startupTimer);
+          resolve();
+          return;
+        }
+
+        const request = this.pending.get(message.id);
+        if (!request) {
+          return;
+        }
+        this.pending.delete(message.id);
+        clearTimeout(request.timer);
+
+        if (message.error) {
+          request.reject(new Error(message.error.message || 'Unknown worker error'));
+        } else {
+          request.resolve(message.result);
+        }
+      });
+
+      child.stderr.on('data', (data) => {
+        // Keep only the tail for error reporting
+        this.stderrTail = (this.stderrTail + data.toString()).slice(-4000);
+      });
+
+      child.on('error', (error) => {
+        clearTimeout(startupTimer);
+        reject(new Error(`Failed to start Python worker: ${error.message}`));
+        if (this.process === child) {
+          this.handleExit(`Failed to start Python worker: ${error.message}`);
+        }
+      });
+
+      child.on('exit', (code) => {
+        clearTimeout(startupTimer);
+        reject(new Error(`Python worker exited with code ${code} during startup\nStderr: ${this.stderrTail}`));
+        // Ignore exits of processes that were already replaced by restart()
+        if (this.process === child) {
+          this.handleExit(`Python worker exited with code ${code}\nStderr: ${this.stderrTail}`);
+        }
+      });
+    });
+
+    return this.ready;
+  }
+
+  private handleExit(reason: string): void {
+    this.process = null;
+    this.ready = null;
+    for (const [id, request] of this.pending) {
+      clearTimeout(request.timer);
+      request.reject(new Error(reason));
+      this.pending.delete(id);
+    }
+  }
+
+  // Kill the current process; the next call() spawns a fresh one
+  restart(): void {
+    const child = this.process;
+    this.handleExit('Python worker restarted');
+    if (child && child.exitCode === null) {
+      child.kill();
+    }
+  }
+
+  async call(id: number, method: string, params: any, timeoutMs: number): Promise<any> {
+    await this.start();
+    const child = this.process;
+    if (!child) {
+      throw new Error('Python worker is not running');
+    }
+
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`${method} timed out after ${Math.round(timeoutMs / 1000)} seconds`));
+        // The worker is busy with a request nobody waits for anymore -> replace it
+        this.restart();
+      }, timeoutMs);
+
+      this.pending.set(id, { resolve, reject, timer });
+      child.stdin.write(JSON.stringify({ jsonrpc: '2.0', id, method, params }) + '\n');
+    });
+  }
+
+  shutdown(): void {
+    const child = this.process;
+    if (child && child.exitCode === null) {
+      try {
+        child.stdin.write(JSON.stringify({ jsonrpc: '2.0', id: 0, method: 'shutdown' }) + '\n');
+        child.stdin.end();
+      } catch {
+        child.kill();
+      }
+    }
+    this.handleExit('Python worker shut down');
+  }
+}
+
+export class PythonWorkerPool {
+  private readonly workers: PythonWorker[];
+  private readonly requestTimeoutMs: number;
+  private nextId = 1;
+
+  constructor(options: PythonWorkerPoolOptions) {
+    const resolved = {
+      size: 1,
+      requestTimeoutMs: 120000,
+      startupTimeoutMs: 60000,
+      ...options
+    };
+    this.requestTimeoutMs = resolved.requestTimeoutMs;
+    this.workers = Array.from({ length: Math.max(1, resolved.size) }, () => new PythonWorker(resolved));
+  }
+
+  // Send a request to the least busy worker; dead or timed out workers are restarted on demand
+  call<T = any>(method: string, params: any = {}, timeoutMs?: number): Promise<T> {
+    const worker = this.workers.reduce((best, w) => (w.load < best.load ? w : best));
+    return worker.call(this.nextId++, method, params, timeoutMs ?? this.requestTimeoutMs);
+  }
+
+  dispose(): void {
+    for (const worker of this.workers) {
+      worker.shutdown();
+    }
+  }
+}
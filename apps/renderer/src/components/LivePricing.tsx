@@ -37,6 +37,14 @@ interface PricingResults {
   price_change_percent: number;
   new_amortization_years: number;
   new_roi_percent: number;
+  kpis?: {
+    amortization_time_years: number;
+    npv_value: number;
+    irr_percent: number | null;
+    lcoe_euro_per_kwh: number | null;
+    cumulative_cash_flows_sim: number[];
+    financing?: { monthly_payment: number; total_interest: number; monthly_net_year1: number };
+  };
   updated_at: string;
 }
 
@@ -0,0 +1,100 @@
+# atomic_files.py - Atomares Schreiben und Generationswechsel für Datei-Caches
+"""
+Gemeinsame Helfer für Caches unter data/ (Lookup-Tabellen, Preis-Matrix-Index,
+Bild-Varianten), die von mehreren Prozessen gleichzeitig gelesen werden.
+
+Dateien werden in eine temporäre Datei im Zielverzeichnis geschrieben und per
+os.replace umbenannt; Leser sehen also nie halbe Stände. Memory-gemappte
+Arrays werden nie überschrieben: jeder Neuaufbau schreibt eine neue
+Generation (<name>-<generation>.npy) und schaltet zuletzt das Manifest um.
+Beim Aufräumen bleibt die vorige Generation erhalten, weil ein anderer Prozess
+ihr Manifest gerade gelesen haben kann; ältere Generationen werden entfernt
+(unter POSIX bleiben gemappte Inhalte dabei gültig).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import uuid
+from typing import IO, Any, Callable, Dict, Iterable, Optional, Set
+
+import numpy as np
+
+
+def _write_atomic(path: str, write: Callable[[IO[bytes]], None], suffix: str) -> None:
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            write(handle)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_bytes_atomic(path: str, data: bytes) -> None:
+    _write_atomic(path, lambda handle: handle.write(data), ".tmp")
+
+
+def write_array_atomic(path: str, array: np.ndarray) -> None:
+    _write_atomic(path, lambda handle: np.save(handle, array), ".npy.tmp")
+
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = None) -> None:
+    encoded = json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")
+    _write_atomic(path, lambda handle: handle.write(encoded), ".json.tmp")
+
+
+def new_generation() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def manifest_files(manifest_path: str) -> Set[str]:
+    """Dateinamen der Generation, die manifest_path nennt (leer, wenn nicht lesbar)."""
+    try:
+        with open(manifest_path, encoding="utf-8") as handle:
+            files = json.load(handle).get("files")
+    except (OSError, ValueError, AttributeError):
+        return set()
+    if not isinstance(files, dict):
+        return set()
+    return {os.path.basename(str(name)) for name in files.values()}
+
+
+def remove_stale_generations(directory: str, keep: Iterable[str], suffix: str = ".npy") -> None:
+    keep = set(keep)
+    for name in os.listdir(directory):
+        if name.endswith(suffix) and name not in keep:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass  # z.B. unter Windows noch gemappt; beim nächsten Umschalten erneut
+
+
+def publish_generation(directory: str, manifest_name: str, manifest: Dict[str, Any], indent: Optional[int] = None) -> None:
+    """
+    Schaltet manifest (mit 'files' der neuen Generation) atomar um und entfernt
+    danach alle Generationen außer der neuen und der vorigen.
+    """
+    manifest_path = os.path.join(directory, manifest_name)
+    previous = manifest_files(manifest_path)
+    write_json_atomic(manifest_path, manifest, indent=indent)
+    remove_stale_generations(directory, set(manifest["files"].values()) | previous)
+
+
+__all__ = [
+    "write_bytes_atomic",
+    "write_array_atomic",
+    "write_json_atomic",
+    "new_generation",
+    "manifest_files",
+    "remove_stale_generations",
+    "publish_generation",
+]
@@ -47,6 +47,7 @@ def add_brand_logo(brand_name: str, logo_base64: str, logo_format: str = "PNG",
         print("Database nicht verfügbar - Logo kann nicht gespeichert werden")
         return False
     
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -85,18 +86,27 @@ def add_brand_logo(brand_name: str, logo_base64: str, logo_format: str = "PNG",
         
         conn.commit()
         conn.close()
+        try:
+            from image_asset_store import register_image
+            register_image(logo_base64)
+        except Exception as e_asset:
+            print(f"Logo für '{brand_name}' nicht im Asset-Store abgelegt: {e_asset}")
         return True
         
     except Exception as e:
         print(f"Fehler beim Speichern des Logos für '{brand_name}': {e}")
         traceback.print_exc()
         return False
+    finally:
+        if conn:
+            conn.close()
 
 def get_brand_logo(brand_name: str) -> Optional[Dict[str, Any]]:
     """Holt das Logo für eine bestimmte Marke"""
     if not DB_AVAILABLE:
         return None
     
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -137,12 +147,16 @@ def get_brand_logo(brand_name: str) -> Optional[Dict[str, Any]]:
     except Exception as e:
         print(f"Fehler beim Abrufen des Logos für '{brand_name}': {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 def list_all_brand_logos() -> List[Dict[str, Any]]:
     """Listet alle verfügbaren Marken-Logos auf"""
     if not DB_AVAILABLE:
         return []
     
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -185,12 +199,16 @@ def list_all_brand_logos() -> List[Dict[str, Any]]:
     except Exception as e:
         print(f"Fehler beim Abrufen der Logo-Liste: {e}")
         return []
+    finally:
+        if conn:
+            conn.close()
 
 def delete_brand_logo(brand_name: str) -> bool:
     """Löscht ein Marken-Logo"""
     if not DB_AVAILABLE:
         return False
     
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -213,6 +231,9 @@ def delete_brand_logo(brand_name: str) -> bool:
     except Exception as e:
         print(f"Fehler beim Löschen des Logos für '{brand_name}': {e}")
         return False
+    finally:
+        if conn:
+            conn.close()
 
 def upload_logo_from_file(brand_name: str, file_path: str) -> bool:
     """Lädt ein Logo aus einer Datei und speichert es in der Datenbank"""
@@ -249,6 +270,7 @@ def update_logo_position(brand_name: str, position_x: float, position_y: float,
     if not DB_AVAILABLE:
         return False
     
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -284,12 +306,24 @@ def update_logo_position(brand_name: str, position_x: float, position_y: float,
     except Exception as e:
         print(f"Fehler beim Aktualisieren der Logo-Position für '{brand_name}': {e}")
         return False
+    finally:
+        if conn:
+            conn.close()
 
-def get_logos_for_brands(brand_names: List[str]) -> Dict[str, Dict[str, Any]]:
-    """Holt Logos für eine Liste von Herstellern"""
+def get_logos_for_brands(brand_names: List[str], case_insensitive: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Holt Logos für eine Liste von Herstellern (eine Abfrage).
+
+    Mit case_insensitive=True wird ohne Beachtung von Groß-/Kleinschreibung und
+    umgebenden Leerzeichen verglichen; die Ergebnisse sind dann nach den
+    angefragten Namen indiziert.
+    """
     if not DB_AVAILABLE:
         return {}
+    brand_names = [name for name in dict.fromkeys(brand_names) if name]
+    if not brand_names:
+        return {}
     
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -302,14 +336,21 @@ def get_logos_for_brands(brand_names: List[str]) -> Dict[str, Dict[str, Any]]:
         
         # Placeholder für IN-Klausel erstellen
         placeholders = ','.join('?' * len(brand_names))
+        if case_insensitive:
+            match_column = "lower(trim(brand_name))"
+            params = list(dict.fromkeys(name.strip().lower() for name in brand_names))
+            placeholders = ','.join('?' * len(params))
+        else:
+            match_column = "brand_name"
+            params = brand_names
         
         cursor.execute(f"""
             SELECT brand_name, logo_base64, logo_format, file_size_bytes,
                    logo_position_x, logo_position_y, logo_width, logo_height,
                    is_active, created_at, updated_at
             FROM brand_logos 
-            WHERE brand_name IN ({placeholders}) AND is_active = 1
-        """, brand_names)
+            WHERE {match_column} IN ({placeholders}) AND is_active = 1
+        """, params)
         
         results = cursor.fetchall()
         conn.close()
@@ -330,17 +371,85 @@ def get_logos_for_brands(brand_names: List[str]) -> Dict[str, Dict[str, Any]]:
                 'updated_at': result[10]
             }
         
+        if case_insensitive:
+            # Case-folded Index; exakte Treffer haben Vorrang vor gleichnamigen Varianten
+            folded = {}
+            for name, logo in logos_dict.items():
+                folded.setdefault(name.strip().casefold(), logo)
+            return {
+                name: logos_dict.get(name) or folded[name.strip().casefold()]
+                for name in brand_names
+                if name in logos_dict or name.strip().casefold() in folded
+            }
         return logos_dict
         
     except Exception as e:
         print(f"Fehler beim Abrufen der Logos für Herstellerliste: {e}")
         return {}
+    finally:
+        if conn:
+            conn.close()
+
+
+def _guess_logo_format(logo_base64: str) -> str:
+    head = logo_base64.split(";base64,", 1)[-1].lstrip()[:8]
+    if head.startswith("/9j/"):
+        return "JPEG"
+    if head.startswith("R0lGOD"):
+        return "GIF"
+    return "PNG"
+
+
+def resolve_brand_logos(brand_names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Löst die Logos aller Hersteller eines Angebots gemeinsam auf.
+
+    Reihenfolge wie database.get_brand_logo: Admin-Setting brand_logo_<Marke>,
+    zentrale Map 'brand_logos' (case-insensitiv), dann die brand_logos-Tabelle.
+    Admin-Settings werden mit einem Aufruf, die Tabelle mit einer Abfrage gelesen.
+    Rückgabe: {angefragter Name: {'logo_base64', 'logo_format', 'source'}}.
+    """
+    requested = [name for name in dict.fromkeys(brand_names) if isinstance(name, str) and name.strip()]
+    if not requested:
+        return {}
+    resolved: Dict[str, Dict[str, Any]] = {}
+    try:
+        from database import load_admin_settings
+
+        setting_keys = [f"brand_logo_{name.strip()}" for name in requested]
+        settings = load_admin_settings(setting_keys + ["brand_logos"], {"brand_logos": {}})
+    except Exception:
+        settings = {}
+    logo_map = settings.get("brand_logos") if isinstance(settings.get("brand_logos"), dict) else {}
+    folded_map: Dict[str, str] = {}
+    for existing_brand, logo_data in logo_map.items():
+        if existing_brand and isinstance(logo_data, str) and logo_data.strip():
+            folded_map.setdefault(str(existing_brand).strip().casefold(), logo_data)
+
+    for name in requested:
+        normalized = name.strip()
+        per_brand = settings.get(f"brand_logo_{normalized}")
+        if isinstance(per_brand, str) and per_brand.strip():
+            logo, source = per_brand, "admin_setting"
+        else:
+            exact = logo_map.get(normalized)
+            logo = exact if isinstance(exact, str) and exact.strip() else folded_map.get(normalized.casefold())
+            source = "brand_logos_map"
+        if logo:
+            resolved[name] = {"logo_base64": logo, "logo_format": _guess_logo_format(logo), "source": source}
+
+    missing = [name for name in requested if name not in resolved]
+    if missing:
+        for name, logo in get_logos_for_brands(missing, case_insensitive=True).items():
+            if logo.get("logo_base64"):
+                resolved[name] = dict(logo, source="brand_logos_table")
+    return resolved
 
 def deactivate_brand_logo(brand_name: str) -> bool:
     """Deaktiviert ein Logo (soft delete)"""
     if not DB_AVAILABLE:
         return False
     
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -367,6 +476,9 @@ def deactivate_brand_logo(brand_name: str) -> bool:
     except Exception as e:
         print(f"Fehler beim Deaktivieren des Logos für '{brand_name}': {e}")
         return False
+    finally:
+        if conn:
+            conn.close()
 
 if __name__ == "__main__":
     # Test der Funktionen
@@ -277,6 +277,15 @@ def calculate_live_pricing(base_results, modifications):
         # Simple ROI with new price
         new_roi_percent = (annual_savings / final_price_netto * 100) if final_price_netto > 0 else 0
         
+        # Financial KPIs: only the price-dependent tail is recomputed, the
+        # production/self-consumption stage stays cached (live_pricing_engine.py)
+        from live_pricing_engine import get_evaluator
+        evaluator = get_evaluator(base_results)
+        kpis = evaluator.evaluate(
+            evaluator.base_investment_netto + (final_price_netto - base_price),
+            modifications.get('financing'),
+        )
+        
         pricing_results = {
             'base_price_netto': base_price,
             'discount_amount': discount_amount,
@@ -287,6 +296,7 @@ def calculate_live_pricing(base_results, modifications):
             'price_change_percent': ((final_price_netto - base_price) / base_price * 100) if base_price > 0 else 0,
             'new_amortization_years': new_amortization_years,
             'new_roi_percent': new_roi_percent,
+            'kpis': kpis,
             'updated_at': pd.Timestamp.now().isoformat()
         }
         
@@ -5,15 +5,35 @@ Hauptmodul für die Berechnung von Photovoltaikanlagen und Wirtschaftlichkeitsan
 
 from __future__ import annotations
 
+import contextvars
+import copy
 import io
-import pandas as pd
 import numpy as np
 import json
 import math
-from typing import Dict, Any, List, Optional, Union, Tuple
+import threading
+from typing import Dict, Any, Callable, Iterator, List, Optional, Union, Tuple
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime
 import traceback
-import requests  # Für HTTP-Anfragen an PVGIS
+
+from lazy_imports import lazy_module, loaded_streamlit, ui_info
+
+# Headless: pandas (Preis-Matrix) und requests (PVGIS) erst bei Bedarf laden,
+# Streamlit wird hier nie importiert (siehe lazy_imports)
+pd = lazy_module("pandas")
+requests = lazy_module("requests")
+
+from cashflow_engine import project_costs_without_pv, simulate_yearly_cash_flows
+import hourly_energy_simulator
+import lookup_tables
+import price_matrix_index
+from irr_engine import investment_cash_flows, irr, mirr, npv
+from live_pricing_engine import compute_financial_tail, financial_tail_params
+from monte_carlo_engine import simulate_npv_distribution, summarize_distribution
+import offer_tracing
+import pvgis_cache
 
 # Import der erweiterten PV-Berechnungsalgorithmen
 try:
@@ -38,25 +58,6 @@ except ImportError as e:
     print(f"Warnung: pv_calculations_core nicht verfügbar: {e}")
     # Fallback-Implementierungen werden bei Bedarf verwendet
 
-# Streamlit Import für UI-Funktionen
-try:
-    import streamlit as st
-    STREAMLIT_AVAILABLE = True
-except ImportError:
-    STREAMLIT_AVAILABLE = False
-    # Dummy st für Kompatibilität
-    class DummySt:
-        @staticmethod
-        def info(msg): print(f"INFO: {msg}")
-        @staticmethod
-        def warning(msg): print(f"WARNING: {msg}")
-        @staticmethod
-        def error(msg): print(f"ERROR: {msg}")
-        class sidebar:
-            @staticmethod
-            def info(msg): print(f"SIDEBAR INFO: {msg}")
-    st = DummySt()
-
 _global_import_errors_calc: List[str] = []
 
 
@@ -108,6 +109,7 @@ def Dummy_load_admin_setting_calc(key, default=None):
             "global_yield_adjustment_percent": 0.0,
             "default_specific_yield_kwh_kwp": 950.0,
             "reference_specific_yield_pr": 1100.0,
+            "latitude_corrections_enabled": False,  # Breitengrad-Korrektur (Lookup-Tabellen), Standard aus
             "pvgis_enabled": True,  # Neue Option für PVGIS aktivieren/deaktivieren
             "specific_yields_by_orientation_tilt": {
                 "Süd_0": 950.0,
@@ -332,6 +334,167 @@ def load_price_matrix_df_with_cache(
     return None, "Keine"
 
 
+# --- Kompilierter Preis-Matrix-Index (price_matrix_index) ---
+# Je Stand der Admin-Settings (get_admin_settings_version) wird die Matrix
+# einmal kompiliert und neben der DB gespeichert. Solange sich die Version
+# nicht ändert, werden weder Excel-Blob noch CSV geladen oder gehasht; ein
+# neuer Prozess lädt den gespeicherten Index per mmap, wenn der
+# Fingerabdruck der Matrix-Settings in der DB übereinstimmt.
+_PRICE_MATRIX_SETTING_KEYS = ["price_matrix_csv_data", "price_matrix_excel_bytes"]
+_PRICE_INDEX_CACHE: Dict[str, Any] = {"version": None, "index": None, "source": "Keine"}
+try:
+    import database as _database_module
+    _DB_LOAD_ADMIN_SETTING = getattr(_database_module, "load_admin_setting", None)
+except Exception:
+    _database_module = None
+    _DB_LOAD_ADMIN_SETTING = None
+
+
+def _compile_price_matrix(
+    excel_bytes: Optional[bytes], csv_content: Optional[str], errors_list: List[str]
+) -> Tuple[Optional[price_matrix_index.CompiledPriceMatrix], str]:
+    df, source = load_price_matrix_df_with_cache(excel_bytes, csv_content, errors_list)
+    if df is None or df.empty:
+        return None, source
+    cached = _PRICE_MATRIX_CACHE.get("index")
+    if cached is not None and _PRICE_MATRIX_CACHE.get("index_df") is df:
+        return cached, source
+    index = price_matrix_index.CompiledPriceMatrix.from_dataframe(df, source)
+    _PRICE_MATRIX_CACHE.update({"index": index, "index_df": df})
+    return index, source
+
+
+def load_price_matrix_index(
+    errors_list: List[str],
+) -> Tuple[Optional[price_matrix_index.CompiledPriceMatrix], str]:
+    """
+    Kompilierte Preis-Matrix und Quelle ("Excel"/"CSV"/"Keine"). Stammen die
+    Settings nicht aus der Datenbank (Tests, Fallback), wird wie bisher über
+    den Inhalts-Hash gecacht.
+    """
+    from_database = (
+        _database_module is not None
+        and real_load_admin_setting is _DB_LOAD_ADMIN_SETTING
+        and _DB_LOAD_ADMIN_SETTING is not None
+    )
+    version = None
+    if from_database:
+        try:
+            version = _database_module.get_admin_settings_version()
+        except Exception:
+            version = None
+    if version is not None and _PRICE_INDEX_CACHE["version"] == version:
+        return _PRICE_INDEX_CACHE["index"], _PRICE_INDEX_CACHE["source"]
+
+    fingerprint = None
+    directory = None
+    if version is not None:
+        try:
+            fingerprint = _database_module.get_admin_settings_fingerprint(_PRICE_MATRIX_SETTING_KEYS)
+            directory = price_matrix_index.index_dir(_database_module.DATA_DIR)
+        except Exception:
+            fingerprint = None
+        if fingerprint is not None:
+            stored = price_matrix_index.load_index(directory, fingerprint)
+            if stored is not None:
+                _PRICE_INDEX_CACHE.update({"version": version, "index": stored, "source": stored.source})
+                return stored, stored.source
+
+    excel_bytes = _load_admin_setting_shared("price_matrix_excel_bytes", None)
+    csv_content = _load_admin_setting_shared("price_matrix_csv_data", "")
+    index, source = _compile_price_matrix(
+        excel_bytes if isinstance(excel_bytes, (bytes, bytearray)) else None,
+        csv_content if isinstance(csv_content, str) else None,
+        errors_list,
+    )
+    if version is not None:
+        _PRICE_INDEX_CACHE.update({"version": version, "index": index, "source": source})
+        if index is not None and fingerprint is not None:
+            try:
+                price_matrix_index.save_index(index, directory, fingerprint)
+            except OSError as e:
+                print(f"Preis-Matrix-Index konnte nicht gespeichert werden: {e}")
+    return index, source
+
+
+# --- Batch-Betrieb: gemeinsame Eingaben für mehrere perform_calculations-Aufrufe ---
+# Innerhalb von shared_calculation_inputs() werden Admin-Settings, Produktdaten,
+# Preis-Matrix und PVGIS-Antworten je Schlüssel nur einmal geladen. Der Speicher
+# gehört zum Kontext (ContextVar) des with-Blocks; andere Threads und Anfragen
+# verhalten sich wie bisher. Threads, die im Kontext laufen sollen, übernehmen
+# ihn per contextvars.copy_context(). Je Schlüssel gibt es ein Future: der
+# erste Aufrufer lädt außerhalb der Sperre, weitere warten nur auf diesen
+# Schlüssel. Meldungen des Loaders (errors_list) werden mitgespeichert und
+# jedem Aufrufer erneut angehängt.
+class _SharedInputStore:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.futures: Dict[Tuple[Any, ...], Future] = {}
+
+
+_SHARED_INPUTS: "contextvars.ContextVar[Optional[_SharedInputStore]]" = contextvars.ContextVar(
+    "shared_calculation_inputs", default=None
+)
+
+
+def _shared_input(
+    key: Tuple[Any, ...],
+    loader: Callable[..., Any],
+    *args: Any,
+    copy_result: bool = True,
+    errors_list: Optional[List[str]] = None,
+) -> Any:
+    """
+    Lädt loader(*args) einmal je Schlüssel und Kontext. Mit errors_list erhält der
+    Loader eine eigene Fehlerliste als letztes Argument; deren Einträge landen bei
+    jedem Aufrufer in errors_list.
+    """
+    store = _SHARED_INPUTS.get()
+    if store is None:
+        return loader(*args, errors_list) if errors_list is not None else loader(*args)
+    with store.lock:
+        future = store.futures.get(key)
+        owner = future is None
+        if owner:
+            future = store.futures[key] = Future()
+    if owner:
+        captured: List[str] = []
+        try:
+            value = loader(*args, captured) if errors_list is not None else loader(*args)
+        except BaseException as e:
+            # Fehlschlag nicht festschreiben: der nächste Aufruf lädt erneut
+            with store.lock:
+                store.futures.pop(key, None)
+            future.set_exception(e)
+            raise
+        future.set_result((value, captured))
+    value, captured = future.result()
+    if errors_list is not None:
+        errors_list.extend(captured)
+    return copy.deepcopy(value) if copy_result else value
+
+
+@contextmanager
+def shared_calculation_inputs() -> Iterator[None]:
+    """Teilt die invarianten Eingaben aller perform_calculations-Aufrufe im with-Block."""
+    if _SHARED_INPUTS.get() is not None:  # verschachtelt: der äußere Block besitzt den Speicher
+        yield
+        return
+    token = _SHARED_INPUTS.set(_SharedInputStore())
+    try:
+        yield
+    finally:
+        _SHARED_INPUTS.reset(token)
+
+
+def _load_admin_setting_shared(key: str, default: Any = None) -> Any:
+    return _shared_input(("admin_setting", key), real_load_admin_setting, key, default)
+
+
+def _get_product_by_id_shared(product_id: Any) -> Optional[Dict[str, Any]]:
+    return _shared_input(("product", product_id), real_get_product_by_id, product_id)
+
+
 def parse_module_price_matrix_csv(
     csv_data: Union[str, io.StringIO], errors_list: List[str]
 ) -> Optional[pd.DataFrame]:
@@ -503,6 +666,62 @@ def parse_module_price_matrix_excel(
         return None
 
 
+def _latitude_corrections_enabled() -> bool:
+    """Admin-Schalter 'latitude_corrections_enabled' (global_constants), Standard aus."""
+    constants = _load_admin_setting_shared("global_constants", {})
+    return bool(isinstance(constants, dict) and constants.get("latitude_corrections_enabled", False))
+
+
+def _simulated_energy_balance(
+    calc_results: Dict[str, Any], include_hourly: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Jahresbilanz der gewählten Anlage aus der stündlichen Simulation
+    (hourly_energy_simulator). None, wenn Produktion oder Verbrauch fehlen.
+    """
+    annual_pv = float(calc_results.get("annual_pv_production_kwh", 0.0) or 0.0)
+    annual_load = float(calc_results.get("total_consumption_kwh_yr", 0.0) or 0.0)
+    if annual_pv <= 0 or annual_load <= 0:
+        return None
+    monthly = calc_results.get("monthly_productions_sim")
+    if not (isinstance(monthly, (list, tuple)) and len(monthly) == 12):
+        monthly = None
+    capacity = (
+        float(calc_results.get("selected_storage_storage_power_kw", 0.0) or 0.0)
+        if calc_results.get("include_storage")
+        else 0.0
+    )
+    try:
+        grid = hourly_energy_simulator.simulate_storage_sizing(
+            annual_load,
+            monthly_production_kwh=monthly,
+            annual_production_kwh=annual_pv,
+            capacities_kwh=[capacity],
+            include_hourly=include_hourly,
+        )
+    except Exception as e_sim:
+        print(f"Stündliche Energiesimulation fehlgeschlagen: {e_sim}")
+        return None
+    balance: Dict[str, Any] = {
+        key: float(grid[key][0])
+        for key in (
+            "direct_consumption_kwh",
+            "battery_charge_kwh",
+            "battery_discharge_kwh",
+            "feed_in_kwh",
+            "grid_purchase_kwh",
+        )
+    }
+    if include_hourly:
+        average_day = hourly_energy_simulator.average_daily_profile
+        balance["daily_load_kw"] = average_day(grid["load_kwh"]).round(3).tolist()
+        balance["daily_pv_kw"] = average_day(grid["pv_kwh"]).round(3).tolist()
+        balance["daily_battery_kw"] = (
+            average_day(grid["charge_kwh"][0] - grid["discharge_kwh"][0]).round(3).tolist()
+        )
+    return balance
+
+
 class AdvancedCalculationsIntegrator:
     """Integriert erweiterte Berechnungen in Dashboard und PDF"""
 
@@ -625,24 +844,34 @@ class AdvancedCalculationsIntegrator:
             "Dez",
         ]
 
-        shading_matrix = []
-        for month_idx in range(12):
-            month_shading = []
-            for hour in hours_of_day:
-                # Simulierte Verschattung basierend auf Sonnenstand
-                base_shading = 0.1  # 10% Basis-Verschattung
+        if _latitude_corrections_enabled():
+            # Verschattung aus der mittleren Sonnenhöhe (Lookup-Tabelle): 10% Basis, bei tiefer Sonne mehr
+            shading_matrix = (
+                lookup_tables.get_tables()
+                .shading_matrix(
+                    hours_of_day, base_data.get("latitude"), base_percent=10.0, max_percent=45.0
+                )
+                / 100.0
+            ).round(3).tolist()
+        else:
+            shading_matrix = []
+            for month_idx in range(12):
+                month_shading = []
+                for hour in hours_of_day:
+                    # Simulierte Verschattung basierend auf Sonnenstand
+                    base_shading = 0.1  # 10% Basis-Verschattung
 
-                # Morgens und abends mehr Verschattung
-                if hour < 9 or hour > 17:
-                    base_shading += 0.2
+                    # Morgens und abends mehr Verschattung
+                    if hour < 9 or hour > 17:
+                        base_shading += 0.2
 
-                # Winter mehr Verschattung
-                if month_idx in [0, 1, 10, 11]:
-                    base_shading += 0.15
+                    # Winter mehr Verschattung
+                    if month_idx in [0, 1, 10, 11]:
+                        base_shading += 0.15
 
-                month_shading.append(min(base_shading, 0.9))
+                    month_shading.append(min(base_shading, 0.9))
 
-            shading_matrix.append(month_shading)
+                shading_matrix.append(month_shading)
 
         # Jährlicher Verschattungsverlust
         avg_shading = np.mean(shading_matrix)
@@ -1315,20 +1544,14 @@ class AdvancedCalculationsIntegrator:
         }
 
     def calculate_npv_sensitivity(
-        self, calc_results: Dict[str, Any], discount_rate: float
-    ) -> float:
-        """NPV-Sensitivitätsanalyse"""
+        self, calc_results: Dict[str, Any], discount_rate: Union[float, np.ndarray]
+    ) -> Union[float, np.ndarray]:
+        """NPV-Sensitivitätsanalyse (discount_rate darf ein Array von Zinssätzen sein)"""
         investment = calc_results.get("total_investment_netto", 20000)
         annual_benefit = calc_results.get("annual_financial_benefit_year1", 1500)
         lifetime = 25
 
-        # NPV berechnen
-        npv = -investment
-        for year in range(1, lifetime + 1):
-            discounted_benefit = annual_benefit / (1 + discount_rate) ** year
-            npv += discounted_benefit
-
-        return npv
+        return npv(discount_rate, investment_cash_flows(investment, annual_benefit, lifetime))
 
     def calculate_irr_advanced(self, calc_results: Dict[str, Any]) -> Dict[str, Any]:
         """Erweiterte IRR-Berechnung"""
@@ -1337,32 +1560,23 @@ class AdvancedCalculationsIntegrator:
         lifetime = 25
 
         # Cash Flow generieren
-        cash_flows = [-investment] + [annual_benefit] * lifetime
+        cash_flows = investment_cash_flows(investment, annual_benefit, lifetime)
 
-        # IRR iterativ berechnen
-        irr = 0.0
-        try:
-            # Vereinfachte IRR-Berechnung
-            for rate in np.arange(0.01, 0.20, 0.001):
-                npv = sum(cf / (1 + rate) ** i for i, cf in enumerate(cash_flows))
-                if abs(npv) < 100:  # Nahe null
-                    irr = rate
-                    break
-        except:
-            irr = 0.05  # Fallback
-
-        # MIRR (vereinfacht)
+        irr_value = irr(cash_flows)
+        if math.isnan(irr_value):
+            irr_value = 0.0  # Keine Lösung im Suchbereich
+
+        # MIRR
         finance_rate = 0.04
         reinvest_rate = 0.03
-        mirr = ((annual_benefit * lifetime / investment) ** (1 / lifetime)) - 1
+        mirr_value = mirr(cash_flows, finance_rate, reinvest_rate)
+        if math.isnan(mirr_value):
+            mirr_value = 0.0
 
         # Profitability Index
-        pi = (
-            sum(annual_benefit / (1 + 0.04) ** year for year in range(1, lifetime + 1))
-            / investment
-        )
+        pi = (npv(0.04, cash_flows) + investment) / investment if investment else 0.0
 
-        return {"irr": irr * 100, "mirr": mirr * 100, "profitability_index": pi}
+        return {"irr": irr_value * 100, "mirr": mirr_value * 100, "profitability_index": pi}
 
     def calculate_detailed_energy_flows(
         self, calc_results: Dict[str, Any]
@@ -1370,13 +1584,23 @@ class AdvancedCalculationsIntegrator:
         """Detaillierte Energieflüsse für Sankey-Diagramm"""
         pv_production = calc_results.get("annual_pv_production_kwh", 10000)
         total_consumption = calc_results.get("total_consumption_kwh_yr", 4000)
+        simulated = _simulated_energy_balance(calc_results) or {}
         direct_consumption = calc_results.get(
-            "annual_direct_self_consumption_kwh", 3000
+            "annual_direct_self_consumption_kwh",
+            simulated.get("direct_consumption_kwh", 3000),
+        )
+        battery_charge = calc_results.get(
+            "annual_battery_charge_kwh", simulated.get("battery_charge_kwh", 1500)
+        )
+        battery_discharge = calc_results.get(
+            "annual_battery_discharge_kwh", simulated.get("battery_discharge_kwh", 1200)
+        )
+        grid_feed_in = calc_results.get(
+            "annual_feed_in_kwh", simulated.get("feed_in_kwh", 5500)
+        )
+        grid_purchase = calc_results.get(
+            "annual_grid_purchase_kwh", simulated.get("grid_purchase_kwh", 1000)
         )
-        battery_charge = calc_results.get("annual_battery_charge_kwh", 1500)
-        battery_discharge = calc_results.get("annual_battery_discharge_kwh", 1200)
-        grid_feed_in = calc_results.get("annual_feed_in_kwh", 5500)
-        grid_purchase = calc_results.get("annual_grid_purchase_kwh", 1000)
 
         # Sankey-Daten
         sources = [
@@ -1441,61 +1665,12 @@ class AdvancedCalculationsIntegrator:
         self, calc_results: Dict[str, Any], project_data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Lastprofilanalyse"""
-        # Typisches Tageslastprofil
-        consumption_profile = [
-            0.3,
-            0.25,
-            0.2,
-            0.2,
-            0.25,
-            0.4,
-            0.7,
-            0.9,
-            1.0,
-            0.9,
-            0.8,
-            0.7,
-            0.8,
-            0.7,
-            0.6,
-            0.7,
-            0.9,
-            1.2,
-            1.0,
-            0.8,
-            0.6,
-            0.5,
-            0.4,
-            0.35,
-        ]
-
-        # PV-Erzeugungsprofil
-        pv_generation_profile = [
-            0,
-            0,
-            0,
-            0,
-            0,
-            0,
-            0.1,
-            0.3,
-            0.6,
-            0.8,
-            0.9,
-            1.0,
-            1.0,
-            0.9,
-            0.8,
-            0.6,
-            0.4,
-            0.2,
-            0.1,
-            0,
-            0,
-            0,
-            0,
-            0,
-        ]
+        # Typische Tagesverläufe (relativ, Maximum 1) aus den Lookup-Tabellen
+        tables = lookup_tables.get_tables()
+        consumption_profile = tables.average_day_load_shape().round(3).tolist()
+        pv_generation_profile = (
+            tables.average_day_pv_shape(project_data.get("latitude")).round(3).tolist()
+        )
 
         # Batterieprofil (Ladung positiv, Entladung negativ)
         battery_profile = []
@@ -1509,6 +1684,13 @@ class AdvancedCalculationsIntegrator:
                     -min(0.3, consumption_profile[i] - pv_generation_profile[i])
                 )
 
+        # Mittlerer Tagesverlauf (kW) aus der stündlichen Jahressimulation, falls möglich
+        simulated = _simulated_energy_balance(calc_results, include_hourly=True)
+        if simulated:
+            consumption_profile = simulated["daily_load_kw"]
+            pv_generation_profile = simulated["daily_pv_kw"]
+            battery_profile = simulated["daily_battery_kw"]
+
         peak_load = max(consumption_profile)
         simultaneity_factor = peak_load / (calc_results.get("anlage_kwp", 10) / 10)
         load_coverage = (
@@ -1534,24 +1716,33 @@ class AdvancedCalculationsIntegrator:
         self, project_data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Verschattungsanalyse"""
-        # Beispiel-Verschattungsmatrix (12 Monate x 13 Stunden)
-        shading_matrix = []
-        for month in range(12):
-            month_data = []
-            for hour in range(6, 19):  # 6:00 bis 18:00
-                # Grundverschattung
-                base_shading = 5  # 5% Grundverschattung
+        if _latitude_corrections_enabled():
+            # Typische Verschattungsmatrix (12 Monate x 13 Stunden, 6:00 bis 18:00) aus der Sonnenhöhe
+            shading_matrix = (
+                lookup_tables.get_tables()
+                .shading_matrix(range(6, 19), project_data.get("latitude"), base_percent=5.0, max_percent=30.0)
+                .round(1)
+                .tolist()
+            )
+        else:
+            # Beispiel-Verschattungsmatrix (12 Monate x 13 Stunden)
+            shading_matrix = []
+            for month in range(12):
+                month_data = []
+                for hour in range(6, 19):  # 6:00 bis 18:00
+                    # Grundverschattung
+                    base_shading = 5  # 5% Grundverschattung
 
-                # Morgens und abends mehr Verschattung
-                if hour < 9 or hour > 16:
-                    base_shading += 10
+                    # Morgens und abends mehr Verschattung
+                    if hour < 9 or hour > 16:
+                        base_shading += 10
 
-                # Winter mehr Verschattung
-                if month in [0, 1, 10, 11]:
-                    base_shading += 15
+                    # Winter mehr Verschattung
+                    if month in [0, 1, 10, 11]:
+                        base_shading += 15
 
-                month_data.append(min(base_shading, 50))
-            shading_matrix.append(month_data)
+                    month_data.append(min(base_shading, 50))
+                shading_matrix.append(month_data)
 
         annual_loss = np.mean(shading_matrix)
         energy_loss_kwh = (
@@ -1701,46 +1892,15 @@ class AdvancedCalculationsIntegrator:
     def run_monte_carlo_simulation(
         self, calc_results: Dict[str, Any], n_simulations: int, confidence_level: int
     ) -> Dict[str, Any]:
-        """Monte-Carlo-Simulation für Risikobewertung"""
-        np.random.seed(42)  # Für reproduzierbare Ergebnisse
-
+        """Monte-Carlo-Simulation für Risikobewertung (vektorisiert, siehe monte_carlo_engine)"""
         base_investment = calc_results.get("total_investment_netto", 20000)
         base_annual_benefit = calc_results.get("annual_financial_benefit_year1", 1500)
         lifetime = 25
 
-        npv_distribution = []
-
-        for _ in range(n_simulations):
-            # Variationen der Parameter (normalverteilt)
-            investment = np.random.normal(base_investment, base_investment * 0.1)
-            annual_benefit = np.random.normal(
-                base_annual_benefit, base_annual_benefit * 0.15
-            )
-            discount_rate = np.random.normal(0.04, 0.01)
-
-            # NPV berechnen
-            npv = -investment
-            for year in range(1, lifetime + 1):
-                npv += annual_benefit / (1 + discount_rate) ** year
-
-            npv_distribution.append(npv)
-
-        npv_distribution = np.array(npv_distribution)
-
-        # Statistiken
-        npv_mean = np.mean(npv_distribution)
-        npv_std = np.std(npv_distribution)
-
-        # Konfidenzintervall
-        alpha = (100 - confidence_level) / 2
-        npv_lower_bound = np.percentile(npv_distribution, alpha)
-        npv_upper_bound = np.percentile(npv_distribution, 100 - alpha)
-
-        # Value at Risk
-        var_5 = np.percentile(npv_distribution, 5)
-
-        # Erfolgswahrscheinlichkeit
-        success_probability = (npv_distribution > 0).sum() / n_simulations * 100
+        npv_distribution = simulate_npv_distribution(
+            base_investment, base_annual_benefit, lifetime, n_simulations
+        )
+        summary = summarize_distribution(npv_distribution, confidence_level)
 
         # Sensitivitätsanalyse (vereinfacht)
         sensitivity_analysis = [
@@ -1753,12 +1913,14 @@ class AdvancedCalculationsIntegrator:
 
         return {
             "npv_distribution": npv_distribution.tolist(),
-            "npv_mean": npv_mean,
-            "npv_std": npv_std,
-            "npv_lower_bound": npv_lower_bound,
-            "npv_upper_bound": npv_upper_bound,
-            "var_5": var_5,
-            "success_probability": success_probability,
+            "npv_mean": summary["mean"],
+            "npv_std": summary["std"],
+            "npv_lower_bound": summary["lower_bound"],
+            "npv_upper_bound": summary["upper_bound"],
+            "var_5": summary["var_5"],
+            "success_probability": summary["success_probability"],
+            "npv_percentiles": summary["percentiles"],
+            "npv_histogram": summary["histogram"],
             "sensitivity_analysis": sensitivity_analysis,
         }
 
@@ -2109,6 +2271,7 @@ def convert_orientation_to_pvgis_azimuth(orientation_text: Optional[str]) -> int
     return 0  # Fallback auf Süd
 
 
+@offer_tracing.traced("pvgis")
 def get_pvgis_data(
     latitude: float,
     longitude: float,
@@ -2119,8 +2282,18 @@ def get_pvgis_data(
     texts: Optional[Dict[str, str]] = None,
     errors_list: Optional[List[str]] = None,
     debug_mode_enabled: bool = False,
+    use_cache: bool = True,
+    offline: Optional[bool] = None,
 ) -> Optional[Dict[str, Any]]:
-    """Holt PV-Produktionsdaten von der PVGIS API."""
+    """
+    Holt PV-Produktionsdaten von der PVGIS API.
+
+    Antworten werden normiert auf 1 kWp in pvgis_cache gespeichert; ein Treffer
+    (gerundete Koordinaten, Neigung, Azimut, Verlust) wird nur noch auf
+    peak_power_kwp hochgerechnet. Offline (Parameter oder KAKERLAKE_PVGIS_OFFLINE)
+    wird nie angefragt, sondern der nächstgelegene gecachte Standort genutzt;
+    denselben Fallback gibt es, wenn die API nicht erreichbar ist.
+    """
     local_errors: List[str] = []  # Für interne Fehler dieser Funktion
     texts = texts if texts is not None else {}  # Sicherstellen, dass texts ein Dict ist
     effective_errors_list = errors_list if errors_list is not None else local_errors
@@ -2148,6 +2321,26 @@ def get_pvgis_data(
         # if debug_mode_enabled: print(f"PVGIS Error: {actual_error_msg}") # Bereinigt
         return None
 
+    cache_key = pvgis_cache.make_key(latitude, longitude, tilt, azimuth, system_loss_percent)
+    if use_cache:
+        cached_entry = _pvgis_cache_call(pvgis_cache.get, cache_key)
+        if cached_entry is not None:
+            return pvgis_cache.scale_to_peak_power(cached_entry, peak_power_kwp)
+    if offline is None:
+        offline = pvgis_cache.is_offline_mode()
+    if offline:
+        nearest_entry = _pvgis_cache_call(pvgis_cache.nearest, cache_key) if use_cache else None
+        if nearest_entry is not None:
+            return pvgis_cache.scale_to_peak_power(nearest_entry, peak_power_kwp)
+        effective_errors_list.append(
+            texts.get(
+                "pvgis_offline_no_cache",
+                "PVGIS: Offline-Modus und kein gecachter Standort in der Nähe.",
+            )
+            or ""
+        )
+        return None
+
     base_url = "https://re.jrc.ec.europa.eu/api/seriescalc"
     params = {
         "lat": latitude,
@@ -2216,6 +2409,15 @@ def get_pvgis_data(
             effective_errors_list.append(error_msg_pvgis)
             return None
 
+        if use_cache:
+            _pvgis_cache_call(
+                pvgis_cache.put,
+                cache_key,
+                [value / peak_power_kwp for value in monthly_production_kwh],
+                annual_production_kwh / peak_power_kwp,
+                specific_yield_kwh_kwp_pa,
+                data.get("meta", {}).get("source", "PVGIS-TMY"),
+            )
         return {
             "monthly_production_kwh": monthly_production_kwh,
             "annual_production_kwh": annual_production_kwh,
@@ -2283,9 +2485,23 @@ def get_pvgis_data(
     if error_msg_pvgis:  # Nur wenn ein Fehler aufgetreten ist
         effective_errors_list.append(error_msg_pvgis)
         # if debug_mode_enabled: print(f"PVGIS Fehler: {error_msg_pvgis}") # Bereinigt
+    # API nicht erreichbar: nächstgelegenen (auch abgelaufenen) Cache-Eintrag nutzen
+    nearest_entry = _pvgis_cache_call(pvgis_cache.nearest, cache_key) if use_cache else None
+    if nearest_entry is not None:
+        return pvgis_cache.scale_to_peak_power(nearest_entry, peak_power_kwp)
     return None
 
 
+def _pvgis_cache_call(func, *args: Any) -> Any:
+    """Cache-Zugriffe sind optional: SQLite-Fehler führen nur zum normalen API-Abruf."""
+    try:
+        return func(*args)
+    except Exception as e_cache:
+        print(f"PVGIS-Cache nicht verfügbar: {e_cache}")
+        return None
+
+
+@offer_tracing.traced("calculation", root=True)
 def perform_calculations(
     project_data: Dict[str, Any],
     texts: Dict[str, str],
@@ -2303,7 +2519,7 @@ def perform_calculations(
     module_quantity = int(project_details.get("module_quantity", 0) or 0)
     # selected_module_id wird später für die Kapazität benötigt, aber die Anzahl ist jetzt schon da.
 
-    global_constants = real_load_admin_setting("global_constants")
+    global_constants = _load_admin_setting_shared("global_constants")
     if not isinstance(global_constants, dict) or not global_constants:
         global_constants = Dummy_load_admin_setting_calc("global_constants")
         errors_list.append(
@@ -2317,21 +2533,17 @@ def perform_calculations(
     if not isinstance(app_debug_mode_is_enabled, bool):
         app_debug_mode_is_enabled = False
     # --- Preis-Matrix laden (mit Cache) ---
-    price_matrix_excel_bytes = real_load_admin_setting("price_matrix_excel_bytes", None)
-    price_matrix_csv_content = real_load_admin_setting("price_matrix_csv_data", "")
-    price_matrix_df_for_lookup, pm_source = load_price_matrix_df_with_cache(
-        price_matrix_excel_bytes if isinstance(price_matrix_excel_bytes, (bytes, bytearray)) else None,
-        price_matrix_csv_content if isinstance(price_matrix_csv_content, str) else None,
-        errors_list,
+    price_matrix_for_lookup, pm_source = _shared_input(
+        ("price_matrix",), load_price_matrix_index, copy_result=False, errors_list=errors_list
     )
     results["price_matrix_source_type"] = pm_source
     results["price_matrix_loaded_successfully"] = bool(
-        price_matrix_df_for_lookup is not None and not price_matrix_df_for_lookup.empty
+        price_matrix_for_lookup is not None and not price_matrix_for_lookup.empty
     )
     # if app_debug_mode_is_enabled: print(f"CALC: Preis-Matrix für Lookup geladen: {results['price_matrix_loaded_successfully']} (Quelle: {results.get('price_matrix_source_type', 'Keine')})") # Bereinigt
 
     # Einspeisevergütungen laden
-    feed_in_tariffs_block = real_load_admin_setting(
+    feed_in_tariffs_block = _load_admin_setting_shared(
         "feed_in_tariffs", Dummy_load_admin_setting_calc("feed_in_tariffs")
     )
     einspeiseverguetung_parts_data = (
@@ -2422,7 +2634,7 @@ def perform_calculations(
     # Anlagengröße
     selected_module_id = project_details.get("selected_module_id")
     module_details = (
-        real_get_product_by_id(selected_module_id) if selected_module_id else None
+        _get_product_by_id_shared(selected_module_id) if selected_module_id else None
     )
     module_capacity_w = (
         float(module_details.get("capacity_w", 0.0) or 0.0) if module_details else 0.0
@@ -2443,7 +2655,9 @@ def perform_calculations(
     # KORREKTUR: PV GIS Einstellung aus Datenbank laden statt aus global_constants
     try:
         from database import load_admin_setting
-        pvgis_setting_raw = load_admin_setting("pvgis_enabled", "false")  # Default auf false
+        pvgis_setting_raw = _shared_input(
+            ("admin_setting", "pvgis_enabled"), load_admin_setting, "pvgis_enabled", "false"
+        )  # Default auf false
         # Boolean-Konvertierung - berücksichtigt String-Werte aus Datenbank
         if isinstance(pvgis_setting_raw, str):
             pvgis_enabled = pvgis_setting_raw.lower() in ['true', '1', 'yes', 'on']
@@ -2454,8 +2668,7 @@ def perform_calculations(
         if app_debug_mode_is_enabled:
             debug_msg = f"DEBUG: PV GIS Status - Raw: '{pvgis_setting_raw}', Enabled: {pvgis_enabled}"
             print(debug_msg)
-            if STREAMLIT_AVAILABLE:
-                st.sidebar.info(debug_msg)
+            ui_info(debug_msg, sidebar=True)
                 
     except ImportError:
         # Fallback auf global_constants wenn Datenbank nicht verfügbar
@@ -2463,8 +2676,7 @@ def perform_calculations(
         if app_debug_mode_is_enabled:
             debug_msg = f"DEBUG: PV GIS Fallback - Enabled: {pvgis_enabled} (Database not available)"
             print(debug_msg)
-            if STREAMLIT_AVAILABLE:
-                st.sidebar.info(debug_msg)
+            ui_info(debug_msg, sidebar=True)
 
     if (
         pvgis_enabled
@@ -2473,8 +2685,7 @@ def perform_calculations(
         and results["anlage_kwp"] > 0
     ):
         # Debug: Zeige PV GIS Status
-        if hasattr(st, 'sidebar'):  # Nur wenn Streamlit verfügbar
-            st.info(f" DEBUG: PV GIS ist AKTIVIERT (pvgis_enabled={pvgis_enabled})")
+        ui_info(f" DEBUG: PV GIS ist AKTIVIERT (pvgis_enabled={pvgis_enabled})")
         
         try:
             lat = float(project_details["latitude"])
@@ -2506,16 +2717,20 @@ def perform_calculations(
                     global_constants.get("pvgis_system_loss_default_percent", 14.0)
                     or 14.0
                 )
-                pvgis_results_data = get_pvgis_data(
-                    lat,
-                    lon,
-                    results["anlage_kwp"],
-                    tilt_val,
-                    azimuth_val,
-                    SYSTEM_LOSS_PVGIS,
-                    texts,
-                    errors_list,
-                    debug_mode_enabled=app_debug_mode_is_enabled,
+                pvgis_results_data = _shared_input(
+                    ("pvgis", lat, lon, results["anlage_kwp"], tilt_val, azimuth_val, SYSTEM_LOSS_PVGIS),
+                    lambda pvgis_errors: get_pvgis_data(
+                        lat,
+                        lon,
+                        results["anlage_kwp"],
+                        tilt_val,
+                        azimuth_val,
+                        SYSTEM_LOSS_PVGIS,
+                        texts,
+                        pvgis_errors,
+                        app_debug_mode_is_enabled,
+                    ),
+                    errors_list=errors_list,
                 )
         except (ValueError, TypeError) as e_coords:
             errors_list.append(
@@ -2568,12 +2783,8 @@ def perform_calculations(
         not results["pvgis_data_used"] and results["anlage_kwp"] > 0
     ):  # Fallback zur manuellen Berechnung
         # Informative Meldung wenn PV GIS bewusst deaktiviert wurde  
-        if not pvgis_enabled and STREAMLIT_AVAILABLE:
-            try:
-                import streamlit as st_local
-                st_local.info("ℹ PV GIS ist in den Einstellungen DEAKTIVIERT. Verwende manuelle Ertragsberechnung.")
-            except:
-                pass  # Streamlit nicht verfügbar, ignoriere Meldung
+        if not pvgis_enabled:
+            ui_info("ℹ PV GIS ist in den Einstellungen DEAKTIVIERT. Verwende manuelle Ertragsberechnung.")
         
         orientation_key = project_details.get(
             "roof_orientation", "Sonstige"
@@ -2581,10 +2792,6 @@ def perform_calculations(
         tilt_val_manual = project_details.get(
             "roof_inclination_deg", 30
         )  # Default auf 30 Grad
-        tilt_key_manual = int(
-            tilt_val_manual or 30
-        )  # Sicherstellen, dass es ein Int ist
-        lookup_key = f"{orientation_key}_{tilt_key_manual}"
         specific_yields_map = global_constants.get(
             "specific_yields_by_orientation_tilt", {}
         )
@@ -2594,9 +2801,24 @@ def perform_calculations(
             specific_yields_map = Dummy_load_admin_setting_calc("global_constants")[
                 "specific_yields_by_orientation_tilt"
             ]
+        # Interpolation über Neigung statt exaktem Schlüssel "Süd_30"; Breitengrad nur mit Admin-Schalter
+        try:
+            project_latitude = (
+                project_details.get("latitude")
+                if global_constants.get("latitude_corrections_enabled", False)
+                else None
+            )
+            specific_yield_interpolated = lookup_tables.get_tables().specific_yield(
+                orientation_key,
+                float(tilt_val_manual or 30),
+                latitude=float(project_latitude) if project_latitude not in (None, "") else None,
+                mapping=specific_yields_map,
+            )
+        except (TypeError, ValueError) as e_yield_lookup:
+            print(f"Ertragstabelle nicht nutzbar ({orientation_key}, {tilt_val_manual}): {e_yield_lookup}")
+            specific_yield_interpolated = None
         specific_annual_yield_kwh_per_kwp_manual = float(
-            specific_yields_map.get(lookup_key, DEFAULT_YIELD_KWH_PER_KWP_ANNUAL)
-            or DEFAULT_YIELD_KWH_PER_KWP_ANNUAL
+            specific_yield_interpolated or DEFAULT_YIELD_KWH_PER_KWP_ANNUAL
         )
         annual_pv_production_kwh_base = (
             results["anlage_kwp"] * specific_annual_yield_kwh_per_kwp_manual
@@ -2635,7 +2857,7 @@ def perform_calculations(
         ]
         results["pvgis_source"] = "Manuelle Berechnung"  # Quelle klarstellen
         # if app_debug_mode_is_enabled: # Bereinigt
-        # print(f"CALC: Manuelle Ertragsberechnung: lookup_key='{lookup_key}', specific_yield={specific_annual_yield_kwh_per_kwp_manual} kWh/kWp/a")
+        # print(f"CALC: Manuelle Ertragsberechnung: {orientation_key}/{tilt_val_manual}°, specific_yield={specific_annual_yield_kwh_per_kwp_manual} kWh/kWp/a")
     elif results["anlage_kwp"] == 0:  # Keine Anlage, keine Produktion
         annual_pv_production_kwh_base = 0.0
         monthly_pv_production_kwh_base = [0.0] * 12
@@ -2843,18 +3065,21 @@ def perform_calculations(
             "grid_bezug_kwh": grid_bezug_kwh,
             "annual_storage_charge_kwh": annual_storage_charge_kwh,  # Speicherladung pro Jahr
             "annual_storage_discharge_kwh": annual_storage_discharge_kwh,  # Speichernutzung pro Jahr
+            # Speicherkonfiguration für Folgeanalysen (z.B. _simulated_energy_balance)
+            "include_storage": bool(include_storage),
+            "selected_storage_storage_power_kw": selected_storage_capacity_kwh,
         }
     )
 
     selected_inverter_id = project_details.get("selected_inverter_id")
     inverter_details = (
-        real_get_product_by_id(selected_inverter_id) if selected_inverter_id else None
+        _get_product_by_id_shared(selected_inverter_id) if selected_inverter_id else None
     )
     free_roof_area_sqm = float(project_details.get("free_roof_area_sqm", 0.0) or 0.0)
 
     # --- Kostenberechnung ---
     storage_details_from_db = (
-        real_get_product_by_id(selected_storage_id)
+        _get_product_by_id_shared(selected_storage_id)
         if selected_storage_id and include_storage
         else None
     )
@@ -2872,113 +3097,19 @@ def perform_calculations(
 
     base_matrix_price_netto, matrix_column_used_for_price = 0.0, None
     if (
-        price_matrix_df_for_lookup is not None
-        and not price_matrix_df_for_lookup.empty
+        price_matrix_for_lookup is not None
+        and not price_matrix_for_lookup.empty
         and module_quantity > 0
     ):
-        # Finde die passende Zeile in der Matrix (genau oder nächstkleinere Modulanzahl)
-        relevant_rows_matrix = price_matrix_df_for_lookup[
-            price_matrix_df_for_lookup.index <= module_quantity
-        ]
-        if not relevant_rows_matrix.empty:
-            selected_row_from_matrix = relevant_rows_matrix.iloc[
-                -1
-            ]  # Letzte Zeile, die Bedingung erfüllt
-            actual_module_count_in_matrix = (
-                selected_row_from_matrix.name
-            )  # Indexwert der Zeile (Modulanzahl)
-            # if module_quantity != actual_module_count_in_matrix and app_debug_mode_is_enabled: # Bereinigt
-            # errors_list.append(f"CALC: Für {module_quantity} Module wurde Matrix-Stufe '{actual_module_count_in_matrix}' Module verwendet.")
-
-            # Spaltennamen normalisieren für robusten Zugriff
-            normalized_matrix_columns_map = {
-                str(col).strip().lower(): str(col)
-                for col in selected_row_from_matrix.index
-            }
-            normalized_storage_name_lookup = (
-                str(storage_name_for_matrix_lookup).strip().lower()
+        # Passende Zeile (genau oder nächstkleinere Modulanzahl) per searchsorted;
+        # Spaltennamen werden normalisiert verglichen, Fallback auf "Ohne Speicher"
+        no_storage_option_text = texts.get("no_storage_option_for_matrix", "Ohne Speicher")
+        actual_module_count_in_matrix, price_value_from_matrix, matrix_column_used_for_price = (
+            price_matrix_for_lookup.lookup(
+                module_quantity, storage_name_for_matrix_lookup, no_storage_option_text
             )
-            no_storage_text_normalized_lookup = (
-                texts.get("no_storage_option_for_matrix", "Ohne Speicher")
-                .strip()
-                .lower()
-            )
-
-            # Original Spaltennamen aus der Map holen
-            original_no_storage_column_name = normalized_matrix_columns_map.get(
-                no_storage_text_normalized_lookup
-            )
-            original_price_col_key_for_df_access = normalized_matrix_columns_map.get(
-                normalized_storage_name_lookup
-            )
-            price_value_from_matrix = None
-
-            # Versuche Preis für spezifischen Speicher zu finden
-            if (
-                original_price_col_key_for_df_access
-                and original_price_col_key_for_df_access
-                in selected_row_from_matrix.index
-                and pd.notna(
-                    selected_row_from_matrix[original_price_col_key_for_df_access]
-                )
-            ):
-                price_value_from_matrix = selected_row_from_matrix[
-                    original_price_col_key_for_df_access
-                ]
-                matrix_column_used_for_price = original_price_col_key_for_df_access  # Speichere den verwendeten Spaltennamen
-
-            # Fallback auf "Ohne Speicher", wenn spezifischer Speicher nicht gefunden oder Preis ungültig
-            if price_value_from_matrix is None or not pd.notna(price_value_from_matrix):
-                # if normalized_storage_name_lookup != no_storage_text_normalized_lookup and include_storage : # Bereinigt (Fehlermeldung bereits informativ genug)
-                # errors_list.append((texts.get("warn_specific_storage_not_in_matrix_fallback_no_storage", "Preis für Speichermodell '{selected_storage_name}' bei {module_count} Modulen nicht in Matrix oder Wert ungültig. Versuche Fallback auf '{no_storage_option_text}'.") or "").format(selected_storage_name=storage_name_for_matrix_lookup, module_count=actual_module_count_in_matrix, no_storage_option_text=texts.get("no_storage_option_for_matrix", "Ohne Speicher")))
-                if (
-                    original_no_storage_column_name
-                    and original_no_storage_column_name
-                    in selected_row_from_matrix.index
-                    and pd.notna(
-                        selected_row_from_matrix[original_no_storage_column_name]
-                    )
-                ):
-                    price_value_from_matrix = selected_row_from_matrix[
-                        original_no_storage_column_name
-                    ]
-                    matrix_column_used_for_price = original_no_storage_column_name  # Speichere "Ohne Speicher" als verwendeten Spaltennamen
-                else:  # Auch "Ohne Speicher" nicht gefunden oder ungültig
-                    price_value_from_matrix = 0.0  # Sicherer Fallback
-                    errors_list.append(
-                        (
-                            texts.get(
-                                "error_no_storage_column_or_price_not_found_in_matrix",
-                                "Fehler: Weder Preis für '{selected_storage_name}' noch für '{no_storage_option_text}' bei {module_count} Modulen in Matrix. Grundpreis 0€.",
-                            )
-                            or ""
-                        ).format(
-                            selected_storage_name=storage_name_for_matrix_lookup,
-                            no_storage_option_text=texts.get(
-                                "no_storage_option_for_matrix", "Ohne Speicher"
-                            ),
-                            module_count=actual_module_count_in_matrix,
-                        )
-                    )
-
-            try:  # Konvertiere den gefundenen Preiswert sicher zu float
-                base_matrix_price_netto = float(
-                    price_value_from_matrix
-                    if pd.notna(price_value_from_matrix)
-                    else 0.0
-                )
-            except (ValueError, TypeError):
-                errors_list.append(
-                    (
-                        texts.get(
-                            "error_invalid_price_in_matrix_conversion",
-                            "Konnte Matrixpreis '{matrix_price_value}' nicht in Zahl umwandeln. Grundpreis 0€.",
-                        )
-                        or ""
-                    ).format(matrix_price_value=price_value_from_matrix)
-                )
-                base_matrix_price_netto = 0.0
-        else:  # Keine passende Modulanzahl in Matrix gefunden
+        )
+        if actual_module_count_in_matrix is None:  # Keine passende Modulanzahl in Matrix gefunden
             errors_list.append(
                 (
                     texts.get(
@@ -2988,6 +3119,22 @@ def perform_calculations(
                     or ""
                 ).format(module_quantity=module_quantity)
             )
+        elif price_value_from_matrix is None:  # Weder Speicher- noch "Ohne Speicher"-Spalte gültig
+            errors_list.append(
+                (
+                    texts.get(
+                        "error_no_storage_column_or_price_not_found_in_matrix",
+                        "Fehler: Weder Preis für '{selected_storage_name}' noch für '{no_storage_option_text}' bei {module_count} Modulen in Matrix. Grundpreis 0€.",
+                    )
+                    or ""
+                ).format(
+                    selected_storage_name=storage_name_for_matrix_lookup,
+                    no_storage_option_text=no_storage_option_text,
+                    module_count=actual_module_count_in_matrix,
+                )
+            )
+        else:
+            base_matrix_price_netto = price_value_from_matrix
     elif module_quantity > 0:  # Matrix nicht geladen oder leer, aber Module vorhanden
         errors_list.append(
             texts.get(
@@ -3092,7 +3239,7 @@ def perform_calculations(
             component_id = project_details.get(pd_key)
             cost_val = 0.0
             if component_id:
-                component_details_db = real_get_product_by_id(component_id)
+                component_details_db = _get_product_by_id_shared(component_id)
                 cost_val = (
                     float(component_details_db.get("additional_cost_netto", 0.0) or 0.0)
                     if component_details_db
@@ -3247,67 +3394,9 @@ def perform_calculations(
         + tax_benefit_feed_in_year1
     )
     results["annual_financial_benefit_year1"] = annual_financial_benefit_year1
-    amortization_time_calc = (
-        total_investment_netto / annual_financial_benefit_year1
-        if annual_financial_benefit_year1 > 0
-        else float("inf")
-    )
-    # Basis-Amortisationszeit speichern
-    results["amortization_time_years"] = amortization_time_calc
-    # Admin-Cheat anwenden (falls aktiviert)
-    try:
-        cheat_settings = real_load_admin_setting("amortization_cheat_settings", None)
-        if isinstance(cheat_settings, dict) and cheat_settings.get("enabled"):
-            mode = cheat_settings.get("mode", "fixed")
-            cheated_value_years = cheat_settings.get("value_years")
-            cheated_percent = cheat_settings.get("percent")
-            original = results.get("amortization_time_years", amortization_time_calc)
-            cheated = None
-            if mode == "fixed":
-                try:
-                    val = float(cheated_value_years)
-                    if val > 0:
-                        cheated = val
-                except (TypeError, ValueError):
-                    cheated = None
-            elif mode == "absolute_reduction":
-                try:
-                    red = float(cheated_value_years)
-                    if red > 0 and original != float("inf"):
-                        cheated = max(0.1, original - red)
-                except (TypeError, ValueError):
-                    cheated = None
-            elif mode == "percentage_reduction":
-                try:
-                    pct = float(cheated_percent)
-                    if original != float("inf"):
-                        pct = min(95.0, max(0.0, pct))
-                        cheated = max(0.1, original * (1 - pct / 100.0))
-                except (TypeError, ValueError):
-                    cheated = None
-            if cheated is not None:
-                results["amortization_time_years_original"] = original
-                results["amortization_time_years"] = cheated
-    except Exception:
-        # Cheat-Einstellungen ignorieren, falls Fehler
-        pass
+    # Amortisation (inkl. Admin-Cheat) setzt compute_financial_tail weiter unten
 
     # --- Simulation über die Jahre ---
-    cash_flows_initial_investment = [
-        -total_investment_netto
-    ]  # Jahr 0 ist die Investition
-    (
-        annual_productions_sim_list,
-        annual_benefits_sim_list,
-        annual_maintenance_costs_sim_list,
-    ) = ([], [], [])
-    (
-        annual_cash_flows_yearly_list,
-        annual_elec_prices_sim_list,
-        annual_feed_in_tariffs_sim_list,
-    ) = ([], [], [])
-    annual_revenue_from_feed_in_sim_list = []  # Für detailliertere Analyse
-
     # Wartungskosten
     maintenance_fixed_pa = float(
         global_constants.get("maintenance_fixed_eur_pa", 0.0) or 0.0
@@ -3350,168 +3439,71 @@ def perform_calculations(
     # Wartungskosten für erweiterte Berechnungen definieren
     maintenance_cost_fixed_pa = annual_maintenance_costs_eur_year1_calc
 
-    for year_idx in range(1, results["simulation_period_years_effective"] + 1):
-        current_year_production = annual_pv_production_kwh * (
-            annual_degredation_factor ** (year_idx - 1)
-        )
-        annual_productions_sim_list.append(current_year_production)
-
-        # Annahme: Anteile von EV und Einspeisung bleiben über die Jahre relativ konstant zur Produktion
-        ev_anteil_an_prod_j1 = (
-            eigenverbrauch_pro_jahr_kwh / annual_pv_production_kwh
-            if annual_pv_production_kwh > 0
-            else 0
-        )
-        einspeisung_anteil_an_prod_j1 = (
-            netzeinspeisung_kwh / annual_pv_production_kwh
-            if annual_pv_production_kwh > 0
-            else 0
-        )
-
-        current_year_ev = current_year_production * ev_anteil_an_prod_j1
-        current_year_einspeisung = (
-            current_year_production * einspeisung_anteil_an_prod_j1
-        )
-
-        elec_price_sim = electricity_price_kwh * (
-            (1 + results["electricity_price_increase_rate_effective_percent"] / 100.0)
-            ** (year_idx - 1)
-        )
-        annual_elec_prices_sim_list.append(elec_price_sim)
-
-        feed_in_tariff_sim = results[
-            "einspeiseverguetung_eur_per_kwh"
-        ]  # Annahme: fester Tarif für EEG-Zeitraum
-        if year_idx > int(
+    # Alle Jahresreihen in einem Durchgang (vektorisiert, siehe cashflow_engine.py)
+    yearly_sim = simulate_yearly_cash_flows(
+        annual_production_kwh=annual_pv_production_kwh,
+        self_consumption_kwh=eigenverbrauch_pro_jahr_kwh,
+        feed_in_kwh=netzeinspeisung_kwh,
+        years=results["simulation_period_years_effective"],
+        degradation_factor=annual_degredation_factor,
+        electricity_price_kwh=electricity_price_kwh,
+        electricity_price_increase_percent=results[
+            "electricity_price_increase_rate_effective_percent"
+        ],
+        feed_in_tariff_eur_kwh=results["einspeiseverguetung_eur_per_kwh"],
+        eeg_period_years=int(
             global_constants.get("einspeiseverguetung_period_years", 20) or 20
-        ):  # Nach EEG-Vergütungszeitraum
-            feed_in_tariff_sim = float(
-                global_constants.get("marktwert_strom_eur_per_kwh_after_eeg", 0.03)
-                or 0.03
-            )  # Marktwert
-        annual_feed_in_tariffs_sim_list.append(feed_in_tariff_sim)
-
-        cost_savings_sim = current_year_ev * elec_price_sim
-        feed_in_rev_sim = current_year_einspeisung * feed_in_tariff_sim
-        annual_revenue_from_feed_in_sim_list.append(
-            feed_in_rev_sim
-        )  # Speichern für Details
-
-        tax_benefit_sim = (
-            feed_in_rev_sim * (income_tax_rate_percent / 100.0)
+        ),
+        market_value_after_eeg_eur_kwh=float(
+            global_constants.get("marktwert_strom_eur_per_kwh_after_eeg", 0.03)
+            or 0.03
+        ),
+        tax_rate_percent=(
+            income_tax_rate_percent
             if customer_data.get("type", "Privat").lower() == "gewerblich"
             else 0.0
-        )
-        maint_costs_sim = annual_maintenance_costs_eur_year1_calc * (
-            (1 + maintenance_increase_pa_rate) ** (year_idx - 1)
-        )
-        annual_maintenance_costs_sim_list.append(maint_costs_sim)
-
-        annual_benefit_this_year = cost_savings_sim + feed_in_rev_sim + tax_benefit_sim
-        annual_benefits_sim_list.append(annual_benefit_this_year)
-
-        cash_flow_this_year = annual_benefit_this_year - maint_costs_sim
-        cash_flows_initial_investment.append(cash_flow_this_year)  # Für IRR und NPV
-        annual_cash_flows_yearly_list.append(
-            cash_flow_this_year
-        )  # Nur die jährlichen CFs
+        ),
+        maintenance_costs_year1=annual_maintenance_costs_eur_year1_calc,
+        maintenance_increase_rate=maintenance_increase_pa_rate,
+        total_investment_netto=total_investment_netto,
+    )
+    annual_productions_sim_list = yearly_sim["annual_productions"].tolist()
+    annual_maintenance_costs_sim_list = yearly_sim["annual_maintenance_costs"].tolist()
 
     results.update(
         {
             "annual_productions_sim": annual_productions_sim_list,
-            "annual_benefits_sim": annual_benefits_sim_list,
+            "annual_benefits_sim": yearly_sim["annual_benefits"].tolist(),
             "annual_maintenance_costs_sim": annual_maintenance_costs_sim_list,
-            "annual_cash_flows_sim": annual_cash_flows_yearly_list,  # Jährliche CFs (ohne Jahr 0)
-            "cumulative_cash_flows_sim": np.cumsum(
-                cash_flows_initial_investment
-            ).tolist(),  # Kumulierte CFs (inkl. Jahr 0)
-            "annual_elec_prices_sim": annual_elec_prices_sim_list,  # Strompreise pro Jahr
-            "annual_feed_in_tariffs_sim": annual_feed_in_tariffs_sim_list,  # Einspeisevergütung pro Jahr
-            "annual_revenue_from_feed_in_sim": annual_revenue_from_feed_in_sim_list,  # Jährliche Einnahmen aus Einspeisung
+            "annual_cash_flows_sim": yearly_sim["annual_cash_flows"].tolist(),  # Jährliche CFs (ohne Jahr 0)
+            "cumulative_cash_flows_sim": yearly_sim[
+                "cumulative_cash_flows"
+            ].tolist(),  # Kumulierte CFs (inkl. Jahr 0)
+            "annual_elec_prices_sim": yearly_sim["annual_elec_prices"].tolist(),  # Strompreise pro Jahr
+            "annual_feed_in_tariffs_sim": yearly_sim["annual_feed_in_tariffs"].tolist(),  # Einspeisevergütung pro Jahr
+            "annual_revenue_from_feed_in_sim": yearly_sim[
+                "annual_revenue_from_feed_in"
+            ].tolist(),  # Jährliche Einnahmen aus Einspeisung
         }
     )
 
-    # --- Weitere Kennzahlen ---
-    # Nettobarwert (NPV)
-    npv_value = -cash_flows_initial_investment[0]  # Investition in Jahr 0
-    discount_rate_npv = loan_interest_rate_percent / 100.0  # Kalkulatorischer Zinssatz
-    for i_npv, cf_val in enumerate(cash_flows_initial_investment[1:], 1):  # Ab Jahr 1
-        npv_value += cf_val / ((1 + discount_rate_npv) ** i_npv)
-    results["npv_value"] = npv_value
-    results["npv_per_kwp"] = (
-        npv_value / results["anlage_kwp"] if results["anlage_kwp"] > 0 else float("nan")
-    )
-
-    # Interner Zinsfuß (IRR)
-    try:
-        import numpy_financial as npf
-
-        irr_val = npf.irr(
-            cash_flows_initial_investment
-        )  # Benötigt Cashflows inkl. initialer Investition
-        results["irr_percent"] = (
-            irr_val * 100
-            if irr_val is not None and not (math.isnan(irr_val) or math.isinf(irr_val))
-            else float("nan")
-        )
-    except ImportError:
-        results["irr_percent"] = float("nan")
-        errors_list.append(
-            texts.get(
-                "warn_numpy_financial_missing_for_irr",
-                "Hinweis: numpy_financial nicht installiert, IRR kann nicht berechnet werden.",
-            )
-        )
-    except (
-        Exception
-    ) as e_irr_calc:  # Fängt auch ValueError von npf.irr ab, wenn keine Lösung gefunden
-        results["irr_percent"] = float("nan")
-        errors_list.append(
-            (
-                texts.get(
-                    "error_irr_calculation",
-                    "Fehler bei IRR-Berechnung: {error_details}",
-                )
-                or ""
-            ).format(error_details=str(e_irr_calc))
+    # --- Weitere Kennzahlen (preisabhängig, siehe live_pricing_engine.py) ---
+    # Amortisation, ROI, NPV, IRR, LCOE, AfA, Restwert, Alternativanlage, CO2-Vermeidungskosten
+    results["financial_tail_params"] = financial_tail_params(global_constants)
+    results.update(
+        compute_financial_tail(
+            total_investment_netto,
+            yearly_sim["annual_cash_flows"],
+            annual_productions_sim_list,
+            annual_maintenance_costs_sim_list,
+            annual_financial_benefit_year1,
+            results["anlage_kwp"],
+            results["simulation_period_years_effective"],
+            results["financial_tail_params"],
+            _load_admin_setting_shared("amortization_cheat_settings", None),
+            errors_list=errors_list,
+            texts=texts,
         )
-
-    # Stromgestehungskosten (LCOE)
-    total_discounted_costs_lcoe = total_investment_netto  # Kosten in Jahr 0
-    total_discounted_production_lcoe = 0.0
-    discount_rate_lcoe = (
-        loan_interest_rate_percent / 100.0
-    )  # Gleicher Diskontsatz wie NPV
-    if annual_productions_sim_list and annual_maintenance_costs_sim_list:
-        for y_idx in range(
-            min(
-                len(annual_productions_sim_list),
-                len(annual_maintenance_costs_sim_list),
-                results["simulation_period_years_effective"],
-            )
-        ):
-            total_discounted_production_lcoe += annual_productions_sim_list[y_idx] / (
-                (1 + discount_rate_lcoe) ** (y_idx + 1)
-            )
-            total_discounted_costs_lcoe += annual_maintenance_costs_sim_list[y_idx] / (
-                (1 + discount_rate_lcoe) ** (y_idx + 1)
-            )  # Diskontierte Wartungskosten addieren
-    results["lcoe_euro_per_kwh"] = (
-        total_discounted_costs_lcoe / total_discounted_production_lcoe
-        if total_discounted_production_lcoe > 0
-        else float("inf")
-    )
-    results["effektiver_pv_strompreis_ct_kwh"] = (
-        results["lcoe_euro_per_kwh"] * 100
-        if results["lcoe_euro_per_kwh"] != float("inf")
-        else float("inf")
-    )
-
-    # Einfache Rentabilität (ROI) für Jahr 1
-    results["simple_roi_percent"] = (
-        (annual_financial_benefit_year1 / total_investment_netto * 100)
-        if total_investment_netto > 0
-        else float("inf")
     )
 
     # Performance Ratio (PR) - Annahme: Referenzwert aus global_constants
@@ -3531,29 +3523,6 @@ def perform_calculations(
             global_constants.get("default_performance_ratio_percent", 78.0) or 78.0
         )  # Fallback auf Default PR
 
-    # AfA und Restwert
-    afa_period_years = int(global_constants.get("afa_period_years", 20) or 20)
-    results["afa_linear_pa_eur"] = (
-        total_investment_netto / afa_period_years if afa_period_years > 0 else 0.0
-    )
-    results["restwert_anlage_eur_nach_laufzeit"] = max(
-        0.0,
-        total_investment_netto
-        - (results["afa_linear_pa_eur"] * results["simulation_period_years_effective"]),
-    )
-
-    # Eigenkapitalrendite (ROE) - hier vereinfacht als IRR, da keine Fremdfinanzierung modelliert
-    results["eigenkapitalrendite_roe_pct"] = results["irr_percent"]
-
-    # Alternativanlage
-    alternative_investment_interest_rate_percent = float(
-        global_constants.get("alternative_investment_interest_rate_percent", 5.0) or 5.0
-    )
-    results["alternativanlage_kapitalwert_eur"] = total_investment_netto * (
-        (1 + alternative_investment_interest_rate_percent / 100.0)
-        ** results["simulation_period_years_effective"]
-    )
-
     # CO2-Einsparungen
     co2_emission_factor_kg_per_kwh = float(
         global_constants.get("co2_emission_factor_kg_per_kwh", 0.474) or 0.474
@@ -3576,14 +3545,6 @@ def perform_calculations(
     results["co2_equivalent_flights_muc_pmi_per_year"] = (
         annual_co2_savings_kg / co2_per_flight if co2_per_flight > 0 else 0.0
     )
-    total_co2_savings_over_lifetime_kg = (
-        sum(annual_productions_sim_list) if annual_productions_sim_list else 0
-    ) * co2_emission_factor_kg_per_kwh
-    results["co2_avoidance_cost_euro_per_tonne"] = (
-        (total_investment_netto / (total_co2_savings_over_lifetime_kg / 1000.0))
-        if total_co2_savings_over_lifetime_kg > 0
-        else float("inf")
-    )
 
     # E-Auto und Wärmepumpe (vereinfachte Betrachtung)
     if project_details.get("future_ev", False):  # Wenn E-Auto geplant ist
@@ -3635,9 +3596,6 @@ def perform_calculations(
         results["pv_deckungsgrad_wp_pct"] = 0.0
 
     # Kostenhochrechnung ohne PV
-    annual_costs_hochrechnung_values_calc = []
-    total_projected_costs_with_increase_calc = 0.0
-    total_projected_costs_without_increase_calc = 0.0
     base_consumption_for_projection_calc = (
         project_details.get("annual_consumption_kwh_yr", 0.0) or 0.0
     ) + (project_details.get("consumption_heating_kwh_yr", 0.0) or 0.0)
@@ -3646,24 +3604,19 @@ def perform_calculations(
     )
     # if base_consumption_for_projection_calc==0 and results['anlage_kwp']>0 and app_debug_mode_is_enabled: errors_list.append(texts.get("warn_zero_consumption_for_projection","Warnung: Gesamtjahresverbrauch für Kostenhochrechnung ist 0 kWh.")) # Bereinigt
     # if base_price_for_projection_calc==0 and results['anlage_kwp']>0 and base_consumption_for_projection_calc > 0 and app_debug_mode_is_enabled: errors_list.append(texts.get("warn_zero_price_for_projection","Warnung: Strompreis für Kostenhochrechnung ist 0 €/kWh.")) # Bereinigt
-    for year_proj_calc in range(results["simulation_period_years_effective"]):
-        cost_this_year_proj_calc = (
-            base_consumption_for_projection_calc
-            * base_price_for_projection_calc
-            * (
-                (
-                    1
-                    + results["electricity_price_increase_rate_effective_percent"]
-                    / 100.0
-                )
-                ** year_proj_calc
-            )
-        )
-        annual_costs_hochrechnung_values_calc.append(cost_this_year_proj_calc)
-        total_projected_costs_with_increase_calc += cost_this_year_proj_calc
-        total_projected_costs_without_increase_calc += (
-            base_consumption_for_projection_calc * base_price_for_projection_calc
-        )
+    cost_projection = project_costs_without_pv(
+        base_consumption_for_projection_calc,
+        base_price_for_projection_calc,
+        results["electricity_price_increase_rate_effective_percent"],
+        results["simulation_period_years_effective"],
+    )
+    annual_costs_hochrechnung_values_calc = cost_projection["annual_costs"].tolist()
+    total_projected_costs_with_increase_calc = float(
+        cost_projection["total_with_increase"]
+    )
+    total_projected_costs_without_increase_calc = float(
+        cost_projection["total_without_increase"]
+    )
     results["annual_costs_hochrechnung_values"] = annual_costs_hochrechnung_values_calc
     results["annual_costs_hochrechnung_jahre_effektiv"] = results[
         "simulation_period_years_effective"
@@ -3819,7 +3772,7 @@ def perform_calculations(
             if annual_consumption_kwh_yr > 0
             else 0.0
         )
-        # Optimale Speichergröße (Heuristik)
+        # Optimale Speichergröße aus der stündlichen Simulation über ein Kapazitätsraster
         optimal_storage_factor_calc = float(
             global_constants.get("optimal_storage_factor", 1.0) or 1.0
         )  # z.B. 1 kWh Speicher pro 1000 kWh Jahresverbrauch
@@ -3828,6 +3781,21 @@ def perform_calculations(
             if annual_consumption_kwh_yr > 0
             else 0.0
         )
+        if annual_consumption_kwh_yr > 0 and annual_pv_production_kwh > 0:
+            try:
+                storage_grid = hourly_energy_simulator.simulate_storage_sizing(
+                    annual_consumption_kwh_yr,
+                    monthly_production_kwh=monthly_pv_production_kwh,
+                    round_trip_efficiency=storage_efficiency,
+                )
+                results["storage_sizing_simulation"] = (
+                    hourly_energy_simulator.storage_grid_summary(storage_grid)
+                )
+                results["optimale_speichergröße_kwh_geschaetzt"] = (
+                    hourly_energy_simulator.optimal_storage_size(storage_grid)
+                )
+            except Exception as e_storage_sim:
+                print(f"Stündliche Speichersimulation fehlgeschlagen, nutze Heuristik: {e_storage_sim}")
         # Notstromkapazität (vereinfacht als Speicherkapazität)
         results["notstromkapazitaet_kwh_pro_tag"] = (
             selected_storage_capacity_kwh  # Annahme: gesamter Speicher für Notstrom nutzbar
@@ -3947,9 +3915,9 @@ def perform_calculations(
 
     # *** BACKUP-SYSTEM: Speichere Ergebnisse in Session State mit Zeitstempel ***
     try:
-        import streamlit as st
+        st = loaded_streamlit()  # nur innerhalb der App, headless kein Import
 
-        if hasattr(st, "session_state"):
+        if st is not None and hasattr(st, "session_state"):
             # Zeitstempel für dieses Berechnungsergebnis
             timestamp = datetime.now().isoformat()
 
@@ -23,8 +23,11 @@ Author: Suratina Sicmislar
 Version: 1.1 (AI-Fully-Implemented)
 """
 
-from typing import Dict, Any, List, Union
-import numpy_financial as npf  # Benötigt: pip install numpy-financial
+import math
+from typing import Dict, Any, List, Optional, Union
+
+from hourly_energy_simulator import optimal_storage_size, simulate_storage_sizing
+from irr_engine import investment_cash_flows, irr, npv
 
 # --- Globale Annahmen für Berechnungen (können in Settings ausgelagert werden) ---
 LIFESPAN_YEARS = 25  # Lebensdauer der Anlage in Jahren
@@ -52,17 +55,14 @@ def calculate_dynamic_payback_period(investment: float, initial_annual_savings:
 def calculate_net_present_value(investment: float, annual_savings: float) -> float:
     """Berechnet den Kapitalwert (NPV) der Investition."""
     cash_flows = [annual_savings] * LIFESPAN_YEARS
-    return npf.npv(DISCOUNT_RATE, cash_flows) - investment
+    return npv(DISCOUNT_RATE, cash_flows) - investment
 
 
 def calculate_internal_rate_of_return(investment: float, annual_savings: float) -> float:
     """Berechnet den internen Zinsfuß (IRR)."""
     if investment <= 0: return 0.0
-    cash_flows = [-investment] + [annual_savings] * LIFESPAN_YEARS
-    try:
-        return npf.irr(cash_flows) * 100
-    except Exception:
-        return 0.0
+    irr_value = irr(investment_cash_flows(investment, annual_savings, LIFESPAN_YEARS))
+    return irr_value * 100 if math.isfinite(irr_value) else 0.0
 
 # calculations_extended.py
 # -*- coding: utf-8 -*-
@@ -131,16 +131,16 @@ def calculate_effective_pv_electricity_price(total_costs: float, total_generated
 
 def calculate_npv(cashflows: List[float], discount_rate: float) -> float:
     """11. Nettobarwert (NPV) """
-    # npf.npv erwartet die Rate als ersten Parameter und dann die Cashflows.
-    # Die Initialinvestition ist oft der erste (negative) Cashflow.
-    return npf.npv(discount_rate, cashflows)
+    # Die Initialinvestition ist oft der erste (negative) Cashflow und wird nicht abgezinst.
+    return npv(discount_rate, cashflows)
 
 def calculate_irr(cashflows: List[float]) -> float:
     """12. Interner Zinsfuß (IRR) """
     try:
-        return npf.irr(cashflows) * 100
-    except:
+        irr_value = irr(cashflows)
+    except ValueError:
         return 0.0
+    return irr_value * 100 if math.isfinite(irr_value) else 0.0
 
 def calculate_alternative_investment_value(investment: float, interest_rate: float, lifetime_years: int) -> float:
     """13. Kapitalwert Alternativanlage """
@@ -174,16 +174,18 @@ def calculate_break_even_year(investment: float, annual_savings: float) -> int:
     if annual_savings == 0: return float('inf')
     return int(investment // annual_savings) + 1
 
-def compare_scenarios(configs: List[Dict]) -> List[Dict]:
-    """20. Szenarienvergleich """
-    # Diese Funktion dient als Platzhalter. Die Logik wäre, für jede Konfiguration
-    # die relevanten KPIs zu berechnen und die Ergebnis-Dicts zurückzugeben.
-    results = []
-    for config in configs:
-        # result = run_all_analyses(config) # Beispielhafter Aufruf
-        result = {"name": config.get("name"), "payback": 10} # Dummy-Ergebnis
-        results.append(result)
-    return results
+def compare_scenarios(configs: List[Dict], base_project_data: Optional[Dict[str, Any]] = None) -> List[Dict]:
+    """20. Szenarienvergleich - mit base_project_data sind configs Overrides dagegen (siehe scenario_batch)"""
+    if base_project_data is None:
+        # Bisheriges Verhalten ohne Projektdaten: Platzhalter-Ergebnis je Konfiguration
+        return [{"name": config.get("name"), "payback": 10} for config in configs]
+    from scenario_batch import evaluate_scenarios  # Lazy: zieht calculations.py nach
+
+    table = evaluate_scenarios(base_project_data, configs)
+    return [
+        dict(row, name=row["scenario_name"], payback=row["amortization_time_years"])
+        for row in table.to_dict(orient="records")
+    ]
 
 # --- 21-30: TECHNISCHE KPIS & VERLUSTE ---
 
@@ -246,9 +248,16 @@ def calculate_self_consumption_increase_with_storage(old_self_consumption_kwh: f
 
 # --- 31-40: SPEICHER, LASTMANAGEMENT & FINANZIERUNG ---
 
-def calculate_optimal_storage_size(daily_consumption_kwh: float, losses_percent: float = 10.0) -> float:
-    """31. Optimale Speichergröße (kWh) - Simplifizierte Formel """
-    # Dies ist eine sehr grobe Heuristik.
+def calculate_optimal_storage_size(daily_consumption_kwh: float, losses_percent: float = 10.0, annual_pv_production_kwh: Optional[float] = None) -> float:
+    """31. Optimale Speichergröße (kWh) - stündliche Simulation, sonst simplifizierte Formel """
+    if annual_pv_production_kwh and annual_pv_production_kwh > 0 and daily_consumption_kwh > 0:
+        grid = simulate_storage_sizing(
+            daily_consumption_kwh * 365,
+            annual_production_kwh=annual_pv_production_kwh,
+            round_trip_efficiency=1 - losses_percent / 100,
+        )
+        return optimal_storage_size(grid)
+    # Ohne PV-Ertrag bleibt nur die grobe Heuristik.
     return daily_consumption_kwh * (1 - losses_percent / 100)
 
 def calculate_load_shifting_potential(controllable_load_kwh: float, pv_surplus_kwh: float) -> float:
@@ -343,7 +352,7 @@ def calculate_peak_shaving_effect(max_load_kw: float, optimized_load_kw: float)
 def calculate_profitability_index(investment: float, annual_savings: float) -> float:
     """Berechnet den Rentabilitätsindex."""
     if investment <= 0: return 0.0
-    npv_of_future_cash_flows = npf.npv(DISCOUNT_RATE, [annual_savings] * LIFESPAN_YEARS)
+    npv_of_future_cash_flows = npv(DISCOUNT_RATE, [annual_savings] * LIFESPAN_YEARS)
     return npv_of_future_cash_flows / investment
 
 
@@ -0,0 +1,154 @@
+# cashflow_engine.py - Vektorisierte Jahres-Cashflow-Simulation
+"""
+Baut alle jahresbezogenen Reihen der Wirtschaftlichkeitsrechnung (Produktion,
+Strompreis, Einspeisevergütung, Wartung, Cashflow) in einem Durchgang als
+NumPy-Arrays auf, statt sie Jahr für Jahr in Python-Listen zu sammeln.
+
+Alle Parameter dürfen Skalare oder 1D-Arrays gleicher Länge sein. Bei Arrays
+werden N Varianten gleichzeitig gerechnet, die Ergebnisse haben dann die Form
+(N, Jahre). Die Laufzeit ist für alle Varianten gleich.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Union
+
+import numpy as np
+
+ArrayLike = Union[float, np.ndarray]
+
+
+def _column(value: ArrayLike) -> np.ndarray:
+    """Skalar bleibt 0D, 1D-Array wird zur Spalte (N, 1) für das Broadcasting gegen die Jahresachse."""
+    arr = np.asarray(value, dtype=float)
+    return arr[..., np.newaxis]
+
+
+def growth_factors(rate: ArrayLike, years: int) -> np.ndarray:
+    """
+    Faktoren (1 + rate) ** (jahr - 1) für jahr = 1..years.
+
+    Args:
+        rate: Jährliche Änderungsrate als Dezimalzahl (0.03 = 3 %)
+        years: Anzahl Jahre
+
+    Returns:
+        Array der Form (years,) bzw. (N, years)
+    """
+    exponents = np.arange(max(int(years), 0), dtype=float)
+    return np.power(1.0 + _column(rate), exponents)
+
+
+def simulate_yearly_cash_flows(
+    annual_production_kwh: ArrayLike,
+    self_consumption_kwh: ArrayLike,
+    feed_in_kwh: ArrayLike,
+    years: int,
+    degradation_factor: ArrayLike,
+    electricity_price_kwh: ArrayLike,
+    electricity_price_increase_percent: ArrayLike,
+    feed_in_tariff_eur_kwh: ArrayLike,
+    eeg_period_years: int,
+    market_value_after_eeg_eur_kwh: ArrayLike,
+    tax_rate_percent: ArrayLike,
+    maintenance_costs_year1: ArrayLike,
+    maintenance_increase_rate: ArrayLike,
+    total_investment_netto: ArrayLike,
+) -> Dict[str, np.ndarray]:
+    """
+    Jahres-Cashflows über die Simulationsdauer, identisch zur bisherigen Jahresschleife
+    in calculations.perform_calculations.
+
+    Eigenverbrauch und Einspeisung behalten ihren Anteil an der Produktion aus Jahr 1,
+    die Produktion sinkt mit degradation_factor ** (jahr - 1). Nach eeg_period_years
+    gilt der Marktwert statt der Einspeisevergütung.
+
+    Args:
+        annual_production_kwh: PV-Produktion Jahr 1
+        self_consumption_kwh: Eigenverbrauch Jahr 1
+        feed_in_kwh: Netzeinspeisung Jahr 1
+        years: Simulationsdauer in Jahren
+        degradation_factor: 1 - Degradation/100
+        electricity_price_kwh: Strompreis Jahr 1 (€/kWh)
+        electricity_price_increase_percent: Strompreissteigerung p.a. in Prozent
+        feed_in_tariff_eur_kwh: Einspeisevergütung im EEG-Zeitraum (€/kWh)
+        eeg_period_years: Dauer der EEG-Vergütung in Jahren
+        market_value_after_eeg_eur_kwh: Vergütung nach dem EEG-Zeitraum (€/kWh)
+        tax_rate_percent: Steuersatz auf Einspeiseerlöse (0 für Privatkunden)
+        maintenance_costs_year1: Wartungskosten Jahr 1 (€)
+        maintenance_increase_rate: Steigerung der Wartungskosten p.a. als Dezimalzahl
+        total_investment_netto: Investition in Jahr 0 (€)
+
+    Returns:
+        Dict mit Arrays der Form (years,) bzw. (N, years); 'cumulative_cash_flows'
+        enthält zusätzlich Jahr 0 und hat years + 1 Einträge.
+    """
+    years = max(int(years), 0)
+    production_year1 = np.asarray(annual_production_kwh, dtype=float)
+    positive = production_year1 > 0
+    safe_production = np.where(positive, production_year1, 1.0)
+    ev_share = _column(np.where(positive, np.asarray(self_consumption_kwh, dtype=float) / safe_production, 0.0))
+    feed_in_share = _column(np.where(positive, np.asarray(feed_in_kwh, dtype=float) / safe_production, 0.0))
+
+    productions = _column(production_year1) * np.power(
+        _column(degradation_factor), np.arange(years, dtype=float)
+    )
+    elec_prices = _column(electricity_price_kwh) * growth_factors(
+        np.asarray(electricity_price_increase_percent, dtype=float) / 100.0, years
+    )
+
+    year_numbers = np.arange(1, years + 1)
+    feed_in_tariffs = np.where(
+        year_numbers > int(eeg_period_years),
+        _column(market_value_after_eeg_eur_kwh),
+        _column(feed_in_tariff_eur_kwh),
+    )
+
+    cost_savings = (productions * ev_share) * elec_prices
+    feed_in_revenue = (productions * feed_in_share) * feed_in_tariffs
+    tax_benefit = feed_in_revenue * (_column(tax_rate_percent) / 100.0)
+    maintenance_costs = _column(maintenance_costs_year1) * growth_factors(maintenance_increase_rate, years)
+
+    benefits = cost_savings + feed_in_revenue + tax_benefit
+    cash_flows = benefits - maintenance_costs
+
+    investment = -_column(total_investment_netto)
+    cash_flows_with_investment = np.concatenate(
+        [np.broadcast_to(investment, cash_flows.shape[:-1] + (1,)), cash_flows], axis=-1
+    )
+
+    return {
+        "annual_productions": productions,
+        "annual_elec_prices": np.broadcast_to(elec_prices, cash_flows.shape),
+        "annual_feed_in_tariffs": np.broadcast_to(feed_in_tariffs, cash_flows.shape),
+        "annual_revenue_from_feed_in": feed_in_revenue,
+        "annual_maintenance_costs": np.broadcast_to(maintenance_costs, cash_flows.shape),
+        "annual_benefits": benefits,
+        "annual_cash_flows": cash_flows,
+        "cash_flows_with_investment": cash_flows_with_investment,
+        "cumulative_cash_flows": np.cumsum(cash_flows_with_investment, axis=-1),
+    }
+
+
+def project_costs_without_pv(
+    annual_consumption_kwh: ArrayLike,
+    electricity_price_kwh: ArrayLike,
+    electricity_price_increase_percent: ArrayLike,
+    years: int,
+) -> Dict[str, np.ndarray]:
+    """
+    Stromkosten-Hochrechnung ohne PV-Anlage (annual_costs_hochrechnung_values).
+
+    Returns:
+        Dict mit 'annual_costs' (Form (years,) bzw. (N, years)) sowie den Summen
+        mit und ohne Preissteigerung.
+    """
+    base_costs = np.asarray(annual_consumption_kwh, dtype=float) * np.asarray(electricity_price_kwh, dtype=float)
+    annual_costs = _column(base_costs) * growth_factors(
+        np.asarray(electricity_price_increase_percent, dtype=float) / 100.0, years
+    )
+    return {
+        "annual_costs": annual_costs,
+        "total_with_increase": annual_costs.sum(axis=-1),
+        "total_without_increase": base_costs * max(int(years), 0),
+    }
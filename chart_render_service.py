@@ -0,0 +1,259 @@
+# chart_render_service.py - Gecachter, paralleler PNG-Export von Plotly-Diagrammen
+"""
+Rendert Plotly-Figuren über Kaleido zu PNG und cached das Ergebnis
+inhaltsadressiert:
+
+- Schlüssel: SHA-256 über Figure-JSON und Exportparameter (statt des ganzen
+  JSON-Strings als Dict-Key).
+- Speicher: LRU mit MAX_MEMORY_ENTRIES Einträgen (verdrängt einzeln statt den
+  Cache komplett zu leeren).
+- Platte: data/chart_cache/<xx>/<key>.png, übersteht Neustarts; begrenzt auf
+  MAX_DISK_BYTES (älteste Dateien zuerst entfernt). Die Belegung wird im
+  Speicher mitgezählt; das Verzeichnis wird nur beim ersten Schreiben und beim
+  Überschreiten der Grenze durchsucht und dann bis auf DISK_EVICT_RATIO
+  geleert, damit nicht jeder weitere Export erneut verdrängt.
+- render_many() rendert alle fehlenden Diagramme eines Angebots parallel in
+  einem Thread-Pool (Kaleido startet je Export einen eigenen Renderer).
+
+Für jeden Abruf wird eine Messung (Quelle, Dauer, Größe) festgehalten, siehe
+get_render_metrics().
+"""
+
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional
+
+import offer_tracing
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "chart_cache")
+
+MAX_MEMORY_ENTRIES = 128
+MAX_DISK_BYTES = 200 * 1024 * 1024
+DISK_EVICT_RATIO = 0.9
+MAX_WORKERS = 4
+MAX_METRICS = 500
+
+DEFAULT_EXPORT = {"format": "png", "scale": 1.5, "width": 800, "height": 480}
+
+_MEMORY: "OrderedDict[str, bytes]" = OrderedDict()
+_MEMORY_LOCK = threading.Lock()
+_DISK_LOCK = threading.Lock()
+# Mitgezählte Belegung von CACHE_DIR (None = noch nicht ermittelt)
+_DISK_USAGE: Dict[str, Any] = {"dir": None, "bytes": None}
+_METRICS: Deque[Dict[str, Any]] = deque(maxlen=MAX_METRICS)
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def chart_key(fig_json: str, **export_options: Any) -> str:
+    """Kurzer, stabiler Cache-Schlüssel für Figure + Exportparameter."""
+    options = {**DEFAULT_EXPORT, **export_options}
+    digest = hashlib.sha256(fig_json.encode("utf-8"))
+    digest.update(repr(sorted(options.items())).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def _disk_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.png")
+
+
+def _memory_get(key: str) -> Optional[bytes]:
+    with _MEMORY_LOCK:
+        data = _MEMORY.get(key)
+        if data is not None:
+            _MEMORY.move_to_end(key)
+        return data
+
+
+def _memory_put(key: str, data: bytes) -> None:
+    with _MEMORY_LOCK:
+        _MEMORY[key] = data
+        _MEMORY.move_to_end(key)
+        while len(_MEMORY) > MAX_MEMORY_ENTRIES:
+            _MEMORY.popitem(last=False)
+
+
+def _disk_get(key: str) -> Optional[bytes]:
+    path = _disk_path(key)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # für die Verdrängung als zuletzt benutzt markieren
+        return data
+    except OSError:
+        return None
+
+
+def _disk_put(key: str, data: bytes) -> None:
+    path = _disk_path(key)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        previous = os.path.getsize(path)
+    except OSError:
+        previous = 0
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return
+    _account_disk(len(data) - previous)
+
+
+def _account_disk(delta: int) -> None:
+    """Zählt die Belegung mit und verdrängt erst, wenn MAX_DISK_BYTES überschritten ist."""
+    with _DISK_LOCK:
+        if _DISK_USAGE["dir"] != CACHE_DIR or _DISK_USAGE["bytes"] is None:
+            # Erstes Schreiben: vorhandenen Bestand (frühere Läufe) einmal erfassen
+            _DISK_USAGE["dir"] = CACHE_DIR
+            _DISK_USAGE["bytes"] = sum(size for _, size, _ in _scan_disk())
+        else:
+            _DISK_USAGE["bytes"] += delta
+        if _DISK_USAGE["bytes"] > MAX_DISK_BYTES:
+            _DISK_USAGE["bytes"] = _evict_disk()
+
+
+def _scan_disk() -> List[Any]:
+    files = []
+    for root, _, names in os.walk(CACHE_DIR):
+        for name in names:
+            if not name.endswith(".png"):
+                continue
+            full = os.path.join(root, name)
+            try:
+                stat = os.stat(full)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, full))
+    return files
+
+
+def _evict_disk() -> int:
+    """Entfernt die ältesten Dateien bis DISK_EVICT_RATIO * MAX_DISK_BYTES; liefert die neue Belegung."""
+    files = _scan_disk()
+    # Neu zählen: andere Prozesse können in dasselbe Verzeichnis schreiben
+    total = sum(size for _, size, _ in files)
+    target = int(MAX_DISK_BYTES * DISK_EVICT_RATIO)
+    if total <= MAX_DISK_BYTES:
+        return total
+    for _, size, full in sorted(files):
+        try:
+            os.remove(full)
+        except OSError:
+            continue
+        total -= size
+        if total <= target:
+            break
+    return total
+
+
+def _record(name: Optional[str], key: str, source: str, started: float, data: Optional[bytes], error: Optional[str] = None) -> None:
+    _METRICS.append(
+        {
+            "chart": name or key,
+            "key": key,
+            "source": source,  # memory | disk | render | error
+            "seconds": time.perf_counter() - started,
+            "bytes": len(data) if data else 0,
+            "error": error,
+        }
+    )
+
+
+def _render(fig: Any, options: Mapping[str, Any]) -> bytes:
+    return fig.to_image(**options)
+
+
+def render_png(fig: Any, name: Optional[str] = None, renderer: Optional[Callable[..., bytes]] = None, **export_options: Any) -> bytes:
+    """PNG-Bytes einer Figure aus Cache oder frisch gerendert. Renderfehler werden weitergereicht."""
+    with offer_tracing.span("chart_export", chart=name) as trace_span:
+        started = time.perf_counter()
+        options = {**DEFAULT_EXPORT, **export_options}
+        key = chart_key(fig.to_json(), **options)
+        data = _memory_get(key)
+        if data is not None:
+            _record(name, key, "memory", started, data)
+            trace_span.set("source", "memory")
+            return data
+        data = _disk_get(key)
+        if data is not None:
+            _memory_put(key, data)
+            _record(name, key, "disk", started, data)
+            trace_span.set("source", "disk")
+            return data
+        try:
+            data = (renderer or _render)(fig, options)
+        except Exception as e:
+            _record(name, key, "error", started, None, str(e))
+            raise
+        _memory_put(key, data)
+        _disk_put(key, data)
+        _record(name, key, "render", started, data)
+        trace_span.set("source", "render")
+        return data
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="chart-render")
+        return _EXECUTOR
+
+
+def render_many(
+    figures: Mapping[str, Any],
+    renderer: Optional[Callable[..., bytes]] = None,
+    on_error: Optional[Callable[[str, Exception], None]] = None,
+    **export_options: Any,
+) -> Dict[str, Optional[bytes]]:
+    """Rendert mehrere Figuren parallel; None für leere Figuren oder Renderfehler (-> on_error)."""
+    results: Dict[str, Optional[bytes]] = {name: None for name in figures}
+    pending = {name: fig for name, fig in figures.items() if fig is not None}
+    with offer_tracing.span("charts", count=len(pending)):
+        if len(pending) <= 1:
+            for name, fig in pending.items():
+                try:
+                    results[name] = render_png(fig, name=name, renderer=renderer, **export_options)
+                except Exception as e:
+                    if on_error:
+                        on_error(name, e)
+            return results
+        # Kontext je Job kopieren, damit die Export-Spans im Trace des Angebots landen
+        futures = {
+            name: _executor().submit(contextvars.copy_context().run, render_png, fig, name, renderer, **export_options)
+            for name, fig in pending.items()
+        }
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                if on_error:
+                    on_error(name, e)
+    return results
+
+
+def get_render_metrics() -> List[Dict[str, Any]]:
+    """Messwerte der letzten Abrufe (älteste zuerst)."""
+    return list(_METRICS)
+
+
+def reset_render_metrics() -> None:
+    _METRICS.clear()
+
+
+def clear_memory_cache() -> None:
+    with _MEMORY_LOCK:
+        _MEMORY.clear()
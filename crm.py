@@ -43,6 +43,11 @@ except Exception:
     _ensure_customer_documents_table = lambda: None  # type: ignore
     _get_customer_document_file_path = None
 
+try:
+    from database import ensure_table_indexes as _ensure_table_indexes
+except Exception:
+    _ensure_table_indexes = lambda conn, table_name: None  # type: ignore
+
 def get_text_crm(texts_dict: Dict[str, str], key: str, fallback_text: Optional[str] = None) -> str:
     return texts_dict.get(key, fallback_text if fallback_text is not None else key.replace("_", " ").title())
 
@@ -145,6 +150,8 @@ def create_tables_crm(conn: sqlite3.Connection):
         )
     """)
     conn.commit()
+    _ensure_table_indexes(conn, "customers")
+    _ensure_table_indexes(conn, "projects")
 
 def save_customer(conn: sqlite3.Connection, customer_data: Dict[str, Any]) -> Optional[int]:
     cursor = conn.cursor()
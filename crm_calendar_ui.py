@@ -11,7 +11,7 @@ import calendar
 import json
 
 try:
-    from database import execute_query, get_db_connection
+    from database import get_db_connection, ensure_schema_once, ensure_table_indexes
     DATABASE_AVAILABLE = True
 except ImportError:
     DATABASE_AVAILABLE = False
@@ -372,6 +372,7 @@ class CRMCalendar:
                     FOREIGN KEY (customer_id) REFERENCES crm_customers (id)
                 )
             ''')
+            ensure_schema_once(conn, "crm_appointments_indexes", lambda c: ensure_table_indexes(c, "crm_appointments"))
             
             # Termine für den Monat abfragen
             start_date = datetime(year, month, 1)
@@ -10,7 +10,7 @@ from datetime import datetime, timedelta
 import json
 
 try:
-    from database import get_db_connection, get_all_active_customers
+    from database import get_db_connection, get_all_active_customers, ensure_schema_once, ensure_table_indexes
     DATABASE_AVAILABLE = True
 except ImportError:
     DATABASE_AVAILABLE = False
@@ -581,6 +581,7 @@ class CRMPipeline:
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
+            ensure_schema_once(conn, "crm_leads_indexes", lambda c: ensure_table_indexes(c, "crm_leads"))
             
             cursor.execute('''
                 SELECT * FROM crm_leads 
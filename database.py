@@ -1,13 +1,18 @@
 # database.py (Schema Version 14 - Spaltennamen und last_modified korrigiert)
 import sqlite3
 import os
+import atexit
+import threading
 import traceback
 import json
-from typing import List, Dict, Any, Optional, Union
+import copy
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Dict, Any, Optional, Set, Tuple, Union
 from datetime import datetime
 import io
 
-DB_SCHEMA_VERSION = 14
+DB_SCHEMA_VERSION = 15
 print(f"DATABASE.PY TOP LEVEL: DB_SCHEMA_VERSION ist auf {DB_SCHEMA_VERSION} gesetzt.")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -28,24 +33,204 @@ if not os.path.exists(CUSTOMER_DOCS_BASE_DIR):
     except OSError as e:
         print(f"DB: FEHLER beim Erstellen des Kunden-Dokumente Verzeichnisses '{CUSTOMER_DOCS_BASE_DIR}': {e}")
 
-# --- Minimale DB-Helfer (Kompatibilität) ---
-def get_db_connection() -> Optional[sqlite3.Connection]:
-    """Stellt eine SQLite-Verbindung zur Hauptdatenbank her (Row-Factory aktiviert).
+# --- Verbindungs-Pool ---
+# Pro Thread und Datenbankdatei bleibt eine SQLite-Verbindung offen und wird
+# wiederverwendet. Aufrufer erhalten je get_db_connection() ein eigenes Handle
+# (PooledConnectionHandle); close() gibt nur dieses Handle zurück. Wird das
+# äußerste Handle zurückgegeben - per close() oder weil der Aufrufer es ohne
+# close() fallen lässt (Garbage Collection) -, verwirft der Pool wie bisher
+# nicht committete Änderungen. Endet ein Thread, schließt ein Finalizer seine
+# Verbindungen. Die Pragmas werden einmal pro Verbindung gesetzt,
+# Schema-Prüfungen laufen über ensure_schema_once() einmal pro Prozess.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-16000",  # 16 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+class PooledConnection(sqlite3.Connection):
+    """Pool-Verbindung eines Threads; Rückgabe erfolgt über die Handles."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.pid = os.getpid()
+        self.checkouts = 0
+        self.pool_closed = False
+
+    def release(self) -> None:
+        if self.checkouts > 0:
+            self.checkouts -= 1
+        if self.checkouts == 0 and not self.pool_closed and self.in_transaction:
+            try:
+                self.rollback()
+            except sqlite3.Error:
+                pass
 
-    Diese Funktion wird von product_db.py und Brücken verwendet und kann in älteren
-    Ständen fehlen. Hiermit wird die Produkt-CRUD wieder funktionsfähig.
-    """
+    def close(self) -> None:
+        self.release()
+
+    def close_for_real(self) -> None:
+        self.pool_closed = True
+        super().close()
+
+
+def _release_checkout(conn: PooledConnection) -> None:
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn.release()
+    except Exception:
+        pass  # z.B. Verbindung bereits durch close_all_connections() geschlossen
+
+
+class PooledConnectionHandle:
+    """
+    Ausgeliehene Pool-Verbindung. Verhält sich wie sqlite3.Connection
+    (Attribute und Methoden werden durchgereicht); close() und das Freigeben
+    des Handles geben den Checkout genau einmal zurück.
+    """
+
+    __slots__ = ("_conn", "_finalizer", "__weakref__")
+
+    def __init__(self, conn: PooledConnection) -> None:
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_finalizer", weakref.finalize(self, _release_checkout, conn))
+
+    @property
+    def raw_connection(self) -> PooledConnection:
+        return self._conn
+
+    def close(self) -> None:
+        self._finalizer()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._conn, name, value)
+
+    def __enter__(self) -> "PooledConnectionHandle":
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> Any:
+        return self._conn.__exit__(*exc_info)
+
+
+class _ThreadConnections:
+    """Verbindungen eines Threads; wird mit dem Thread-Local des Threads verworfen."""
+
+    def __init__(self) -> None:
+        self.connections: Dict[str, PooledConnection] = {}
+        weakref.finalize(self, _close_thread_connections, self.connections)
+
+
+def _close_thread_connections(connections: Dict[str, PooledConnection]) -> None:
+    for conn in list(connections.values()):
+        with _POOL_LOCK:
+            _POOL_CONNECTIONS.discard(conn)
+        if conn.pid == os.getpid() and not conn.pool_closed:
+            try:
+                conn.close_for_real()
+            except Exception:
+                pass
+    connections.clear()
+
+
+_POOL_LOCAL = threading.local()
+_POOL_LOCK = threading.Lock()
+_POOL_CONNECTIONS: "weakref.WeakSet[PooledConnection]" = weakref.WeakSet()
+_SCHEMA_CHECKS_DONE: Set[Tuple[str, str]] = set()
+
+
+def _pooled_connection(db_path: str) -> PooledConnectionHandle:
+    holder = getattr(_POOL_LOCAL, "holder", None)
+    if holder is None:
+        holder = _POOL_LOCAL.holder = _ThreadConnections()
+    connections = holder.connections
+    conn = connections.get(db_path)
+    # Nach fork() gehört eine geerbte Verbindung dem Elternprozess
+    if conn is None or conn.pool_closed or conn.pid != os.getpid():
+        conn = sqlite3.connect(db_path, timeout=5, factory=PooledConnection, check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            try:
+                conn.execute(pragma)
+            except sqlite3.Error:
+                pass  # z.B. WAL auf schreibgeschützten Laufwerken
+        connections[db_path] = conn
+        with _POOL_LOCK:
+            _POOL_CONNECTIONS.add(conn)
+    if conn.checkouts == 0 and conn.in_transaction:
+        conn.rollback()  # Reste eines Aufrufers, der nicht geschlossen hat
+    conn.row_factory = sqlite3.Row
+    conn.checkouts += 1
+    return PooledConnectionHandle(conn)
+
+
+def close_all_connections() -> None:
+    """Schließt alle Pool-Verbindungen, z.B. vor Backup, Restore oder Reset der DB-Datei."""
+    with _POOL_LOCK:
+        connections = list(_POOL_CONNECTIONS)
+        _POOL_CONNECTIONS.clear()
+        _SCHEMA_CHECKS_DONE.clear()
+    _close_data_version_watchers()
+    for conn in connections:
+        if conn.pid != os.getpid():
+            continue
         try:
-            conn.row_factory = sqlite3.Row  # komfortabler Zugriff per Spaltenname
+            conn.close_for_real()
         except Exception:
             pass
-        return conn
-    except Exception as e:
-        print(f"DB: get_db_connection fehlgeschlagen: {e}")
+
+
+atexit.register(close_all_connections)
+
+
+def get_db_connection() -> Optional[sqlite3.Connection]:
+    """Liefert die Pool-Verbindung des aktuellen Threads zur Hauptdatenbank (Row-Factory aktiviert)."""
+    try:
+        if not os.path.exists(DATA_DIR): os.makedirs(DATA_DIR)
+        return _pooled_connection(DB_PATH)
+    except sqlite3.Error as e:
+        print(f"FATAL DB Error: {e}")
+        traceback.print_exc()
         return None
 
+
+@contextmanager
+def db_connection() -> Iterator[sqlite3.Connection]:
+    """Pool-Verbindung als Transaktionsblock: Commit bei Erfolg, Rollback bei Fehler."""
+    conn = get_db_connection()
+    if conn is None:
+        raise sqlite3.OperationalError(f"Keine Verbindung zu {DB_PATH}")
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _connection_db_path(conn: sqlite3.Connection) -> str:
+    try:
+        row = conn.execute("PRAGMA database_list").fetchone()
+        return row[2] or ":memory:"
+    except sqlite3.Error:
+        return str(id(conn))
+
+
+def ensure_schema_once(conn: sqlite3.Connection, name: str, check: Callable[[sqlite3.Connection], None]) -> None:
+    """Führt eine Schema-Prüfung (CREATE TABLE IF NOT EXISTS, Migrationen) pro Prozess und DB nur einmal aus."""
+    key = (_connection_db_path(conn), name)
+    if key in _SCHEMA_CHECKS_DONE:
+        return
+    check(conn)
+    _SCHEMA_CHECKS_DONE.add(key)
+
 def init_db(conn: Optional[sqlite3.Connection] = None) -> Optional[sqlite3.Connection]:
     """Optionale Initialisierung. Gibt eine Verbindung zurück.
 
@@ -94,6 +279,7 @@ def ensure_customer_documents_table() -> None:
 
 def add_customer_document(customer_id: int, file_bytes: bytes, display_name: str, doc_type: str = "other", project_id: Optional[int] = None, suggested_filename: Optional[str] = None) -> Optional[int]:
     """Speichert eine Datei im Kundenakte-Ordner und erfasst sie in der DB. Gibt Dokument-ID zurück."""
+    conn = None
     try:
         if not isinstance(file_bytes, (bytes, bytearray)) or len(file_bytes) == 0:
             return None
@@ -127,8 +313,12 @@ def add_customer_document(customer_id: int, file_bytes: bytes, display_name: str
     except Exception as e:
         print(f"DB Fehler add_customer_document: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 def list_customer_documents(customer_id: int, project_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -161,8 +351,12 @@ def list_customer_documents(customer_id: int, project_id: Optional[int] = None)
     except Exception as e:
         print(f"DB Fehler list_customer_documents: {e}")
         return []
+    finally:
+        if conn:
+            conn.close()
 
 def get_customer_document_file_path(document_id: int) -> Optional[str]:
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -179,8 +373,12 @@ def get_customer_document_file_path(document_id: int) -> Optional[str]:
     except Exception as e:
         print(f"DB Fehler get_customer_document_file_path: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 def delete_customer_document(document_id: int) -> bool:
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -207,6 +405,9 @@ def delete_customer_document(document_id: int) -> bool:
     except Exception as e:
         print(f"DB Fehler delete_customer_document: {e}")
         return False
+    finally:
+        if conn:
+            conn.close()
 
 INITIAL_ADMIN_SETTINGS: Dict[str, Any] = {
     "price_matrix_csv_data": None,
@@ -236,7 +437,7 @@ INITIAL_ADMIN_SETTINGS: Dict[str, Any] = {
         'maintenance_fixed_eur_pa': 50.0, 'maintenance_variable_eur_per_kwp_pa': 5.0,
         'maintenance_increase_percent_pa': 2.0, 'one_time_bonus_eur': 0.0,
         'global_yield_adjustment_percent': 0.0, 'default_specific_yield_kwh_kwp': 950.0,
-        'reference_specific_yield_pr': 1100.0,
+        'reference_specific_yield_pr': 1100.0, 'latitude_corrections_enabled': False,
         'monthly_production_distribution': [0.03,0.05,0.08,0.11,0.13,0.14,0.13,0.12,0.09,0.06,0.04,0.02],
         'monthly_consumption_distribution': [0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0837],
         'direct_self_consumption_factor_of_production': 0.25, 'app_debug_mode_enabled': False,
@@ -296,15 +497,6 @@ INITIAL_ADMIN_SETTINGS: Dict[str, Any] = {
     'active_company_id': None
 }
 
-def get_db_connection() -> Optional[sqlite3.Connection]:
-    try:
-        if not os.path.exists(DATA_DIR): os.makedirs(DATA_DIR)
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
-    except sqlite3.Error as e: print(f"FATAL DB Error: {e}"); traceback.print_exc(); return None
-
-
 def get_pdf_template_by_name(template_type: str, name: str) -> Optional[Dict[str, Any]]:
     conn = get_db_connection()
     if not conn: 
@@ -325,6 +517,7 @@ def backup_database(backup_path: str) -> bool:
     try:
         import shutil
         if os.path.exists(DB_PATH):
+            close_all_connections()  # WAL in die Hauptdatei übernehmen
             shutil.copy2(DB_PATH, backup_path)
             print(f"DB: Backup erfolgreich erstellt: {backup_path}")
             return True
@@ -339,7 +532,9 @@ def restore_database(backup_path: str) -> bool:
     try:
         import shutil
         if os.path.exists(backup_path):
+            close_all_connections()
             shutil.copy2(backup_path, DB_PATH)
+            invalidate_admin_settings_cache()
             print(f"DB: Wiederherstellung erfolgreich von: {backup_path}")
             return True
         else:
@@ -377,6 +572,9 @@ def export_admin_settings() -> Dict[str, Any]:
 
 # --- Hersteller-Logos: einfache Key-Value Verwaltung in admin_settings ---
 def _ensure_admin_table(conn: sqlite3.Connection) -> None:
+    ensure_schema_once(conn, "admin_settings", _create_admin_table)
+
+def _create_admin_table(conn: sqlite3.Connection) -> None:
     try:
         cur = conn.cursor()
         cur.execute(
@@ -430,51 +628,32 @@ def load_admin_setting(key: str, default: Any = None) -> Any:
         conn.close()
 
 def get_brand_logo(brand_name: str) -> Optional[str]:
-    """Liefert Base64-Logo für Marke aus admin_settings (key: brand_logo_<name>) oder brand_logos Tabelle."""
+    """Liefert Base64-Logo für Marke aus admin_settings (key: brand_logo_<name>), der Map 'brand_logos' oder der brand_logos Tabelle."""
     if not brand_name:
         return None
-    
-    # Normalisiere den Brand-Namen für konsistente Suche (entferne Leerzeichen am Anfang/Ende)
-    normalized_brand = brand_name.strip()
-    
-    # Erst in admin_settings suchen
-    key = f"brand_logo_{normalized_brand}"
-    val = load_admin_setting(key, None)
-    if isinstance(val, str) and val.strip():
-        return val
-    
-    # Fallback: zentrale Map 'brand_logos' {brand: base64}
-    logos = load_admin_setting("brand_logos", {})
-    if isinstance(logos, dict):
-        # Exakte Suche zuerst
-        v = logos.get(normalized_brand)
-        if isinstance(v, str) and v.strip():
-            return v
-        
-        # Falls nicht gefunden, versuche case-insensitive Suche ohne Datennamen zu ändern
-        for existing_brand, logo_data in logos.items():
-            if existing_brand and normalized_brand.lower() == existing_brand.lower():
-                if isinstance(logo_data, str) and logo_data.strip():
-                    return logo_data
-    
-    # Neuer Fallback: brand_logos Tabelle
+    logos = get_brand_logos([brand_name])
+    return logos.get(brand_name)
+
+
+def get_brand_logos(brand_names: List[str]) -> Dict[str, Optional[str]]:
+    """Base64-Logos mehrerer Marken gemeinsam (siehe brand_logo_db.resolve_brand_logos)."""
     try:
-        from brand_logo_db import get_brand_logo as brand_db_get_logo
-        logo_data = brand_db_get_logo(normalized_brand)
-        if logo_data and logo_data.get('logo_base64'):
-            return logo_data['logo_base64']
-        
-        # Falls exakte Suche in DB fehlschlägt, versuche case-insensitive ohne Daten zu ändern
-        from brand_logo_db import get_all_brand_logos
-        all_logos = get_all_brand_logos()
-        for logo in all_logos:
-            if logo.get('brand_name', '').lower() == normalized_brand.lower():
-                return logo.get('logo_base64')
-                
+        from brand_logo_db import resolve_brand_logos
+        resolved = resolve_brand_logos(list(brand_names))
     except Exception:
-        pass
-    
-    return None
+        resolved = {}
+    return {name: (resolved.get(name) or {}).get('logo_base64') for name in brand_names}
+
+def _register_image_asset(image_data: Any) -> None:
+    """Legt hochgeladene Bilder (Logos, Titelbilder) normalisiert im Asset-Store ab."""
+    if not image_data:
+        return
+    try:
+        from image_asset_store import register_image
+        register_image(image_data)
+    except Exception as e:
+        print(f"DB: Bild-Asset konnte nicht registriert werden: {e}")
+
 
 def import_admin_settings(settings: Dict[str, Any]) -> bool:
     success_count = 0
@@ -692,6 +871,7 @@ def cleanup_orphaned_files() -> Dict[str, Any]:
         "removed_files": []
     }
     
+    conn = None
     try:
         # Company Documents Verzeichnis prüfen
         if not os.path.exists(COMPANY_DOCS_BASE_DIR):
@@ -740,10 +920,14 @@ def cleanup_orphaned_files() -> Dict[str, Any]:
     except Exception as e:
         cleanup_results["errors"].append(f"Allgemeiner Fehler beim Cleanup: {str(e)}")
         return cleanup_results
+    finally:
+        if conn:
+            conn.close()
 
 def reset_database() -> bool:
     try:
         # Datenbankdatei löschen
+        close_all_connections()
         if os.path.exists(DB_PATH):
             os.remove(DB_PATH)
             print(f"DB: Datenbankdatei {DB_PATH} gelöscht")
@@ -756,6 +940,7 @@ def reset_database() -> bool:
         
         # Datenbank neu initialisieren
         init_db()
+        invalidate_admin_settings_cache()
         print("DB: Datenbank erfolgreich zurückgesetzt und neu initialisiert")
         return True
         
@@ -770,7 +955,7 @@ from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 import io
 
-DB_SCHEMA_VERSION = 14
+DB_SCHEMA_VERSION = 15
 print(f"DATABASE.PY TOP LEVEL: DB_SCHEMA_VERSION ist auf {DB_SCHEMA_VERSION} gesetzt.")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -812,7 +997,7 @@ INITIAL_ADMIN_SETTINGS: Dict[str, Any] = {
         'maintenance_fixed_eur_pa': 50.0, 'maintenance_variable_eur_per_kwp_pa': 5.0,
         'maintenance_increase_percent_pa': 2.0, 'one_time_bonus_eur': 0.0,
         'global_yield_adjustment_percent': 0.0, 'default_specific_yield_kwh_kwp': 950.0,
-        'reference_specific_yield_pr': 1100.0,
+        'reference_specific_yield_pr': 1100.0, 'latitude_corrections_enabled': False,
         'monthly_production_distribution': [0.03,0.05,0.08,0.11,0.13,0.14,0.13,0.12,0.09,0.06,0.04,0.02],
         'monthly_consumption_distribution': [0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0833,0.0837],
         'direct_self_consumption_factor_of_production': 0.25, 'app_debug_mode_enabled': False,
@@ -959,6 +1144,59 @@ def _create_company_templates_tables_v14(conn: sqlite3.Connection):
     
     print("DB Schema v14: Tabellen für firmenspezifische Vorlagen erstellt.")
 
+# Indizes für die häufigsten Abfragen (Produktkatalog, CRM, Pipeline, Kalender).
+# Schlüssel: Tabelle -> (Indexname, Spaltenliste). Reihenfolge und COLLATE
+# entsprechen den WHERE/ORDER BY-Klauseln der Aufrufer (siehe tests/test_query_plans.py).
+SCHEMA_INDEXES: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "products": (
+        ("idx_products_category_model", "category, model_name COLLATE NOCASE"),
+        ("idx_products_company_category", "company_id, category, model_name COLLATE NOCASE"),
+        ("idx_products_brand_category", "brand COLLATE NOCASE, category, model_name COLLATE NOCASE"),
+        ("idx_products_model_nocase", "model_name COLLATE NOCASE"),
+    ),
+    "customers": (
+        ("idx_customers_name", "last_name, first_name"),
+    ),
+    "projects": (
+        ("idx_projects_customer", "customer_id, id"),
+        ("idx_projects_status", "project_status"),
+    ),
+    "crm_customers": (
+        ("idx_crm_customers_status_name", "status, last_name, first_name"),
+    ),
+    "crm_leads": (
+        ("idx_crm_leads_stage_changed", "stage, stage_changed_at"),
+        ("idx_crm_leads_source", "lead_source"),
+    ),
+    "crm_appointments": (
+        ("idx_crm_appointments_date", "appointment_date"),
+        ("idx_crm_appointments_status_date", "status, appointment_date"),
+        ("idx_crm_appointments_customer", "customer_id"),
+    ),
+}
+
+def ensure_table_indexes(conn: sqlite3.Connection, table_name: str) -> None:
+    """Legt die Indizes aus SCHEMA_INDEXES für eine (vorhandene) Tabelle an."""
+    cursor = conn.cursor()
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone() is None:
+        return
+    for index_name, columns in SCHEMA_INDEXES.get(table_name, ()):
+        try:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns});")
+        except sqlite3.OperationalError as e:
+            # z.B. Spalte fehlt in einer sehr alten Tabellenversion
+            print(f"DB HINWEIS: Index '{index_name}' auf '{table_name}' nicht angelegt: {e}")
+    conn.commit()
+
+def _create_query_indexes_v15(conn: sqlite3.Connection):
+    # Tabellen, die erst später (lazy) angelegt werden, erhalten ihre Indizes beim Anlegen
+    for table_name in SCHEMA_INDEXES:
+        ensure_table_indexes(conn, table_name)
+    cursor = conn.cursor()
+    cursor.execute("ANALYZE;")
+    conn.commit()
+    print("DB Schema v15: Indizes für Produktkatalog und CRM angelegt.")
+
 def _ensure_column_exists(conn: sqlite3.Connection, table_name: str, column_name: str, column_type_for_alter: str, 
                           is_not_null_with_default_for_alter: bool = False, default_value_for_alter: str = "''"):
     cursor = conn.cursor()
@@ -1099,6 +1337,16 @@ def init_db():
             except Exception as _:
                 pass
             current_db_version = 14; print("DB: Schema v14 angewendet (Firmenspezifische Angebotsvorlagen).")
+        if current_db_version < 15:
+            _create_query_indexes_v15(conn)
+            cursor.execute("UPDATE admin_settings SET value = '15' WHERE key = 'schema_version';")
+            conn.commit()
+            try:
+                cursor.execute("PRAGMA user_version = 15;")
+                conn.commit()
+            except Exception as _:
+                pass
+            current_db_version = 15; print("DB: Schema v15 angewendet (Abfrage-Indizes).")
 
         # Stelle sicher, dass die SQLite user_version am Ende exakt dem Code-Schema entspricht
         try:
@@ -1119,36 +1367,169 @@ def init_db():
                 elif value_insert is not None:
                      cursor.execute("INSERT INTO admin_settings (key, value, last_modified) VALUES (?, ?, CURRENT_TIMESTAMP)", (key, value_insert))
                 print(f"DB: Initiale Admin-Einstellung '{key}' hinzugefügt.")
-        conn.commit(); print("DB: Initialisierung abgeschlossen.")
+        conn.commit(); invalidate_admin_settings_cache(); print("DB: Initialisierung abgeschlossen.")
     except Exception as e: print(f"DB KRITISCHER FEHLER init_db: {e}"); traceback.print_exc(); conn.rollback()
     finally:
         if conn: conn.close()
 
-def load_admin_setting(key: str, default: Any = None) -> Any:
+# --- Admin-Settings-Cache ---
+# Dekodierte Werte werden pro Prozess gehalten, damit große Einstellungen
+# (Preis-Matrix, Logos, Konstanten) nicht bei jedem Aufruf gelesen und per
+# json.loads geparst werden. Die Version wird von save_admin_setting erhöht und
+# ebenso, wenn PRAGMA data_version Schreibzugriffe meldet. data_version ist je
+# Verbindung ein eigener Zähler; geprüft wird daher immer über eine einzige
+# Beobachter-Verbindung pro Prozess und DB-Datei, die selbst nie schreibt und
+# so Commits aller anderen Verbindungen (Pool-Threads, andere Prozesse) sieht.
+# Andere Caches können sich über get_admin_settings_version() an dieselbe
+# Invalidierung hängen.
+_ADMIN_SETTINGS_CACHE: Dict[str, Any] = {}
+_ADMIN_SETTINGS_LOCK = threading.Lock()
+_ADMIN_SETTINGS_VERSION = 0
+_ADMIN_SETTING_DEFAULT = object()  # Marker: Default des Aufrufers zurückgeben
+# DB-Pfad -> [pid, Beobachter-Verbindung, zuletzt gesehene data_version]
+_DATA_VERSION_WATCHERS: Dict[str, List[Any]] = {}
+
+
+def invalidate_admin_settings_cache() -> None:
+    global _ADMIN_SETTINGS_VERSION
+    with _ADMIN_SETTINGS_LOCK:
+        _ADMIN_SETTINGS_CACHE.clear()
+        _ADMIN_SETTINGS_VERSION += 1
+
+
+def get_admin_settings_version() -> int:
+    """Zähler, der sich bei jeder erkannten Änderung der Admin-Settings erhöht."""
+    _sync_admin_settings_cache()
+    return _ADMIN_SETTINGS_VERSION
+
+
+def get_admin_settings_fingerprint(keys: List[str]) -> Optional[str]:
+    """
+    Prozessübergreifender Stand einzelner Settings aus Länge und last_modified,
+    ohne die (ggf. großen) Werte selbst zu lesen. None, wenn die DB nicht lesbar ist.
+    """
     conn = get_db_connection()
-    if conn is None: return default
+    if conn is None: return None
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM admin_settings WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        if row and row['value'] is not None:
-            value_str = row['value']
-            if isinstance(value_str, str) and value_str.strip().startswith(('[', '{')) and value_str.strip().endswith((']', '}')):
-                try: return json.loads(value_str)
-                except json.JSONDecodeError: pass
-            if key in INITIAL_ADMIN_SETTINGS and isinstance(INITIAL_ADMIN_SETTINGS.get(key), bool):
-                try: return bool(int(value_str))
-                except: pass
-            if key == 'active_company_id':
-                try: return int(value_str) if value_str is not None else None
-                except: return default
-            return value_str
-        if key == 'active_company_id' and row and row['value'] is None: return None
-        return default
-    except Exception as e: print(f"DB Fehler load_admin_setting '{key}': {e}"); return default
+        placeholders = ", ".join("?" * len(keys))
+        rows = conn.execute(
+            f"SELECT key, length(CAST(value AS BLOB)) AS size, last_modified FROM admin_settings WHERE key IN ({placeholders}) ORDER BY key",
+            list(keys),
+        ).fetchall()
+        return "|".join(f"{row['key']}:{row['size']}:{row['last_modified']}" for row in rows) or "-"
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def get_calculation_data_fingerprint() -> Optional[str]:
+    """
+    Stand aller Berechnungsgrundlagen (Admin-Settings und Produkte) aus
+    Zeilenanzahl und letzter Änderung, für Ergebnis-Caches über Prozesse und
+    Verbindungen hinweg. None, wenn die DB nicht lesbar ist.
+    """
+    conn = get_db_connection()
+    if conn is None: return None
+    try:
+        settings = conn.execute(
+            "SELECT COUNT(*), MAX(last_modified), TOTAL(length(CAST(value AS BLOB))) FROM admin_settings"
+        ).fetchone()
+        try:
+            products = conn.execute("SELECT COUNT(*), MAX(updated_at), MAX(id) FROM products").fetchone()
+        except sqlite3.OperationalError:
+            products = (0, None, None)  # Produkttabelle noch nicht angelegt
+        return "settings:{}:{}:{}|products:{}:{}:{}".format(*tuple(settings), *tuple(products))
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def _sync_admin_settings_cache() -> None:
+    """Verwirft den Cache, wenn seit der letzten Prüfung irgendeine Verbindung in die DB geschrieben hat."""
+    db_path = DB_PATH
+    with _ADMIN_SETTINGS_LOCK:
+        watcher = _DATA_VERSION_WATCHERS.get(db_path)
+        try:
+            if watcher is None or watcher[0] != os.getpid():
+                watch_conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+                # Erster Stand: Der Cache ist bis hierher über save_admin_setting bzw. die
+                # letzte Beobachtung gepflegt; eine neue Beobachter-Verbindung verwirft ihn einmal.
+                watcher = _DATA_VERSION_WATCHERS[db_path] = [os.getpid(), watch_conn, None]
+            data_version = watcher[1].execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            _DATA_VERSION_WATCHERS.pop(db_path, None)
+            data_version = None
+        changed = data_version is None or watcher[2] != data_version
+        if watcher is not None and data_version is not None:
+            watcher[2] = data_version
+    if changed:
+        invalidate_admin_settings_cache()
+
+
+def _close_data_version_watchers() -> None:
+    with _ADMIN_SETTINGS_LOCK:
+        watchers = list(_DATA_VERSION_WATCHERS.values())
+        _DATA_VERSION_WATCHERS.clear()
+    for pid, watch_conn, _ in watchers:
+        if pid == os.getpid():
+            try:
+                watch_conn.close()
+            except sqlite3.Error:
+                pass
+
+
+def _decode_admin_setting(key: str, value_str: Any) -> Any:
+    if value_str is None:
+        return None if key == 'active_company_id' else _ADMIN_SETTING_DEFAULT
+    if isinstance(value_str, str) and value_str.strip().startswith(('[', '{')) and value_str.strip().endswith((']', '}')):
+        try: return json.loads(value_str)
+        except json.JSONDecodeError: pass
+    if key in INITIAL_ADMIN_SETTINGS and isinstance(INITIAL_ADMIN_SETTINGS.get(key), bool):
+        try: return bool(int(value_str))
+        except: pass
+    if key == 'active_company_id':
+        try: return int(value_str)
+        except: return _ADMIN_SETTING_DEFAULT
+    return value_str
+
+
+def load_admin_settings(keys: List[str], defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Lädt mehrere Admin-Settings; nicht gecachte Schlüssel werden mit einer Abfrage gelesen."""
+    defaults = defaults or {}
+    keys = list(dict.fromkeys(keys))
+    conn = get_db_connection()
+    if conn is None: return {key: defaults.get(key) for key in keys}
+    try:
+        _sync_admin_settings_cache()
+        with _ADMIN_SETTINGS_LOCK:
+            values = {key: _ADMIN_SETTINGS_CACHE[key] for key in keys if key in _ADMIN_SETTINGS_CACHE}
+            version = _ADMIN_SETTINGS_VERSION
+        missing = [key for key in keys if key not in values]
+        if missing:
+            placeholders = ", ".join("?" * len(missing))
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT key, value FROM admin_settings WHERE key IN ({placeholders})", missing)
+            found = {row['key']: _decode_admin_setting(row['key'], row['value']) for row in cursor.fetchall()}
+            loaded = {key: found.get(key, _ADMIN_SETTING_DEFAULT) for key in missing}
+            with _ADMIN_SETTINGS_LOCK:
+                if version == _ADMIN_SETTINGS_VERSION:  # zwischenzeitlich gespeichert -> nicht cachen
+                    _ADMIN_SETTINGS_CACHE.update(loaded)
+            values.update(loaded)
+        # Aufrufer dürfen Dicts/Listen verändern, ohne den Cache zu beschädigen
+        return {
+            key: defaults.get(key) if values[key] is _ADMIN_SETTING_DEFAULT
+            else copy.deepcopy(values[key]) if isinstance(values[key], (dict, list)) else values[key]
+            for key in keys
+        }
+    except Exception as e: print(f"DB Fehler load_admin_settings {keys}: {e}"); return {key: defaults.get(key) for key in keys}
     finally:
         if conn: conn.close()
 
+def load_admin_setting(key: str, default: Any = None) -> Any:
+    return load_admin_settings([key], {key: default})[key]
+
 def save_admin_setting(key: str, value: Any) -> bool:
     conn = get_db_connection()
     if conn is None:
@@ -1176,6 +1557,7 @@ def save_admin_setting(key: str, value: Any) -> bool:
         print(f"DB DEBUG: save_admin_setting - Versuche SQL auszuführen für Key '{key}'. Wert None? {params_for_sql[1] is None}")
         cursor.execute(sql_query, params_for_sql)
         conn.commit()
+        invalidate_admin_settings_cache()
         print(f"DB ERFOLG: save_admin_setting - Einstellung '{key}' erfolgreich gespeichert.")
         return True
     except Exception as e: 
@@ -1334,6 +1716,7 @@ def add_company(company_data: Dict[str, Any]) -> Optional[int]:
         # Nach dem Hinzufügen der Firma Standardtechnik einfügen
         if new_id:
             add_default_technique_for_company(new_id)
+            _register_image_asset(company_data.get("logo_base64"))
         return new_id
     except sqlite3.IntegrityError as e_int: 
         print(f"DB FEHLER (IntegrityError) beim INSERT: Firma '{company_name_to_add_stripped}' existiert bereits oder anderer UNIQUE Constraint verletzt. Fehler: {e_int}")
@@ -1401,7 +1784,10 @@ def update_company(company_id: int, company_data: Dict[str, Any]) -> bool:
 
         cursor.execute(stmt, values_for_set)
         conn.commit()
-        return cursor.rowcount > 0
+        updated = cursor.rowcount > 0
+        if updated:
+            _register_image_asset(update_data_db.get("logo_base64"))
+        return updated
     except sqlite3.IntegrityError as e_int: print(f"DB Integritätsfehler update_company (ID {company_id}): {e_int}"); conn.rollback(); return False
     except Exception as e: print(f"DB Fehler update_company (ID {company_id}): {e}"); conn.rollback(); return False
     finally:
@@ -1565,6 +1951,7 @@ def add_company_image_template(company_id: int, name: str, image_data: bytes, te
             VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
         """, (company_id, name.strip(), template_type, relative_path_for_db))
         conn.commit()
+        _register_image_asset(image_data)
         return cursor.lastrowid
     except IOError as e_io:
         print(f"DB: IOError beim Schreiben der Bilddatei {absolute_path_on_disk}: {e_io}")
@@ -1836,8 +2223,9 @@ def get_company_documents(company_id: int, doc_type: Optional[str] = None) -> Li
 
 def get_all_active_customers() -> List[Dict[str, Any]]:
     """Gibt alle aktiven Kunden aus der CRM-Datenbank zurück"""
+    conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Versuche zuerst die Tabelle zu erstellen falls sie nicht existiert
@@ -1856,6 +2244,7 @@ def get_all_active_customers() -> List[Dict[str, Any]]:
                 project_data TEXT
             )
         ''')
+        ensure_schema_once(conn, "crm_customers_indexes", lambda c: ensure_table_indexes(c, "crm_customers"))
         
         cursor.execute('''
             SELECT id, first_name, last_name, email, phone, address, status, 
@@ -1890,11 +2279,15 @@ def get_all_active_customers() -> List[Dict[str, Any]]:
     except Exception as e:
         print(f"Fehler beim Abrufen der aktiven Kunden: {e}")
         return []
+    finally:
+        if conn:
+            conn.close()
 
 def create_customer(customer_data: Dict[str, Any]) -> bool:
     """Erstellt einen neuen Kunden in der CRM-Datenbank"""
+    conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Tabelle erstellen falls sie nicht existiert
@@ -1934,6 +2327,9 @@ def create_customer(customer_data: Dict[str, Any]) -> bool:
     except Exception as e:
         print(f"Fehler beim Erstellen des Kunden: {e}")
         return False
+    finally:
+        if conn:
+            conn.close()
 
 def update_customer(customer_id: int, customer_data: Dict[str, Any]) -> bool:
     """
@@ -1946,6 +2342,7 @@ def update_customer(customer_id: int, customer_data: Dict[str, Any]) -> bool:
     Returns:
         bool: True wenn erfolgreich
     """
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -1986,11 +2383,15 @@ def update_customer(customer_id: int, customer_data: Dict[str, Any]) -> bool:
     except Exception as e:
         print(f"Fehler beim Aktualisieren des Kunden {customer_id}: {e}")
         return False
+    finally:
+        if conn:
+            conn.close()
 
 def get_customer_by_id(customer_id: int) -> Optional[Dict[str, Any]]:
     """Gibt einen spezifischen Kunden basierend auf der ID zurück"""
+    conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Versuche zuerst die Tabelle zu erstellen falls sie nicht existiert
@@ -2040,4 +2441,7 @@ def get_customer_by_id(customer_id: int) -> Optional[Dict[str, Any]]:
         
     except Exception as e:
         print(f"Fehler beim Abrufen des Kunden mit ID {customer_id}: {e}")
-        return None
\ No newline at end of file
+        return None
+    finally:
+        if conn:
+            conn.close()
\ No newline at end of file
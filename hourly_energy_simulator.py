@@ -0,0 +1,249 @@
+# hourly_energy_simulator.py - Stündliche Energiebilanz (8760 h) mit Speicher-Dispatch
+"""
+Simuliert Eigenverbrauch, Speicherladung/-entladung, Einspeisung und Netzbezug
+Stunde für Stunde über ein Jahr, statt mit festen Anteilen oder einem
+24-Stunden-Mustertag zu rechnen.
+
+- Profile: Standardlastprofil H0 und PV-Erzeugung aus Sonnenstand kommen
+  normiert aus lookup_tables und werden auf die Jahres- bzw. Monatsmengen
+  skaliert.
+- Dispatch: Überschuss lädt, Defizit entlädt, begrenzt durch C-Rate, Kapazität
+  und Wirkungsgrad. Gerechnet wird für ein ganzes Raster von Speichergrößen in
+  einem Aufruf (Achse 0 = Speichergröße).
+
+Der Ladezustand hängt nur innerhalb zusammenhängender Lade- bzw.
+Entladephasen voneinander ab und ist dort monoton. Der Kernel läuft deshalb
+nicht über 8760 Stunden, sondern über die Phasen (typisch ~700 pro Jahr) und
+rechnet jede Phase per kumulierter Summe mit Kappung an Voll/Leer – das
+Ergebnis ist identisch zur Stundenschleife.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from lookup_tables import DAYS_PER_MONTH, HOURS_PER_YEAR, get_tables
+
+DEFAULT_STORAGE_GRID_KWH = tuple(float(c) for c in np.arange(0.0, 20.5, 0.5))
+DEFAULT_C_RATE = 0.5
+DEFAULT_LATITUDE = 51.0
+# Zusätzlicher Eigenverbrauch je kWh Speicher und Jahr, ab dem sich eine Vergrößerung noch lohnt
+DEFAULT_MIN_MARGINAL_GAIN_KWH_PER_KWH = 150.0
+
+# Deutsche Standard-Monatsverteilung des PV-Ertrags (wie global_constants.monthly_production_distribution)
+DEFAULT_MONTHLY_PV_SHARES = (0.03, 0.05, 0.08, 0.11, 0.13, 0.14, 0.13, 0.12, 0.09, 0.06, 0.04, 0.02)
+
+_MONTH_OF_HOUR = np.repeat(np.repeat(np.arange(12), DAYS_PER_MONTH), 24)
+
+
+def standard_load_profile(annual_consumption_kwh: float, first_weekday: int = 0) -> np.ndarray:
+    """
+    Stündliches Haushaltslastprofil (H0) für ein Jahr aus den Lookup-Tabellen.
+
+    Args:
+        annual_consumption_kwh: Jahresverbrauch, auf den das Profil skaliert wird
+        first_weekday: Wochentag des 01.01. (0 = Montag)
+
+    Returns:
+        Array (8760,) in kWh je Stunde
+    """
+    return get_tables().load_profile(annual_consumption_kwh, first_weekday)
+
+
+def pv_production_profile(
+    monthly_production_kwh: Optional[Sequence[float]] = None,
+    annual_production_kwh: Optional[float] = None,
+    latitude: float = DEFAULT_LATITUDE,
+) -> np.ndarray:
+    """
+    Stündliches PV-Erzeugungsprofil aus dem Sonnenstand, skaliert auf Monatsmengen.
+
+    Entweder monthly_production_kwh (12 Werte, z.B. results['monthly_productions_sim'])
+    oder annual_production_kwh angeben; letzteres wird über
+    DEFAULT_MONTHLY_PV_SHARES auf die Monate verteilt.
+
+    Returns:
+        Array (8760,) in kWh je Stunde
+    """
+    if monthly_production_kwh is None:
+        shares = np.asarray(DEFAULT_MONTHLY_PV_SHARES, dtype=float)
+        monthly = shares / shares.sum() * float(annual_production_kwh or 0.0)
+    else:
+        monthly = np.asarray(monthly_production_kwh, dtype=float)
+        if monthly.shape != (12,):
+            raise ValueError(f"monthly_production_kwh braucht 12 Werte, nicht {monthly.shape}")
+
+    shape = get_tables().pv_shape(latitude)
+    month_sums = np.bincount(_MONTH_OF_HOUR, weights=shape, minlength=12)
+    scale = np.divide(monthly, month_sums, out=np.zeros(12), where=month_sums > 0)
+    return shape * scale[_MONTH_OF_HOUR]
+
+
+def simulate_storage_grid(
+    pv_kwh: Sequence[float],
+    load_kwh: Sequence[float],
+    capacities_kwh: Sequence[float] = DEFAULT_STORAGE_GRID_KWH,
+    round_trip_efficiency: float = 0.9,
+    c_rate: float = DEFAULT_C_RATE,
+    min_soc_percent: float = 0.0,
+    initial_soc_percent: float = 0.0,
+    include_hourly: bool = False,
+) -> Dict[str, np.ndarray]:
+    """
+    Stündlicher Speicher-Dispatch für mehrere Speichergrößen gleichzeitig.
+
+    Args:
+        pv_kwh, load_kwh: Stundenwerte gleicher Länge (üblich 8760)
+        capacities_kwh: Nutzbare Speicherkapazitäten (N Werte, 0 = ohne Speicher)
+        round_trip_efficiency: Gesamtwirkungsgrad Laden+Entladen, je Richtung die Wurzel
+        c_rate: Maximale Lade-/Entladeleistung in kW je kWh Kapazität
+        min_soc_percent: Entladegrenze in % der Kapazität
+        initial_soc_percent: Ladezustand zu Jahresbeginn in % der Kapazität
+        include_hourly: Zusätzlich Stundenreihen (N, Stunden) zurückgeben
+
+    Returns:
+        Dict mit Jahressummen je Speichergröße (Form (N,)): direct_consumption_kwh,
+        battery_charge_kwh (aus PV), battery_discharge_kwh (an Verbraucher),
+        feed_in_kwh, grid_purchase_kwh, self_consumption_kwh,
+        self_consumption_rate_percent, autarky_percent, full_cycles; bei
+        include_hourly außerdem soc_kwh, charge_kwh, discharge_kwh.
+    """
+    pv = np.asarray(pv_kwh, dtype=float)
+    load = np.asarray(load_kwh, dtype=float)
+    if pv.shape != load.shape or pv.ndim != 1:
+        raise ValueError("pv_kwh und load_kwh müssen 1D-Reihen gleicher Länge sein")
+    capacities = np.maximum(np.asarray(capacities_kwh, dtype=float).reshape(-1), 0.0)
+    eta = math.sqrt(min(max(float(round_trip_efficiency), 1e-6), 1.0))
+
+    net = pv - load
+    surplus = np.maximum(net, 0.0)
+    deficit = np.maximum(-net, 0.0)
+    power = (capacities * max(float(c_rate), 0.0))[:, np.newaxis]
+    soc_min = capacities * (min(max(float(min_soc_percent), 0.0), 100.0) / 100.0)
+    soc = np.clip(capacities * (float(initial_soc_percent) / 100.0), soc_min, capacities)
+
+    # Energie im Speicher: zugeführt (nach Ladeverlust) bzw. entnommen (vor Entladeverlust)
+    stored = np.zeros((capacities.size, pv.size))
+    drawn = np.zeros((capacities.size, pv.size))
+    soc_hourly = np.empty((capacities.size, pv.size)) if include_hourly else None
+
+    charging = net > 0
+    boundaries = np.flatnonzero(charging[1:] != charging[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [pv.size]))
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if charging[start]:
+            inflow = np.minimum(surplus[start:end], power) * eta
+            levels = np.minimum(soc[:, np.newaxis] + np.cumsum(inflow, axis=1), capacities[:, np.newaxis])
+            stored[:, start:end] = np.diff(levels, axis=1, prepend=soc[:, np.newaxis])
+        else:
+            outflow = np.minimum(deficit[start:end], power) / eta
+            levels = np.maximum(soc[:, np.newaxis] - np.cumsum(outflow, axis=1), soc_min[:, np.newaxis])
+            drawn[:, start:end] = -np.diff(levels, axis=1, prepend=soc[:, np.newaxis])
+        soc = levels[:, -1]
+        if soc_hourly is not None:
+            soc_hourly[:, start:end] = levels
+
+    direct = float(np.minimum(pv, load).sum())
+    total_pv = float(pv.sum())
+    total_load = float(load.sum())
+    charge_from_pv = stored.sum(axis=1) / eta
+    discharge_to_load = drawn.sum(axis=1) * eta
+    self_consumption = direct + discharge_to_load
+
+    result: Dict[str, np.ndarray] = {
+        "capacities_kwh": capacities,
+        "direct_consumption_kwh": np.full(capacities.size, direct),
+        "battery_charge_kwh": charge_from_pv,
+        "battery_discharge_kwh": discharge_to_load,
+        "feed_in_kwh": float(surplus.sum()) - charge_from_pv,
+        "grid_purchase_kwh": float(deficit.sum()) - discharge_to_load,
+        "self_consumption_kwh": self_consumption,
+        "self_consumption_rate_percent": (direct + charge_from_pv) / total_pv * 100 if total_pv > 0 else np.zeros(capacities.size),
+        "autarky_percent": self_consumption / total_load * 100 if total_load > 0 else np.zeros(capacities.size),
+        "full_cycles": np.divide(drawn.sum(axis=1), capacities, out=np.zeros(capacities.size), where=capacities > 0),
+    }
+    if include_hourly:
+        result["soc_kwh"] = soc_hourly
+        result["charge_kwh"] = stored / eta
+        result["discharge_kwh"] = drawn * eta
+    return result
+
+
+def optimal_storage_size(
+    grid_result: Dict[str, np.ndarray],
+    min_marginal_gain_kwh_per_kwh: float = DEFAULT_MIN_MARGINAL_GAIN_KWH_PER_KWH,
+) -> float:
+    """
+    Größte Kapazität des Rasters, deren letzter Zuwachs noch mindestens
+    min_marginal_gain_kwh_per_kwh zusätzlichen Eigenverbrauch pro Jahr bringt.
+    """
+    capacities = np.asarray(grid_result["capacities_kwh"], dtype=float)
+    order = np.argsort(capacities)
+    capacities = capacities[order]
+    self_consumption = np.asarray(grid_result["self_consumption_kwh"], dtype=float)[order]
+    if capacities.size < 2:
+        return float(capacities[0]) if capacities.size else 0.0
+    step = np.diff(capacities)
+    gain = np.divide(np.diff(self_consumption), step, out=np.zeros(step.size), where=step > 0)
+    worthwhile = np.flatnonzero(gain >= min_marginal_gain_kwh_per_kwh)
+    return float(capacities[worthwhile[-1] + 1]) if worthwhile.size else float(capacities[0])
+
+
+def average_daily_profile(hourly: Any) -> np.ndarray:
+    """Mittlerer Tagesverlauf (24 Werte) aus Stundenreihen (..., 8760)."""
+    values = np.asarray(hourly, dtype=float)
+    return values.reshape(values.shape[:-1] + (-1, 24)).mean(axis=-2)
+
+
+def simulate_storage_sizing(
+    annual_consumption_kwh: float,
+    monthly_production_kwh: Optional[Sequence[float]] = None,
+    annual_production_kwh: Optional[float] = None,
+    capacities_kwh: Sequence[float] = DEFAULT_STORAGE_GRID_KWH,
+    round_trip_efficiency: float = 0.9,
+    c_rate: float = DEFAULT_C_RATE,
+    latitude: float = DEFAULT_LATITUDE,
+    include_hourly: bool = False,
+) -> Dict[str, np.ndarray]:
+    """Profile erzeugen und simulate_storage_grid über das Kapazitätsraster laufen lassen."""
+    pv = pv_production_profile(monthly_production_kwh, annual_production_kwh, latitude)
+    load = standard_load_profile(annual_consumption_kwh)
+    result = simulate_storage_grid(
+        pv, load, capacities_kwh, round_trip_efficiency, c_rate, include_hourly=include_hourly
+    )
+    if include_hourly:
+        result["pv_kwh"] = pv
+        result["load_kwh"] = load
+    return result
+
+
+def storage_grid_summary(grid_result: Dict[str, np.ndarray]) -> Dict[str, list]:
+    """Jahressummen eines Rasterlaufs als Listen (JSON-tauglich für Ergebnis-Dicts)."""
+    keys = (
+        "capacities_kwh",
+        "self_consumption_kwh",
+        "battery_discharge_kwh",
+        "feed_in_kwh",
+        "grid_purchase_kwh",
+        "autarky_percent",
+        "self_consumption_rate_percent",
+        "full_cycles",
+    )
+    return {key: np.asarray(grid_result[key], dtype=float).round(3).tolist() for key in keys}
+
+
+__all__ = [
+    "HOURS_PER_YEAR",
+    "DEFAULT_STORAGE_GRID_KWH",
+    "standard_load_profile",
+    "pv_production_profile",
+    "simulate_storage_grid",
+    "simulate_storage_sizing",
+    "optimal_storage_size",
+    "average_daily_profile",
+    "storage_grid_summary",
+]
@@ -0,0 +1,302 @@
+# image_asset_store.py - Normalisierte Bild-Assets für die PDF-Erzeugung
+"""
+Produktbilder, Firmen- und Markenlogos liegen als Base64 in voller Auflösung in
+SQLite. Dieser Speicher legt beim Hochladen/Importieren je Bildinhalt (SHA-256)
+einmal das Original als Binärdatei außerhalb der Zeile ab und berechnet
+Druckvarianten für die Bildplätze der Templates im Hintergrund vor (oder beim
+ersten Abruf):
+
+    data/image_assets/<id[:2]>/<id>.orig
+    data/image_assets/<id[:2]>/<id>_<slot>_<dpi>dpi_q<qualität>.jpg|.png
+
+Varianten werden auf die Slot-Größe bei PRINT_DPI verkleinert (nie vergrößert),
+Fotos als JPEG, Logos/Grafiken mit Transparenz oder wenigen Farben als PNG.
+DPI und JPEG-Qualität sind Teil des Schlüssels, geänderte Einstellungen
+erzeugen also neue Varianten statt alte weiterzuverwenden. Da dasselbe Bild
+für denselben Slot immer dieselben Bytes liefert, bettet ReportLab es pro
+Dokument nur einmal ein. Die Asset-ID eines bereits gesehenen Base64-Strings
+wird (über dessen Python-Hash) gemerkt, sodass wiederholte PDFs das Bild weder
+dekodieren noch per SHA-256 hashen.
+Ist das Verzeichnis nicht beschreibbar, werden Varianten nur im Speicher
+gehalten.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Optional, Set, Tuple, Union
+
+from atomic_files import write_bytes_atomic
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "image_assets")
+PRINT_DPI = float(os.environ.get("KAKERLAKE_ASSET_PRINT_DPI", "200"))
+JPEG_QUALITY = int(os.environ.get("KAKERLAKE_ASSET_JPEG_QUALITY", "85"))
+_MEMORY_CACHE_SIZE = int(os.environ.get("KAKERLAKE_ASSET_CACHE_SIZE", "128"))
+_ID_CACHE_SIZE = 256
+_ID_INLINE_KEY_LIMIT = 1024  # Bytes/Zeichen; größere Eingaben per Digest
+
+# Bildplätze der Templates (Breite, Höhe in pt)
+SLOT_SIZES_PT: Dict[str, Tuple[float, float]] = {
+    "brand_logo": (60.0, 30.0),          # coords/seite4.yml Logomodul/Logoricht/Logoakkus
+    "page4_component": (140.0, 90.0),    # dynamic_overlay._draw_page4_component_images
+    "company_logo": (170.1, 85.0),       # Deckblatt 6 x 3 cm (Overlay: 120 x 50 pt)
+    "product_image": (141.7, 141.7),     # Produktseiten 5 x 5 cm
+    "title_image": (481.9, 390.0),       # Titelbild: Satzspiegel-Breite, Höhe / 1.8
+}
+
+Slot = Union[str, Tuple[float, float]]
+
+_memory: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+# Eingabe (bzw. blake2b-Digest großer Eingaben) -> Asset-ID. Treffer kosten
+# weder Base64-Dekodieren noch SHA-256, große Base64-Strings werden nicht
+# festgehalten, und verschiedene Inhalte teilen nie eine ID.
+_ids: "OrderedDict[Tuple[type, int, Union[str, bytes]], str]" = OrderedDict()
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_pending: Set[Future] = set()
+
+
+def decode_image_input(data: Union[str, bytes, None]) -> Optional[bytes]:
+    """Bildbytes aus Bytes, Base64 oder Data-URL; None bei leeren/ungültigen Werten."""
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data) or None
+    if not isinstance(data, str) or data.strip().lower() in ("", "none", "null", "nan"):
+        return None
+    text = data.strip()
+    if ";base64," in text:
+        text = text.split(";base64,", 1)[1]
+    try:
+        return base64.b64decode(text) or None
+    except Exception:
+        return None
+
+
+def asset_id(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _slot_key(slot: Slot) -> Tuple[str, Tuple[float, float]]:
+    """Varianten-Schlüssel aus Slot, PRINT_DPI und JPEG_QUALITY sowie die Slot-Größe in pt."""
+    if isinstance(slot, str):
+        name, size_pt = slot, SLOT_SIZES_PT[slot]
+    else:
+        size_pt = (float(slot[0]), float(slot[1]))
+        name = f"{int(math.ceil(size_pt[0]))}x{int(math.ceil(size_pt[1]))}"
+    return f"{name}_{PRINT_DPI:g}dpi_q{JPEG_QUALITY}", size_pt
+
+
+def _asset_path(aid: str, suffix: str) -> str:
+    return os.path.join(ASSET_DIR, aid[:2], f"{aid}{suffix}")
+
+
+def render_variant(raw: bytes, size_pt: Tuple[float, float], dpi: Optional[float] = None) -> Tuple[bytes, str]:
+    """Verkleinert auf die Slot-Größe bei dpi (Standard: PRINT_DPI); liefert (Bytes, 'jpg'|'png')."""
+    from PIL import Image
+
+    dpi = PRINT_DPI if dpi is None else dpi
+
+    max_px = (
+        max(1, int(math.ceil(size_pt[0] / 72.0 * dpi))),
+        max(1, int(math.ceil(size_pt[1] / 72.0 * dpi))),
+    )
+    with Image.open(io.BytesIO(raw)) as img:
+        img.load()
+        source_format = (img.format or "").upper()
+        if img.width > max_px[0] or img.height > max_px[1]:
+            img.thumbnail(max_px, Image.LANCZOS)
+            resized = True
+        else:
+            resized = False
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+        few_colors = img.getcolors(256) is not None
+        out = io.BytesIO()
+        if has_alpha or few_colors:
+            if img.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+                img = img.convert("RGBA")
+            img.save(out, format="PNG", optimize=True)
+            ext = "png"
+        else:
+            img.convert("RGB").save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+            ext = "jpg"
+    data = out.getvalue()
+    # Bereits kleine Originale in passendem Format nicht künstlich aufblähen
+    if not resized and len(raw) <= len(data) and source_format in ("PNG", "JPEG"):
+        return raw, "png" if source_format == "PNG" else "jpg"
+    return data, ext
+
+
+def _load_variant_from_disk(aid: str, key: str) -> Optional[bytes]:
+    for ext in ("jpg", "png"):
+        try:
+            with open(_asset_path(aid, f"_{key}.{ext}"), "rb") as handle:
+                return handle.read()
+        except OSError:
+            continue
+    return None
+
+
+def _remember(aid: str, key: str, data: bytes) -> None:
+    with _lock:
+        _memory[(aid, key)] = data
+        _memory.move_to_end((aid, key))
+        while len(_memory) > max(_MEMORY_CACHE_SIZE, 0):
+            _memory.popitem(last=False)
+
+
+def _stored_variant(aid: str, key: str) -> Optional[bytes]:
+    """Variante aus Speicher oder Platte, ohne das Bild anzufassen."""
+    with _lock:
+        cached = _memory.get((aid, key))
+        if cached is not None:
+            _memory.move_to_end((aid, key))
+            return cached
+    data = _load_variant_from_disk(aid, key)
+    if data is not None:
+        _remember(aid, key, data)
+    return data
+
+
+def _variant(raw: bytes, aid: str, slot: Slot) -> bytes:
+    key, size_pt = _slot_key(slot)
+    data = _stored_variant(aid, key)
+    if data is None:
+        data, ext = render_variant(raw, size_pt)
+        try:
+            write_bytes_atomic(_asset_path(aid, f"_{key}.{ext}"), data)
+        except OSError as e:
+            print(f"image_asset_store: Variante {aid[:12]}/{key} nur im Speicher: {e}")
+        _remember(aid, key, data)
+    return data
+
+
+def _input_key(data: Union[str, bytes]) -> Tuple[type, int, Union[str, bytes]]:
+    """Kleine Eingaben direkt, große über einen blake2b-Digest des gesamten Inhalts (nie hash())."""
+    if len(data) <= _ID_INLINE_KEY_LIMIT:
+        return type(data), len(data), data
+    raw = data.encode("utf-8", errors="surrogatepass") if isinstance(data, str) else data
+    return type(data), len(data), hashlib.blake2b(raw, digest_size=32).digest()
+
+
+def _cached_asset_id(data: Union[str, bytes]) -> Optional[str]:
+    key = _input_key(data)
+    with _lock:
+        aid = _ids.get(key)
+        if aid is not None:
+            _ids.move_to_end(key)
+        return aid
+
+
+def _remember_asset_id(data: Union[str, bytes], aid: str) -> None:
+    key = _input_key(data)
+    with _lock:
+        _ids[key] = aid
+        _ids.move_to_end(key)
+        while len(_ids) > _ID_CACHE_SIZE:
+            _ids.popitem(last=False)
+
+
+def _precompute_variants(raw: bytes, aid: str) -> None:
+    try:
+        for slot in SLOT_SIZES_PT:
+            _variant(raw, aid, slot)
+    except Exception as e:
+        print(f"image_asset_store: Keine Varianten für {aid[:12]} (kein unterstütztes Bild?): {e}")
+
+
+def _submit(raw: bytes, aid: str) -> None:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-assets")
+        future = _executor.submit(_precompute_variants, raw, aid)
+        _pending.add(future)
+    future.add_done_callback(_discard_pending)
+
+
+def _discard_pending(future: Future) -> None:
+    with _lock:
+        _pending.discard(future)
+
+
+def wait_for_variants(timeout: Optional[float] = None) -> bool:
+    """Wartet auf die im Hintergrund laufenden Vorberechnungen; True, wenn alle fertig sind."""
+    with _lock:
+        pending = list(_pending)
+    return not wait(pending, timeout=timeout).not_done
+
+
+def register_image(data: Union[str, bytes, None], background: bool = True) -> Optional[str]:
+    """
+    Legt ein Bild beim Hochladen/Importieren ab (dedupliziert nach Inhalt) und
+    liefert die Asset-ID. Die Varianten der Template-Slots werden im
+    Hintergrund vorberechnet (background=False: sofort), damit Speichern und
+    CSV-Importe nicht auf Pillow warten.
+    """
+    raw = decode_image_input(data)
+    if raw is None:
+        return None
+    aid = asset_id(raw)
+    if isinstance(data, (str, bytes)):
+        _remember_asset_id(data, aid)
+    try:
+        original_path = _asset_path(aid, ".orig")
+        if not os.path.exists(original_path):
+            write_bytes_atomic(original_path, raw)
+    except OSError as e:
+        print(f"image_asset_store: Original {aid[:12]} konnte nicht gespeichert werden: {e}")
+    if background:
+        _submit(raw, aid)
+    else:
+        _precompute_variants(raw, aid)
+    return aid
+
+
+def print_variant(data: Union[str, bytes, None], slot: Slot) -> Optional[bytes]:
+    """
+    Druckfertige Bytes für einen Slot (Name aus SLOT_SIZES_PT oder (Breite, Höhe)
+    in pt). Nicht registrierte Bilder werden bei Bedarf normalisiert; ist das
+    Bild nicht lesbar, kommen die Originalbytes zurück.
+    """
+    if isinstance(data, (str, bytes)):
+        aid = _cached_asset_id(data)
+        if aid is not None:
+            stored = _stored_variant(aid, _slot_key(slot)[0])
+            if stored is not None:
+                return stored
+    raw = decode_image_input(data)
+    if raw is None:
+        return None
+    aid = asset_id(raw)
+    if isinstance(data, (str, bytes)):
+        _remember_asset_id(data, aid)
+    try:
+        return _variant(raw, aid, slot)
+    except Exception:
+        return raw
+
+
+def clear_memory_cache() -> None:
+    with _lock:
+        _memory.clear()
+        _ids.clear()
+
+
+__all__ = [
+    "ASSET_DIR",
+    "PRINT_DPI",
+    "SLOT_SIZES_PT",
+    "decode_image_input",
+    "asset_id",
+    "render_variant",
+    "register_image",
+    "wait_for_variants",
+    "print_variant",
+    "clear_memory_cache",
+]
@@ -0,0 +1,195 @@
+# irr_engine.py - Gemeinsame NPV-, IRR- und MIRR-Berechnung auf NumPy-Arrays
+"""
+Finanzmathematische Kennzahlen für Cashflow-Reihen, bei denen Index 0 das
+Jahr der Investition ist (Konvention wie numpy_financial).
+
+Alle Funktionen akzeptieren eine einzelne Reihe (Form (T,)) oder einen Stapel
+von Reihen (Form (N, T)) und rechnen alle Reihen gleichzeitig. Der IRR wird
+über ein Newton-Verfahren innerhalb eines Vorzeichenwechsel-Intervalls
+bestimmt; verlässt ein Newton-Schritt das Intervall, wird halbiert. Damit
+konvergiert die Suche immer, ohne einen festen Zinsraster abzulaufen. Findet
+sich bis IRR_UPPER_BOUND kein Vorzeichenwechsel, wird die obere Grenze bis
+IRR_MAX_UPPER_BOUND schrittweise verdoppelt (kurze Amortisation, IRR > 100 %).
+"""
+
+from __future__ import annotations
+
+from typing import Union
+
+import numpy as np
+
+ArrayLike = Union[float, np.ndarray]
+
+# Suchbereich und Raster für die Eingrenzung des IRR
+IRR_LOWER_BOUND = -0.99
+IRR_UPPER_BOUND = 1.0
+IRR_MAX_UPPER_BOUND = 1000.0
+IRR_BRACKET_POINTS = 200
+IRR_TOLERANCE = 1e-10
+IRR_MAX_ITERATIONS = 100
+
+
+def _as_batch(cash_flows) -> np.ndarray:
+    """Cashflows als (N, T)-Array; eine einzelne Reihe wird zu N = 1."""
+    flows = np.asarray(cash_flows, dtype=float)
+    if flows.ndim == 0 or flows.shape[-1] == 0:
+        raise ValueError("Cashflow-Reihe darf nicht leer sein")
+    return flows.reshape(-1, flows.shape[-1])
+
+
+def _result(values: np.ndarray, template) -> ArrayLike:
+    """Skalar für eine einzelne Reihe, sonst Array in der Stapelform der Eingabe."""
+    shape = np.shape(template)[:-1]
+    if not shape:
+        return float(values.reshape(-1)[0])
+    return values.reshape(shape)
+
+
+def investment_cash_flows(investment: ArrayLike, annual_cash_flow: ArrayLike, years: int) -> np.ndarray:
+    """
+    Cashflow-Reihe [-Investition, Rückfluss, ..., Rückfluss] mit konstantem Jahresrückfluss.
+
+    Args:
+        investment: Anfangsinvestition (positiv angegeben)
+        annual_cash_flow: Jährlicher Rückfluss
+        years: Anzahl Jahre mit Rückfluss
+
+    Returns:
+        Array der Form (years + 1,) bzw. (N, years + 1) bei Array-Eingaben
+    """
+    investment_arr = np.asarray(investment, dtype=float)[..., np.newaxis]
+    annual_arr = np.asarray(annual_cash_flow, dtype=float)[..., np.newaxis]
+    shape = np.broadcast_shapes(investment_arr.shape, annual_arr.shape)[:-1]
+    flows = np.empty(shape + (max(int(years), 0) + 1,), dtype=float)
+    flows[..., :1] = -investment_arr
+    flows[..., 1:] = annual_arr
+    return flows
+
+
+def npv(rate: ArrayLike, cash_flows) -> ArrayLike:
+    """
+    Kapitalwert einer oder mehrerer Cashflow-Reihen (Jahr 0 wird nicht abgezinst).
+
+    Args:
+        rate: Kalkulationszins als Dezimalzahl; Skalar oder Array, das gegen die
+            Stapelachse der Cashflows gebroadcastet wird (z.B. ein Zinsraster
+            für eine einzelne Reihe)
+        cash_flows: Reihe (T,) oder Stapel (N, T)
+
+    Returns:
+        Kapitalwert als float bzw. Array
+    """
+    flows = np.asarray(cash_flows, dtype=float)
+    rates = np.asarray(rate, dtype=float)[..., np.newaxis]
+    exponents = np.arange(flows.shape[-1], dtype=float)
+    values = np.sum(flows * np.power(1.0 + rates, -exponents), axis=-1)
+    return float(values) if values.ndim == 0 else values
+
+
+def _bracket(flows: np.ndarray, lower: float, upper: float, points: int):
+    """
+    Sucht pro Reihe das Raster-Intervall mit Vorzeichenwechsel, das 0 % am nächsten liegt.
+
+    Returns:
+        (lo, hi, found) - Intervallgrenzen und Maske der Reihen mit Lösung
+    """
+    grid = np.linspace(lower, upper, points)
+    if lower < 0.0 < upper:
+        grid = np.union1d(grid, [0.0])
+    values = npv(grid, flows[:, np.newaxis, :])  # (N, G)
+    signs = np.sign(values)
+    change = signs[:, :-1] * signs[:, 1:] <= 0
+    distance = np.where(change, np.abs(grid[:-1] + grid[1:]), np.inf)
+    index = np.argmin(distance, axis=1)
+    found = np.isfinite(distance[np.arange(len(flows)), index])
+    return grid[index], grid[index + 1], found
+
+
+def irr(
+    cash_flows,
+    lower: float = IRR_LOWER_BOUND,
+    upper: float = IRR_UPPER_BOUND,
+    tol: float = IRR_TOLERANCE,
+    max_iterations: int = IRR_MAX_ITERATIONS,
+) -> ArrayLike:
+    """
+    Interner Zinsfuß einer oder mehrerer Cashflow-Reihen.
+
+    Args:
+        cash_flows: Reihe (T,) oder Stapel (N, T), Index 0 = Investitionsjahr
+        lower: Untere Grenze des Suchbereichs (Dezimalzahl, > -1)
+        upper: Obere Grenze des Suchbereichs; ohne Treffer bis IRR_MAX_UPPER_BOUND verdoppelt
+        tol: Abbruchtoleranz für den Zinssatz
+        max_iterations: Maximale Anzahl Newton-/Halbierungsschritte
+
+    Returns:
+        IRR als Dezimalzahl (float bzw. Array); NaN, wenn im Suchbereich kein
+        Vorzeichenwechsel des Kapitalwerts existiert
+    """
+    flows = _as_batch(cash_flows)
+    exponents = np.arange(flows.shape[-1], dtype=float)
+    lo, hi, found = _bracket(flows, lower, upper, IRR_BRACKET_POINTS)
+    # Ohne Treffer die obere Grenze verdoppeln, nur für Reihen mit Vorzeichenwechsel
+    widen = ~found & (flows.min(axis=1) < 0) & (flows.max(axis=1) > 0)
+    bound = upper
+    while widen.any() and 0.0 < bound < IRR_MAX_UPPER_BOUND:
+        next_bound = min(bound * 2.0, IRR_MAX_UPPER_BOUND)
+        lo_w, hi_w, found_w = _bracket(flows[widen], bound, next_bound, IRR_BRACKET_POINTS)
+        lo[widen], hi[widen], found[widen] = lo_w, hi_w, found_w
+        widen[widen] = ~found_w
+        bound = next_bound
+    f_lo = npv(lo, flows)
+    rate = np.where(f_lo == 0.0, lo, 0.5 * (lo + hi))
+    active = found & (f_lo != 0.0)
+
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        discount = np.power(1.0 + rate[:, np.newaxis], -exponents)
+        value = np.sum(flows * discount, axis=-1)
+        derivative = np.sum(-exponents * flows * discount, axis=-1) / (1.0 + rate)
+
+        # Intervall anhand des Vorzeichens verkleinern
+        same_side = np.sign(value) == np.sign(f_lo)
+        lo = np.where(active & same_side, rate, lo)
+        f_lo = np.where(active & same_side, value, f_lo)
+        hi = np.where(active & ~same_side, rate, hi)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = rate - value / derivative
+        inside = np.isfinite(newton) & (newton > lo) & (newton < hi)
+        candidate = np.where(inside, newton, 0.5 * (lo + hi))
+
+        converged = (np.abs(candidate - rate) < tol) | (value == 0.0)
+        rate = np.where(active, candidate, rate)
+        active &= ~converged
+
+    return _result(np.where(found, rate, np.nan), np.asarray(cash_flows, dtype=float))
+
+
+def mirr(cash_flows, finance_rate: ArrayLike, reinvest_rate: ArrayLike) -> ArrayLike:
+    """
+    Modifizierter interner Zinsfuß (Konvention wie numpy_financial.mirr).
+
+    Negative Cashflows werden mit finance_rate auf Jahr 0 abgezinst, positive
+    mit reinvest_rate auf das Laufzeitende aufgezinst.
+
+    Returns:
+        MIRR als Dezimalzahl (float bzw. Array); NaN, wenn die Reihe keine
+        positiven oder keine negativen Cashflows enthält
+    """
+    flows = _as_batch(cash_flows)
+    periods = flows.shape[-1] - 1
+    exponents = np.arange(flows.shape[-1], dtype=float)
+    finance = np.asarray(finance_rate, dtype=float).reshape(-1, 1)
+    reinvest = np.asarray(reinvest_rate, dtype=float).reshape(-1, 1)
+
+    positive = np.where(flows > 0, flows, 0.0)
+    negative = np.where(flows < 0, flows, 0.0)
+    future_value = np.sum(positive * np.power(1.0 + reinvest, periods - exponents), axis=-1)
+    present_cost = -np.sum(negative * np.power(1.0 + finance, -exponents), axis=-1)
+
+    valid = (future_value > 0) & (present_cost > 0) & (periods > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = np.where(valid, (future_value / present_cost) ** (1.0 / max(periods, 1)) - 1.0, np.nan)
+    return _result(values, np.asarray(cash_flows, dtype=float))
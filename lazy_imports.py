@@ -0,0 +1,50 @@
+# lazy_imports.py - Verzögertes Laden schwerer Abhängigkeiten
+"""
+Rechenkern und Platzhalter-Logik werden auch ohne Oberfläche genutzt
+(Electron-Bridge-Prozesse, CLI, Tests). pandas und requests kosten beim Import
+mehrere hundert Millisekunden, werden aber nur auf wenigen Pfaden gebraucht
+(Preis-Matrix-Parsing, PVGIS-Abruf). lazy_module() liefert ein Modulobjekt,
+das erst beim ersten Attributzugriff tatsächlich importiert wird.
+
+Streamlit wird im Rechenkern gar nicht importiert: loaded_streamlit() gibt das
+Modul nur zurück, wenn die App bereits in Streamlit läuft.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Optional
+
+
+def lazy_module(name: str) -> ModuleType:
+    """Modul, das beim ersten Attributzugriff geladen wird (bereits geladene Module direkt)."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Modul '{name}' nicht gefunden", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def loaded_streamlit() -> Optional[ModuleType]:
+    """Streamlit-Modul, falls die App darin läuft; sonst None (ohne Import)."""
+    return sys.modules.get("streamlit")
+
+
+def ui_info(message: str, sidebar: bool = False) -> None:
+    """Hinweis in der Streamlit-Oberfläche anzeigen, falls vorhanden."""
+    st = loaded_streamlit()
+    if st is None:
+        return
+    try:
+        (st.sidebar if sidebar else st).info(message)
+    except Exception:
+        pass  # z.B. kein ScriptRunContext (Streamlit importiert, aber nicht als App gestartet)
@@ -4,27 +4,50 @@ Erweiterte Berechnungslogik für korrekte Live-Vorschau Werte
 """
 
 import streamlit as st
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 from german_formatting import format_currency, format_percentage, format_kwh, format_years, format_ct_kwh
 
 def calculate_correct_live_values(results: Dict[str, Any]) -> Dict[str, Any]:
     """
     Berechnet alle Live-Vorschau Werte korrekt nach der angegebenen Logik
+
+    Nur die Amortisationszeit hängt von der Investition ab; alle übrigen Werte
+    werden pro Kombination aus Verbrauchs-/Ertragsdaten zwischengespeichert,
+    sodass Rabatt- und Zuschlagsänderungen keine Neuberechnung auslösen.
     """
-    # Basis-Daten extrahieren
-    annual_production_kwh = results.get('annual_pv_production_kwh', 0)
-    annual_consumption_kwh = results.get('annual_consumption_kwh', 0)
-    monthly_electricity_cost = results.get('monthly_electricity_cost', 0)
-    autarkie_grad_percent = results.get('self_supply_rate_percent', 0)
-    battery_capacity_kwh = results.get('battery_capacity_kwh', 0)
-    feed_in_tariff_ct_kwh = results.get('feed_in_tariff_ct_kwh', 8.2)  # Admin-Bereich Wert
-    price_increase_percent = results.get('electricity_price_increase_rate_effective_percent', 4.0)
-    simulation_years = results.get('simulation_period_years_effective', 20)
-    
-    # Investment-Werte
     investment_netto = results.get('total_investment_netto', 0)
     investment_brutto = results.get('total_investment_brutto', investment_netto * 1.19 if investment_netto > 0 else 0)
-    
+
+    live_values = dict(_price_independent_live_values(
+        float(results.get('annual_pv_production_kwh', 0) or 0),
+        float(results.get('annual_consumption_kwh', 0) or 0),
+        float(results.get('monthly_electricity_cost', 0) or 0),
+        float(results.get('self_supply_rate_percent', 0) or 0),
+        float(results.get('battery_capacity_kwh', 0) or 0),
+        float(results.get('feed_in_tariff_ct_kwh', 8.2)),  # Admin-Bereich Wert
+        float(results.get('electricity_price_increase_rate_effective_percent', 4.0)),
+        int(results.get('simulation_period_years_effective', 20)),
+    ))
+
+    # 7. AMORTISATIONSZEIT
+    annual_total_savings = live_values['jaehrliche_gesamtersparnis']
+    live_values['amortisationszeit_jahre'] = investment_brutto / annual_total_savings if annual_total_savings > 0 else 0
+    return live_values
+
+
+@lru_cache(maxsize=128)
+def _price_independent_live_values(
+    annual_production_kwh: float,
+    annual_consumption_kwh: float,
+    monthly_electricity_cost: float,
+    autarkie_grad_percent: float,
+    battery_capacity_kwh: float,
+    feed_in_tariff_ct_kwh: float,
+    price_increase_percent: float,
+    simulation_years: int,
+) -> Tuple[Tuple[str, float], ...]:
+    """Preisunabhängiger Teil von calculate_correct_live_values (gecacht, daher als Tupel)."""
     # 1. STROMTARIF BERECHNEN
     # Jährliche Gesamtstromkosten / Gesamtstromverbrauch kWh = Stromtarif ct/kWh
     yearly_electricity_cost = monthly_electricity_cost * 12
@@ -74,22 +97,18 @@ def calculate_correct_live_values(results: Dict[str, Any]) -> Dict[str, Any]:
     annual_total_savings = annual_savings_from_self_consumption + annual_feed_in_revenue
     total_savings_over_period = total_cost_without_pv - total_cost_with_pv
     
-    # 7. AMORTISATIONSZEIT
-    amortization_years = investment_brutto / annual_total_savings if annual_total_savings > 0 else 0
-    
-    return {
-        'stromtarif_ct_kwh': stromtarif_ct_kwh,
-        'stromkosten_ohne_pv_total': total_cost_without_pv,
-        'stromkosten_mit_pv_total': total_cost_with_pv,
-        'gesamtersparnis_total': total_savings_over_period,
-        'jaehrliche_einspeiseverguetung': annual_feed_in_revenue,
-        'jaehrliche_gesamtersparnis': annual_total_savings,
-        'amortisationszeit_jahre': amortization_years,
-        'direct_consumption_kwh': direct_consumption_kwh,
-        'surplus_for_feed_in_kwh': surplus_for_feed_in,
-        'battery_charged_kwh': battery_charged_kwh,
-        'remaining_consumption_kwh': remaining_consumption_kwh
-    }
+    return (
+        ('stromtarif_ct_kwh', stromtarif_ct_kwh),
+        ('stromkosten_ohne_pv_total', total_cost_without_pv),
+        ('stromkosten_mit_pv_total', total_cost_with_pv),
+        ('gesamtersparnis_total', total_savings_over_period),
+        ('jaehrliche_einspeiseverguetung', annual_feed_in_revenue),
+        ('jaehrliche_gesamtersparnis', annual_total_savings),
+        ('direct_consumption_kwh', direct_consumption_kwh),
+        ('surplus_for_feed_in_kwh', surplus_for_feed_in),
+        ('battery_charged_kwh', battery_charged_kwh),
+        ('remaining_consumption_kwh', remaining_consumption_kwh),
+    )
 
 def get_admin_feed_in_tariff() -> float:
     """
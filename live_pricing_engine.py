@@ -0,0 +1,413 @@
+# live_pricing_engine.py - Inkrementelle Neuberechnung der Preis-Kennzahlen
+"""
+Trennt die Wirtschaftlichkeitsrechnung in zwei Stufen:
+
+1. Energie-Stufe (preisunabhängig): Produktion, Eigenverbrauch, Degradation,
+   jährliche Nutzen und Wartungskosten. Sie stammt aus einem vollständigen
+   Lauf von calculations.perform_calculations und wird zwischengespeichert.
+2. Finanz-Stufe (preisabhängig): Investition, Amortisation, NPV, IRR, LCOE,
+   ROI, AfA usw. sowie optional eine Annuitäten-Finanzierung.
+
+Ändern sich nur Rabatte, Zuschläge oder Finanzierungskonditionen, rechnet
+IncrementalPricingEvaluator nur die Finanz-Stufe neu (wenige Millisekunden).
+compute_financial_tail wird auch von perform_calculations verwendet, sodass
+Live-Werte und vollständige Berechnung übereinstimmen.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from irr_engine import irr
+
+# Ergebnis-Schlüssel, die compute_financial_tail liefert (alle preisabhängig)
+FINANCIAL_TAIL_KEYS = (
+    "total_investment_netto",
+    "total_investment_brutto",
+    "amortization_time_years",
+    "simple_roi_percent",
+    "npv_value",
+    "npv_per_kwp",
+    "irr_percent",
+    "eigenkapitalrendite_roe_pct",
+    "lcoe_euro_per_kwh",
+    "effektiver_pv_strompreis_ct_kwh",
+    "afa_linear_pa_eur",
+    "restwert_anlage_eur_nach_laufzeit",
+    "alternativanlage_kapitalwert_eur",
+    "co2_avoidance_cost_euro_per_tonne",
+    "cumulative_cash_flows_sim",
+)
+
+_EVALUATOR_CACHE_SIZE = 8
+_KPI_CACHE_SIZE = 64
+
+_evaluators: "OrderedDict[Tuple[Any, ...], IncrementalPricingEvaluator]" = OrderedDict()
+_evaluators_lock = threading.Lock()
+
+
+def financial_tail_params(global_constants: Optional[Mapping[str, Any]]) -> Dict[str, float]:
+    """Admin-Konstanten der Finanz-Stufe mit denselben Fallbacks wie perform_calculations."""
+    gc = global_constants or {}
+    return {
+        "vat_rate_percent": float(gc.get("vat_rate_percent", 0.0) or 0.0),
+        "discount_rate_percent": float(gc.get("loan_interest_rate_percent", 4.0) or 4.0),
+        "afa_period_years": int(gc.get("afa_period_years", 20) or 20),
+        "alternative_investment_interest_rate_percent": float(
+            gc.get("alternative_investment_interest_rate_percent", 5.0) or 5.0
+        ),
+        "co2_emission_factor_kg_per_kwh": float(gc.get("co2_emission_factor_kg_per_kwh", 0.474) or 0.474),
+    }
+
+
+def apply_amortization_cheat(amortization_years: float, cheat_settings: Any) -> Tuple[float, Optional[float]]:
+    """
+    Wendet die Admin-Einstellung 'amortization_cheat_settings' an.
+
+    Returns:
+        (angezeigte Amortisationszeit, Originalwert oder None wenn unverändert)
+    """
+    if not isinstance(cheat_settings, dict) or not cheat_settings.get("enabled"):
+        return amortization_years, None
+    mode = cheat_settings.get("mode", "fixed")
+    cheated = None
+    try:
+        if mode == "fixed":
+            val = float(cheat_settings.get("value_years"))
+            if val > 0:
+                cheated = val
+        elif mode == "absolute_reduction":
+            red = float(cheat_settings.get("value_years"))
+            if red > 0 and amortization_years != float("inf"):
+                cheated = max(0.1, amortization_years - red)
+        elif mode == "percentage_reduction":
+            pct = float(cheat_settings.get("percent"))
+            if amortization_years != float("inf"):
+                pct = min(95.0, max(0.0, pct))
+                cheated = max(0.1, amortization_years * (1 - pct / 100.0))
+    except (TypeError, ValueError):
+        cheated = None
+    if cheated is None:
+        return amortization_years, None
+    return cheated, amortization_years
+
+
+def compute_financial_tail(
+    investment_netto: float,
+    annual_cash_flows: Sequence[float],
+    annual_productions: Sequence[float],
+    annual_maintenance_costs: Sequence[float],
+    annual_financial_benefit_year1: float,
+    anlage_kwp: float,
+    simulation_years: int,
+    params: Mapping[str, Any],
+    cheat_settings: Any = None,
+    errors_list: Optional[List[str]] = None,
+    texts: Optional[Mapping[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Alle preisabhängigen Kennzahlen aus den preisunabhängigen Jahresreihen.
+
+    Args:
+        investment_netto: Nettoinvestition (Jahr 0)
+        annual_cash_flows: Jährliche Cashflows ohne Jahr 0 (Nutzen - Wartung)
+        annual_productions: PV-Produktion je Jahr (kWh)
+        annual_maintenance_costs: Wartungskosten je Jahr (€)
+        annual_financial_benefit_year1: Nutzen im ersten Jahr (€)
+        anlage_kwp: Anlagenleistung
+        simulation_years: Simulationsdauer in Jahren
+        params: Ergebnis von financial_tail_params
+        cheat_settings: Admin-Einstellung 'amortization_cheat_settings'
+        errors_list: Erhält die Meldung, falls die IRR-Berechnung scheitert
+        texts: Texte für die Fehlermeldung ('error_irr_calculation')
+
+    Returns:
+        Dict mit den Schlüsseln aus FINANCIAL_TAIL_KEYS (plus ggf.
+        'amortization_time_years_original')
+    """
+    investment = float(investment_netto)
+    cash_flows = np.asarray(annual_cash_flows, dtype=float)
+    productions = np.asarray(annual_productions, dtype=float)
+    maintenance = np.asarray(annual_maintenance_costs, dtype=float)
+    rate = float(params["discount_rate_percent"]) / 100.0
+    tail: Dict[str, Any] = {
+        "total_investment_netto": investment,
+        "total_investment_brutto": investment * (1 + float(params["vat_rate_percent"]) / 100.0),
+    }
+
+    amortization = investment / annual_financial_benefit_year1 if annual_financial_benefit_year1 > 0 else float("inf")
+    amortization, original = apply_amortization_cheat(amortization, cheat_settings)
+    tail["amortization_time_years"] = amortization
+    if original is not None:
+        tail["amortization_time_years_original"] = original
+    tail["simple_roi_percent"] = (
+        annual_financial_benefit_year1 / investment * 100 if investment > 0 else float("inf")
+    )
+
+    # Kapitalwert: -Investition + Σ cf_t / (1 + r)^t
+    discount = np.power(1.0 + rate, np.arange(1, cash_flows.size + 1, dtype=float))
+    npv_value = -investment + float(np.sum(cash_flows / discount))
+    tail["npv_value"] = npv_value
+    tail["npv_per_kwp"] = npv_value / anlage_kwp if anlage_kwp > 0 else float("nan")
+
+    flows_with_investment = np.concatenate(([-investment], cash_flows))
+    try:
+        irr_val = irr(flows_with_investment.tolist())
+        tail["irr_percent"] = irr_val * 100 if math.isfinite(irr_val) else float("nan")
+    except Exception as e_irr_calc:
+        tail["irr_percent"] = float("nan")
+        if errors_list is not None:
+            errors_list.append(
+                ((texts or {}).get("error_irr_calculation", "Fehler bei IRR-Berechnung: {error_details}") or "").format(
+                    error_details=str(e_irr_calc)
+                )
+            )
+    tail["eigenkapitalrendite_roe_pct"] = tail["irr_percent"]
+
+    # Stromgestehungskosten (LCOE), gleicher Diskontsatz wie NPV
+    n_lcoe = min(productions.size, maintenance.size, int(simulation_years)) if productions.size and maintenance.size else 0
+    lcoe_discount = discount[:n_lcoe] if n_lcoe <= discount.size else np.power(1.0 + rate, np.arange(1, n_lcoe + 1, dtype=float))
+    discounted_production = float(np.sum(productions[:n_lcoe] / lcoe_discount))
+    discounted_costs = investment + float(np.sum(maintenance[:n_lcoe] / lcoe_discount))
+    lcoe = discounted_costs / discounted_production if discounted_production > 0 else float("inf")
+    tail["lcoe_euro_per_kwh"] = lcoe
+    tail["effektiver_pv_strompreis_ct_kwh"] = lcoe * 100 if lcoe != float("inf") else float("inf")
+
+    afa_years = int(params["afa_period_years"])
+    tail["afa_linear_pa_eur"] = investment / afa_years if afa_years > 0 else 0.0
+    tail["restwert_anlage_eur_nach_laufzeit"] = max(0.0, investment - tail["afa_linear_pa_eur"] * simulation_years)
+    tail["alternativanlage_kapitalwert_eur"] = investment * (
+        (1 + float(params["alternative_investment_interest_rate_percent"]) / 100.0) ** simulation_years
+    )
+
+    lifetime_co2_kg = float(np.sum(productions)) * float(params["co2_emission_factor_kg_per_kwh"])
+    tail["co2_avoidance_cost_euro_per_tonne"] = (
+        investment / (lifetime_co2_kg / 1000.0) if lifetime_co2_kg > 0 else float("inf")
+    )
+    tail["cumulative_cash_flows_sim"] = np.cumsum(flows_with_investment).tolist()
+    return tail
+
+
+def annuity_terms(principal: float, annual_interest_rate_percent: float, duration_years: float) -> Dict[str, float]:
+    """Monatsrate und Gesamtzinsen eines Annuitätenkredits (ohne Tilgungsplan, vgl. financial_tools.calculate_annuity)."""
+    months = int(round(float(duration_years) * 12))
+    if principal <= 0 or months <= 0 or annual_interest_rate_percent < 0:
+        return {"loan_amount": max(0.0, principal), "monthly_payment": 0.0, "total_interest": 0.0, "total_cost": max(0.0, principal)}
+    monthly_rate = annual_interest_rate_percent / 100 / 12
+    if monthly_rate == 0:
+        payment = principal / months
+    else:
+        growth = (1 + monthly_rate) ** months
+        payment = principal * monthly_rate * growth / (growth - 1)
+    total_interest = payment * months - principal
+    return {
+        "loan_amount": principal,
+        "monthly_payment": payment,
+        "total_interest": total_interest,
+        "total_cost": principal + total_interest,
+    }
+
+
+def apply_price_modifications(base_price: float, modifications: Optional[Mapping[str, Any]]) -> Dict[str, float]:
+    """
+    Endpreis aus Grundpreis und Preisänderungen (Rabatt, Nachlässe, Zuschlag,
+    Sonderkosten, Sonstiges) wie in der Live-Kosten-Vorschau.
+
+    Returns:
+        Dict im Format von st.session_state['live_pricing_calculations']
+    """
+    mods = modifications or {}
+    discount_amount = base_price * (float(mods.get("discount_percent", 0.0) or 0.0) / 100.0)
+    total_rabatte_nachlaesse = discount_amount + float(mods.get("rebates_eur", 0.0) or 0.0)
+    price_after_discounts = base_price - total_rabatte_nachlaesse
+    surcharge_amount = price_after_discounts * (float(mods.get("surcharge_percent", 0.0) or 0.0) / 100.0)
+    total_aufpreise_zuschlaege = (
+        surcharge_amount
+        + float(mods.get("special_costs_eur", 0.0) or 0.0)
+        + float(mods.get("miscellaneous_eur", 0.0) or 0.0)
+    )
+    return {
+        "base_cost": base_price,
+        "total_rabatte_nachlaesse": total_rabatte_nachlaesse,
+        "total_aufpreise_zuschlaege": total_aufpreise_zuschlaege,
+        "final_price": price_after_discounts + total_aufpreise_zuschlaege,
+        "discount_amount": discount_amount,
+        "surcharge_amount": surcharge_amount,
+        "price_after_discounts": price_after_discounts,
+    }
+
+
+def _float_tuple(values: Any) -> Tuple[float, ...]:
+    if values is None:
+        return ()
+    return tuple(float(v) for v in values)
+
+
+class IncrementalPricingEvaluator:
+    """
+    Hält die Energie-Stufe eines Berechnungsergebnisses und rechnet bei
+    Preis- oder Finanzierungsänderungen nur die abhängigen Stufen neu.
+
+    stage_runs zählt, wie oft jede Stufe tatsächlich berechnet wurde.
+    """
+
+    def __init__(
+        self,
+        base_results: Mapping[str, Any],
+        params: Optional[Mapping[str, Any]] = None,
+        cheat_settings: Any = None,
+    ):
+        self.stage_runs: Counter = Counter()
+        self._energy = self._energy_stage(base_results)
+        self.params = dict(params or base_results.get("financial_tail_params") or financial_tail_params(None))
+        self.cheat_settings = cheat_settings
+        self._kpis: "OrderedDict[float, Dict[str, Any]]" = OrderedDict()
+        self._financing: "OrderedDict[Tuple[float, ...], Dict[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _energy_stage(self, base_results: Mapping[str, Any]) -> Dict[str, Any]:
+        self.stage_runs["energy"] += 1
+        return energy_stage(base_results)
+
+    @property
+    def base_investment_netto(self) -> float:
+        return self._energy["base_investment_netto"]
+
+    def evaluate(self, investment_netto: Optional[float] = None, financing: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Kennzahlen für eine geänderte Nettoinvestition und optionale Finanzierung.
+
+        financing: {"interest_rate": %, "duration_years": n, "down_payment_eur": €}
+        """
+        investment = self.base_investment_netto if investment_netto is None else float(investment_netto)
+        with self._lock:
+            kpis = self._cached(self._kpis, investment, lambda: self._kpi_stage(investment))
+            result = dict(kpis)
+            if financing:
+                terms = (
+                    result["total_investment_brutto"],
+                    float(financing.get("interest_rate", 0.0) or 0.0),
+                    float(financing.get("duration_years", 0) or 0),
+                    float(financing.get("down_payment_eur", 0.0) or 0.0),
+                )
+                result["financing"] = dict(self._cached(self._financing, terms, lambda: self._financing_stage(*terms)))
+        return result
+
+    def evaluate_modifications(
+        self,
+        modifications: Optional[Mapping[str, Any]],
+        base_price: Optional[float] = None,
+        financing: Optional[Mapping[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Preisänderungen auf base_price anwenden (Standard: Nettoinvestition) und
+        die Differenz zum Grundpreis auf die Investition umlegen.
+        """
+        base = self.base_investment_netto if base_price is None else float(base_price)
+        pricing = apply_price_modifications(base, modifications)
+        investment = self.base_investment_netto + (pricing["final_price"] - base)
+        result = self.evaluate(investment, financing)
+        result["pricing"] = pricing
+        return result
+
+    @staticmethod
+    def _cached(cache: "OrderedDict[Any, Any]", key: Any, compute: Any) -> Any:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        value = compute()
+        cache[key] = value
+        if len(cache) > _KPI_CACHE_SIZE:
+            cache.popitem(last=False)
+        return value
+
+    def _kpi_stage(self, investment: float) -> Dict[str, Any]:
+        self.stage_runs["kpis"] += 1
+        e = self._energy
+        return compute_financial_tail(
+            investment,
+            e["annual_cash_flows"],
+            e["annual_productions"],
+            e["annual_maintenance_costs"],
+            e["annual_financial_benefit_year1"],
+            e["anlage_kwp"],
+            e["simulation_years"],
+            self.params,
+            self.cheat_settings,
+        )
+
+    def _financing_stage(self, investment_brutto: float, rate: float, years: float, down_payment: float) -> Dict[str, float]:
+        self.stage_runs["financing"] += 1
+        terms = annuity_terms(max(0.0, investment_brutto - down_payment), rate, years)
+        benefit_monthly = self._energy["annual_financial_benefit_year1"] / 12.0
+        terms["monthly_benefit_year1"] = benefit_monthly
+        terms["monthly_net_year1"] = benefit_monthly - terms["monthly_payment"]
+        return terms
+
+
+def energy_stage(base_results: Mapping[str, Any]) -> Dict[str, Any]:
+    """Preisunabhängige Jahresreihen aus einem Ergebnis von perform_calculations."""
+    years = int(base_results.get("simulation_period_years_effective", 20) or 20)
+    benefit_y1 = float(base_results.get("annual_financial_benefit_year1", 0.0) or 0.0)
+    maintenance = _float_tuple(base_results.get("annual_maintenance_costs_sim"))
+    cash_flows = _float_tuple(base_results.get("annual_cash_flows_sim"))
+    if not cash_flows:
+        # Ergebnisse ohne Jahresreihen (z.B. aus der Electron-Bridge): konstanter Jahres-Cashflow
+        maintenance_y1 = float(base_results.get("annual_maintenance_costs_eur_year1", 0.0) or 0.0)
+        maintenance = maintenance or (maintenance_y1,) * years
+        cash_flows = tuple(benefit_y1 - m for m in maintenance[:years])
+    productions = _float_tuple(base_results.get("annual_productions_sim")) or (
+        float(base_results.get("annual_pv_production_kwh", 0.0) or 0.0),
+    ) * years
+    return {
+        "base_investment_netto": float(base_results.get("total_investment_netto", 0.0) or 0.0),
+        "annual_cash_flows": cash_flows,
+        "annual_productions": productions,
+        "annual_maintenance_costs": maintenance,
+        "annual_financial_benefit_year1": benefit_y1,
+        "anlage_kwp": float(base_results.get("anlage_kwp", 0.0) or 0.0),
+        "simulation_years": years,
+    }
+
+
+def _evaluator_key(energy: Mapping[str, Any], params: Mapping[str, Any], cheat_settings: Any) -> Tuple[Any, ...]:
+    cheat_key = tuple(sorted((k, str(v)) for k, v in cheat_settings.items())) if isinstance(cheat_settings, dict) else None
+    return (tuple(sorted(energy.items())), tuple(sorted(params.items())), cheat_key)
+
+
+def get_evaluator(
+    base_results: Mapping[str, Any],
+    params: Optional[Mapping[str, Any]] = None,
+    cheat_settings: Any = None,
+) -> IncrementalPricingEvaluator:
+    """
+    Liefert einen (wiederverwendeten) Evaluator für base_results.
+
+    Schlüssel sind die preisunabhängigen Eingaben; solange sich an Anlage,
+    Verbrauch oder Admin-Konstanten nichts ändert, bleiben die Zwischenstufen
+    über Aufrufe hinweg (z.B. im Bridge-Worker) erhalten.
+    """
+    energy = energy_stage(base_results)
+    resolved_params = dict(params or base_results.get("financial_tail_params") or financial_tail_params(None))
+    key = _evaluator_key(energy, resolved_params, cheat_settings)
+    with _evaluators_lock:
+        evaluator = _evaluators.get(key)
+        if evaluator is not None:
+            _evaluators.move_to_end(key)
+            return evaluator
+    evaluator = IncrementalPricingEvaluator(base_results, resolved_params, cheat_settings)
+    with _evaluators_lock:
+        _evaluators[key] = evaluator
+        while len(_evaluators) > _EVALUATOR_CACHE_SIZE:
+            _evaluators.popitem(last=False)
+    return evaluator
+
+
+def clear_evaluator_cache() -> None:
+    with _evaluators_lock:
+        _evaluators.clear()
@@ -1,7 +1,10 @@
 # locales.py
 import json
 import os
-from typing import Dict, List, Optional, Tuple
+import string
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
 
 # Importiere die globale Fehlerliste aus app_status.py
 try:
@@ -12,54 +15,178 @@ except ImportError:
     global_import_errors: List[str] = []
 
 
-# Funktion zum Laden der Übersetzungen
-def load_translations(lang_code: str = 'de') -> Optional[Dict[str, str]]:
-    """Lädt Übersetzungsdaten aus einer JSON-Datei für den gegebenen Sprachcode."""
-    # KORREKTUR: `global_import_errors` ist jetzt direkt verfügbar, kein erneuter Import von `gui` nötig.
-    # from gui import import_errors as global_import_errors # Entfernt
-
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(current_dir, f"{lang_code}.json")
-    default_texts = {
-        "app_title": "Ömers Solar Kakerlake",
-        "error_loading_translations": "Fehler beim Laden der Übersetzungen.",
-        "language_file_not_found": "Sprachdatei nicht gefunden: {filepath}",
-        # Füge hier weitere absolut notwendige Fallback-Texte hinzu,
-        # die benötigt werden, BEVOR die Haupt-TEXTS-Variable in gui.py gefüllt ist.
-    }
+# Wie oft (Sekunden) höchstens geprüft wird, ob sich eine Sprachdatei geändert hat
+_MTIME_CHECK_INTERVAL_S = float(os.environ.get("KAKERLAKE_LOCALES_CHECK_INTERVAL_S", "1.0"))
+
+_DEFAULT_TEXTS = {
+    "app_title": "Ömers Solar Kakerlake",
+    "error_loading_translations": "Fehler beim Laden der Übersetzungen.",
+    "language_file_not_found": "Sprachdatei nicht gefunden: {filepath}",
+    # Füge hier weitere absolut notwendige Fallback-Texte hinzu,
+    # die benötigt werden, BEVOR die Haupt-TEXTS-Variable in gui.py gefüllt ist.
+}
+
+
+def _report_error(error_msg: str) -> None:
+    print(f"LOCALES FEHLER: {error_msg}")
+    if global_import_errors is not None: # Sicherstellen, dass die Liste existiert
+        global_import_errors.append(error_msg)
+
 
+def _read_translation_file(file_path: str) -> Dict[str, str]:
+    """Liest eine Sprachdatei; bei Fehlern die Fallback-Texte."""
     try:
         if not os.path.exists(file_path):
-            error_msg = default_texts["language_file_not_found"].format(filepath=file_path)
-            print(f"LOCALES FEHLER: {error_msg}")
-            if global_import_errors is not None: # Sicherstellen, dass die Liste existiert
-                global_import_errors.append(error_msg)
-            return default_texts
+            _report_error(_DEFAULT_TEXTS["language_file_not_found"].format(filepath=file_path))
+            return dict(_DEFAULT_TEXTS)
 
         with open(file_path, 'r', encoding='utf-8') as f:
             texts = json.load(f)
             if not isinstance(texts, dict):
                 raise ValueError("Übersetzungsdatei hat kein Dictionary-Format.")
-            # print(f"LOCALES INFO: Übersetzungen für '{lang_code}' erfolgreich geladen aus {file_path}")
             return texts
     except FileNotFoundError: # Sollte durch obigen Check abgedeckt sein, aber zur Sicherheit
-        error_msg = default_texts["language_file_not_found"].format(filepath=file_path)
-        print(f"LOCALES FEHLER: {error_msg}")
-        if global_import_errors is not None:
-           global_import_errors.append(error_msg)
-        return default_texts
+        _report_error(_DEFAULT_TEXTS["language_file_not_found"].format(filepath=file_path))
     except json.JSONDecodeError as e_json:
-        error_msg = f"JSON-Dekodierungsfehler in {file_path}: {e_json}"
-        print(f"LOCALES FEHLER: {error_msg}")
-        if global_import_errors is not None:
-           global_import_errors.append(error_msg)
-        return default_texts
+        _report_error(f"JSON-Dekodierungsfehler in {file_path}: {e_json}")
     except Exception as e:
-        error_msg = f"Allgemeiner Fehler beim Laden von {file_path}: {e}"
-        print(f"LOCALES FEHLER: {error_msg}")
-        if global_import_errors is not None:
-            global_import_errors.append(error_msg)
-        return default_texts
+        _report_error(f"Allgemeiner Fehler beim Laden von {file_path}: {e}")
+    return dict(_DEFAULT_TEXTS)
+
+
+class TextsView(dict):
+    """
+    Schreibgeschütztes Text-Dict eines Katalogstands. Es wird an UI, Berechnung
+    und PDF-Erzeugung durchgereicht statt kopiert; copy/deepcopy liefern die
+    Ansicht selbst, dict(view) eine veränderbare Kopie.
+    """
+
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("TextsView ist schreibgeschützt; dict(texts) liefert eine veränderbare Kopie.")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self) -> "TextsView":
+        return self
+
+    def __deepcopy__(self, memo) -> "TextsView":
+        return self
+
+    def __reduce__(self):
+        return (TextsView, (dict(self),))
+
+
+_NO_FIELDS = None
+_INVALID_TEMPLATE = frozenset({"\0invalid"})
+
+
+def _compile_template(text: str) -> Optional[FrozenSet[str]]:
+    """Namen der Format-Felder eines Textes; None für Texte ohne Klammern."""
+    if "{" not in text and "}" not in text:
+        return _NO_FIELDS
+    try:
+        fields = set()
+        for _, field_name, _, _ in string.Formatter().parse(text):
+            if field_name is not None:
+                fields.add(field_name.split(".", 1)[0].split("[", 1)[0])
+        return frozenset(fields)
+    except ValueError:
+        return _INVALID_TEMPLATE
+
+
+class TranslationCatalog:
+    """
+    Übersetzungen einer Sprache, einmal pro Prozess geladen. Ändert sich die
+    Datei (mtime/Größe), wird sie beim nächsten Zugriff neu gelesen.
+    Format-Felder werden beim Laden vorab ermittelt.
+    """
+
+    def __init__(self, lang_code: str = 'de', file_path: Optional[str] = None,
+                 check_interval_s: Optional[float] = None):
+        self.lang_code = lang_code
+        self.file_path = file_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{lang_code}.json")
+        self.check_interval_s = _MTIME_CHECK_INTERVAL_S if check_interval_s is None else check_interval_s
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked_at = float("-inf")
+        self._texts: Optional[TextsView] = None
+        self._templates: Dict[str, Optional[FrozenSet[str]]] = {}
+        self.loads = 0
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _ensure_current(self) -> TextsView:
+        now = time.monotonic()
+        texts = self._texts
+        if texts is not None and now - self._checked_at < self.check_interval_s:
+            return texts
+        with self._lock:
+            stamp = self._file_stamp()
+            self._checked_at = now
+            if self._texts is None or stamp != self._stamp:
+                raw = _read_translation_file(self.file_path)
+                self._templates = {
+                    key: _compile_template(value) for key, value in raw.items() if isinstance(value, str)
+                }
+                self._texts = TextsView(raw)
+                self._stamp = stamp
+                self.loads += 1
+            return self._texts
+
+    def view(self) -> TextsView:
+        """Geteilte, schreibgeschützte Ansicht aller Texte."""
+        return self._ensure_current()
+
+    def get(self, key: str, fallback: Optional[str] = None, **kwargs) -> str:
+        texts = self._ensure_current()
+        if key not in texts:
+            text = fallback or key
+            try:
+                return text.format(**kwargs) if kwargs else text
+            except (KeyError, ValueError, IndexError):
+                return text
+        text = texts[key]
+        if not kwargs or not isinstance(text, str):
+            return text
+        fields = self._templates.get(key)
+        if fields is _NO_FIELDS or fields is _INVALID_TEMPLATE or not fields.issubset(kwargs):
+            return text
+        try:
+            return text.format(**kwargs)
+        except (KeyError, ValueError, IndexError):
+            return text
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        texts = self._ensure_current()
+        return {key: texts.get(key, key) for key in keys}
+
+
+_CATALOGS: Dict[Tuple[str, Optional[str]], TranslationCatalog] = {}
+_CATALOGS_LOCK = threading.Lock()
+
+
+def get_catalog(lang_code: str = 'de') -> TranslationCatalog:
+    """Prozessweiter Katalog je Sprache."""
+    catalog = _CATALOGS.get((lang_code, None))
+    if catalog is None:
+        with _CATALOGS_LOCK:
+            catalog = _CATALOGS.setdefault((lang_code, None), TranslationCatalog(lang_code))
+    return catalog
+
+
+# Funktion zum Laden der Übersetzungen
+def load_translations(lang_code: str = 'de') -> Optional[Dict[str, str]]:
+    """Übersetzungen für den Sprachcode als geteilte, schreibgeschützte Ansicht (TextsView)."""
+    return get_catalog(lang_code).view()
+
 
 def get_text(key: str, locale: str = 'de', fallback: str = None, **kwargs) -> str:
     """
@@ -74,17 +201,12 @@ def get_text(key: str, locale: str = 'de', fallback: str = None, **kwargs) -> st
     Returns:
         str: Übersetzter oder Fallback-Text
     """
-    # Lade Übersetzungen
-    translations = load_translations(locale)
-    
-    # Hol den Text oder verwende Fallback
-    text = translations.get(key, fallback or key)
-    
-    # Formatiere mit kwargs wenn vorhanden
-    try:
-        return text.format(**kwargs) if kwargs else text
-    except (KeyError, ValueError):
-        return text
+    return get_catalog(locale).get(key, fallback, **kwargs)
+
+
+def get_texts(keys: Iterable[str], locale: str = 'de') -> Dict[str, str]:
+    """Mehrere Texte auf einmal; fehlende Schlüssel liefern den Schlüssel selbst."""
+    return get_catalog(locale).get_many(keys)
 
 if __name__ == '__main__':
     # Testen der Ladefunktion
@@ -0,0 +1,446 @@
+# lookup_tables.py - Vorberechnete Profil- und Ertragstabellen (versioniert, mmap)
+"""
+Gemeinsame Nachschlagetabellen für alle Rechenmodule, statt Profile und
+spezifische Erträge in jedem Modul neu herzuleiten oder als String-Schlüssel
+nachzuschlagen.
+
+Die Tabellen liegen als .npy unter data/lookup_tables/ und werden einmal pro
+Prozess per Memory-Mapping geladen (get_tables). Fehlen sie oder passt die
+Version in manifest.json nicht zu TABLE_VERSION, werden sie aus den Quelldaten
+dieses Moduls neu erzeugt (bei schreibgeschütztem Verzeichnis nur im Speicher).
+Jeder Neuaufbau schreibt eine neue Generation (<name>-<generation>.npy) und
+schaltet erst danach das Manifest um (siehe atomic_files).
+
+Inhalt:
+- load_profile_h0.npy     (7, 8760)  H0-Standardlastprofil je Wochentag des 01.01., Summe 1
+- pv_shape.npy            (L, 8760)  relative PV-Erzeugung (Sonnenhöhe) je Breitengrad
+- sun_elevation.npy       (L, 12, 24) mittlere Sonnenhöhe in Grad je Monat und Stunde
+- specific_yield_grid.npy (O, T)     kWh/kWp je Ausrichtung und Neigung (Admin-Standard)
+- yield_latitude_factor.npy (L,)     Ertragskorrektur relativ zu REFERENCE_LATITUDE
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from atomic_files import new_generation, publish_generation, write_array_atomic
+
+TABLE_VERSION = 2
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "lookup_tables")
+MANIFEST_NAME = "manifest.json"
+
+HOURS_PER_YEAR = 8760
+DAYS_PER_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+LATITUDES = tuple(float(lat) for lat in range(47, 56))
+REFERENCE_LATITUDE = 51.0
+# Ertragsabnahme je Grad nördlicher Breite (Süddeutschland ~1150, Küste ~950 kWh/kWp)
+YIELD_CHANGE_PER_DEGREE_NORTH = 0.022
+
+# Abweichung von Süd in Grad (Ost negativ) für die Kompass-Ausrichtungen der Ertragstabelle
+ORIENTATION_AZIMUTHS = {
+    "Süd": 0.0,
+    "Südwest": 45.0,
+    "West": 90.0,
+    "Nordwest": 135.0,
+    "Nord": 180.0,
+    "Nordost": -135.0,
+    "Ost": -90.0,
+    "Südost": -45.0,
+}
+
+# Spezifische Jahreserträge nach Ausrichtung und Neigung (Standard aus admin_panel.py)
+DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT = {
+    "Süd_0": 1050.0, "Süd_15": 1080.0, "Süd_30": 1100.0, "Süd_45": 1080.0, "Süd_60": 1050.0,
+    "Südost_0": 980.0, "Südost_15": 1030.0, "Südost_30": 1070.0, "Südost_45": 1030.0, "Südost_60": 980.0,
+    "Südwest_0": 980.0, "Südwest_15": 1030.0, "Südwest_30": 1070.0, "Südwest_45": 1030.0, "Südwest_60": 980.0,
+    "Ost_0": 950.0, "Ost_15": 980.0, "Ost_30": 1000.0, "Ost_45": 980.0, "Ost_60": 950.0,
+    "West_0": 950.0, "West_15": 980.0, "West_30": 1000.0, "West_45": 980.0, "West_60": 950.0,
+    "Nord_0": 800.0, "Nord_15": 820.0, "Nord_30": 850.0, "Nord_45": 820.0, "Nord_60": 850.0,
+    "Nordost_0": 850.0, "Nordost_15": 870.0, "Nordost_30": 890.0, "Nordost_45": 870.0, "Nordost_60": 850.0,
+    "Nordwest_0": 850.0, "Nordwest_15": 870.0, "Nordwest_30": 890.0, "Nordwest_45": 870.0, "Nordwest_60": 850.0,
+    "Flachdach_0": 950.0, "Flachdach_15": 1000.0,
+    "Sonstige_0": 1000.0, "Sonstige_15": 1050.0, "Sonstige_30": 1080.0, "Sonstige_45": 1050.0, "Sonstige_60": 1000.0,
+}
+
+# Stundenmittel des H0-Profils (W je 1000 kWh/a), Tagestypen Werktag/Samstag/Sonntag
+_H0_WINTER = (
+    (67, 56, 51, 49, 49, 54, 77, 108, 120, 120, 118, 122, 129, 122, 112, 106, 110, 134, 158, 160, 148, 131, 112, 87),
+    (72, 61, 54, 51, 50, 52, 62, 84, 113, 134, 143, 148, 152, 142, 127, 117, 118, 137, 156, 156, 145, 131, 116, 95),
+    (77, 64, 56, 52, 50, 51, 55, 66, 90, 118, 140, 158, 166, 147, 124, 111, 110, 127, 148, 151, 141, 126, 108, 86),
+)
+_H0_SUMMER = (
+    (72, 60, 53, 50, 50, 53, 67, 89, 101, 106, 108, 114, 122, 114, 104, 97, 97, 105, 117, 124, 130, 130, 113, 91),
+    (76, 64, 56, 52, 50, 51, 58, 74, 98, 115, 124, 131, 137, 128, 114, 104, 102, 110, 120, 126, 130, 129, 115, 96),
+    (81, 68, 59, 54, 51, 51, 53, 62, 82, 104, 122, 138, 148, 131, 110, 99, 96, 104, 116, 123, 127, 125, 110, 90),
+)
+
+
+# --- Erzeugung der Tabellen ---
+
+def _h0_day_shapes() -> np.ndarray:
+    """(3 Perioden Winter/Sommer/Übergang, 3 Tagestypen, 24 h)."""
+    winter = np.asarray(_H0_WINTER, dtype=float)
+    summer = np.asarray(_H0_SUMMER, dtype=float)
+    return np.stack([winter, summer, (winter + summer) / 2.0])
+
+
+def _h0_period_of_day() -> np.ndarray:
+    """BDEW-Perioden: Winter 01.11.–20.03., Sommer 15.05.–14.09., sonst Übergang."""
+    day = np.arange(365)
+    period = np.full(365, 2)
+    period[(day < 79) | (day >= 304)] = 0
+    period[(day >= 134) & (day < 257)] = 1
+    return period
+
+
+def build_load_profiles() -> np.ndarray:
+    """H0-Jahresprofile (7, 8760) für jeden Wochentag des 01.01., je Zeile auf Summe 1 normiert."""
+    shapes = _h0_day_shapes()
+    period = _h0_period_of_day()
+    t = np.arange(1, 366, dtype=float)
+    # Dynamisierungsfunktion des BDEW-Standardlastprofils
+    dynamization = -3.92e-10 * t**4 + 3.2e-7 * t**3 - 7.02e-5 * t**2 + 2.1e-3 * t + 1.24
+    profiles = np.empty((7, HOURS_PER_YEAR))
+    for first_weekday in range(7):
+        weekday = (first_weekday + np.arange(365)) % 7
+        day_type = np.where(weekday < 5, 0, weekday - 4)
+        yearly = shapes[period, day_type] * dynamization[:, np.newaxis]
+        profiles[first_weekday] = yearly.reshape(HOURS_PER_YEAR) / yearly.sum()
+    return profiles
+
+
+def _sin_elevation(latitude: float) -> np.ndarray:
+    """Sinus der Sonnenhöhe (365, 24) zur Stundenmitte, wahre Ortszeit."""
+    phi = math.radians(latitude)
+    day = np.arange(365)
+    declination = np.radians(23.44) * np.sin(2 * np.pi * (284 + day + 1) / 365.0)
+    hour_angle = np.radians(15.0 * (np.arange(24) + 0.5 - 12.0))
+    return (
+        math.sin(phi) * np.sin(declination)[:, np.newaxis]
+        + math.cos(phi) * np.cos(declination)[:, np.newaxis] * np.cos(hour_angle)[np.newaxis, :]
+    )
+
+
+def build_pv_shapes(latitudes: Sequence[float] = LATITUDES) -> np.ndarray:
+    """Relative stündliche PV-Erzeugung (L, 8760) = max(sin(Sonnenhöhe), 0)."""
+    return np.stack([np.clip(_sin_elevation(lat), 0.0, None).reshape(HOURS_PER_YEAR) for lat in latitudes])
+
+
+def build_sun_elevation(latitudes: Sequence[float] = LATITUDES) -> np.ndarray:
+    """Mittlere Sonnenhöhe in Grad (L, 12, 24) je Monat und Stunde."""
+    month_of_day = np.repeat(np.arange(12), DAYS_PER_MONTH)
+    counts = np.asarray(DAYS_PER_MONTH, dtype=float)[:, np.newaxis]
+    table = np.empty((len(latitudes), 12, 24))
+    for i, lat in enumerate(latitudes):
+        elevation = np.degrees(np.arcsin(np.clip(_sin_elevation(lat), -1.0, 1.0)))
+        sums = np.zeros((12, 24))
+        np.add.at(sums, month_of_day, elevation)
+        table[i] = sums / counts
+    return table
+
+
+def build_yield_latitude_factor(latitudes: Sequence[float] = LATITUDES) -> np.ndarray:
+    return np.asarray([1.0 - YIELD_CHANGE_PER_DEGREE_NORTH * (lat - REFERENCE_LATITUDE) for lat in latitudes])
+
+
+class YieldGrid:
+    """Spezifische Erträge als Matrix (Ausrichtung x Neigung) mit Interpolation über die Neigung."""
+
+    def __init__(self, orientations: Sequence[str], tilts: Sequence[float], values: np.ndarray):
+        self.orientations = tuple(orientations)
+        self.tilts = np.asarray(tilts, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        self._rows = {name: i for i, name in enumerate(self.orientations)}
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping[str, Any]) -> "YieldGrid":
+        """Aus dem Admin-Format {"Süd_30": 1100.0, ...}; fehlende Kombinationen bleiben NaN."""
+        entries: Dict[Tuple[str, float], float] = {}
+        for key, value in mapping.items():
+            name, _, tilt = str(key).rpartition("_")
+            try:
+                entries[(name, float(tilt))] = float(value)
+            except (TypeError, ValueError):
+                continue
+        orientations = list(dict.fromkeys(name for name, _ in entries))
+        tilts = sorted({tilt for _, tilt in entries})
+        values = np.full((len(orientations), len(tilts)), np.nan)
+        for (name, tilt), value in entries.items():
+            values[orientations.index(name), tilts.index(tilt)] = value
+        return cls(orientations, tilts, values)
+
+    def value(self, orientation: Union[str, float], tilt_deg: float) -> Optional[float]:
+        """
+        Ertrag für eine Ausrichtung (Name oder Abweichung von Süd in Grad) und Neigung.
+
+        Zwischen den Tabellenneigungen wird linear interpoliert, außerhalb auf den
+        Rand begrenzt. Numerische Ausrichtungen werden zwischen den benachbarten
+        Kompassrichtungen interpoliert. None, wenn die Ausrichtung unbekannt ist.
+        """
+        if isinstance(orientation, str) and orientation in self._rows:
+            return self._row_value(self._rows[orientation], tilt_deg)
+        azimuth = ORIENTATION_AZIMUTHS.get(orientation) if isinstance(orientation, str) else orientation
+        if azimuth is None:
+            return None
+        return self._azimuth_value(float(azimuth), tilt_deg)
+
+    def _row_value(self, row: int, tilt_deg: float) -> Optional[float]:
+        values = self.values[row]
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return None
+        return float(np.interp(float(tilt_deg), self.tilts[valid], values[valid]))
+
+    def _azimuth_value(self, azimuth: float, tilt_deg: float) -> Optional[float]:
+        compass = sorted(
+            (ORIENTATION_AZIMUTHS[name], self._row_value(self._rows[name], tilt_deg))
+            for name in ORIENTATION_AZIMUTHS
+            if name in self._rows
+        )
+        compass = [(az, val) for az, val in compass if val is not None]
+        if not compass:
+            return None
+        azimuths = np.asarray([az for az, _ in compass])
+        values = np.asarray([val for _, val in compass])
+        wrapped = (azimuth + 180.0) % 360.0 - 180.0
+        return float(np.interp(wrapped, azimuths, values, period=360.0))
+
+
+@lru_cache(maxsize=16)
+def _compiled_yield_grid(items: Tuple[Tuple[str, Any], ...]) -> YieldGrid:
+    return YieldGrid.from_mapping(dict(items))
+
+
+def compile_yield_grid(mapping: Mapping[str, Any]) -> YieldGrid:
+    """YieldGrid für eine (Admin-)Zuordnung; gleiche Inhalte werden nur einmal übersetzt."""
+    return _compiled_yield_grid(tuple(sorted((str(k), v) for k, v in mapping.items())))
+
+
+def build_tables(directory: str = TABLE_DIR) -> Dict[str, Any]:
+    """
+    Erzeugt alle Tabellen neu als neue Generation und schaltet zuletzt
+    manifest.json (atomar) um. Danach werden ältere Generationen entfernt, die
+    vorige bleibt für Prozesse erhalten, die ihr Manifest gerade gelesen haben.
+    """
+    default_grid = YieldGrid.from_mapping(DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT)
+    arrays = _build_arrays(default_grid)
+    generation = new_generation()
+    files = {name: f"{name}-{generation}.npy" for name in arrays}
+    for name, array in arrays.items():
+        write_array_atomic(os.path.join(directory, files[name]), array)
+    manifest = _manifest(default_grid, arrays)
+    manifest["files"] = files
+    publish_generation(directory, MANIFEST_NAME, manifest, indent=2)
+    return manifest
+
+
+def _build_arrays(default_grid: YieldGrid) -> Dict[str, np.ndarray]:
+    return {
+        "load_profile_h0": build_load_profiles().astype(np.float32),
+        "pv_shape": build_pv_shapes().astype(np.float32),
+        "sun_elevation": build_sun_elevation().astype(np.float32),
+        "specific_yield_grid": default_grid.values.astype(np.float32),
+        "yield_latitude_factor": build_yield_latitude_factor().astype(np.float32),
+    }
+
+
+def _manifest(default_grid: YieldGrid, arrays: Mapping[str, np.ndarray]) -> Dict[str, Any]:
+    return {
+        "version": TABLE_VERSION,
+        "latitudes": list(LATITUDES),
+        "reference_latitude": REFERENCE_LATITUDE,
+        "yield_orientations": list(default_grid.orientations),
+        "yield_tilts": default_grid.tilts.tolist(),
+        "arrays": {name: list(array.shape) for name, array in arrays.items()},
+    }
+
+
+# --- Zugriff ---
+
+class LookupTables:
+    """Geladene Tabellen eines Verzeichnisses (Arrays schreibgeschützt, ggf. memory-mapped)."""
+
+    def __init__(self, manifest: Mapping[str, Any], arrays: Mapping[str, np.ndarray], source: Optional[str]):
+        self.version = int(manifest["version"])
+        self.source = source
+        self.latitudes = np.asarray(manifest["latitudes"], dtype=float)
+        self.reference_latitude = float(manifest.get("reference_latitude", REFERENCE_LATITUDE))
+        self.load_profiles = arrays["load_profile_h0"]
+        self.pv_shapes = arrays["pv_shape"]
+        self.sun_elevation = arrays["sun_elevation"]
+        self.yield_latitude_factors = arrays["yield_latitude_factor"]
+        self.default_yield_grid = YieldGrid(
+            manifest["yield_orientations"], manifest["yield_tilts"], arrays["specific_yield_grid"]
+        )
+
+    def _latitude_weights(self, latitude: Optional[float]) -> Tuple[int, int, float]:
+        """Nachbarzeilen und Gewicht für lineare Interpolation über den Breitengrad."""
+        lat = self.reference_latitude if latitude is None else float(latitude)
+        position = float(np.interp(lat, self.latitudes, np.arange(self.latitudes.size)))
+        lower = int(math.floor(position))
+        upper = min(lower + 1, self.latitudes.size - 1)
+        return lower, upper, position - lower
+
+    def _by_latitude(self, table: np.ndarray, latitude: Optional[float]) -> np.ndarray:
+        lower, upper, weight = self._latitude_weights(latitude)
+        if weight == 0.0:
+            return np.asarray(table[lower], dtype=float)
+        return (1.0 - weight) * np.asarray(table[lower], dtype=float) + weight * np.asarray(table[upper], dtype=float)
+
+    def load_profile(self, annual_consumption_kwh: float, first_weekday: int = 0) -> np.ndarray:
+        """H0-Stundenprofil (8760,) in kWh, skaliert auf den Jahresverbrauch."""
+        return np.asarray(self.load_profiles[int(first_weekday) % 7], dtype=float) * max(
+            float(annual_consumption_kwh), 0.0
+        )
+
+    def average_day_load_shape(self, first_weekday: int = 0) -> np.ndarray:
+        """Mittlerer Tagesverlauf des H0-Profils (24,), Maximum = 1."""
+        day = np.asarray(self.load_profiles[int(first_weekday) % 7], dtype=float).reshape(365, 24).mean(axis=0)
+        return day / day.max()
+
+    def pv_shape(self, latitude: Optional[float] = None) -> np.ndarray:
+        """Relative stündliche PV-Erzeugung (8760,) für einen Breitengrad (interpoliert)."""
+        return self._by_latitude(self.pv_shapes, latitude)
+
+    def average_day_pv_shape(self, latitude: Optional[float] = None) -> np.ndarray:
+        """Mittlerer Tagesverlauf der PV-Erzeugung (24,), Maximum = 1."""
+        day = self.pv_shape(latitude).reshape(365, 24).mean(axis=0)
+        return day / day.max() if day.max() > 0 else day
+
+    def monthly_sun_elevation(self, latitude: Optional[float] = None) -> np.ndarray:
+        """Mittlere Sonnenhöhe in Grad (12, 24)."""
+        return self._by_latitude(self.sun_elevation, latitude)
+
+    def yield_latitude_factor(self, latitude: Optional[float] = None) -> float:
+        return float(self._by_latitude(self.yield_latitude_factors[:, np.newaxis], latitude)[0])
+
+    def specific_yield(
+        self,
+        orientation: Union[str, float],
+        tilt_deg: float,
+        latitude: Optional[float] = None,
+        mapping: Optional[Mapping[str, Any]] = None,
+    ) -> Optional[float]:
+        """
+        Spezifischer Jahresertrag (kWh/kWp), interpoliert über Neigung und Ausrichtung.
+
+        mapping: Admin-Zuordnung {"Süd_30": ...}; ohne Angabe gilt die Standardtabelle.
+        latitude: Mit Angabe wird relativ zu reference_latitude korrigiert.
+        """
+        grid = self.default_yield_grid if mapping is None else compile_yield_grid(mapping)
+        value = grid.value(orientation, tilt_deg)
+        if value is None:
+            return None
+        if latitude is not None:
+            value *= self.yield_latitude_factor(latitude)
+        return value
+
+    def shading_matrix(
+        self,
+        hours: Iterable[int],
+        latitude: Optional[float] = None,
+        base_percent: float = 5.0,
+        max_percent: float = 30.0,
+        low_sun_threshold_deg: float = 20.0,
+    ) -> np.ndarray:
+        """
+        Typische Verschattung in % (12, len(hours)) aus der mittleren Sonnenhöhe:
+        Grundverschattung plus linear zunehmender Anteil unterhalb der Schwelle,
+        begrenzt auf max_percent.
+        """
+        elevation = self.monthly_sun_elevation(latitude)[:, list(hours)]
+        low_sun = np.clip((low_sun_threshold_deg - elevation) / low_sun_threshold_deg, 0.0, 1.0)
+        return np.minimum(base_percent + (max_percent - base_percent) * low_sun, max_percent)
+
+
+def load_tables(directory: str = TABLE_DIR, mmap: bool = True) -> LookupTables:
+    """
+    Lädt die Tabellen aus directory; erzeugt sie neu, wenn sie fehlen oder veraltet sind.
+    Entfernt ein anderer Prozess die gelesene Generation vor dem Laden, wird das
+    Manifest einmal neu gelesen, danach im Speicher aufgebaut.
+    """
+    mmap_mode = "r" if mmap else None
+    for _attempt in range(2):
+        manifest = _read_manifest(directory)
+        if manifest is None or manifest.get("version") != TABLE_VERSION:
+            try:
+                manifest = build_tables(directory)
+            except OSError as e:
+                print(f"Lookup-Tabellen konnten nicht nach {directory} geschrieben werden, nutze Speicher: {e}")
+                return _tables_in_memory()
+        try:
+            arrays = {
+                name: np.load(os.path.join(directory, filename), mmap_mode=mmap_mode)
+                for name, filename in manifest["files"].items()
+            }
+        except (OSError, ValueError) as e:
+            load_error = e
+            continue
+        return LookupTables(manifest, arrays, directory)
+    print(f"Lookup-Tabellen in {directory} nicht lesbar, nutze Speicher: {load_error}")
+    return _tables_in_memory()
+
+
+def _tables_in_memory() -> LookupTables:
+    default_grid = YieldGrid.from_mapping(DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT)
+    arrays = _build_arrays(default_grid)
+    return LookupTables(_manifest(default_grid, arrays), arrays, None)
+
+
+def _read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    files = manifest.get("files")
+    if not isinstance(files, dict) or set(files) != set(manifest.get("arrays") or {}):
+        return None
+    # Nur Dateinamen, keine Pfade aus dem Manifest übernehmen
+    manifest["files"] = {name: os.path.basename(str(filename)) for name, filename in files.items()}
+    if not all(os.path.exists(os.path.join(directory, filename)) for filename in manifest["files"].values()):
+        return None
+    return manifest
+
+
+_tables: Optional[LookupTables] = None
+_tables_lock = threading.Lock()
+
+
+def get_tables() -> LookupTables:
+    """Prozessweit geteilte Tabellen (einmaliges Laden)."""
+    global _tables
+    if _tables is None:
+        with _tables_lock:
+            if _tables is None:
+                _tables = load_tables()
+    return _tables
+
+
+def reset_tables() -> None:
+    """Verwirft die geladenen Tabellen (z.B. nach build_tables in Tests)."""
+    global _tables
+    with _tables_lock:
+        _tables = None
+
+
+__all__ = [
+    "TABLE_VERSION",
+    "TABLE_DIR",
+    "DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT",
+    "ORIENTATION_AZIMUTHS",
+    "YieldGrid",
+    "LookupTables",
+    "compile_yield_grid",
+    "build_tables",
+    "load_tables",
+    "get_tables",
+    "reset_tables",
+]
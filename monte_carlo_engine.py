@@ -0,0 +1,145 @@
+# monte_carlo_engine.py - Vektorisierte Monte-Carlo-Risikoanalyse
+"""
+Zieht alle Stichproben einer Monte-Carlo-Simulation als Matrix über einen lokalen
+np.random.Generator, statt pro Simulation eine Python-Schleife über die Jahre zu
+laufen. Der globale NumPy-Zufallszustand bleibt unberührt.
+
+Die Diskontierung nutzt einen einmal vorberechneten Vektor der Jahresexponenten
+(1..Laufzeit); sehr große Stichprobenzahlen werden in Blöcken verarbeitet, damit
+die Diskontierungsmatrix (Block x Laufzeit) den Speicher nicht sprengt.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+# Reihenfolge der variierten Parameter (auch für die Korrelationsmatrix)
+PARAMETER_NAMES = ("investment", "annual_benefit", "discount_rate")
+
+DEFAULT_SEED = 42
+DEFAULT_CHUNK_SIZE = 50_000
+DEFAULT_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+def _cholesky_factor(correlation: Optional[Sequence[Sequence[float]]]) -> Optional[np.ndarray]:
+    """Cholesky-Faktor der Korrelationsmatrix; None bei unkorrelierten Parametern."""
+    if correlation is None:
+        return None
+    matrix = np.asarray(correlation, dtype=float)
+    size = len(PARAMETER_NAMES)
+    if matrix.shape != (size, size):
+        raise ValueError(f"Korrelationsmatrix muss die Form ({size}, {size}) haben, nicht {matrix.shape}")
+    if not np.allclose(matrix, matrix.T) or not np.allclose(np.diag(matrix), 1.0):
+        raise ValueError("Korrelationsmatrix muss symmetrisch sein und 1 auf der Diagonale haben")
+    try:
+        return np.linalg.cholesky(matrix)
+    except np.linalg.LinAlgError as exc:
+        raise ValueError("Korrelationsmatrix ist nicht positiv definit") from exc
+
+
+def simulate_npv_distribution(
+    base_investment: float,
+    base_annual_benefit: float,
+    lifetime_years: int,
+    n_simulations: int,
+    investment_sd_ratio: float = 0.10,
+    benefit_sd_ratio: float = 0.15,
+    discount_rate_mean: float = 0.04,
+    discount_rate_sd: float = 0.01,
+    correlation: Optional[Sequence[Sequence[float]]] = None,
+    clip_at_zero: bool = False,
+    seed: Optional[int] = DEFAULT_SEED,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> np.ndarray:
+    """
+    NPV-Verteilung bei normalverteilter Investition, Jahresnutzen und Diskontierungsrate.
+
+    NPV = -Investition + Σ_{t=1..Laufzeit} Nutzen / (1 + r) ** t
+
+    Args:
+        base_investment: Erwartungswert der Investition (€)
+        base_annual_benefit: Erwartungswert des jährlichen Nutzens (€)
+        lifetime_years: Laufzeit in Jahren
+        n_simulations: Anzahl Ziehungen
+        investment_sd_ratio: Standardabweichung der Investition relativ zum Erwartungswert
+        benefit_sd_ratio: Standardabweichung des Nutzens relativ zum Erwartungswert
+        discount_rate_mean: Erwartungswert der Diskontierungsrate
+        discount_rate_sd: Standardabweichung der Diskontierungsrate
+        correlation: Optionale 3x3-Korrelationsmatrix in der Reihenfolge PARAMETER_NAMES
+        clip_at_zero: Negative Ziehungen auf 0 begrenzen
+        seed: Startwert des lokalen Generators (None = nicht reproduzierbar)
+        chunk_size: Maximale Zeilenzahl pro Block
+
+    Returns:
+        1D-Array mit n_simulations NPV-Werten. Das Ergebnis hängt nicht von chunk_size ab.
+    """
+    n_simulations = max(int(n_simulations), 0)
+    chunk_size = max(int(chunk_size), 1)
+    rng = np.random.default_rng(seed)
+    cholesky = _cholesky_factor(correlation)
+
+    means = np.array([base_investment, base_annual_benefit, discount_rate_mean], dtype=float)
+    sds = np.array(
+        [abs(base_investment) * investment_sd_ratio, abs(base_annual_benefit) * benefit_sd_ratio, discount_rate_sd],
+        dtype=float,
+    )
+    # Jahresexponenten einmalig vorberechnen; pro Block nur noch eine Potenz-Operation
+    negative_exponents = -np.arange(1, max(int(lifetime_years), 0) + 1, dtype=float)
+
+    npv = np.empty(n_simulations, dtype=float)
+    for start in range(0, n_simulations, chunk_size):
+        stop = min(start + chunk_size, n_simulations)
+        standard = rng.standard_normal((stop - start, len(PARAMETER_NAMES)))
+        if cholesky is not None:
+            standard = standard @ cholesky.T
+        samples = means + standard * sds
+        if clip_at_zero:
+            np.maximum(samples, 0.0, out=samples)
+
+        investment, annual_benefit, discount_rate = samples.T
+        annuity_factors = np.power(1.0 + discount_rate[:, np.newaxis], negative_exponents).sum(axis=1)
+        npv[start:stop] = annual_benefit * annuity_factors - investment
+    return npv
+
+
+def summarize_distribution(
+    values: np.ndarray,
+    confidence_level: float = 95,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    histogram_bins: int = 50,
+) -> Dict[str, Any]:
+    """
+    Kennzahlen einer Ergebnisverteilung: Mittelwert, Streuung, Konfidenzintervall,
+    Perzentile, Value at Risk (5 %), Erfolgswahrscheinlichkeit (> 0) und Histogramm.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return {
+            "mean": 0.0,
+            "std": 0.0,
+            "lower_bound": 0.0,
+            "upper_bound": 0.0,
+            "var_5": 0.0,
+            "success_probability": 0.0,
+            "percentiles": {},
+            "histogram": {"counts": [], "bin_edges": []},
+        }
+
+    alpha = (100 - confidence_level) / 2
+    # Alle benötigten Quantile in einem Sortierdurchgang
+    quantile_points = [alpha, 100 - alpha, 5, *percentiles]
+    quantiles = np.percentile(values, quantile_points)
+    counts, bin_edges = np.histogram(values, bins=max(int(histogram_bins), 1))
+
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "lower_bound": float(quantiles[0]),
+        "upper_bound": float(quantiles[1]),
+        "var_5": float(quantiles[2]),
+        "success_probability": float((values > 0).mean() * 100),
+        "percentiles": {f"p{p:g}": float(q) for p, q in zip(percentiles, quantiles[3:])},
+        "histogram": {"counts": counts.tolist(), "bin_edges": bin_edges.tolist()},
+    }
@@ -15,6 +15,8 @@ import re
 from typing import Dict, List, Any
 import traceback
 
+from multi_offer_pipeline import generate_offer_zip
+
 try:
     from tqdm import tqdm
 except ImportError:
@@ -44,6 +46,18 @@ except ImportError as e:
     PDF_OUTPUT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pdf_output")
 
 
+def render_company_offer(pdf_kwargs: Dict[str, Any]) -> bytes:
+    """Erzeugt das PDF einer Firma; läuft im Prozess-Pool von multi_offer_pipeline."""
+    return generate_offer_pdf(
+        **pdf_kwargs,
+        list_products_func=list_products,
+        get_product_by_id_func=get_product_by_id,
+        load_admin_setting_func=load_admin_setting,
+        save_admin_setting_func=save_admin_setting,
+        db_list_company_documents_func=list_company_documents,
+    )
+
+
 def get_text_mog(key: str, fallback: str) -> str:
     """Hilfsfunktion für Texte"""
     return st.session_state.get("TEXTS", {}).get(key, fallback)
@@ -590,8 +604,10 @@ class MultiCompanyOfferGenerator:
                 progress_bar = st.progress(0)
                 status_text = st.empty()
                 
-                generated_pdfs = []
                 total_companies = len(selected_companies)
+                # Gemeinsame Daten (Berechnung, Vorlagen, Optionen) nur einmal laden
+                shared_context = self._shared_pdf_context()
+                jobs = []
                 
                 for i, company_id in enumerate(selected_companies):
                     company_name = f"Firma_{company_id}"  # Fallback-Name sofort setzen
@@ -600,42 +616,40 @@ class MultiCompanyOfferGenerator:
                         company = get_company(company_id) if callable(get_company) else {}
                         company_name = company.get("name", f"Firma_{company_id}")  # Überschreibe mit echtem Namen
                         
-                        status_text.text(f"Erstelle Angebot für {company_name} (Firma {i+1}/{total_companies})...")
+                        status_text.text(f"Bereite Angebot für {company_name} vor (Firma {i+1}/{total_companies})...")
                         
                         # NEUE FEATURE: Produktrotation für diese Firma
                         company_settings = self.get_rotated_products_for_company(i, settings)
-                          # PDF-Generierung vorbereiten mit firmenspezifischen Produkten
+                        # PDF-Generierung vorbereiten mit firmenspezifischen Produkten
                         offer_data = self._prepare_offer_data(customer_data, company, company_settings, project_data, i)
                         
-                        # PDF generieren mit company_index für Preisstaffelung
-                        pdf_content = self._generate_company_pdf(offer_data, company, i)
-                        
-                        if pdf_content:
-                            generated_pdfs.append({
-                                "company_name": company_name,
-                                "pdf_content": pdf_content,
-                                "filename": f"Angebot_{company_name}_{customer_data.get('last_name', 'Kunde')}.pdf"
-                            })
-                            st.success(f" PDF für {company_name} erstellt")
-                        else:
-                            st.error(f" PDF für {company_name} konnte nicht erstellt werden")                        # Fortschritt aktualisieren
-                        progress_bar.progress((i + 1) / total_companies)
-                        
+                        jobs.append({
+                            "name": company_name,
+                            "filename": f"Angebot_{company_name}_{customer_data.get('last_name', 'Kunde')}.pdf",
+                            "payload": self._build_company_pdf_kwargs(offer_data, company, i, shared_context),
+                        })
                     except Exception as e:
-                        # Sichere Verwendung von company_name - falls nicht definiert, Fallback verwenden
-                        safe_company_name = locals().get('company_name', f"Firma_{company_id}")
-                        st.error(f"Fehler bei {safe_company_name}: {str(e)}")
-                        logging.error(f"Fehler bei PDF-Generierung für {safe_company_name}: {e}")
-                        logging.error(f"Exception Typ: {type(e).__name__}")
-                        logging.error(f"Verfügbare lokale Variablen: {list(locals().keys())}")
-                        # Ausführlichere Fehlerbehandlung für company_name Probleme
-                        if "company_name" in str(e):
-                            logging.error(f"COMPANY_NAME DEBUG: company_id={company_id}, locals company_name: {locals().get('company_name', 'NOT_FOUND')}")
+                        st.error(f"Fehler bei {company_name}: {str(e)}")
+                        logging.error(f"Fehler bei Angebotsvorbereitung für {company_name}: {e}")
                         continue  # Weiter mit der nächsten Firma
                 
+                def on_progress(event):
+                    if event["status"] == "ok":
+                        st.success(f" PDF für {event['name']} erstellt")
+                    else:
+                        st.error(f" PDF für {event['name']} konnte nicht erstellt werden: {event['error']}")
+                    progress_bar.progress(event["completed"] / max(event["total"], 1))
+                    status_text.text(f"{event['completed']}/{event['total']} Angebote fertig...")
+                
+                # PDFs parallel erzeugen und direkt ins ZIP schreiben
+                status_text.text(f"Erstelle {len(jobs)} Angebote parallel...")
+                zip_buffer = io.BytesIO()
+                batch = generate_offer_zip(jobs, render_company_offer, zip_buffer, on_progress=on_progress, keep_bytes=True)
+                generated_pdfs = batch["succeeded"]
+                
                 # ZIP-Download erstellen
                 if generated_pdfs:
-                    zip_content = self._create_zip_download(generated_pdfs)
+                    zip_content = zip_buffer.getvalue()
                     
                     st.success(f" {len(generated_pdfs)} Angebote erfolgreich erstellt!")
                     st.download_button(
@@ -715,7 +729,7 @@ class MultiCompanyOfferGenerator:
                                     saved_docs = 0
                                     for item in generated_pdfs:
                                         try:
-                                            pdf_bytes = item.get('bytes')
+                                            pdf_bytes = item.get('pdf_content')
                                             filename = item.get('filename') or f"Angebot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
                                             if isinstance(pdf_bytes, (bytes, bytearray)):
                                                 add_customer_document(crm_customer_id, pdf_bytes, display_name=filename, doc_type="offer_pdf", project_id=crm_project_id, suggested_filename=filename)
@@ -982,163 +996,181 @@ class MultiCompanyOfferGenerator:
         
         return offer_data
 
-    def _generate_company_pdf(self, offer_data: Dict, company: Dict, company_index: int = 0) -> bytes:
-        """Generiert PDF für eine spezifische Firma mit firmenspezifischen Produkten und Preisen"""
+    def _shared_pdf_context(self) -> Dict[str, Any]:
+        """Lädt die für alle Firmen gleichen PDF-Eingaben einmal pro Lauf (Berechnung, Vorlagen, Optionen)."""
+        # Vorbereitung der Berechnungsergebnisse - ECHTE DATEN verwenden!
+        calc_results = st.session_state.get('calculation_results', {})
+        
+        # Fallback: Multi-Offer spezifische Berechnungen
+        if not calc_results:
+            calc_results = st.session_state.get('multi_offer_calc_results', {})
+        
+        if calc_results:
+            logging.info(f"Verwende echte Berechnungsergebnisse mit {len(calc_results)} Feldern")
+        else:
+            logging.warning("Keine echten Berechnungsergebnisse verfügbar - verwende Mock-Daten")
+        
+        # KRITISCH: Verfügbare Charts aus analysis_results extrahieren
+        available_charts = []
+        if calc_results and isinstance(calc_results, dict):
+            available_charts = [k for k in calc_results.keys() if k.endswith('_chart_bytes') and calc_results[k] is not None]
+            logging.info(f"Multi-Offer PDF: {len(available_charts)} Charts gefunden: {available_charts}")
+        
+        # PDF-Templates aus Admin-Einstellungen laden
         try:
-            # PDF-Generierung über generate_offer_pdf mit allen 16 erforderlichen Parametern
-            if callable(generate_offer_pdf):
-                  # Vorbereitung der Berechnungsergebnisse - ECHTE DATEN verwenden!
-                calc_results = st.session_state.get('calculation_results', {})
-                
-                # Fallback: Multi-Offer spezifische Berechnungen
-                if not calc_results:
-                    calc_results = st.session_state.get('multi_offer_calc_results', {})
-                
-                # Als letzter Fallback Mock-Daten, aber mit Warnung
-                if not calc_results:
-                    logging.warning("Keine echten Berechnungsergebnisse verfügbar - verwende Mock-Daten")
-                    calc_results = {
-                        'anlage_kwp': offer_data.get('module_quantity', 20) * 0.4,  # Geschätzt
-                        'annual_pv_production_kwh': offer_data.get('module_quantity', 20) * 400,
-                        'total_investment_netto': offer_data.get('module_quantity', 20) * 750,
-                        'amortization_time_years': 12.5,
-                        'self_supply_rate_percent': 65.0,
-                        'annual_financial_benefit_year1': 1200
-                    }
-                else:
-                    logging.info(f"Verwende echte Berechnungsergebnisse mit {len(calc_results)} Feldern")
+            title_image_templates = load_admin_setting("pdf_title_image_templates", []) if callable(load_admin_setting) else []
+            offer_title_templates = load_admin_setting("pdf_offer_title_templates", []) if callable(load_admin_setting) else []
+            cover_letter_templates = load_admin_setting("pdf_cover_letter_templates", []) if callable(load_admin_setting) else []
+            
+            # Erstes verfügbares Template verwenden
+            selected_title_image = title_image_templates[0] if title_image_templates else None
+            selected_offer_title = offer_title_templates[0] if offer_title_templates else None
+            selected_cover_letter = cover_letter_templates[0] if cover_letter_templates else None
+            
+            logging.info(f"Templates geladen: Titelbild={bool(selected_title_image)}, Titel={bool(selected_offer_title)}, Anschreiben={bool(selected_cover_letter)}")
+        except Exception as e:
+            logging.warning(f"Fehler beim Laden der Templates: {e}")
+            selected_title_image = selected_offer_title = selected_cover_letter = None
+        
+        # NEUE FEATURE: Benutzerdefinierten PDF-Optionen aus Einstellungen verwenden
+        base_settings = st.session_state.get("multi_offer_settings", {})
+        pdf_options = base_settings.get("pdf_options", {})
+        
+        # Charts basierend auf Benutzereinstellungen filtern
+        charts_to_include = available_charts if pdf_options.get("include_charts", True) else []
+        if not pdf_options.get("include_visualizations", True):
+            # Technische Visualisierungen entfernen
+            charts_to_include = [c for c in charts_to_include if not any(
+                vis_key in c for vis_key in ['daily_production', 'weekly_production', 'yearly_production']
+            )]
+        
+        # Drag&Drop-Reihenfolge und erweiterte Konfigurationen (Finanzierung, Design, Custom Content) aus globalem State
+        custom_section_order = st.session_state.get('pdf_section_order', [])
+        # final_price aus dem Live-Pricing explizit mitgeben: pdf_generator liest es sonst
+        # aus st.session_state, das in den Worker-Prozessen leer ist
+        live_pricing = st.session_state.get('live_pricing_calculations', {})
+        live_final_price = live_pricing.get('final_price') if isinstance(live_pricing, dict) else None
+        return {
+            "calc_results": calc_results,
+            "live_final_price": live_final_price if isinstance(live_final_price, (int, float)) and live_final_price > 0 else None,
+            "base_settings": base_settings,
+            "pdf_options": pdf_options,
+            # Sektionen aus Benutzereinstellungen
+            "selected_sections": pdf_options.get("selected_sections", [
+                "ProjectOverview", "TechnicalComponents", "CostDetails",
+                "Economics", "SimulationDetails", "CO2Savings", 
+                "Visualizations", "FutureAspects"
+            ]),
+            "charts_to_include": charts_to_include,
+            "templates": {
+                "selected_title_image_template": selected_title_image,
+                "selected_offer_title_template": selected_offer_title,
+                "selected_cover_letter_template": selected_cover_letter,
+            },
+            "extend_all": bool(st.session_state.get("multi_offer_extend_all", False)),
+            "company_extended": dict(st.session_state.get("multi_offer_company_extended", {})),
+            "inclusion_extras": {
+                'financing_config': st.session_state.get('financing_config', {}),
+                'chart_config': st.session_state.get('chart_config', {}),
+                'custom_content_items': st.session_state.get('custom_content_items', []),
+                'pdf_editor_config': st.session_state.get('pdf_editor_config', {}),
+                'pdf_design_config': st.session_state.get('pdf_design_config', {}),
+                'custom_section_order': custom_section_order if isinstance(custom_section_order, list) else []
+            },
+            "texts": st.session_state.get("TEXTS", {}),
+        }
 
-                # NEUE FEATURE: Preisstaffelung anwenden
-                base_settings = st.session_state.get("multi_offer_settings", {})
-                calc_results = self.apply_price_scaling(company_index, base_settings, calc_results)
-                
-                logging.info(f"PDF-Generierung für Firma {company_index+1}: Preise angepasst")# KRITISCH: PDF-kompatible Datenstruktur erstellen
-                # Die PDF-Funktion erwartet project_data mit customer_data und project_details
-                pdf_project_data = {
-                    "customer_data": offer_data.get("customer_data", {}),
-                    "project_details": offer_data.get("project_details", {}),
-                    # Weitere Felder aus offer_data übernehmen
-                    "consumption_data": offer_data.get("consumption_data", {}),
-                    "calculation_results": offer_data.get("calculation_results", {})
-                }
-                  # Falls ursprüngliche project_data vorhanden, deren Struktur beibehalten
-                if "project_data" in offer_data and offer_data["project_data"]:
-                    original_project_data = offer_data["project_data"]
-                    # Wichtige Felder aus original_project_data übernehmen
-                    for key in ["address", "roof_data", "location_data", "technical_specs"]:
-                        if key in original_project_data:
-                            pdf_project_data[key] = original_project_data[key]
-                  # DEBUG: Ausgabe der PDF-Datenstruktur
-                logging.info(f"Multi-Offer PDF Datenstruktur:")
-                logging.info(f"  project_details keys: {list(pdf_project_data.get('project_details', {}).keys())}")
-                logging.info(f"  selected_module_id: {pdf_project_data.get('project_details', {}).get('selected_module_id', 'NICHT GESETZT')}")
-                logging.info(f"  selected_inverter_id: {pdf_project_data.get('project_details', {}).get('selected_inverter_id', 'NICHT GESETZT')}")
-                logging.info(f"  selected_storage_id: {pdf_project_data.get('project_details', {}).get('selected_storage_id', 'NICHT GESETZT')}")
-                  # KRITISCH: Verfügbare Charts aus analysis_results extrahieren
-                available_charts = []
-                if calc_results and isinstance(calc_results, dict):
-                    # Chart-Keys aus analysis_results finden
-                    chart_keys = [k for k in calc_results.keys() if k.endswith('_chart_bytes') and calc_results[k] is not None]
-                    available_charts = chart_keys
-                    logging.info(f"Multi-Offer PDF: {len(available_charts)} Charts gefunden: {chart_keys}")
-                
-                # PDF-Templates aus Admin-Einstellungen laden
-                try:
-                    # Templates laden (falls verfügbar)
-                    title_image_templates = load_admin_setting("pdf_title_image_templates", []) if callable(load_admin_setting) else []
-                    offer_title_templates = load_admin_setting("pdf_offer_title_templates", []) if callable(load_admin_setting) else []
-                    cover_letter_templates = load_admin_setting("pdf_cover_letter_templates", []) if callable(load_admin_setting) else []
-                    
-                    # Erstes verfügbares Template verwenden
-                    selected_title_image = title_image_templates[0] if title_image_templates else None
-                    selected_offer_title = offer_title_templates[0] if offer_title_templates else None
-                    selected_cover_letter = cover_letter_templates[0] if cover_letter_templates else None
-                    
-                    logging.info(f"Templates geladen: Titelbild={bool(selected_title_image)}, Titel={bool(selected_offer_title)}, Anschreiben={bool(selected_cover_letter)}")
-                except Exception as e:
-                    logging.warning(f"Fehler beim Laden der Templates: {e}")
-                    selected_title_image = selected_offer_title = selected_cover_letter = None
-                  # NEUE FEATURE: Benutzerdefinierten PDF-Optionen aus Einstellungen verwenden
-                base_settings = st.session_state.get("multi_offer_settings", {})
-                pdf_options = base_settings.get("pdf_options", {})
-                
-                # Sektionen aus Benutzereinstellungen
-                selected_sections = pdf_options.get("selected_sections", [
-                    "ProjectOverview", "TechnicalComponents", "CostDetails",
-                    "Economics", "SimulationDetails", "CO2Savings", 
-                    "Visualizations", "FutureAspects"
-                ])
-                
-                # Charts basierend auf Benutzereinstellungen filtern
-                charts_to_include = available_charts if pdf_options.get("include_charts", True) else []
-                if not pdf_options.get("include_visualizations", True):
-                    # Technische Visualisierungen entfernen
-                    charts_to_include = [c for c in charts_to_include if not any(
-                        vis_key in c for vis_key in ['daily_production', 'weekly_production', 'yearly_production']
-                    )]
-                
-                # Wichtig: Logo/Firmendaten müssen pro Firma gesetzt werden – kein Global-Fallback der Hauptfirma
-                # Extended-Flag pro Firma bestimmen (oder Master "Alle erweitern")
-                is_extended = bool(st.session_state.get("multi_offer_extend_all", False) or 
-                                   st.session_state.get("multi_offer_company_extended", {}).get(company.get("id", 0), False))
+    def _build_company_pdf_kwargs(self, offer_data: Dict, company: Dict, company_index: int, shared: Dict[str, Any]) -> Dict[str, Any]:
+        """Firmenspezifische Argumente für generate_offer_pdf (picklebar, für den Prozess-Pool)."""
+        calc_results = shared["calc_results"]
+        # Als letzter Fallback Mock-Daten
+        if not calc_results:
+            calc_results = {
+                'anlage_kwp': offer_data.get('module_quantity', 20) * 0.4,  # Geschätzt
+                'annual_pv_production_kwh': offer_data.get('module_quantity', 20) * 400,
+                'total_investment_netto': offer_data.get('module_quantity', 20) * 750,
+                'amortization_time_years': 12.5,
+                'self_supply_rate_percent': 65.0,
+                'annual_financial_benefit_year1': 1200
+            }
 
-                # Company-Dokumente IDs ermitteln, wenn erweitert und Anhänge gewünscht
-                base_settings = st.session_state.get("multi_offer_settings", {})
-                pdf_options = base_settings.get("pdf_options", {})
-                include_all_docs = bool(pdf_options.get("include_all_documents", False))
-                company_doc_ids: list[int] = []
-                if is_extended and include_all_docs and callable(list_company_documents):
-                    try:
-                        docs = list_company_documents(company.get("id", 0), None) or []
-                        company_doc_ids = [d.get("id") for d in docs if isinstance(d, dict) and d.get("id") is not None]
-                    except Exception as _e_docs:
-                        logging.warning(f"Konnte Firmendokumente nicht laden: {_e_docs}")
+        # NEUE FEATURE: Preisstaffelung anwenden
+        calc_results = self.apply_price_scaling(company_index, shared["base_settings"], calc_results)
+        logging.info(f"PDF-Generierung für Firma {company_index+1}: Preise angepasst")
+        if shared.get("live_final_price") and calc_results.get("final_price") in (None, 0, 0.0):
+            calc_results = {**calc_results, "final_price": shared["live_final_price"]}
 
-                # Drag&Drop-Reihenfolge und erweiterte Konfigurationen (Finanzierung, Design, Custom Content) aus globalem State
-                custom_section_order = st.session_state.get('pdf_section_order', [])
-                inclusion_extras = {
-                    'financing_config': st.session_state.get('financing_config', {}),
-                    'chart_config': st.session_state.get('chart_config', {}),
-                    'custom_content_items': st.session_state.get('custom_content_items', []),
-                    'pdf_editor_config': st.session_state.get('pdf_editor_config', {}),
-                    'pdf_design_config': st.session_state.get('pdf_design_config', {}),
-                    'custom_section_order': custom_section_order if isinstance(custom_section_order, list) else []
-                }
-                pdf_content = generate_offer_pdf(
-                    project_data=pdf_project_data,  # Korrekt strukturierte Daten
-                    analysis_results=calc_results,
-                    company_info=company,  # wird im Generator in project_data.company_information injiziert
-                    company_logo_base64=company.get("logo_base64"),  # pro Firma
-                    selected_title_image_b64=None,
-                    selected_offer_title_text=f"Ihr individuelles Solaranlagen-Angebot von {company.get('name', 'Unser Unternehmen')}",
-                    selected_cover_letter_text="Sehr geehrte Damen und Herren,\n\nvielen Dank für Ihr Interesse an nachhaltiger Solarenergie.",
-                    sections_to_include=selected_sections,  # Benutzerdef. Sektionen
-                    inclusion_options={
-                        "include_company_logo": pdf_options.get("include_company_logo", True),
-                        "include_product_images": pdf_options.get("include_product_images", True),
-                        "include_all_documents": include_all_docs,
-                        "company_document_ids_to_include": company_doc_ids,
-                        "selected_charts_for_pdf": charts_to_include if is_extended else [],
-                        "include_optional_component_details": pdf_options.get("include_optional_component_details", True),
-                        # Erweiterte Ausgabe ab Seite 7
-                        "append_additional_pages_after_main6": is_extended,
-                        # Templates hinzufügen
-                        "selected_title_image_template": selected_title_image,
-                        "selected_offer_title_template": selected_offer_title,
-                        "selected_cover_letter_template": selected_cover_letter,
-                        "use_templates": True,
-                        # DnD & Advanced Configs
-                        **inclusion_extras
-                    },
-                    texts=st.session_state.get("TEXTS", {}),
-                    list_products_func=list_products if callable(list_products) else lambda: [],
-                    get_product_by_id_func=get_product_by_id if callable(get_product_by_id) else lambda x: {},
-                    load_admin_setting_func=load_admin_setting if callable(load_admin_setting) else lambda k, d=None: d,
-                    save_admin_setting_func=save_admin_setting if callable(save_admin_setting) else lambda k, v: None,
-                    db_list_company_documents_func=list_company_documents if callable(list_company_documents) else lambda cid, dtype=None: [],
-                    active_company_id=company.get("id", 1)
-                )
-                return pdf_content
+        # KRITISCH: PDF-kompatible Datenstruktur erstellen
+        # Die PDF-Funktion erwartet project_data mit customer_data und project_details
+        pdf_project_data = {
+            "customer_data": offer_data.get("customer_data", {}),
+            "project_details": offer_data.get("project_details", {}),
+            # Weitere Felder aus offer_data übernehmen
+            "consumption_data": offer_data.get("consumption_data", {}),
+            "calculation_results": offer_data.get("calculation_results", {})
+        }
+        # Falls ursprüngliche project_data vorhanden, deren Struktur beibehalten
+        if "project_data" in offer_data and offer_data["project_data"]:
+            original_project_data = offer_data["project_data"]
+            # Wichtige Felder aus original_project_data übernehmen
+            for key in ["address", "roof_data", "location_data", "technical_specs"]:
+                if key in original_project_data:
+                    pdf_project_data[key] = original_project_data[key]
+        logging.info(f"Multi-Offer PDF Datenstruktur:")
+        logging.info(f"  project_details keys: {list(pdf_project_data.get('project_details', {}).keys())}")
+        logging.info(f"  selected_module_id: {pdf_project_data.get('project_details', {}).get('selected_module_id', 'NICHT GESETZT')}")
+        logging.info(f"  selected_inverter_id: {pdf_project_data.get('project_details', {}).get('selected_inverter_id', 'NICHT GESETZT')}")
+        logging.info(f"  selected_storage_id: {pdf_project_data.get('project_details', {}).get('selected_storage_id', 'NICHT GESETZT')}")
+
+        # Wichtig: Logo/Firmendaten müssen pro Firma gesetzt werden – kein Global-Fallback der Hauptfirma
+        # Extended-Flag pro Firma bestimmen (oder Master "Alle erweitern")
+        is_extended = bool(shared["extend_all"] or shared["company_extended"].get(company.get("id", 0), False))
+
+        # Company-Dokumente IDs ermitteln, wenn erweitert und Anhänge gewünscht
+        pdf_options = shared["pdf_options"]
+        include_all_docs = bool(pdf_options.get("include_all_documents", False))
+        company_doc_ids: list[int] = []
+        if is_extended and include_all_docs and callable(list_company_documents):
+            try:
+                docs = list_company_documents(company.get("id", 0), None) or []
+                company_doc_ids = [d.get("id") for d in docs if isinstance(d, dict) and d.get("id") is not None]
+            except Exception as _e_docs:
+                logging.warning(f"Konnte Firmendokumente nicht laden: {_e_docs}")
+
+        return dict(
+            project_data=pdf_project_data,  # Korrekt strukturierte Daten
+            analysis_results=calc_results,
+            company_info=company,  # wird im Generator in project_data.company_information injiziert
+            company_logo_base64=company.get("logo_base64"),  # pro Firma
+            selected_title_image_b64=None,
+            selected_offer_title_text=f"Ihr individuelles Solaranlagen-Angebot von {company.get('name', 'Unser Unternehmen')}",
+            selected_cover_letter_text="Sehr geehrte Damen und Herren,\n\nvielen Dank für Ihr Interesse an nachhaltiger Solarenergie.",
+            sections_to_include=shared["selected_sections"],  # Benutzerdef. Sektionen
+            inclusion_options={
+                "include_company_logo": pdf_options.get("include_company_logo", True),
+                "include_product_images": pdf_options.get("include_product_images", True),
+                "include_all_documents": include_all_docs,
+                "company_document_ids_to_include": company_doc_ids,
+                "selected_charts_for_pdf": shared["charts_to_include"] if is_extended else [],
+                "include_optional_component_details": pdf_options.get("include_optional_component_details", True),
+                # Erweiterte Ausgabe ab Seite 7
+                "append_additional_pages_after_main6": is_extended,
+                # Templates hinzufügen
+                **shared["templates"],
+                "use_templates": True,
+                # DnD & Advanced Configs
+                **shared["inclusion_extras"]
+            },
+            texts=shared["texts"],
+            active_company_id=company.get("id", 1)
+        )
+
+    def _generate_company_pdf(self, offer_data: Dict, company: Dict, company_index: int = 0) -> bytes:
+        """Generiert PDF für eine spezifische Firma mit firmenspezifischen Produkten und Preisen"""
+        try:
+            if callable(generate_offer_pdf):
+                pdf_kwargs = self._build_company_pdf_kwargs(offer_data, company, company_index, self._shared_pdf_context())
+                return render_company_offer(pdf_kwargs)
             else:
                 st.error("PDF-Generator nicht verfügbar")
                 return None
@@ -1148,20 +1180,6 @@ class MultiCompanyOfferGenerator:
             st.error(f"PDF-Generierung fehlgeschlagen: {str(e)}")
             return None
 
-    def _create_zip_download(self, generated_pdfs: List[Dict]) -> bytes:
-        """Erstellt ZIP-Datei mit allen PDFs"""
-        zip_buffer = io.BytesIO()
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for pdf_info in generated_pdfs:
-                zip_file.writestr(
-                    pdf_info["filename"],
-                    pdf_info["pdf_content"]
-                )
-        
-        zip_buffer.seek(0)
-        return zip_buffer.getvalue()
-
     def render_ui(self):
         """Hauptfunktion für die UI-Darstellung"""
         st.title(" Multi-Firmen-Angebotsgenerator")
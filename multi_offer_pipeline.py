@@ -0,0 +1,220 @@
+# multi_offer_pipeline.py - Parallele Erzeugung von Multi-Firmen-Angeboten
+"""
+Rendert die Firmen-PDFs eines Multi-Angebots nebenläufig und schreibt jedes
+fertige PDF sofort in das ZIP-Archiv.
+
+- Aufrufer bereiten die gemeinsamen Daten (Berechnung, Vorlagen, Texte)
+  einmal vor und übergeben pro Firma nur noch einen Job:
+  {"name": ..., "filename": ..., "payload": ...}.
+- render(payload) läuft in einem begrenzten Prozess-Pool (MAX_WORKERS) und
+  muss daher eine Modul-Funktion sein; payload muss picklebar sein. Kann der
+  Pool nicht gestartet oder ein Job nicht übertragen werden, wird der Job im
+  aktuellen Prozess gerendert.
+- Fehler einzelner Firmen brechen den Lauf nicht ab; sie landen in
+  result["failed"] und werden über on_progress gemeldet.
+- Mit spool=True schreiben die Worker jedes PDF in eine temporäre Datei und
+  übergeben nur den Pfad; das ZIP kopiert die Datei blockweise. render darf
+  auch direkt einen Dateipfad liefern. target darf eine Pipe sein.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import IO, Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import offer_tracing
+from pdf_output_stream import spool_pdf
+
+MAX_WORKERS = 4
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+def default_workers(job_count: int) -> int:
+    return max(1, min(MAX_WORKERS, os.cpu_count() or 1, job_count))
+
+
+def safe_filename(name: str, fallback: str = "Angebot") -> str:
+    """Dateiname ohne Sonderzeichen (Leerzeichen -> '_')."""
+    cleaned = re.sub(r"[^\w\s.-]", "", str(name or "")).strip().replace(" ", "_")
+    return cleaned or fallback
+
+
+def _unique_name(filename: str, used: Set[str]) -> str:
+    base, ext = os.path.splitext(filename)
+    candidate, counter = filename, 2
+    while candidate in used:
+        candidate = f"{base}_{counter}{ext}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+RenderOutput = Union[bytes, str]
+
+
+def _timed_render(render: Callable[[Any], Any], payload: Any, spool_dir: Optional[str] = None) -> Tuple[RenderOutput, float]:
+    """Rendert ein PDF; Ergebnis sind bytes oder (gespoolt/von render geliefert) ein Dateipfad."""
+    started = time.perf_counter()
+    # Eigener Trace je Angebot (im Worker-Prozess/-Thread), sonst Span im laufenden Trace
+    with offer_tracing.trace_request("offer_render"):
+        data = render(payload)
+    if isinstance(data, (str, os.PathLike)):
+        path = os.fspath(data)
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            raise ValueError(f"PDF-Erzeugung lieferte keine Datei: {path}")
+        return path, time.perf_counter() - started
+    if hasattr(data, "getvalue"):
+        data = data.getvalue()
+    if not data:
+        raise ValueError("PDF-Erzeugung lieferte keine Daten")
+    if spool_dir is not None:
+        return spool_pdf(data, directory=spool_dir), time.perf_counter() - started
+    return bytes(data), time.perf_counter() - started
+
+
+def _make_executor(kind: str, workers: int) -> Executor:
+    if kind == "process":
+        try:
+            return ProcessPoolExecutor(max_workers=workers)
+        except (OSError, NotImplementedError, ImportError) as e:
+            logging.warning(f"Prozess-Pool nicht verfügbar, verwende Threads: {e}")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="offer-pdf")
+
+
+def _is_transport_error(error: BaseException) -> bool:
+    """Fehler beim Übertragen an/aus dem Worker-Prozess (nicht beim Rendern selbst)."""
+    if isinstance(error, (BrokenProcessPool, pickle.PicklingError)):
+        return True
+    return isinstance(error, (TypeError, AttributeError)) and "pickle" in str(error).lower()
+
+
+def generate_offer_zip(
+    jobs: Sequence[Dict[str, Any]],
+    render: Callable[[Any], Any],
+    target: Union[str, IO[bytes]],
+    max_workers: Optional[int] = None,
+    executor: str = "process",
+    on_progress: Optional[ProgressCallback] = None,
+    keep_bytes: bool = False,
+    spool: bool = False,
+) -> Dict[str, Any]:
+    """Rendert alle Jobs parallel und schreibt die PDFs in Fertigstellungsreihenfolge ins ZIP.
+
+    target ist ein Dateipfad oder ein beschreibbares Binärobjekt (z.B. BytesIO
+    oder eine Pipe). executor: "process" (Standard), "thread" oder "inline"
+    (seriell, z.B. für Tests). spool: PDFs über temporäre Dateien statt als
+    bytes an den Hauptprozess übergeben.
+    Rückgabe: {"total", "succeeded": [{name, filename, seconds[, pdf_content]}],
+    "failed": [{name, filename, error}], "seconds"}.
+    """
+    started = time.perf_counter()
+    total = len(jobs)
+    used_names: Set[str] = set()
+    result: Dict[str, Any] = {"total": total, "succeeded": [], "failed": [], "seconds": 0.0}
+
+    spool_dir = tempfile.mkdtemp(prefix="offer_zip_") if spool else None
+
+    def report(job: Dict[str, Any], filename: str, seconds: float, data: Optional[RenderOutput], error: Optional[BaseException]) -> None:
+        if error is None:
+            entry: Dict[str, Any] = {"name": job.get("name"), "filename": filename, "seconds": seconds}
+            if keep_bytes:
+                if isinstance(data, str):
+                    with open(data, "rb") as handle:
+                        data = handle.read()
+                entry["pdf_content"] = data
+            result["succeeded"].append(entry)
+        else:
+            logging.error(f"Angebot für {job.get('name')} fehlgeschlagen: {error}")
+            result["failed"].append({"name": job.get("name"), "filename": filename, "error": str(error)})
+        if on_progress:
+            on_progress({
+                "name": job.get("name"),
+                "filename": filename,
+                "status": "ok" if error is None else "error",
+                "error": None if error is None else str(error),
+                "seconds": seconds,
+                "completed": len(result["succeeded"]) + len(result["failed"]),
+                "total": total,
+            })
+
+    try:
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as archive:
+            _fill_archive(archive, jobs, render, executor, max_workers, spool_dir, used_names, report)
+    finally:
+        if spool_dir is not None:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def _fill_archive(
+    archive: zipfile.ZipFile,
+    jobs: Sequence[Dict[str, Any]],
+    render: Callable[[Any], Any],
+    executor: str,
+    max_workers: Optional[int],
+    spool_dir: Optional[str],
+    used_names: Set[str],
+    report: Callable[..., None],
+) -> None:
+    total = len(jobs)
+
+    def finish(job: Dict[str, Any], outcome: Optional[Tuple[RenderOutput, float]], error: Optional[BaseException]) -> None:
+        filename = _unique_name(job.get("filename") or f"{safe_filename(job.get('name'))}.pdf", used_names)
+        if outcome is None:
+            report(job, filename, 0.0, None, error)
+            return
+        data, seconds = outcome
+        if isinstance(data, str):
+            archive.write(data, filename)  # blockweise Kopie, kein Gesamt-Puffer
+            report(job, filename, seconds, data, None)
+            if spool_dir is not None and os.path.dirname(data) == spool_dir:
+                os.remove(data)
+        else:
+            archive.writestr(filename, data)
+            report(job, filename, seconds, data, None)
+
+    def run_inline(job: Dict[str, Any]) -> None:
+        try:
+            finish(job, _timed_render(render, job.get("payload"), spool_dir), None)
+        except Exception as e:
+            finish(job, None, e)
+
+    if executor == "inline" or total <= 1:
+        for job in jobs:
+            run_inline(job)
+    else:
+        retry: List[Dict[str, Any]] = []
+        pool = _make_executor(executor, max_workers or default_workers(total))
+        try:
+            futures: Dict[Future, Dict[str, Any]] = {}
+            for job in jobs:
+                try:
+                    futures[pool.submit(_timed_render, render, job.get("payload"), spool_dir)] = job
+                except BrokenProcessPool:
+                    retry.append(job)
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    finish(job, future.result(), None)
+                except Exception as e:
+                    if _is_transport_error(e):
+                        retry.append(job)
+                    else:
+                        finish(job, None, e)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        for job in retry:
+            logging.info(f"Angebot für {job.get('name')} wird im Hauptprozess erzeugt")
+            run_inline(job)
@@ -0,0 +1,467 @@
+# offer_benchmark.py - Reproduzierbare Benchmarks der Angebotserstellung
+"""
+Misst die Angebots-Pipeline stufenweise an festen Beispielprojekten und
+vergleicht mit einer gespeicherten Baseline (tests/benchmark_baseline.json).
+
+Stufen: calculation (perform_calculations), dynamic_data
+(placeholders.build_dynamic_data, bei Wärmepumpe zusätzlich mit der WP-Firma wie
+in pdf_generator), charts (Diagramm-Builder und gesammelter Export aus analysis),
+overlay (dynamic_overlay.generate_overlay), merge (merge_with_background),
+attachments (Datenblätter anhängen).
+
+Läuft vollständig offline: PVGIS, Admin-Einstellungen und Produktdaten kommen
+aus festen Stubs, Kaleido wird durch einen Renderer mit fester PNG ersetzt und
+der Diagramm-Cache liegt in einem temporären Verzeichnis. Zeiten sind der
+Median aus mehreren Läufen ohne Tracing; der Speicher-Peak (tracemalloc)
+stammt aus einem zusätzlichen Lauf.
+
+    python offer_benchmark.py                    # messen und ausgeben
+    python offer_benchmark.py --check            # gegen Baseline prüfen (Exit 1 bei Regression)
+    python offer_benchmark.py --update-baseline  # Baseline neu schreiben
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parent
+BASELINE_PATH = ROOT / "tests" / "benchmark_baseline.json"
+COORDS_DIR = ROOT / "coords"
+COORDS_DIR_WP = ROOT / "coords_wp"
+BACKGROUND_DIR = ROOT / "pdf_templates_static" / "notext"
+
+STAGES = ("calculation", "dynamic_data", "charts", "overlay", "merge", "attachments")
+DEFAULT_REPEATS = 3
+DEFAULT_TOLERANCE = float(os.environ.get("KAKERLAKE_BENCH_TOLERANCE", "0.5"))
+# Absolute Spielräume, damit Rauschen bei sehr kurzen Stufen keinen Alarm auslöst
+MIN_SLACK_SECONDS = 0.010
+MIN_SLACK_KIB = 512.0
+
+COMPANY_INFO = {
+    "name": "Benchmark Solar GmbH",
+    "street": "Sonnenweg 1",
+    "zip_code": "20095",
+    "city": "Hamburg",
+    "phone": "+49 40 123456",
+    "email": "info@example.com",
+}
+
+# Feste Produktdaten für die Stub-Produktdatenbank
+PRODUCTS = {
+    1: {"id": 1, "category": "Modul", "model_name": "Bench 430", "brand": "BenchSolar", "capacity_w": 430.0, "additional_cost_netto": 0.0},
+    2: {"id": 2, "category": "Wechselrichter", "model_name": "Bench WR 10", "brand": "BenchInvert", "power_kw": 10.0, "additional_cost_netto": 150.0},
+    3: {"id": 3, "category": "Batteriespeicher", "model_name": "Bench Store 10", "brand": "BenchStore", "storage_power_kw": 10.0, "max_cycles": 6000, "additional_cost_netto": 300.0},
+    4: {"id": 4, "category": "Wechselrichter", "model_name": "Bench WR 100", "brand": "BenchInvert", "power_kw": 100.0, "additional_cost_netto": 900.0},
+    5: {"id": 5, "category": "Batteriespeicher", "model_name": "Bench Store 100", "brand": "BenchStore", "storage_power_kw": 100.0, "max_cycles": 8000, "additional_cost_netto": 2500.0},
+}
+
+_CUSTOMER = {
+    "salutation": "Herr",
+    "first_name": "Max",
+    "last_name": "Mustermann",
+    "address": "Musterweg",
+    "house_number": "12",
+    "zip_code": "12345",
+    "city": "Musterstadt",
+    "email": "max@example.com",
+}
+
+FIXTURES: Dict[str, Dict[str, Any]] = {
+    "small_home": {
+        "customer_data": _CUSTOMER,
+        "project_details": {
+            "module_quantity": 20,
+            "selected_module_id": 1,
+            "selected_inverter_id": 2,
+            "annual_consumption_kwh_yr": 4500,
+            "electricity_price_kwh": 0.32,
+            "roof_orientation": "Süd",
+            "roof_inclination_deg": 35,
+            "latitude": 51.3,
+            "longitude": 9.5,
+        },
+        "economic_data": {},
+        "datasheet_pages": 4,
+    },
+    "commercial": {
+        "customer_data": dict(_CUSTOMER, company_name="Logistik Beispiel GmbH"),
+        "project_details": {
+            "module_quantity": 480,
+            "selected_module_id": 1,
+            "selected_inverter_id": 4,
+            "selected_inverter_quantity": 2,
+            "include_storage": True,
+            "selected_storage_id": 5,
+            "selected_storage_storage_power_kw": 100.0,
+            "annual_consumption_kwh_yr": 240000,
+            "electricity_price_kwh": 0.24,
+            "roof_orientation": "Ost",
+            "roof_inclination_deg": 10,
+            "latitude": 53.5,
+            "longitude": 10.0,
+        },
+        "economic_data": {},
+        "datasheet_pages": 24,
+    },
+    "heatpump": {
+        "customer_data": _CUSTOMER,
+        "project_details": {
+            "module_quantity": 28,
+            "selected_module_id": 1,
+            "selected_inverter_id": 2,
+            "include_storage": True,
+            "selected_storage_id": 3,
+            "selected_storage_storage_power_kw": 10.0,
+            "annual_consumption_kwh_yr": 4200,
+            "consumption_heating_kwh_yr": 6500,
+            "electricity_price_kwh": 0.30,
+            "roof_orientation": "Südwest",
+            "roof_inclination_deg": 30,
+            "latitude": 48.1,
+            "longitude": 11.6,
+        },
+        "economic_data": {},
+        "company_information_wp": dict(COMPANY_INFO, name="Benchmark Wärme GmbH", email="waerme@example.com"),
+        "heatpump_offer": {"heating_demand": 22000, "heatpump_power": 9.0, "cop": 3.8, "investment_cost": 24000},
+        "datasheet_pages": 8,
+    },
+}
+
+# 1x1-PNG als Ergebnis des Kaleido-Stubs
+_STUB_PNG = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89"
+    b"\x00\x00\x00\rIDATx\x9cc\xf8\xff\xff?\x00\x05\xfe\x02\xfe\xa7\x35\x81\x84\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+
+
+# --- Stubs ---
+
+def _stub_pvgis(latitude: float, longitude: float, peak_power_kwp: float, tilt: int, azimuth: int, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+    """Deterministische PVGIS-Antwort aus den Lookup-Tabellen (Format wie get_pvgis_data)."""
+    import pvgis_cache
+    from hourly_energy_simulator import DEFAULT_MONTHLY_PV_SHARES
+    from lookup_tables import get_tables
+
+    import calculations
+
+    # Breitengrad-Korrektur nur mit Admin-Schalter, wie in perform_calculations
+    project_latitude = latitude if calculations._latitude_corrections_enabled() else None
+    specific_yield = get_tables().specific_yield(float(azimuth), float(tilt), latitude=project_latitude) or 950.0
+    total_share = sum(DEFAULT_MONTHLY_PV_SHARES)
+    entry = {
+        "monthly_kwh_per_kwp": [specific_yield * share / total_share for share in DEFAULT_MONTHLY_PV_SHARES],
+        "annual_kwh_per_kwp": specific_yield,
+        "specific_yield_kwh_kwp_pa": specific_yield,
+        "pvgis_source": "benchmark-stub",
+    }
+    return pvgis_cache.scale_to_peak_power(entry, peak_power_kwp)
+
+
+def _stub_kaleido(fig: Any, options: Any) -> bytes:
+    return _STUB_PNG
+
+
+def _stub_admin_setting(key: str, default: Any = None) -> Any:
+    """Admin-Defaults aus calculations, PVGIS aktiviert (der Stub ersetzt den Abruf)."""
+    import calculations
+
+    if key == "pvgis_enabled":
+        return True
+    return calculations.Dummy_load_admin_setting_calc(key, default)
+
+
+@contextlib.contextmanager
+def offline_stubs() -> Iterator[str]:
+    """Ersetzt PVGIS, Admin-/Produktdaten und Kaleido; liefert das temporäre Diagramm-Cache-Verzeichnis."""
+    import analysis
+    import calculations
+    import chart_render_service
+    import database
+
+    chart_dir = tempfile.mkdtemp(prefix="bench_charts_")
+    with contextlib.ExitStack() as stack:
+        stack.callback(shutil.rmtree, chart_dir, True)
+        stack.enter_context(mock.patch.object(calculations, "get_pvgis_data", _stub_pvgis))
+        stack.enter_context(mock.patch.object(calculations, "real_load_admin_setting", _stub_admin_setting))
+        # perform_calculations liest den PVGIS-Schalter direkt aus database
+        stack.enter_context(mock.patch.object(database, "load_admin_setting", _stub_admin_setting))
+        stack.enter_context(
+            mock.patch.object(calculations, "real_get_product_by_id", lambda pid: copy.deepcopy(PRODUCTS.get(int(pid or 0))))
+        )
+        stack.enter_context(mock.patch.object(chart_render_service, "_render", _stub_kaleido))
+        stack.enter_context(mock.patch.object(chart_render_service, "CACHE_DIR", chart_dir))
+        # Die Diagramm-Builder lesen Typ/Farben aus dem Session State; ohne Streamlit-Lauf leer
+        stack.enter_context(mock.patch.object(analysis.st, "session_state", {}))
+        yield chart_dir
+
+
+# --- Stufen ---
+
+def _datasheet_pdf(pages: int) -> bytes:
+    """Synthetisches Datenblatt mit fester Seitenzahl (einmal pro Fixture, nicht gemessen)."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    for page in range(pages):
+        c.setFont("Helvetica", 10)
+        for line in range(60):
+            c.drawString(40, 800 - line * 12, f"Datenblatt Seite {page + 1} Zeile {line + 1}: Technische Daten")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+# Diagramme der Analyse-Seite (Schlüssel in analysis_results, Builder, Prefix der Bedienelemente)
+ANALYSIS_CHARTS = (
+    ("monthly_prod_cons_chart_bytes", "_create_monthly_production_consumption_chart", "monthly_compare"),
+    ("cost_projection_chart_bytes", "_create_electricity_cost_projection_chart", "cost_projection"),
+    ("cumulative_cashflow_chart_bytes", "_create_cumulative_cashflow_chart", "cum_cashflow"),
+)
+
+
+class _PipelineRun:
+    """Ein Durchlauf aller Stufen für ein Fixture; jede Stufe nutzt das Ergebnis der vorigen."""
+
+    def __init__(self, fixture: Dict[str, Any], datasheet: bytes):
+        self.fixture = fixture
+        self.datasheet = datasheet
+        self.state: Dict[str, Any] = {}
+
+    def calculation(self) -> None:
+        import calculations
+
+        project = {key: copy.deepcopy(value) for key, value in self.fixture.items() if key != "datasheet_pages"}
+        results = calculations.perform_calculations(project, {}, [])
+        if project.get("heatpump_offer"):
+            from calculations_heatpump import calculate_heatpump_economics
+
+            results["heatpump_economics"] = calculate_heatpump_economics(project["heatpump_offer"])
+        self.state["project"] = project
+        self.state["results"] = results
+
+    def dynamic_data(self) -> None:
+        from pdf_template_engine import build_dynamic_data
+
+        project = self.state["project"]
+        self.state["dynamic_data"] = build_dynamic_data(project, self.state["results"], COMPANY_INFO)
+        if project.get("heatpump_offer"):
+            wp_company = project.get("company_information_wp") or COMPANY_INFO
+            self.state["dynamic_data_wp"] = build_dynamic_data(project, self.state["results"], wp_company)
+
+    def charts(self) -> None:
+        import analysis
+        import chart_render_service
+
+        chart_render_service.clear_memory_cache()
+        results = dict(self.state["results"])
+        texts: Dict[str, str] = {}
+        viz_settings = analysis._get_default_viz_settings()
+        with analysis._deferred_chart_exports(texts):
+            for key, builder, prefix in ANALYSIS_CHARTS:
+                fig = getattr(analysis, builder)(results, texts, viz_settings, prefix)
+                if fig is not None:
+                    analysis._queue_chart_export(results, key, fig, texts)
+        self.state["charts"] = {key: results.get(key) for key, _, _ in ANALYSIS_CHARTS}
+
+    def overlay(self) -> None:
+        from pypdf import PdfReader, PdfWriter
+        from pdf_template_engine import generate_overlay
+
+        dynamic_data = dict(self.state["dynamic_data"], total_pages="7")
+        parts = [generate_overlay(COORDS_DIR, dynamic_data, total_pages=7)]
+        if "dynamic_data_wp" in self.state:
+            parts.append(generate_overlay(COORDS_DIR_WP, self.state["dynamic_data_wp"], total_pages=7))
+        if len(parts) == 1:
+            self.state["overlay"] = parts[0]
+            return
+        writer = PdfWriter()
+        for part in parts:
+            for page in PdfReader(io.BytesIO(part)).pages:
+                writer.add_page(page)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        self.state["overlay"] = buffer.getvalue()
+
+    def merge(self) -> None:
+        from pdf_template_engine import merge_with_background
+
+        self.state["main_pdf"] = merge_with_background(self.state["overlay"], BACKGROUND_DIR)
+
+    def attachments(self) -> None:
+        from pdf_template_engine.dynamic_overlay import append_additional_pages
+
+        self.state["final_pdf"] = append_additional_pages(self.state["main_pdf"], self.datasheet)
+
+
+def _run_pipeline(fixture: Dict[str, Any], datasheet: bytes, trace_memory: bool) -> Dict[str, Dict[str, float]]:
+    run = _PipelineRun(fixture, datasheet)
+    measurements: Dict[str, Dict[str, float]] = {}
+    for stage in STAGES:
+        if trace_memory:
+            tracemalloc.reset_peak()
+            baseline_bytes = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        getattr(run, stage)()
+        elapsed = time.perf_counter() - started
+        entry = {"seconds": elapsed}
+        if trace_memory:
+            entry["peak_kib"] = max(tracemalloc.get_traced_memory()[1] - baseline_bytes, 0) / 1024.0
+        measurements[stage] = entry
+    return measurements
+
+
+def run_fixture(name: str, repeats: int = DEFAULT_REPEATS) -> Dict[str, Dict[str, float]]:
+    """Median-Zeit und Speicher-Peak je Stufe für ein Fixture (Stubs müssen aktiv sein)."""
+    fixture = FIXTURES[name]
+    datasheet = _datasheet_pdf(int(fixture.get("datasheet_pages", 4)))
+    # Aufwärmlauf: Importe, Layout- und Hintergrund-Caches wie im laufenden Prozess
+    _run_pipeline(fixture, datasheet, trace_memory=False)
+    timings = [_run_pipeline(fixture, datasheet, trace_memory=False) for _ in range(max(int(repeats), 1))]
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        memory = _run_pipeline(fixture, datasheet, trace_memory=True)
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return {
+        stage: {
+            "seconds": round(statistics.median(run[stage]["seconds"] for run in timings), 6),
+            "peak_kib": round(memory[stage]["peak_kib"], 1),
+        }
+        for stage in STAGES
+    }
+
+
+def run_suite(fixtures: Optional[Sequence[str]] = None, repeats: int = DEFAULT_REPEATS) -> Dict[str, Any]:
+    """Alle (oder die angegebenen) Fixtures offline messen."""
+    names = list(fixtures or FIXTURES)
+    with offline_stubs():
+        results = {name: run_fixture(name, repeats) for name in names}
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeats": repeats,
+        },
+        "fixtures": results,
+    }
+
+
+# --- Baseline ---
+
+def load_baseline(path: Path = BASELINE_PATH) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(report: Dict[str, Any], path: Path = BASELINE_PATH) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, ensure_ascii=False, indent=2)
+        handle.write("\n")
+
+
+def compare_to_baseline(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[Dict[str, Any]]:
+    """
+    Regressionen gegenüber der Baseline: Zeit oder Speicher über
+    baseline * (1 + tolerance) plus absolutem Spielraum. Stufen ohne
+    Baseline-Wert werden nicht bewertet.
+    """
+    regressions: List[Dict[str, Any]] = []
+    baseline_fixtures = baseline.get("fixtures", {})
+    for fixture, stages in report.get("fixtures", {}).items():
+        for stage, measured in stages.items():
+            reference = baseline_fixtures.get(fixture, {}).get(stage)
+            if not reference:
+                continue
+            for metric, slack in (("seconds", MIN_SLACK_SECONDS), ("peak_kib", MIN_SLACK_KIB)):
+                if metric not in reference or metric not in measured:
+                    continue
+                limit = reference[metric] * (1.0 + tolerance) + slack
+                if measured[metric] > limit:
+                    regressions.append(
+                        {
+                            "fixture": fixture,
+                            "stage": stage,
+                            "metric": metric,
+                            "baseline": reference[metric],
+                            "measured": measured[metric],
+                            "limit": round(limit, 6),
+                        }
+                    )
+    return regressions
+
+
+def format_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    lines = [f"{'Fixture':<12} {'Stufe':<13} {'Zeit ms':>10} {'Basis ms':>10} {'Peak KiB':>10}"]
+    for fixture, stages in report["fixtures"].items():
+        for stage, measured in stages.items():
+            reference = ((baseline or {}).get("fixtures", {}).get(fixture, {}).get(stage) or {}).get("seconds")
+            lines.append(
+                f"{fixture:<12} {stage:<13} {measured['seconds'] * 1000:>10.1f} "
+                f"{(reference * 1000 if reference is not None else float('nan')):>10.1f} {measured['peak_kib']:>10.1f}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark der Angebots-Pipeline (offline)")
+    parser.add_argument("--fixture", action="append", choices=sorted(FIXTURES), help="nur dieses Fixture (mehrfach möglich)")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="erlaubte Abweichung, 0.5 = +50%%")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--check", action="store_true", help="Exit 1 bei Regression gegenüber der Baseline")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", type=Path, help="Messergebnis zusätzlich als JSON schreiben")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.fixture, args.repeats)
+    baseline = load_baseline(args.baseline)
+    print(format_report(report, baseline))
+    if args.json:
+        save_baseline(report, args.json)
+    if args.update_baseline:
+        save_baseline(report, args.baseline)
+        print(f"Baseline geschrieben: {args.baseline}")
+        return 0
+    if args.check:
+        if baseline is None:
+            print(f"Keine Baseline unter {args.baseline}")
+            return 1
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        for reg in regressions:
+            print(
+                f"REGRESSION {reg['fixture']}/{reg['stage']} {reg['metric']}: "
+                f"{reg['measured']} > {reg['limit']} (Baseline {reg['baseline']})"
+            )
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,461 @@
+# offer_tracing.py - Opt-in Stufen-Tracing der Angebotserstellung
+"""
+Verschachtelte Spans mit Wall-Zeit, CPU-Zeit und tracemalloc-Peak um die
+Stufen eines Angebots (PVGIS, Berechnung, Diagramme, Overlay, Merge, ...).
+Pro Anfrage wird eine JSON-Datei geschrieben, die die Electron-Seite über das
+Feld ``trace_file`` der Bridge-Antwort einsammeln kann:
+
+    data/offer_traces/<Zeitstempel>-<pid>-<id>-<name>.json
+
+Aktivierung nur per Umgebung, ohne Tracing kostet ein Span einen
+os.environ-Zugriff:
+
+    KAKERLAKE_TRACE=1              Tracing einschalten
+    KAKERLAKE_TRACE_DIR=...        Zielverzeichnis (Standard data/offer_traces)
+    KAKERLAKE_TRACE_MEMORY=0       tracemalloc-Peaks abschalten (spart Laufzeit)
+    KAKERLAKE_TRACE_KEEP=500       Anzahl aufbewahrter Trace-Dateien
+
+trace_request() öffnet eine Trace-Wurzel (innerhalb eines laufenden Traces
+nur einen Span), span() misst nur innerhalb eines Traces. CPU-Zeit ist
+Prozess-CPU (schließt Diagramm-Threads ein). tracemalloc-Peaks sind
+prozessweit: tracemalloc läuft, solange irgendein Trace es braucht, und
+Spans, die sich mit einem fremden Span überlappen (parallele Angebote,
+Diagramm-Threads), tragen ``peak_overlap`` und fließen nicht in die
+Peak-Perzentile ein.
+
+    python offer_tracing.py --last 50          # p50/p95 je Stufe
+    python offer_tracing.py --last 50 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "offer_traces")
+TRACE_FORMAT_VERSION = 1
+DEFAULT_LAST_N = 50
+
+_current_trace: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("offer_trace", default=None)
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("offer_span", default=None)
+
+# tracemalloc.reset_peak() und start()/stop() wirken prozessweit
+_MEMORY_LOCK = threading.Lock()
+_open_spans: "set[Span]" = set()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+def is_enabled() -> bool:
+    return os.environ.get("KAKERLAKE_TRACE", "0").lower() in {"1", "true", "yes", "on"}
+
+
+def _memory_enabled() -> bool:
+    return os.environ.get("KAKERLAKE_TRACE_MEMORY", "1").lower() not in {"0", "false", "no", "off"}
+
+
+def trace_dir() -> str:
+    return os.environ.get("KAKERLAKE_TRACE_DIR") or TRACE_DIR
+
+
+class Span:
+    """Ein gemessener Abschnitt; Kinder werden in Aufrufreihenfolge gesammelt."""
+
+    def __init__(self, name: str, parent: Optional["Span"], origin: float, attrs: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.attrs = dict(attrs)
+        self.children: List[Span] = []
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._origin = origin
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._mem_start: Optional[int] = None
+        self._peak_abs = 0
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_kib: Optional[float] = None
+        self.peak_overlap = False
+        if tracemalloc.is_tracing():
+            with _MEMORY_LOCK:
+                current, peak = tracemalloc.get_traced_memory()
+                # Bisherigen Peak dem Elternteil gutschreiben, dann neu messen
+                if parent is not None:
+                    parent._peak_abs = max(parent._peak_abs, peak)
+                self._mark_overlaps()
+                tracemalloc.reset_peak()
+                _open_spans.add(self)
+            self._mem_start = current
+            self._peak_abs = current
+
+    def _ancestors(self) -> List["Span"]:
+        chain = []
+        node = self.parent
+        while node is not None:
+            chain.append(node)
+            node = node.parent
+        return chain
+
+    def _mark_overlaps(self) -> None:
+        # reset_peak() löscht den Peak offener Spans außerhalb der eigenen
+        # Ahnenkette; beide Seiten bis zum gemeinsamen Vorfahren sind unscharf
+        ancestors = set(self._ancestors())
+        for other in _open_spans:
+            if other in ancestors:
+                continue
+            other_chain = [other] + other._ancestors()
+            common = next((node for node in other_chain if node in ancestors), None)
+            for node in other_chain:
+                if node is common:
+                    break
+                node.peak_overlap = True
+            for node in [self] + self._ancestors():
+                if node is common:
+                    break
+                node.peak_overlap = True
+
+    def set(self, key: str, value: Any) -> None:
+        self.attrs[key] = value
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.wall_s = time.perf_counter() - self._wall_start
+        self.cpu_s = time.process_time() - self._cpu_start
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+        if self._mem_start is None:
+            return
+        with _MEMORY_LOCK:
+            _open_spans.discard(self)
+            if tracemalloc.is_tracing():
+                _, peak = tracemalloc.get_traced_memory()
+                self._peak_abs = max(self._peak_abs, peak)
+                self.peak_kib = max(0, self._peak_abs - self._mem_start) / 1024.0
+                if self.parent is not None:
+                    self.parent._peak_abs = max(self.parent._peak_abs, self._peak_abs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "name": self.name,
+            "start_s": round(self._wall_start - self._origin, 6),
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "peak_kib": None if self.peak_kib is None else round(self.peak_kib, 1),
+            "status": self.status,
+        }
+        if self.peak_overlap and self.peak_kib is not None:
+            data["peak_overlap"] = True
+        if self.error:
+            data["error"] = self.error
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+class _NullSpan:
+    """Platzhalter ohne aktiven Trace: set() wird ignoriert."""
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """Ein Trace je Anfrage; path ist nach dem Schreiben gesetzt."""
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = datetime.now()
+        self.root = Span(name, None, time.perf_counter(), attrs)
+        self.path: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": TRACE_FORMAT_VERSION,
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.started_at.isoformat(timespec="milliseconds"),
+            "pid": os.getpid(),
+            "memory_traced": self.root.peak_kib is not None,
+            "root": self.root.to_dict(),
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def _acquire_tracemalloc() -> None:
+    """tracemalloc für einen Trace anmelden; gestartet wird nur beim ersten Nutzer."""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _MEMORY_LOCK:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc() -> None:
+    """Abmelden; gestoppt wird erst nach dem letzten Nutzer und nur, was wir gestartet haben."""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _MEMORY_LOCK:
+        _tracemalloc_users = max(0, _tracemalloc_users - 1)
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+@contextlib.contextmanager
+def _enter(span: Span) -> Iterator[Span]:
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.finish(e)
+        raise
+    else:
+        span.finish()
+    finally:
+        _current_span.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Any]:
+    """Misst einen Abschnitt im laufenden Trace; ohne Trace ein No-op (NULL_SPAN)."""
+    parent = _current_span.get() if _current_trace.get() is not None else None
+    if parent is None:
+        yield NULL_SPAN
+        return
+    child = Span(name, parent, parent._origin, attrs)
+    parent.children.append(child)
+    with _enter(child) as active:
+        yield active
+
+
+@contextlib.contextmanager
+def trace_request(name: str, **attrs: Any) -> Iterator[Optional[Trace]]:
+    """
+    Trace-Wurzel für eine Anfrage. Liefert den Trace (None bei abgeschaltetem
+    Tracing); innerhalb eines laufenden Traces wird nur ein Span angelegt.
+    Die Datei wird auch bei Fehlern geschrieben, Schreibfehler brechen die
+    Anfrage nie ab.
+    """
+    active = _current_trace.get()
+    if active is not None:
+        with span(name, **attrs):
+            yield active
+        return
+    if not is_enabled():
+        yield None
+        return
+
+    uses_memory = _memory_enabled()
+    if uses_memory:
+        _acquire_tracemalloc()
+    trace = Trace(name, attrs)
+    trace_token = _current_trace.set(trace)
+    try:
+        with _enter(trace.root):
+            yield trace
+    finally:
+        _current_trace.reset(trace_token)
+        if uses_memory:
+            _release_tracemalloc()
+        trace.path = write_trace(trace)
+
+
+def traced(name: str, root: bool = False) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator: span() um die Funktion, mit root=True trace_request()."""
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _current_trace.get() is None and not (root and is_enabled()):
+                return func(*args, **kwargs)
+            with (trace_request(name) if root else span(name)):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _trace_filename(trace: Trace) -> str:
+    safe_name = re.sub(r"[^\w.-]", "_", trace.root.name)[:60] or "trace"
+    stamp = trace.started_at.strftime("%Y%m%d-%H%M%S-%f")
+    return f"{stamp}-{os.getpid()}-{trace.trace_id[:8]}-{safe_name}.json"
+
+
+def write_trace(trace: Trace, directory: Optional[str] = None) -> Optional[str]:
+    directory = directory or trace_dir()
+    path = os.path.join(directory, _trace_filename(trace))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(trace.to_dict(), handle, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"offer_tracing: Trace konnte nicht geschrieben werden: {e}", file=sys.stderr)
+        return None
+    _prune(directory)
+    return path
+
+
+def _prune(directory: str) -> None:
+    try:
+        keep = int(os.environ.get("KAKERLAKE_TRACE_KEEP", "500"))
+    except ValueError:
+        print("offer_tracing: KAKERLAKE_TRACE_KEEP ist keine Zahl, behalte 500 Traces", file=sys.stderr)
+        keep = 500
+    files = list_trace_files(directory)
+    for stale in files[: max(0, len(files) - keep)]:
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
+
+
+def list_trace_files(directory: Optional[str] = None) -> List[str]:
+    """Trace-Dateien, älteste zuerst (Dateiname beginnt mit dem Zeitstempel)."""
+    directory = directory or trace_dir()
+    try:
+        names = sorted(n for n in os.listdir(directory) if n.endswith(".json"))
+    except OSError:
+        return []
+    return [os.path.join(directory, n) for n in names]
+
+
+def load_traces(last_n: int = DEFAULT_LAST_N, directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    files = list_trace_files(directory)
+    traces = []
+    for path in files[-last_n:] if last_n > 0 else []:
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict) and isinstance(data.get("root"), dict):
+            traces.append(data)
+    return traces
+
+
+def _stage_totals(node: Dict[str, Any], prefix: str, totals: Dict[str, Dict[str, float]]) -> None:
+    # Mehrfach auftretende Stufen (z.B. Overlay PV + WP) werden je Trace summiert
+    path = f"{prefix}/{node.get('name')}" if prefix else str(node.get("name"))
+    entry = totals.setdefault(path, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_kib": None})
+    entry["calls"] += 1
+    entry["wall_s"] += float(node.get("wall_s") or 0.0)
+    entry["cpu_s"] += float(node.get("cpu_s") or 0.0)
+    if node.get("peak_kib") is not None and not node.get("peak_overlap"):
+        entry["peak_kib"] = max(entry["peak_kib"] or 0.0, float(node["peak_kib"]))
+    for child in node.get("children") or ():
+        _stage_totals(child, path, totals)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Lineare Interpolation zwischen den Rängen (q in 0..100)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def aggregate_report(last_n: int = DEFAULT_LAST_N, directory: Optional[str] = None) -> Dict[str, Any]:
+    """p50/p95 von Wall-, CPU-Zeit und Peak je Stufenpfad über die letzten last_n Traces."""
+    traces = load_traces(last_n, directory)
+    samples: Dict[str, List[Dict[str, float]]] = {}
+    for trace in traces:
+        totals: Dict[str, Dict[str, float]] = {}
+        _stage_totals(trace["root"], "", totals)
+        for path, entry in totals.items():
+            samples.setdefault(path, []).append(entry)
+
+    stages: Dict[str, Dict[str, Any]] = {}
+    for path, entries in samples.items():
+        wall = [e["wall_s"] for e in entries]
+        cpu = [e["cpu_s"] for e in entries]
+        peaks = [e["peak_kib"] for e in entries if e["peak_kib"] is not None]
+        stages[path] = {
+            "traces": len(entries),
+            "calls": sum(int(e["calls"]) for e in entries),
+            "wall_p50_s": round(percentile(wall, 50), 6),
+            "wall_p95_s": round(percentile(wall, 95), 6),
+            "cpu_p50_s": round(percentile(cpu, 50), 6),
+            "cpu_p95_s": round(percentile(cpu, 95), 6),
+            "peak_p50_kib": round(percentile(peaks, 50), 1) if peaks else None,
+            "peak_p95_kib": round(percentile(peaks, 95), 1) if peaks else None,
+        }
+    return {"traces": len(traces), "last_n": last_n, "stages": stages}
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"Traces: {report['traces']} (letzte {report['last_n']})"]
+    header = f"{'Stufe':<60} {'n':>4} {'p50 s':>9} {'p95 s':>9} {'CPU p95':>9} {'Peak p95':>10}"
+    lines += [header, "-" * len(header)]
+    for path, row in report["stages"].items():
+        depth = path.count("/")
+        label = ("  " * depth + path.rsplit("/", 1)[-1])[:60]
+        peak = "-" if row["peak_p95_kib"] is None else f"{row['peak_p95_kib']:.0f} KiB"
+        lines.append(
+            f"{label:<60} {row['traces']:>4} {row['wall_p50_s']:>9.3f} {row['wall_p95_s']:>9.3f} "
+            f"{row['cpu_p95_s']:>9.3f} {peak:>10}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Stufen-Auswertung der Angebots-Traces")
+    parser.add_argument("--last", type=int, default=DEFAULT_LAST_N, help="Anzahl der jüngsten Traces")
+    parser.add_argument("--dir", default=None, help="Trace-Verzeichnis (Standard: KAKERLAKE_TRACE_DIR bzw. data/offer_traces)")
+    parser.add_argument("--json", action="store_true", help="Bericht als JSON ausgeben")
+    args = parser.parse_args(argv)
+
+    report = aggregate_report(args.last, args.dir)
+    print(json.dumps(report, ensure_ascii=False, indent=2) if args.json else format_report(report))
+    return 0
+
+
+__all__ = [
+    "TRACE_DIR",
+    "NULL_SPAN",
+    "Span",
+    "Trace",
+    "is_enabled",
+    "trace_dir",
+    "current_trace",
+    "span",
+    "trace_request",
+    "traced",
+    "write_trace",
+    "list_trace_files",
+    "load_traces",
+    "percentile",
+    "aggregate_report",
+    "format_report",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,15 +14,13 @@ except Exception as e:
 
 
 def _load_texts() -> Dict[str, str]:
-    """Lädt deutsche Texte aus de.json, falls vorhanden."""
-    base_dir = Path(__file__).parent
-    de_path = base_dir / "de.json"
-    if de_path.exists():
-        try:
-            return json.loads(de_path.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
-    return {}
+    """Deutsche Texte aus dem Übersetzungskatalog (einmal pro Prozess geladen)."""
+    try:
+        from locales import load_translations
+
+        return load_translations("de") or {}
+    except Exception:
+        return {}
 
 
 def _generate_legacy_pdf_optional(
@@ -16,9 +16,11 @@ import math
 import traceback
 from calculations_extended import run_all_extended_analyses
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union, Callable
+from typing import Any, Dict, List, Optional, Tuple, Union, Callable
 from pathlib import Path
 from theming.pdf_styles import get_theme
+from pdf_output_stream import merge_pdfs_to_bytes, write_merged_pdf
+import offer_tracing
 
 # Optional PDF Templates import
 try:
@@ -34,6 +36,13 @@ except ImportError:
 _REPORTLAB_AVAILABLE = True
 _PYPDF_AVAILABLE = True
 
+# Optional: normalisierte Druckvarianten von Produktbildern und Logos
+try:
+    import image_asset_store
+    _IMAGE_ASSETS_AVAILABLE = True
+except ImportError:
+    _IMAGE_ASSETS_AVAILABLE = False
+
 try:
     from reportlab.lib.colors import HexColor
     from reportlab.lib.pagesizes import A4
@@ -287,56 +296,10 @@ class PDFGenerator:
         Returns:
             bytes: Die zusammengeführte PDF als Bytes
         """
-        if not _PYPDF_AVAILABLE:
-            raise RuntimeError("PyPDF ist nicht verfügbar für das Zusammenführen von PDFs")
-            
-        if not pdf_files:
-            return b""
-            
-        merger = PdfWriter()
-        
-        try:
-            for pdf_file in pdf_files:
-                if isinstance(pdf_file, str):
-                    # Pfad zu PDF-Datei
-                    if os.path.exists(pdf_file):
-                        with open(pdf_file, 'rb') as f:
-                            reader = PdfReader(f)
-                            for page in reader.pages:
-                                merger.add_page(page)
-                elif isinstance(pdf_file, bytes):
-                    # PDF als Bytes
-                    reader = PdfReader(io.BytesIO(pdf_file))
-                    for page in reader.pages:
-                        merger.add_page(page)
-                elif isinstance(pdf_file, io.BytesIO):
-                    # PDF als BytesIO
-                    pdf_file.seek(0)  # Sicherstellung, dass wir am Anfang sind
-                    reader = PdfReader(pdf_file)
-                    for page in reader.pages:
-                        merger.add_page(page)
-                        
-            # Zusammengeführte PDF in BytesIO schreiben
-            output = io.BytesIO()
-            merger.write(output)
-            output.seek(0)
-            return output.getvalue()
-            
-        except Exception as e:
-            # Fallback: Erste PDF zurückgeben wenn verfügbar
-            if pdf_files:
-                first_pdf = pdf_files[0]
-                if isinstance(first_pdf, str) and os.path.exists(first_pdf):
-                    with open(first_pdf, 'rb') as f:
-                        return f.read()
-                elif isinstance(first_pdf, bytes):
-                    return first_pdf
-                elif isinstance(first_pdf, io.BytesIO):
-                    first_pdf.seek(0)
-                    return first_pdf.getvalue()
-            return b""
+        return merge_pdfs(pdf_files)
 
 # =============== NEUE TEMPLATE-HAUPTAUSGABE (7 Seiten) API ==================
+@offer_tracing.traced("main_pages", root=True)
 def generate_main_template_pdf_bytes(
     project_data: Dict[str, Any],
     analysis_results: Optional[Dict[str, Any]],
@@ -362,7 +325,8 @@ def generate_main_template_pdf_bytes(
     debug_templates = os.environ.get("DING_TEMPLATE_DEBUG", "0").lower() in {"1","true","yes","on"}
     if debug_templates:
         print("[TEMPLATE] build_dynamic_data start")
-    dyn_data = build_dynamic_data(project_data, analysis_results, company_info)
+    with offer_tracing.span("dynamic_data"):
+        dyn_data = build_dynamic_data(project_data, analysis_results, company_info)
 
     # Dynamische Reihenfolge Photovoltaik / Wärmepumpe: segment_order aus inclusion_options (liegt nicht direkt vor),
     # deshalb aus project_data Hint lesen
@@ -406,13 +370,16 @@ def generate_main_template_pdf_bytes(
         # Overlay für PV Standard
         overlay_parts: list[bytes] = []
         if 'Photovoltaik' in segment_order:
-            overlay_bytes_pv = generate_overlay(coords_dir_pv, dyn_data, total_pages=total_pages)
+            with offer_tracing.span("overlay", segment="pv"):
+                overlay_bytes_pv = generate_overlay(coords_dir_pv, dyn_data, total_pages=total_pages)
             overlay_parts.append(overlay_bytes_pv)
         if 'Wärmepumpe' in segment_order and wp_coords_available:
             # Für Wärmepumpe separate dyn_data (eigene Firmeninfo? project_data.company_information_wp)
             wp_company = project_data.get('company_information_wp') or company_info
-            dyn_data_wp = build_dynamic_data(project_data, analysis_results, wp_company)
-            overlay_bytes_wp = generate_overlay(coords_dir_wp, dyn_data_wp, total_pages=total_pages)
+            with offer_tracing.span("dynamic_data", segment="wp"):
+                dyn_data_wp = build_dynamic_data(project_data, analysis_results, wp_company)
+            with offer_tracing.span("overlay", segment="wp"):
+                overlay_bytes_wp = generate_overlay(coords_dir_wp, dyn_data_wp, total_pages=total_pages)
             overlay_parts.append(overlay_bytes_wp)
         # Merge Overlay Streams sequenziell (einfaches Aneinanderfügen der Seiten)
         if len(overlay_parts) == 1:
@@ -435,7 +402,8 @@ def generate_main_template_pdf_bytes(
                 overlay_bytes = overlay_parts[0] if overlay_parts else b""
         if debug_templates:
             print(f"[TEMPLATE] overlay size={len(overlay_bytes)} bytes")
-        fused = merge_with_background(overlay_bytes, bg_dir)
+        with offer_tracing.span("merge"):
+            fused = merge_with_background(overlay_bytes, bg_dir)
         if debug_templates:
             print(f"[TEMPLATE] fused main7 size={len(fused)} bytes")
         return fused
@@ -448,6 +416,7 @@ def generate_main_template_pdf_bytes(
             print("[TEMPLATE] (Traceback konnte nicht ausgegeben werden)")
         return None
 
+@offer_tracing.traced("offer_pdf", root=True)
 def generate_offer_pdf_with_main_templates(
     project_data: Dict[str, Any],
     analysis_results: Optional[Dict[str, Any]],
@@ -667,11 +636,8 @@ def generate_offer_pdf_with_main_templates(
             return pdf_bytes
 
     try:
-        from pypdf import PdfReader, PdfWriter
+        from pypdf import PdfReader
         # BUGFIX: Ehemals main6 (Altbezeichnung) -> korrekt main7
-        base_reader = PdfReader(io.BytesIO(main7))
-        writer = PdfWriter()
-        for p in base_reader.pages: writer.add_page(p)
         if additional_pdf:
             # Seitenanzahl ermitteln (gesamt = 7 + n)
             tmp_reader = PdfReader(io.BytesIO(additional_pdf))
@@ -693,11 +659,10 @@ def generate_offer_pdf_with_main_templates(
                 footer_left = ' '.join(name_parts)
             except Exception:
                 footer_left = None
-            additional_pdf = _overlay_footer_page_numbers(additional_pdf, start_number=8, total_pages=total_pages, logo_b64=logo_b64, footer_left_text=footer_left)
-            add_reader = PdfReader(io.BytesIO(additional_pdf))
-            for p in add_reader.pages: writer.add_page(p)
-        buf = io.BytesIO(); writer.write(buf)
-        return buf.getvalue()
+            with offer_tracing.span("footer_overlay"):
+                additional_pdf = _overlay_footer_page_numbers(additional_pdf, start_number=8, total_pages=total_pages, logo_b64=logo_b64, footer_left_text=footer_left)
+        with offer_tracing.span("merge"):
+            return merge_pdfs_to_bytes([main7, additional_pdf], skip_invalid=False)
     except Exception:
         # Falls Zusammenführen fehlschlägt, gib die 7 Seiten zurück
         return main7
@@ -1089,7 +1054,8 @@ def _update_styles_with_dynamic_colors(design_settings: Dict[str, str]):
         ])
 
 
-def _get_image_flowable(image_data_input: Optional[Union[str, bytes]], desired_width: float, texts: Dict[str, str], caption_text_key: Optional[str] = None, max_height: Optional[float] = None, align: str = 'CENTER') -> List[Any]:
+def _get_image_flowable(image_data_input: Optional[Union[str, bytes]], desired_width: float, texts: Dict[str, str], caption_text_key: Optional[str] = None, max_height: Optional[float] = None, align: str = 'CENTER', asset_slot: Optional[Union[str, Tuple[float, float]]] = None) -> List[Any]:
+    """Bild als Flowable; mit asset_slot wird die vorberechnete Druckvariante (image_asset_store) eingebettet."""
     flowables: List[Any] = []
     if not _REPORTLAB_AVAILABLE: return flowables
     img_data_bytes: Optional[bytes] = None
@@ -1100,6 +1066,9 @@ def _get_image_flowable(image_data_input: Optional[Union[str, bytes]], desired_w
             img_data_bytes = base64.b64decode(image_data_input)
         except Exception: img_data_bytes = None 
     elif isinstance(image_data_input, bytes): img_data_bytes = image_data_input
+
+    if img_data_bytes and asset_slot is not None and _IMAGE_ASSETS_AVAILABLE:
+        img_data_bytes = image_asset_store.print_variant(img_data_bytes, asset_slot) or img_data_bytes
     
     if img_data_bytes:
         try:
@@ -1686,7 +1655,7 @@ def _add_product_details_to_story(
         product_image_base64_prod = product_details.get('image_base64')
         if product_image_base64_prod:
             img_w_prod = min(available_width * 0.30, 5*cm); img_h_max_prod = 5*cm
-            product_image_flowables_prod = _get_image_flowable(product_image_base64_prod, img_w_prod, texts, None, img_h_max_prod, align='CENTER')
+            product_image_flowables_prod = _get_image_flowable(product_image_base64_prod, img_w_prod, texts, None, img_h_max_prod, align='CENTER', asset_slot='product_image')
     
     # Tabelle zu geschützten Elementen hinzufügen
     table_elements = _create_product_table_with_image(details_data_prod, product_image_flowables_prod, available_width)
@@ -1704,6 +1673,7 @@ def _add_product_details_to_story(
     story.append(KeepTogether(protected_elements))
 
 
+@offer_tracing.traced("reportlab_pdf", root=True)
 def generate_offer_pdf(
     project_data: Dict[str, Any],
     analysis_results: Optional[Dict[str, Any]],
@@ -1897,13 +1867,13 @@ def generate_offer_pdf(
     if not skip_cover_and_letter:
         try:
             if selected_title_image_b64:
-                img_flowables_title = _get_image_flowable(selected_title_image_b64, doc.width, texts, max_height=doc.height / 1.8, align='CENTER')
+                img_flowables_title = _get_image_flowable(selected_title_image_b64, doc.width, texts, max_height=doc.height / 1.8, align='CENTER', asset_slot='title_image')
                 if img_flowables_title:
                     story.extend(img_flowables_title)
                     story.append(Spacer(1, 0.5 * cm))
 
             if include_company_logo_opt and company_logo_base64:
-                logo_flowables_deckblatt = _get_image_flowable(company_logo_base64, 6*cm, texts, max_height=3*cm, align='CENTER')
+                logo_flowables_deckblatt = _get_image_flowable(company_logo_base64, 6*cm, texts, max_height=3*cm, align='CENTER', asset_slot='company_logo')
                 if logo_flowables_deckblatt:
                     story.extend(logo_flowables_deckblatt)
                     story.append(Spacer(1, 0.5 * cm))
@@ -2090,7 +2060,7 @@ def generate_offer_pdf(
                 if section_key_current == "ProjectOverview":
                     if pv_details_pdf.get('visualize_roof_in_pdf_satellite', True) and pv_details_pdf.get('satellite_image_base64_data'):
                         section_elements.append(Paragraph(get_text(texts,"satellite_image_header_pdf","Satellitenansicht Objekt"), STYLES.get('SubSectionTitle')))
-                        sat_img_flowables = _get_image_flowable(pv_details_pdf['satellite_image_base64_data'], available_width_content * 0.8, texts, caption_text_key="satellite_image_caption_pdf", max_height=10*cm)
+                        sat_img_flowables = _get_image_flowable(pv_details_pdf['satellite_image_base64_data'], available_width_content * 0.8, texts, caption_text_key="satellite_image_caption_pdf", max_height=10*cm, asset_slot=(available_width_content * 0.8, 10*cm))
                         if sat_img_flowables: section_elements.extend(sat_img_flowables); section_elements.append(Spacer(1, 0.5*cm))
                     
                     overview_data_content_pdf = [
@@ -2719,7 +2689,7 @@ def generate_offer_pdf(
                         else:  # medium
                             image_width = available_width_content * 0.6
                         
-                        img_flowables = _get_image_flowable(image_data, image_width, texts, max_height=10*cm, align='CENTER')
+                        img_flowables = _get_image_flowable(image_data, image_width, texts, max_height=10*cm, align='CENTER', asset_slot=(image_width, 10*cm))
                         if img_flowables:
                             item_elements.extend(img_flowables)
                             
@@ -2791,7 +2761,8 @@ def generate_offer_pdf(
             'include_custom_footer_ref': include_custom_footer_opt,
             'include_header_logo_ref': include_header_logo_opt
         }
-        doc.build(story, canvasmaker=lambda *args, **kwargs_c: PageNumCanvas(*args, onPage_callback=page_layout_handler, callback_kwargs=layout_callback_kwargs_build, **kwargs_c))
+        with offer_tracing.span("layout"):
+            doc.build(story, canvasmaker=lambda *args, **kwargs_c: PageNumCanvas(*args, onPage_callback=page_layout_handler, callback_kwargs=layout_callback_kwargs_build, **kwargs_c))
         main_pdf_bytes = main_offer_buffer.getvalue()
     except Exception as e_build_pdf:
         return _create_plaintext_pdf_fallback(project_data, analysis_results, texts, company_info, selected_offer_title_text, selected_cover_letter_text)
@@ -2873,33 +2844,17 @@ def generate_offer_pdf(
     if not paths_to_append: 
         return main_pdf_bytes
     
-    pdf_writer = PdfWriter()
     try:
-        main_offer_reader = PdfReader(io.BytesIO(main_pdf_bytes))
-        for page in main_offer_reader.pages: 
-            pdf_writer.add_page(page)
+        PdfReader(io.BytesIO(main_pdf_bytes))
     except Exception as e_read_main:
-        return main_pdf_bytes 
+        return main_pdf_bytes
 
-    successfully_appended = 0
-    for pdf_path in paths_to_append:
-        try:
-            datasheet_reader = PdfReader(pdf_path)
-            for page in datasheet_reader.pages: 
-                pdf_writer.add_page(page)
-            successfully_appended += 1
-        except Exception as e_append_ds:
-            pass  # Fehler beim Anhängen werden still behandelt
-    
-    final_buffer = io.BytesIO()
+    # Datenblätter werden per Pfad (mmap) referenziert statt vorab eingelesen
     try:
-        pdf_writer.write(final_buffer)
-        final_pdf_bytes = final_buffer.getvalue()
-        return final_pdf_bytes
+        with offer_tracing.span("attachments", files=len(paths_to_append)):
+            return merge_pdfs_to_bytes([main_pdf_bytes, *paths_to_append])
     except Exception as e_write_final:
-        return main_pdf_bytes 
-    finally:
-        final_buffer.close()
+        return main_pdf_bytes
 
 def merge_pdfs(pdf_files: List[Union[str, bytes, io.BytesIO]]) -> bytes:
     """
@@ -2917,35 +2872,8 @@ def merge_pdfs(pdf_files: List[Union[str, bytes, io.BytesIO]]) -> bytes:
     if not pdf_files:
         return b""
         
-    merger = PdfWriter()
-    
     try:
-        for pdf_file in pdf_files:
-            if isinstance(pdf_file, str):
-                # Pfad zu PDF-Datei
-                if os.path.exists(pdf_file):
-                    with open(pdf_file, 'rb') as f:
-                        reader = PdfReader(f)
-                        for page in reader.pages:
-                            merger.add_page(page)
-            elif isinstance(pdf_file, bytes):
-                # PDF als Bytes
-                reader = PdfReader(io.BytesIO(pdf_file))
-                for page in reader.pages:
-                    merger.add_page(page)
-            elif isinstance(pdf_file, io.BytesIO):
-                # PDF als BytesIO
-                pdf_file.seek(0)  # Sicherstellung, dass wir am Anfang sind
-                reader = PdfReader(pdf_file)
-                for page in reader.pages:
-                    merger.add_page(page)
-                    
-        # Zusammengeführte PDF in BytesIO schreiben
-        output = io.BytesIO()
-        merger.write(output)
-        output.seek(0)
-        return output.getvalue()
-        
+        return merge_pdfs_to_bytes(pdf_files)
     except Exception as e:
         # Fallback: Erste PDF zurückgeben wenn verfügbar
         if pdf_files:
@@ -2960,6 +2888,23 @@ def merge_pdfs(pdf_files: List[Union[str, bytes, io.BytesIO]]) -> bytes:
                 return first_pdf.getvalue()
         return b""
 
+def merge_pdfs_to_file(pdf_files: List[Union[str, bytes, io.BytesIO]], output_path: str) -> Optional[str]:
+    """
+    Wie merge_pdfs, schreibt das Ergebnis aber direkt nach output_path
+    (atomar, ohne Gesamt-Puffer im Speicher).
+    
+    Returns:
+        Optional[str]: output_path bei Erfolg, sonst None
+    """
+    if not _PYPDF_AVAILABLE or not pdf_files:
+        return None
+    try:
+        write_merged_pdf(pdf_files, output_path)
+        return output_path
+    except Exception as e:
+        print(f"Fehler beim Schreiben der PDF nach {output_path}: {e}")
+        return None
+
 def _validate_pdf_data_availability(project_data: Dict[str, Any], analysis_results: Dict[str, Any], texts: Dict[str, str]) -> Dict[str, Any]:
     """
     Validiert die Verfügbarkeit von Daten für die PDF-Erstellung und gibt Warnmeldungen zurück.
@@ -0,0 +1,188 @@
+# pdf_output_stream.py - Streamende PDF-Ausgabe ohne Gesamt-Puffer
+"""
+Fügt PDFs zusammen und schreibt das Ergebnis direkt in eine Datei oder Pipe,
+statt das komplette Angebot (inkl. Datenblätter) als bytes im Speicher
+aufzubauen.
+
+- Quellen: bytes, BytesIO/Dateiobjekte oder Pfade. Pfade (z.B. große
+  Datenblätter) werden per mmap referenziert und nicht vorab eingelesen;
+  die Handles bleiben bis zum Ende des Schreibvorgangs offen.
+- Ziel: Dateipfad (atomar über temporäre Datei + os.replace) oder ein
+  beschreibbares Binärobjekt. Nicht-seekbare Ziele (Pipes, stdout) werden
+  über einen Positionszähler beschrieben, da pypdf für die xref-Tabelle
+  tell() benötigt.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import mmap
+import os
+import tempfile
+from typing import IO, Any, Iterator, Optional, Sequence, Union
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    _PYPDF_AVAILABLE = True
+except ImportError:
+    try:
+        from PyPDF2 import PdfReader, PdfWriter  # type: ignore
+        _PYPDF_AVAILABLE = True
+    except ImportError:
+        PdfReader = PdfWriter = None  # type: ignore
+        _PYPDF_AVAILABLE = False
+
+PdfSource = Union[str, "os.PathLike[str]", bytes, bytearray, memoryview, IO[bytes]]
+PdfTarget = Union[str, "os.PathLike[str]", IO[bytes]]
+
+
+class _PositionTrackingWriter(io.RawIOBase):
+    """Schreib-Adapter für Pipes: zählt die geschriebenen Bytes für tell()."""
+
+    def __init__(self, raw: IO[bytes]):
+        super().__init__()
+        self._raw = raw
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._raw.write(data)
+        size = len(data)
+        self._position += size
+        return size
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        self._raw.flush()
+
+
+def _is_path(value: Any) -> bool:
+    return isinstance(value, (str, os.PathLike))
+
+
+@contextlib.contextmanager
+def open_pdf_source(source: PdfSource) -> Iterator[IO[bytes]]:
+    """Liefert einen lesbaren Stream für source, ohne Pfade vollständig einzulesen."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+        return
+    if _is_path(source):
+        with open(source, "rb") as handle:
+            try:
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):  # leere Datei oder mmap nicht unterstützt
+                yield handle
+                return
+            try:
+                yield mapped  # type: ignore[misc]
+            finally:
+                mapped.close()
+        return
+    if hasattr(source, "seek"):
+        source.seek(0)
+    yield source  # type: ignore[misc]
+
+
+def write_pdf(writer: Any, target: PdfTarget) -> None:
+    """Schreibt einen PdfWriter nach target (Pfad atomar, Stream/Pipe direkt)."""
+    if _is_path(target):
+        target_path = os.fspath(target)
+        directory = os.path.dirname(os.path.abspath(target_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".pdf", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                writer.write(handle)
+            os.replace(tmp_path, target_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        return
+    try:
+        seekable = target.seekable()
+    except (AttributeError, ValueError):
+        seekable = False
+    if seekable:
+        writer.write(target)
+    else:
+        writer.write(_PositionTrackingWriter(target))
+    with contextlib.suppress(AttributeError, ValueError):
+        target.flush()
+
+
+def write_merged_pdf(
+    sources: Sequence[Optional[PdfSource]],
+    target: PdfTarget,
+    skip_invalid: bool = True,
+) -> int:
+    """Hängt alle Seiten aus sources aneinander und schreibt sie nach target.
+
+    None-Einträge und nicht existierende Pfade werden übersprungen; unlesbare
+    Quellen ebenfalls, sofern skip_invalid gesetzt ist. Rückgabe: Seitenzahl.
+    """
+    if not _PYPDF_AVAILABLE:
+        raise RuntimeError("PyPDF ist nicht verfügbar für das Zusammenführen von PDFs")
+    writer = PdfWriter()
+    with contextlib.ExitStack() as stack:
+        for source in sources:
+            if source is None or (_is_path(source) and not os.path.exists(source)):
+                continue
+            try:
+                reader = PdfReader(stack.enter_context(open_pdf_source(source)))
+                for page in reader.pages:
+                    writer.add_page(page)
+            except Exception as e:
+                if not skip_invalid:
+                    raise
+                print(f"WARN: PDF-Quelle übersprungen ({_describe(source)}): {e}")
+        page_count = len(writer.pages)
+        # Quellen erst nach dem Schreiben schließen: pypdf liest Seiteninhalte lazy
+        write_pdf(writer, target)
+    return page_count
+
+
+def merge_pdfs_to_bytes(sources: Sequence[Optional[PdfSource]], skip_invalid: bool = True) -> bytes:
+    """Wie write_merged_pdf, liefert das Ergebnis aber als bytes (für bestehende Aufrufer)."""
+    output = io.BytesIO()
+    write_merged_pdf(sources, output, skip_invalid=skip_invalid)
+    return output.getvalue()
+
+
+def spool_pdf(data: Union[bytes, IO[bytes]], directory: Optional[str] = None, prefix: str = "angebot_") -> str:
+    """Schreibt ein gerendertes PDF in eine temporäre Datei und liefert deren Pfad."""
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=".pdf", dir=directory)
+    with os.fdopen(fd, "wb") as handle:
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            handle.write(data)
+        else:
+            if hasattr(data, "seek"):
+                data.seek(0)
+            while True:
+                chunk = data.read(1024 * 1024)
+                if not chunk:
+                    break
+                handle.write(chunk)
+    return path
+
+
+def _describe(source: Any) -> str:
+    if _is_path(source):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"{len(source)} Bytes"
+    return type(source).__name__
+
+
+__all__ = [
+    "open_pdf_source",
+    "write_pdf",
+    "write_merged_pdf",
+    "merge_pdfs_to_bytes",
+    "spool_pdf",
+]
@@ -0,0 +1,209 @@
+"""
+pdf_template_engine/coords_layout.py
+
+Kompilierte Layouts der Koordinatendateien (coords/seiteX.yml, coords_wp/wp_seiteX.yml).
+
+Die YML-Dateien werden einmal geparst und als JSON unter data/layout_cache/
+abgelegt. Gültig ist ein Eintrag, solange mtime und Größe der Quelldatei
+übereinstimmen; ändern sich nur diese (z.B. nach einem Checkout), entscheidet
+der SHA-256 des Inhalts, ob neu geparst werden muss. Pro Prozess wird das
+kompilierte Layout zusätzlich im Speicher gehalten.
+
+Kompilierte Elemente enthalten neben den Rohfeldern (text, position, font,
+font_size, color) bereits aufgelöste Zeichenparameter:
+- resolved_font: für ReportLab nutzbarer Schriftname
+- fill_color: reportlab Color
+- placeholder_key: Schlüssel aus PLACEHOLDER_MAPPING (oder None)
+- draw_x / draw_y: Textursprung auf der Seite (y von unten, Basis = y1)
+
+Die Elemente werden zwischen Aufrufen geteilt und dürfen nicht verändert werden.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from reportlab.lib.colors import Color
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+
+from .placeholders import PLACEHOLDER_MAPPING
+
+LAYOUT_FORMAT_VERSION = 1
+CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "layout_cache"
+
+# Schriftnamen aus den Koordinatendateien, die ReportLab nicht kennt
+_FONT_ALIASES = {
+    "Helvetica-Regular": "Helvetica",
+    "Arial": "Helvetica",
+    "Arial-Regular": "Helvetica",
+    "Arial-Bold": "Helvetica-Bold",
+}
+
+_NUMBER_RE = re.compile(r"[-+]?[0-9]*[\.,]?[0-9]+")
+
+_MEMORY_CACHE: Dict[Tuple[str, float], Tuple[Tuple[int, int], List[Dict[str, Any]]]] = {}
+_MEMORY_LOCK = threading.Lock()
+
+
+def parse_coords_text(content: str) -> List[Dict[str, Any]]:
+    """Parst den Inhalt einer seiteX.yml.
+
+    Einträge sind durch eine Zeile beginnend mit '-' oder '---' getrennt.
+    Unterstützte Felder: Text, Position(x0,y0,x1,y1), Schriftart, Schriftgröße, Farbe
+    """
+    elements: List[Dict[str, Any]] = []
+    current: Dict[str, Any] = {}
+    for raw in content.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        # Einträge sind durch Linien aus '-' getrennt (z.B. "----------------------------------------")
+        if (line.startswith("---") or (set(line) == {"-"} and len(line) >= 3)) and current:
+            elements.append(current)
+            current = {}
+            continue
+        if line.startswith("Text:"):
+            current["text"] = line.split(":", 1)[1].strip()
+        elif line.startswith("Position:"):
+            # Zahlen extrahieren (auch mit Komma als Dezimaltrenner)
+            nums = [n.replace(",", ".") for n in _NUMBER_RE.findall(line)]
+            if len(nums) >= 4:
+                current["position"] = tuple(float(n) for n in nums[:4])
+        elif line.startswith("Schriftart:"):
+            current["font"] = line.split(":", 1)[1].strip()
+        elif line.lower().startswith("schriftgröße:") or line.lower().startswith("schriftgroesse:"):
+            try:
+                current["font_size"] = float(line.split(":", 1)[1].strip().replace(",", "."))
+            except Exception:
+                current["font_size"] = 10.0
+        elif line.startswith("Farbe:"):
+            try:
+                val = line.split(":", 1)[1].strip()
+                current["color"] = int(val, 16) if val.lower().startswith("0x") else int(val)
+            except Exception:
+                current["color"] = 0
+    if current:
+        elements.append(current)
+    return elements
+
+
+def resolve_font(font_name: Optional[str]) -> str:
+    """Liefert einen bei ReportLab bekannten Schriftnamen (Fallback Helvetica)."""
+    name = _FONT_ALIASES.get(font_name or "", font_name or "Helvetica")
+    try:
+        pdfmetrics.getFont(name)
+    except Exception:
+        return "Helvetica"
+    return name
+
+
+def int_to_color(value: int) -> Color:
+    """Wandelt einen Integer (0xRRGGBB) in reportlab Color um."""
+    r = ((value >> 16) & 0xFF) / 255.0
+    g = ((value >> 8) & 0xFF) / 255.0
+    b = (value & 0xFF) / 255.0
+    return Color(r, g, b)
+
+
+def _cache_file(path: Path) -> Path:
+    digest = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+    return CACHE_DIR / f"{path.stem}_{digest}.json"
+
+
+def _read_disk_cache(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with _cache_file(path).open(encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("format") != LAYOUT_FORMAT_VERSION:
+        return None
+    return cached
+
+
+def _write_disk_cache(path: Path, signature: Tuple[int, int], sha256: str, elements: List[Dict[str, Any]]) -> None:
+    target = _cache_file(path)
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(
+                {"format": LAYOUT_FORMAT_VERSION, "mtime_ns": signature[0], "size": signature[1],
+                 "sha256": sha256, "elements": elements},
+                f,
+            )
+        os.replace(tmp, target)
+    except OSError:
+        # Cache ist optional (z.B. schreibgeschütztes Installationsverzeichnis)
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def _load_parsed(path: Path, signature: Tuple[int, int]) -> List[Dict[str, Any]]:
+    cached = _read_disk_cache(path)
+    if cached and (cached.get("mtime_ns"), cached.get("size")) == signature:
+        return cached["elements"]
+    raw = path.read_bytes()
+    sha256 = hashlib.sha256(raw).hexdigest()
+    if cached and cached.get("sha256") == sha256:
+        elements = cached["elements"]
+    else:
+        elements = parse_coords_text(raw.decode("utf-8", errors="ignore"))
+    _write_disk_cache(path, signature, sha256, elements)
+    return elements
+
+
+def _compile(elements: List[Dict[str, Any]], page_height: float) -> List[Dict[str, Any]]:
+    compiled = []
+    for raw in elements:
+        elem = dict(raw)
+        if "position" in elem:
+            elem["position"] = tuple(elem["position"])  # JSON liefert Listen
+        pos = elem.get("position", (0.0, 0.0, 0.0, 0.0))
+        text = elem.get("text", "")
+        font_size = float(elem.get("font_size", 10.0))
+        color_int = int(elem.get("color", 0))
+        elem.update(
+            resolved_font=resolve_font(elem.get("font", "Helvetica")),
+            fill_color=int_to_color(color_int),
+            placeholder_key=PLACEHOLDER_MAPPING.get(text),
+            draw_x=pos[0] if len(pos) == 4 else 0.0,
+            draw_y=page_height - pos[3] if len(pos) == 4 else 0.0,
+        )
+        elem["font_size"] = font_size
+        elem["color"] = color_int
+        compiled.append(elem)
+    return compiled
+
+
+def load_layout(path: Path, page_height: float = A4[1]) -> List[Dict[str, Any]]:
+    """Kompiliertes Layout einer Koordinatendatei; leere Liste, wenn sie fehlt."""
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return []
+    signature = (stat.st_mtime_ns, stat.st_size)
+    memory_key = (str(path.resolve()), float(page_height))
+    with _MEMORY_LOCK:
+        hit = _MEMORY_CACHE.get(memory_key)
+    if hit and hit[0] == signature:
+        return hit[1]
+    compiled = _compile(_load_parsed(path, signature), page_height)
+    with _MEMORY_LOCK:
+        _MEMORY_CACHE[memory_key] = (signature, compiled)
+    return compiled
+
+
+def clear_memory_cache() -> None:
+    with _MEMORY_LOCK:
+        _MEMORY_CACHE.clear()
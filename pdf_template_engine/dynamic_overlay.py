@@ -7,10 +7,15 @@ pdf_templates_static/notext/nt_nt_01.pdf … nt_nt_07.pdf.
 """
 
 from __future__ import annotations
+import copy
+import hashlib
 import io
+import os
 import re
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
@@ -26,7 +31,13 @@ except Exception:  # pragma: no cover
     PageObject = None  # type: ignore
 from pathlib import Path
 
-from .placeholders import PLACEHOLDER_MAPPING
+from .coords_layout import int_to_color, load_layout
+from pdf_output_stream import PdfSource, PdfTarget, merge_pdfs_to_bytes, write_merged_pdf
+
+try:
+    import image_asset_store  # normalisierte Druckvarianten für Logos/Produktbilder
+except ImportError:  # pragma: no cover
+    image_asset_store = None  # type: ignore
 
 # Optional: Admin-Settings laden, um Overlay-Verhalten dynamisch zu steuern
 try:
@@ -49,9 +60,66 @@ def _to_bool(val: Any, default: bool = False) -> bool:
     return default
 
 
-def _as_image_reader(val: Any) -> Any:
+# Dekodierte Bilder (Logos, Produktbilder) je Inhalts-Hash, damit wiederholte
+# Angebote mit denselben Komponenten nicht erneut Base64 dekodieren und parsen.
+_IMAGE_READER_CACHE_SIZE = int(os.environ.get("KAKERLAKE_IMAGE_READER_CACHE_SIZE", "64"))
+_IMAGE_READER_CACHE: "OrderedDict[str, Any]" = OrderedDict()
+_IMAGE_READER_LOCK = threading.Lock()
+_NOT_AN_IMAGE = object()  # Marker: Inhalt ist dekodierbar, aber kein unterstütztes Bild
+
+
+def clear_image_reader_cache() -> None:
+    with _IMAGE_READER_LOCK:
+        _IMAGE_READER_CACHE.clear()
+
+
+def _reader_for_use(entry: Any) -> Any:
+    """Eigene Kopie je Aufruf: geteiltes (bereits geladenes) Bild, eigener Dateizeiger für JPEG-Passthrough."""
+    if entry is _NOT_AN_IMAGE:
+        return None
+    raw, reader = entry
+    clone = copy.copy(reader)
+    clone.fp = io.BytesIO(raw)
+    if "jpeg_fh" in reader.__dict__:
+        # jpeg_fh ist an das Original gebunden; neu binden, damit es clone.fp liefert
+        clone.jpeg_fh = clone._jpeg_fh
+    return clone
+
+
+def _image_reader_from_base64(s: str, slot: Optional[str] = None) -> Any:
+    """ImageReader aus Base64 (LRU nach Inhalts-Hash und Slot); wirft, wenn nicht dekodierbar.
+
+    Mit slot wird die Druckvariante aus image_asset_store verwendet, sodass dasselbe
+    Logo im Dokument immer mit denselben (kleinen) Bytes eingebettet wird.
+    """
+    key = hashlib.sha1(s.encode("ascii", errors="ignore")).hexdigest() + (f":{slot}" if slot else "")
+    with _IMAGE_READER_LOCK:
+        entry = _IMAGE_READER_CACHE.get(key)
+        if entry is not None:
+            _IMAGE_READER_CACHE.move_to_end(key)
+    if entry is None:
+        raw = base64.b64decode(s)
+        # Prüfe Bildformat - nur PNG/JPEG unterstützt
+        if raw.startswith(b'<?xml') or raw.startswith(b'<svg'):
+            entry = _NOT_AN_IMAGE  # SVG nicht unterstützt
+        else:
+            if slot and image_asset_store is not None:
+                raw = image_asset_store.print_variant(raw, slot) or raw
+            reader = ImageReader(io.BytesIO(raw))
+            image = getattr(reader, "_image", None)
+            if image is not None and hasattr(image, "load"):
+                image.load()  # Pixel einmal laden, danach nur noch lesend geteilt
+            entry = (raw, reader)
+        with _IMAGE_READER_LOCK:
+            _IMAGE_READER_CACHE[key] = entry
+            while len(_IMAGE_READER_CACHE) > max(_IMAGE_READER_CACHE_SIZE, 0):
+                _IMAGE_READER_CACHE.popitem(last=False)
+    return _reader_for_use(entry)
+
+
+def _as_image_reader(val: Any, slot: Optional[str] = None) -> Any:
     """Erzeugt einen ImageReader aus Base64, Data-URL oder lokalem Dateipfad.
-    Gibt None zurück, wenn nicht lesbar."""
+    Gibt None zurück, wenn nicht lesbar. slot: Bildplatz aus image_asset_store.SLOT_SIZES_PT."""
     try:
         if not val:
             return None
@@ -63,13 +131,7 @@ def _as_image_reader(val: Any) -> Any:
         
         # Versuche Base64-Decode
         try:
-            raw = base64.b64decode(s)
-            
-            # Prüfe Bildformat - nur PNG/JPEG unterstützt
-            if raw.startswith(b'<?xml') or raw.startswith(b'<svg'):
-                return None  # SVG nicht unterstützt
-            
-            return ImageReader(io.BytesIO(raw))
+            return _image_reader_from_base64(s, slot)
         except Exception:
             pass
         
@@ -128,61 +190,8 @@ def _draw_global_watermark(c: canvas.Canvas, page_width: float, page_height: flo
 
 
 def parse_coords_file(path: Path) -> List[Dict[str, Any]]:
-    """Liest eine seiteX.yml und gibt eine Liste von Einträgen zurück.
-
-    Einträge sind durch eine Zeile beginnend mit '-' oder '---' getrennt.
-    Unterstützte Felder: Text, Position(x0,y0,x1,y1), Schriftart, Schriftgröße, Farbe
-    """
-    elements: List[Dict[str, Any]] = []
-    current: Dict[str, Any] = {}
-    if not path.exists():
-        return elements
-    with path.open(encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line:
-                continue
-            # Einträge sind durch Linien aus '-' getrennt (z.B. "----------------------------------------")
-            if (line.startswith("---") or (set(line) == {"-"} and len(line) >= 3)) and current:
-                elements.append(current)
-                current = {}
-                continue
-            if line.startswith("Text:"):
-                current["text"] = line.split(":", 1)[1].strip()
-            elif line.startswith("Position:"):
-                # Zahlen extrahieren (auch mit Komma als Dezimaltrenner)
-                nums = re.findall(r"[-+]?[0-9]*[\.,]?[0-9]+", line)
-                nums = [n.replace(",", ".") for n in nums]
-                if len(nums) >= 4:
-                    current["position"] = tuple(float(n) for n in nums[:4])
-            elif line.startswith("Schriftart:"):
-                current["font"] = line.split(":", 1)[1].strip()
-            elif line.lower().startswith("schriftgröße:") or line.lower().startswith("schriftgroesse:"):
-                try:
-                    val = line.split(":", 1)[1].strip().replace(",", ".")
-                    current["font_size"] = float(val)
-                except Exception:
-                    current["font_size"] = 10.0
-            elif line.startswith("Farbe:"):
-                try:
-                    val = line.split(":", 1)[1].strip()
-                    if val.lower().startswith("0x"):
-                        current["color"] = int(val, 16)
-                    else:
-                        current["color"] = int(val)
-                except Exception:
-                    current["color"] = 0
-        if current:
-            elements.append(current)
-    return elements
-
-
-def int_to_color(value: int) -> Color:
-    """Wandelt einen Integer (0xRRGGBB) in reportlab Color um."""
-    r = ((value >> 16) & 0xFF) / 255.0
-    g = ((value >> 8) & 0xFF) / 255.0
-    b = (value & 0xFF) / 255.0
-    return Color(r, g, b)
+    """Liest eine seiteX.yml als kompiliertes Layout (siehe coords_layout.load_layout)."""
+    return load_layout(path)
 
 
 def _draw_company_logo(c: canvas.Canvas, dynamic_data: Dict[str, str], page_width: float, page_height: float) -> None:
@@ -191,8 +200,9 @@ def _draw_company_logo(c: canvas.Canvas, dynamic_data: Dict[str, str], page_widt
     if not b64:
         return
     try:
-        img_bytes = base64.b64decode(b64)
-        img = ImageReader(io.BytesIO(img_bytes))
+        img = _as_image_reader(b64, "company_logo")
+        if img is None:
+            return
         # Zielfläche: max Breite/Höhe
         max_w, max_h = 120, 50  # Punkte
         c.saveState()
@@ -407,7 +417,7 @@ def generate_overlay(coords_dir: Path, dynamic_data: Dict[str, str], total_pages
 
         for elem in elements:
             text = elem.get("text", "")
-            key = PLACEHOLDER_MAPPING.get(text)
+            key = elem["placeholder_key"]
             
             # Spezielle Behandlung für Logo-Platzhalter (als Bilder rendern)
             if text in ["Logomodul", "Logoricht", "Logoakkus"]:
@@ -415,7 +425,7 @@ def generate_overlay(coords_dir: Path, dynamic_data: Dict[str, str], total_pages
                 logo_b64 = dynamic_data.get(key, "") if key else ""
                 print(f"DEBUG: Logo-Key: {key}, Logo-Daten vorhanden: {bool(logo_b64)}")
                 if logo_b64:
-                    img = _as_image_reader(logo_b64)
+                    img = _as_image_reader(logo_b64, "brand_logo")
                     print(f"DEBUG: Image Reader erfolgreich: {img is not None}")
                     if img is not None:
                         pos = elem.get("position", (0, 0, 0, 0))
@@ -443,22 +453,16 @@ def generate_overlay(coords_dir: Path, dynamic_data: Dict[str, str], total_pages
             
             # Normale Text-Behandlung
             draw_text = (dynamic_data.get(key, "") if key else text)
-            pos = elem.get("position", (0, 0, 0, 0))
+            pos = elem.get("position") or (0, 0, 0, 0)
             if len(pos) == 4:
                 x0, y0, x1, y1 = pos
-                draw_x = x0
-                draw_y = page_height - y1
-            else:
-                draw_x = 0
-                draw_y = 0
-            font_name = elem.get("font", "Helvetica")
-            font_size = float(elem.get("font_size", 10.0))
-            try:
-                c.setFont(font_name, font_size)
-            except Exception:
-                c.setFont("Helvetica", font_size)
-            color_int = int(elem.get("color", 0))
-            c.setFillColor(int_to_color(color_int))
+            draw_x = elem["draw_x"]
+            draw_y = elem["draw_y"]
+            font_name = elem["resolved_font"]
+            font_size = elem["font_size"]
+            c.setFont(font_name, font_size)
+            color_int = elem["color"]
+            c.setFillColor(elem["fill_color"])
 
             # Seite 3: Ersetzte / entfernte statische 10-Jahres-Kosten NICHT erneut zeichnen
             if i == 3 and text in {"46.296,00 €", "58.230,61 €"}:
@@ -796,7 +800,7 @@ def _draw_page4_component_images(c: canvas.Canvas, dynamic_data: Dict[str, str],
             }),
         ]
         for img_b64, pos in images:
-            img = _as_image_reader(img_b64)
+            img = _as_image_reader(img_b64, "page4_component")
             if img is None:
                 continue
             max_w = float(pos.get("max_w", 140.0))
@@ -871,120 +875,171 @@ def _remove_text_from_page(page, texts_to_remove: list[str]):
         pass  # Bei Fehlern einfach ignorieren
 
 
+# Vorbereitete Hintergrundseiten (Text entfernt, haus.pdf bereits eingesetzt) pro
+# bg_dir. Invalidiert, sobald sich mtime/Größe einer Quelldatei ändert.
+_BACKGROUND_CACHE: Dict[str, Tuple[tuple, Optional[bytes], Tuple[bool, ...]]] = {}
+_BACKGROUND_LOCK = threading.Lock()
+
+
+def _background_candidates(bg_dir: Path, page_num: int) -> List[Path]:
+    # Unterstütze beide Muster: nt_nt_XX.pdf und nt_XX.pdf
+    return [bg_dir / f"nt_nt_{page_num:02d}.pdf", bg_dir / f"nt_{page_num:02d}.pdf"]
+
+
+def _background_signature(bg_dir: Path) -> tuple:
+    paths = [p for n in range(1, 8) for p in _background_candidates(bg_dir, n)] + [bg_dir / "haus.pdf"]
+    signature = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _compose_background_page(page_num: int, bg_dir: Path):
+    """Hintergrundseite ohne Overlay; None, wenn weder nt_nt_XX.pdf noch (Seite 1) haus.pdf lesbar ist."""
+    bg_page = None
+    for cand in _background_candidates(bg_dir, page_num):
+        if cand.exists():
+            try:
+                bg_reader = PdfReader(str(cand))
+                bg_page = bg_reader.pages[0]
+                break
+            except Exception:
+                continue
+
+    # Optional: Auf Seite 1 zusätzlich eine weitere statische PDF (haus.pdf) mergen
+    # Reihenfolge: Basis (nt_nt_01.pdf) -> haus.pdf -> Overlay
+    extra_bg_page = None
+    if page_num == 1:
+        haus_path = bg_dir / "haus.pdf"
+        if haus_path.exists():
+            try:
+                haus_reader = PdfReader(str(haus_path))
+                extra_bg_page = haus_reader.pages[0]
+            except Exception:
+                extra_bg_page = None
+
+    # Falls kein Standard-Hintergrund vorhanden ist, aber haus.pdf existiert, nutze diese als Basis
+    base_page = bg_page
+    if base_page is None and extra_bg_page is not None:
+        base_page = extra_bg_page
+        extra_bg_page = None  # bereits als Basis gesetzt
+
+    if base_page is not None:
+        # Seite 3: Problematische Legendentexte aus dem Hintergrund entfernen
+        if page_num == 3:
+            texts_to_remove = [
+                "",
+                "", 
+                "",
+                "",
+                ""
+            ]
+            _remove_text_from_page(base_page, texts_to_remove)
+
+        # Falls eine zusätzliche Haus-Seite vorhanden ist, zuerst darüber legen (skaliert 30% und zentriert)
+        if extra_bg_page is not None:
+            try:
+                bw = float(base_page.mediabox.width)
+                bh = float(base_page.mediabox.height)
+                hw = float(extra_bg_page.mediabox.width)
+                hh = float(extra_bg_page.mediabox.height)
+                scale = 0.3  # 70% kleiner
+                tx = (bw - hw * scale) / 2.0
+                ty = (bh - hh * scale) / 2.0
+                t = Transformation().scale(scale, scale).translate(tx, ty)
+                base_page.merge_transformed_page(extra_bg_page, t)
+            except Exception:
+                # Fallback: unskaliert mergen
+                try:
+                    base_page.merge_page(extra_bg_page)
+                except Exception:
+                    pass
+        return base_page
+    return None
+
+
+def _prepared_backgrounds(bg_dir: Path) -> Tuple[Optional[bytes], Tuple[bool, ...]]:
+    """Vorbereitete 7-seitige Hintergrund-PDF und pro Seite, ob ein Hintergrund existiert."""
+    cache_key = str(Path(bg_dir).resolve())
+    signature = _background_signature(bg_dir)
+    with _BACKGROUND_LOCK:
+        hit = _BACKGROUND_CACHE.get(cache_key)
+    if hit and hit[0] == signature:
+        return hit[1], hit[2]
+
+    writer = PdfWriter()
+    present = []
+    for page_num in range(1, 8):
+        page = _compose_background_page(page_num, bg_dir)
+        present.append(page is not None)
+        if page is None:
+            # Platzhalter, damit Seitenindex und Seitennummer übereinstimmen
+            writer.add_blank_page(width=A4[0], height=A4[1])
+        else:
+            writer.add_page(page)
+    prepared: Optional[bytes] = None
+    if any(present):
+        out = io.BytesIO()
+        writer.write(out)
+        prepared = out.getvalue()
+    with _BACKGROUND_LOCK:
+        _BACKGROUND_CACHE[cache_key] = (signature, prepared, tuple(present))
+    return prepared, tuple(present)
+
+
+def clear_background_cache() -> None:
+    with _BACKGROUND_LOCK:
+        _BACKGROUND_CACHE.clear()
+
+
 def merge_with_background(overlay_bytes: bytes, bg_dir: Path) -> bytes:
-    """Verschmilzt das Overlay mit nt_nt_01.pdf … nt_nt_07.pdf aus bg_dir."""
+    """Verschmilzt das Overlay mit nt_nt_01.pdf … nt_nt_07.pdf aus bg_dir.
+
+    Die Hintergründe werden nur einmal gelesen und vorbereitet (siehe
+    _prepared_backgrounds); pro Angebot bleibt ein Merge je Seite.
+    """
     overlay_reader = PdfReader(io.BytesIO(overlay_bytes))
+    prepared, present = _prepared_backgrounds(bg_dir)
+    # Eigener Reader pro Aufruf: merge_page verändert die Hintergrundseite
+    bg_reader = PdfReader(io.BytesIO(prepared)) if prepared else None
     writer = PdfWriter()
     for page_num in range(1, 8):
-        # Unterstütze beide Muster: nt_nt_XX.pdf und nt_XX.pdf
-        candidates = [bg_dir / f"nt_nt_{page_num:02d}.pdf", bg_dir / f"nt_{page_num:02d}.pdf"]
-        bg_page = None
-        for cand in candidates:
-            if cand.exists():
-                try:
-                    bg_reader = PdfReader(str(cand))
-                    bg_page = bg_reader.pages[0]
-                    break
-                except Exception:
-                    continue
-        # Fallback: Wenn kein Hintergrund vorhanden/lesbar ist, füge nur Overlay-Seite ein
         ov_page = overlay_reader.pages[page_num - 1]
-
-        # Optional: Auf Seite 1 zusätzlich eine weitere statische PDF (haus.pdf) mergen
-        # Reihenfolge: Basis (nt_nt_01.pdf) -> haus.pdf -> Overlay
-        extra_bg_page = None
-        if page_num == 1:
-            haus_path = bg_dir / "haus.pdf"
-            if haus_path.exists():
-                try:
-                    haus_reader = PdfReader(str(haus_path))
-                    extra_bg_page = haus_reader.pages[0]
-                except Exception:
-                    extra_bg_page = None
-
-        # Falls kein Standard-Hintergrund vorhanden ist, aber haus.pdf existiert, nutze diese als Basis
-        base_page = bg_page
-        if base_page is None and extra_bg_page is not None:
-            base_page = extra_bg_page
-            extra_bg_page = None  # bereits als Basis gesetzt
-
-        if base_page is not None:
-            # Seite 3: Problematische Legendentexte aus dem Hintergrund entfernen
-            if page_num == 3:
-                texts_to_remove = [
-                    "",
-                    "", 
-                    "",
-                    "",
-                    ""
-                ]
-                _remove_text_from_page(base_page, texts_to_remove)
-                
-            # Falls eine zusätzliche Haus-Seite vorhanden ist, zuerst darüber legen (skaliert 30% und zentriert)
-            if extra_bg_page is not None:
-                try:
-                    bw = float(base_page.mediabox.width)
-                    bh = float(base_page.mediabox.height)
-                    hw = float(extra_bg_page.mediabox.width)
-                    hh = float(extra_bg_page.mediabox.height)
-                    scale = 0.3  # 70% kleiner
-                    tx = (bw - hw * scale) / 2.0
-                    ty = (bh - hh * scale) / 2.0
-                    t = Transformation().scale(scale, scale).translate(tx, ty)
-                    base_page.merge_transformed_page(extra_bg_page, t)
-                except Exception:
-                    # Fallback: unskaliert mergen
-                    try:
-                        base_page.merge_page(extra_bg_page)
-                    except Exception:
-                        pass
+        if bg_reader is not None and present[page_num - 1]:
             # Overlay über den zusammengesetzten Hintergrund legen
+            base_page = bg_reader.pages[page_num - 1]
             base_page.merge_page(ov_page)
             writer.add_page(base_page)
         else:
-            # Kein Standard-Hintergrund: nur haus.pdf (falls vorhanden) als Basis, skaliert, dann Overlay
-            if extra_bg_page is not None and PageObject is not None:
-                try:
-                    # Erzeuge leere Basis-Seite in A4 (oder Größe des Overlay)
-                    try:
-                        bw = float(ov_page.mediabox.width)
-                        bh = float(ov_page.mediabox.height)
-                    except Exception:
-                        bw, bh = A4
-                    base = PageObject.create_blank_page(width=bw, height=bh)  # type: ignore
-                    hw = float(extra_bg_page.mediabox.width)
-                    hh = float(extra_bg_page.mediabox.height)
-                    scale = 0.3
-                    tx = (bw - hw * scale) / 2.0
-                    ty = (bh - hh * scale) / 2.0
-                    t = Transformation().scale(scale, scale).translate(tx, ty)
-                    base.merge_transformed_page(extra_bg_page, t)
-                    base.merge_page(ov_page)
-                    writer.add_page(base)
-                    continue
-                except Exception:
-                    pass
-            # Fallback: nur Overlay
+            # Fallback: Wenn kein Hintergrund vorhanden/lesbar ist, füge nur Overlay-Seite ein
             writer.add_page(ov_page)
     out = io.BytesIO()
     writer.write(out)
     return out.getvalue()
 
 
-def append_additional_pages(base_pdf: bytes, additional_pdf: Optional[bytes]) -> bytes:
-    """Hängt optional weitere Seiten hinten an."""
-    if not additional_pdf:
-        return base_pdf
-    base_reader = PdfReader(io.BytesIO(base_pdf))
-    add_reader = PdfReader(io.BytesIO(additional_pdf))
-    writer = PdfWriter()
-    for p in base_reader.pages:
-        writer.add_page(p)
-    for p in add_reader.pages:
-        writer.add_page(p)
-    out = io.BytesIO()
-    writer.write(out)
-    return out.getvalue()
+def append_additional_pages(
+    base_pdf: PdfSource,
+    additional_pdf: Optional[PdfSource],
+    output: Optional[PdfTarget] = None,
+) -> Optional[bytes]:
+    """Hängt optional weitere Seiten hinten an.
+
+    base_pdf/additional_pdf dürfen bytes, Streams oder Dateipfade sein; Pfade
+    (z.B. Datenblätter) werden referenziert statt eingelesen. Mit output
+    (Pfad oder beschreibbarer Stream) wird direkt dorthin geschrieben und
+    None geliefert, sonst das Ergebnis als bytes.
+    """
+    if output is None:
+        if not additional_pdf and isinstance(base_pdf, bytes):
+            return base_pdf
+        return merge_pdfs_to_bytes([base_pdf, additional_pdf or None], skip_invalid=False)
+    write_merged_pdf([base_pdf, additional_pdf or None], output, skip_invalid=False)
+    return None
 
 
 def generate_custom_offer_pdf(
@@ -12,23 +12,26 @@ import re
 from functools import lru_cache
 import math
 
-try:
-    from ..calculations import perform_calculations
-except Exception:
-    # Fall B: Skript wird direkt ausgeführt -> Parent-Verzeichnis in sys.path schieben
-    import os, sys
-    _THIS_DIR = os.path.dirname(__file__)
-    _PARENT = os.path.abspath(os.path.join(_THIS_DIR, ".."))
-    if _PARENT not in sys.path:
-        sys.path.insert(0, _PARENT)
-    from calculations import perform_calculations  # noqa: E402
+from lookup_tables import DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT  # Spezifische Erträge (gemeinsame Tabelle)
 
 def USE_PERFORM_CALCULATIONS(context: Dict[str, Any]) -> Dict[str, Any]:
     """
     DEF Block:
     Nutzt calculations.perform_calculations(context) und liefert die berechneten Werte
     zurück. Side-effect-frei; passt sich an bestehende Struktur an.
+    Der Rechenkern wird erst hier importiert, damit das Laden der Platzhalter
+    (PDF-Bridge, Tests) nicht die Kosten von calculations trägt.
     """
+    try:
+        from ..calculations import perform_calculations
+    except Exception:
+        # Fall B: Skript wird direkt ausgeführt -> Parent-Verzeichnis in sys.path schieben
+        import os, sys
+        _THIS_DIR = os.path.dirname(__file__)
+        _PARENT = os.path.abspath(os.path.join(_THIS_DIR, ".."))
+        if _PARENT not in sys.path:
+            sys.path.insert(0, _PARENT)
+        from calculations import perform_calculations  # noqa: E402
     return perform_calculations(context)
 # --- /import shim ---
 # === Neuer Einspeisetarif-Block (integriert aus feed_in_tariffs.py) ===
@@ -48,22 +51,8 @@ _DEFAULT_FEED_IN_TARIFFS_FALLBACK = {
     ],
 }
 
-# Spezifische Jahreserträge nach Ausrichtung und Neigung (aus admin_panel.py)
-_DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT = {
-    "Süd_0":1050.0, "Süd_15":1080.0, "Süd_30":1100.0, "Süd_45":1080.0, "Süd_60":1050.0,
-    "Südost_0":980.0, "Südost_15":1030.0, "Südost_30":1070.0, "Südost_45":1030.0, "Südost_60":980.0,
-    "Südwest_0":980.0, "Südwest_15":1030.0, "Südwest_30":1070.0, "Südwest_45":1030.0, "Südwest_60":980.0,
-    "Ost_0":950.0, "Ost_15":980.0, "Ost_30":1000.0, "Ost_45":980.0, "Ost_60":950.0,
-    "West_0":950.0, "West_15":980.0, "West_30":1000.0, "West_45":980.0, "West_60":950.0,
-    "Nord_0":800.0, "Nord_15":820.0, "Nord_30":850.0, "Nord_45":820.0, "Nord_60":850.0,
-    "Nordost_0":850.0, "Nordost_15":870.0, "Nordost_30":890.0, "Nordost_45":870.0, "Nordost_60":850.0,
-    "Nordwest_0":850.0, "Nordwest_15":870.0, "Nordwest_30":890.0, "Nordwest_45":870.0, "Nordwest_60":850.0,
-    "Flachdach_0":950.0, "Flachdach_15":1000.0,
-    "Sonstige_0":1000.0, "Sonstige_15":1050.0, "Sonstige_30":1080.0, "Sonstige_45":1050.0, "Sonstige_60":1000.0
-}
-
 DEFAULT_FEED_IN_TARIFFS_FALLBACK = _DEFAULT_FEED_IN_TARIFFS_FALLBACK
-DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT = _DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT
+
 
 def _fit_to_float(x: Any) -> float:
     try:
@@ -2403,8 +2392,8 @@ def build_dynamic_data(project_data: Dict[str, Any] | None,
     # === NEUE LOGO-INTEGRATION FÜR SEITE 4 ===
     # Logo-Platzhalter für Hersteller basierend auf ausgewählten Produkten
     try:
-        # Import der Logo-Funktionen
-        from brand_logo_db import get_logos_for_brands
+        # Import der Logo-Funktionen (Admin-Settings + Tabelle gebündelt, case-insensitiv)
+        from brand_logo_db import resolve_brand_logos
         
         # Hersteller aus Projektdaten extrahieren (lokale Implementierung)
         def extract_brands_from_project_data(project_data_local: Dict[str, Any]) -> Dict[str, str]:
@@ -2450,7 +2439,7 @@ def build_dynamic_data(project_data: Dict[str, Any] | None,
             brand_names = list(brands_by_category.values())
             unique_brands = list(set(brand_names))  # Duplikate entfernen
             
-            logos_data = get_logos_for_brands(unique_brands)
+            logos_data = resolve_brand_logos(unique_brands)
             
             # Logo-Platzhalter mit Base64-Daten befüllen - die exakten Namen aus seite4.yml verwenden
             logo_mapping = {
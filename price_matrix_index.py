@@ -0,0 +1,167 @@
+# price_matrix_index.py - Kompilierte Preis-Matrix für schnelle Lookups
+"""
+Die Preis-Matrix (Modulanzahl x Speicher-Spalte) wird einmal je Stand der
+Admin-Settings in ein kompaktes NumPy-Format übersetzt:
+
+- module_counts-<gen>.npy  (R,)    aufsteigende Modulanzahlen (Zeilen der Matrix)
+- prices-<gen>.npy         (R, C)  Preise, NaN für leere Zellen
+- manifest.json                    Spaltennamen (Original), Quelle, Fingerabdruck,
+                                   Dateinamen der aktuellen Generation
+
+Jede Generation bekommt neue Dateinamen, weil andere Prozesse (Worker-Pool,
+Bridge) die Dateien gemappt halten können (siehe atomic_files).
+
+Lookups suchen die Zeile per searchsorted (größte Modulanzahl <= Anfrage) und
+die Spalte über eine normalisierte Namens-Map (strip/lower). Gespeichert wird
+neben der Datenbank (data/price_matrix_index/), damit ein frischer Prozess
+(z.B. die Calculation-Bridge) weder den Excel-Blob lesen noch pandas laden muss.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from atomic_files import new_generation, publish_generation, write_array_atomic
+
+INDEX_FORMAT_VERSION = 2
+INDEX_DIR_NAME = "price_matrix_index"
+MANIFEST_NAME = "manifest.json"
+
+
+def normalize_column(name: Any) -> str:
+    return str(name).strip().lower()
+
+
+class CompiledPriceMatrix:
+    """Preis-Matrix als sortiertes Zeilen-Array, Spalten-Slot-Map und dichte Preistabelle."""
+
+    def __init__(
+        self,
+        module_counts: np.ndarray,
+        prices: np.ndarray,
+        columns: Sequence[str],
+        source: str = "Keine",
+    ):
+        self.module_counts = module_counts
+        self.prices = prices
+        self.columns = tuple(str(col) for col in columns)
+        self.source = source
+        # Bei doppelten normalisierten Namen gewinnt die letzte Spalte (wie bisher im DataFrame-Lookup)
+        self.slots: Dict[str, int] = {normalize_column(col): slot for slot, col in enumerate(self.columns)}
+
+    @classmethod
+    def from_dataframe(cls, df: Any, source: str = "Keine") -> "CompiledPriceMatrix":
+        """Übersetzt das geparste DataFrame (Index = Modulanzahl) in die kompakte Form."""
+        counts = np.asarray(df.index, dtype=np.int64)
+        prices = df.to_numpy(dtype=np.float64, na_value=np.nan)
+        order = np.argsort(counts, kind="stable")
+        return cls(counts[order], np.ascontiguousarray(prices[order]), [str(col) for col in df.columns], source)
+
+    @property
+    def empty(self) -> bool:
+        return self.module_counts.size == 0 or self.prices.size == 0
+
+    def row_for(self, module_quantity: int) -> int:
+        """Zeile der größten Modulanzahl <= module_quantity, -1 wenn keine passt."""
+        return int(np.searchsorted(self.module_counts, module_quantity, side="right")) - 1
+
+    def column_slot(self, column: Optional[str]) -> Optional[int]:
+        if column is None:
+            return None
+        return self.slots.get(normalize_column(column))
+
+    def lookup(
+        self,
+        module_quantity: int,
+        column: Optional[str],
+        fallback_column: Optional[str] = None,
+    ) -> Tuple[Optional[int], Optional[float], Optional[str]]:
+        """
+        (Modulanzahl der Matrix-Zeile, Preis, verwendete Spalte). Ist die Spalte
+        unbekannt oder leer, wird fallback_column versucht. Ohne passende Zeile
+        (None, None, None), ohne gültigen Preis (Zeile, None, None).
+        """
+        row = self.row_for(module_quantity)
+        if row < 0:
+            return None, None, None
+        matched_count = int(self.module_counts[row])
+        for candidate in (column, fallback_column):
+            slot = self.column_slot(candidate)
+            if slot is not None and not np.isnan(self.prices[row, slot]):
+                return matched_count, float(self.prices[row, slot]), self.columns[slot]
+        return matched_count, None, None
+
+    def lookup_many(
+        self,
+        module_quantities: Iterable[int],
+        column: Optional[str],
+        fallback_column: Optional[str] = None,
+    ) -> np.ndarray:
+        """Preise für viele Modulanzahlen auf einmal; NaN, wo weder Zeile noch Preis existiert."""
+        quantities = np.asarray(list(module_quantities) if not isinstance(module_quantities, np.ndarray) else module_quantities)
+        rows = np.searchsorted(self.module_counts, quantities, side="right") - 1
+        result = np.full(rows.shape, np.nan)
+        valid = rows >= 0
+        for candidate in (fallback_column, column):  # spezifische Spalte überschreibt den Fallback
+            slot = self.column_slot(candidate)
+            if slot is None:
+                continue
+            values = np.full(rows.shape, np.nan)
+            values[valid] = self.prices[rows[valid], slot]
+            result = np.where(np.isnan(values), result, values)
+        return result
+
+
+def index_dir(data_dir: str) -> str:
+    return os.path.join(data_dir, INDEX_DIR_NAME)
+
+
+def save_index(matrix: CompiledPriceMatrix, directory: str, fingerprint: str) -> None:
+    """
+    Schreibt die Arrays als neue Generation und schaltet zuletzt das Manifest
+    (atomar) um; halbe Stände sind nie gültig, gemappte Dateien bleiben unberührt.
+    """
+    generation = new_generation()
+    files = {"module_counts": f"module_counts-{generation}.npy", "prices": f"prices-{generation}.npy"}
+    write_array_atomic(os.path.join(directory, files["module_counts"]), matrix.module_counts)
+    write_array_atomic(os.path.join(directory, files["prices"]), matrix.prices)
+    manifest = {
+        "format_version": INDEX_FORMAT_VERSION,
+        "fingerprint": fingerprint,
+        "columns": list(matrix.columns),
+        "source": matrix.source,
+        "files": files,
+    }
+    publish_generation(directory, MANIFEST_NAME, manifest)
+
+
+def load_index(directory: str, fingerprint: str, mmap: bool = True) -> Optional[CompiledPriceMatrix]:
+    """Gespeicherter Index, wenn Format und Fingerabdruck passen; sonst None."""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        if manifest.get("format_version") != INDEX_FORMAT_VERSION or manifest.get("fingerprint") != fingerprint:
+            return None
+        mmap_mode = "r" if mmap else None
+        files = manifest["files"]
+        counts = np.load(os.path.join(directory, os.path.basename(files["module_counts"])), mmap_mode=mmap_mode)
+        prices = np.load(os.path.join(directory, os.path.basename(files["prices"])), mmap_mode=mmap_mode)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if prices.ndim != 2 or prices.shape != (counts.shape[0], len(manifest.get("columns", []))):
+        return None
+    return CompiledPriceMatrix(counts, prices, manifest["columns"], manifest.get("source", "Keine"))
+
+
+__all__ = [
+    "INDEX_FORMAT_VERSION",
+    "CompiledPriceMatrix",
+    "normalize_column",
+    "index_dir",
+    "save_index",
+    "load_index",
+]
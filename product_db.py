@@ -3,8 +3,11 @@
 from datetime import datetime
 
 import sqlite3
-import pandas as pd
 import json
+import base64
+import io
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any, Union, Tuple
 import traceback
 import os
@@ -17,7 +20,7 @@ get_db_connection_safe_pd = None
 
 # --- (Beginn des unveränderten Codes bis zum if __name__ Block) ---
 try:
-    from database import get_db_connection, init_db 
+    from database import get_db_connection, init_db, ensure_schema_once, ensure_table_indexes
     get_db_connection_safe_pd = get_db_connection
     DB_AVAILABLE = True
 except ImportError as e:
@@ -25,15 +28,23 @@ except ImportError as e:
         print(f"product_db.py: Importfehler für database.py: {e}. Dummy DB-Verbindung genutzt.")
         return None
     get_db_connection_safe_pd = _dummy_get_db_connection_ie
+    def ensure_schema_once(conn, name, check): check(conn)
+    def ensure_table_indexes(conn, table_name): pass
     print(f"product_db.py: Importfehler für database.py: {e}. Dummy DB Funktionen werden genutzt.")
 except Exception as e:
     def _dummy_get_db_connection_ex(): 
         print(f"product_db.py: Fehler beim Laden von database.py: {e}. Dummy DB-Verbindung genutzt.")
         return None
     get_db_connection_safe_pd = _dummy_get_db_connection_ex
+    def ensure_schema_once(conn, name, check): check(conn)
+    def ensure_table_indexes(conn, table_name): pass
     print(f"product_db.py: Fehler beim Laden von database.py: {e}. Dummy DB Funktionen werden genutzt.")
 
 def create_product_table(conn: sqlite3.Connection):
+    # DDL und Spalten-Migration nur einmal pro Prozess, nicht bei jeder Abfrage
+    ensure_schema_once(conn, "products", _create_product_table)
+
+def _create_product_table(conn: sqlite3.Connection):
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS products (
@@ -65,6 +76,7 @@ def create_product_table(conn: sqlite3.Connection):
     """)
     conn.commit()
     _migrate_product_table_columns(conn) 
+    ensure_table_indexes(conn, "products")
 
 def _migrate_product_table_columns(conn: sqlite3.Connection):
     cursor = conn.cursor()
@@ -141,6 +153,16 @@ def _migrate_product_table_columns(conn: sqlite3.Connection):
             except Exception as e_general_add: print(f"product_db.py: Allgemeiner Fehler beim Hinzufügen der Spalte '{col_name}': {e_general_add}"); traceback.print_exc()
     conn.commit()
 
+def _register_image_asset(image_base64: Any) -> None:
+    """Produktbild beim Speichern/Import normalisiert im Asset-Store ablegen (für die PDF-Erzeugung)."""
+    if not image_base64:
+        return
+    try:
+        from image_asset_store import register_image
+        register_image(image_base64)
+    except Exception as e:
+        print(f"product_db: Bild-Asset konnte nicht registriert werden: {e}")
+
 def add_product(product_data: Dict[str, Any]) -> Optional[int]:
     conn = get_db_connection_safe_pd()
     if conn is None: print("product_db.add_product: DB nicht verfügbar."); return None
@@ -177,7 +199,8 @@ def add_product(product_data: Dict[str, Any]) -> Optional[int]:
     try:
         cursor.execute(f"INSERT INTO products ({fields}) VALUES ({placeholders})", list(insert_data.values()))
         conn.commit(); product_id = cursor.lastrowid
-        print(f"product_db.add_product: Produkt '{insert_data['model_name']}' erfolgreich mit ID {product_id} hinzugefügt."); return product_id
+        print(f"product_db.add_product: Produkt '{insert_data['model_name']}' erfolgreich mit ID {product_id} hinzugefügt.")
+        _register_image_asset(insert_data.get("image_base64")); return product_id
     except sqlite3.Error as e: print(f"product_db.add_product: SQLite Fehler bei INSERT von '{insert_data.get('model_name', 'N/A')}': {e}"); traceback.print_exc(); conn.rollback(); return None
     finally: conn.close()
 
@@ -198,7 +221,9 @@ def update_product(product_id: Union[int, float], product_data: Dict[str, Any])
     fields_to_set = [f"{k}=?" for k in update_data.keys()]; values = list(update_data.values()); values.append(int(product_id))
     try:
         cursor.execute(f"UPDATE products SET {', '.join(fields_to_set)} WHERE id=?", values); conn.commit()
-        if cursor.rowcount > 0: print(f"product_db.update_product: Produkt ID {product_id} erfolgreich aktualisiert."); return True
+        if cursor.rowcount > 0:
+            print(f"product_db.update_product: Produkt ID {product_id} erfolgreich aktualisiert.")
+            _register_image_asset(update_data.get("image_base64")); return True
         else: print(f"product_db.update_product: Produkt ID {product_id} nicht gefunden."); return False
     except sqlite3.Error as e: print(f"product_db.update_product: SQLite Fehler für ID {product_id}: {e}"); traceback.print_exc(); conn.rollback(); return False
     finally: conn.close()
@@ -290,6 +315,140 @@ def list_product_categories() -> List[str]:
         return [row['category'] for row in rows] 
     except sqlite3.Error as e: print(f"product_db.list_product_categories: SQLite Fehler: {e}"); traceback.print_exc(); return []
     finally: conn.close()
+
+# --- Schlanke Katalog-Abfragen (ohne Bild-Blobs) ---
+# Für Dropdowns und Listen reichen diese Spalten; image_base64 und lange Texte
+# werden nur noch einzeln per ID geladen (get_product_image, get_product_by_id).
+PRODUCT_LISTING_COLUMNS: Tuple[str, ...] = (
+    "id", "category", "model_name", "brand", "price_euro", "additional_cost_netto",
+    "capacity_w", "storage_power_kw", "power_kw", "max_cycles", "warranty_years",
+    "length_m", "width_m", "weight_kg", "efficiency_percent", "rating",
+    "company_id", "updated_at",
+)
+
+_IMAGE_CACHE_MAX_ENTRIES = 256
+_IMAGE_CACHE: "OrderedDict[Tuple[int, str, Optional[int]], Optional[str]]" = OrderedDict()
+_IMAGE_CACHE_LOCK = threading.Lock()
+
+def _product_filters(category: Optional[str], company_id: Optional[int], brand: Optional[str]) -> Tuple[str, List[Any]]:
+    conditions: List[str] = []; params: List[Any] = []
+    if category:
+        conditions.append("category = ?"); params.append(category)
+    if company_id is not None:
+        conditions.append("company_id = ?"); params.append(company_id)
+    if brand:
+        conditions.append("brand = ? COLLATE NOCASE"); params.append(brand)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+def list_product_summaries(category: Optional[str] = None, company_id: Optional[int] = None, brand: Optional[str] = None,
+                           limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+    """Produkte mit PRODUCT_LISTING_COLUMNS plus has_image/has_datasheet, optional seitenweise."""
+    conn = get_db_connection_safe_pd()
+    if conn is None: print("product_db.list_product_summaries: DB nicht verfügbar."); return []
+    create_product_table(conn); cursor = conn.cursor()
+    where, params = _product_filters(category, company_id, brand)
+    query = (
+        f"SELECT {', '.join(PRODUCT_LISTING_COLUMNS)}, "
+        "(image_base64 IS NOT NULL AND image_base64 != '') AS has_image, "
+        "(datasheet_link_db_path IS NOT NULL AND datasheet_link_db_path != '') AS has_datasheet "
+        f"FROM products{where} ORDER BY model_name COLLATE NOCASE"
+    )
+    if limit is not None:
+        query += " LIMIT ? OFFSET ?"; params += [max(0, int(limit)), max(0, int(offset))]
+    try:
+        cursor.execute(query, params)
+        products = []
+        for row in cursor.fetchall():
+            product = dict(row)
+            product["has_image"] = bool(product["has_image"]); product["has_datasheet"] = bool(product["has_datasheet"])
+            products.append(product)
+        return products
+    except sqlite3.Error as e: print(f"product_db.list_product_summaries: SQLite Fehler: {e}"); traceback.print_exc(); return []
+    finally: conn.close()
+
+def count_products(category: Optional[str] = None, company_id: Optional[int] = None, brand: Optional[str] = None) -> int:
+    conn = get_db_connection_safe_pd()
+    if conn is None: print("product_db.count_products: DB nicht verfügbar."); return 0
+    create_product_table(conn); cursor = conn.cursor()
+    where, params = _product_filters(category, company_id, brand)
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM products{where}", params)
+        return int(cursor.fetchone()[0])
+    except sqlite3.Error as e: print(f"product_db.count_products: SQLite Fehler: {e}"); traceback.print_exc(); return 0
+    finally: conn.close()
+
+def list_product_brands(category: Optional[str] = None, company_id: Optional[int] = None) -> List[str]:
+    """Hersteller (brand) einer Kategorie, alphabetisch und ohne Duplikate."""
+    conn = get_db_connection_safe_pd()
+    if conn is None: print("product_db.list_product_brands: DB nicht verfügbar."); return []
+    create_product_table(conn); cursor = conn.cursor()
+    where, params = _product_filters(category, company_id, None)
+    where += (" AND" if where else " WHERE") + " brand IS NOT NULL AND brand != ''"
+    try:
+        cursor.execute(f"SELECT DISTINCT brand FROM products{where} ORDER BY brand", params)
+        return [row['brand'] for row in cursor.fetchall()]
+    except sqlite3.Error as e: print(f"product_db.list_product_brands: SQLite Fehler: {e}"); traceback.print_exc(); return []
+    finally: conn.close()
+
+def _make_thumbnail(image_base64: str, max_size_px: int) -> Optional[str]:
+    try:
+        from PIL import Image
+    except ImportError:
+        return image_base64  # ohne Pillow das Originalbild ausliefern
+    try:
+        with Image.open(io.BytesIO(base64.b64decode(image_base64))) as img:
+            img.thumbnail((max_size_px, max_size_px))
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            out = io.BytesIO()
+            img.save(out, format="PNG", optimize=True)
+        return base64.b64encode(out.getvalue()).decode("ascii")
+    except Exception as e:
+        print(f"product_db._make_thumbnail: Bild konnte nicht verkleinert werden: {e}")
+        return image_base64
+
+def get_product_image(product_id: Union[int, float], max_size_px: Optional[int] = None) -> Optional[str]:
+    """Produktbild (Base64) per ID; mit max_size_px als PNG-Vorschaubild.
+
+    Ergebnisse werden je (ID, updated_at, Größe) gecacht, ein geändertes
+    Produkt erhält dadurch automatisch einen neuen Eintrag.
+    """
+    conn = get_db_connection_safe_pd()
+    if conn is None: print("product_db.get_product_image: DB nicht verfügbar."); return None
+    create_product_table(conn); cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT updated_at FROM products WHERE id=?", (int(product_id),)); row = cursor.fetchone()
+        if row is None: return None
+        key = (int(product_id), str(row["updated_at"]), int(max_size_px) if max_size_px else None)
+        with _IMAGE_CACHE_LOCK:
+            if key in _IMAGE_CACHE:
+                _IMAGE_CACHE.move_to_end(key)
+                return _IMAGE_CACHE[key]
+        cursor.execute("SELECT image_base64 FROM products WHERE id=?", (int(product_id),)); row = cursor.fetchone()
+    except sqlite3.Error as e: print(f"product_db.get_product_image: SQLite Fehler für ID {product_id}: {e}"); traceback.print_exc(); return None
+    finally: conn.close()
+    image = row["image_base64"] if row and row["image_base64"] else None
+    if image and key[2]:
+        image = _make_thumbnail(image, key[2])
+    with _IMAGE_CACHE_LOCK:
+        _IMAGE_CACHE[key] = image
+        while len(_IMAGE_CACHE) > _IMAGE_CACHE_MAX_ENTRIES:
+            _IMAGE_CACHE.popitem(last=False)
+    return image
+
+def get_product_datasheet_path(product_id: Union[int, float]) -> Optional[str]:
+    conn = get_db_connection_safe_pd()
+    if conn is None: print("product_db.get_product_datasheet_path: DB nicht verfügbar."); return None
+    create_product_table(conn); cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT datasheet_link_db_path FROM products WHERE id=?", (int(product_id),)); row = cursor.fetchone()
+        return row["datasheet_link_db_path"] if row and row["datasheet_link_db_path"] else None
+    except sqlite3.Error as e: print(f"product_db.get_product_datasheet_path: SQLite Fehler für ID {product_id}: {e}"); traceback.print_exc(); return None
+    finally: conn.close()
+
+def clear_product_image_cache() -> None:
+    with _IMAGE_CACHE_LOCK:
+        _IMAGE_CACHE.clear()
 # --- (Ende des unveränderten Codes) ---
 
 if __name__ == "__main__":
@@ -15,10 +15,13 @@ Portiert aus kalkulationen.py mit Sicherheits- und Performance-Optimierungen.
 
 from __future__ import annotations
 import numpy as np
-import numpy_financial as npf
 from typing import Dict, Any, List, Optional, Union
 import math
 
+from hourly_energy_simulator import optimal_storage_size, simulate_storage_sizing
+from irr_engine import investment_cash_flows, irr, npv
+from monte_carlo_engine import simulate_npv_distribution, summarize_distribution
+
 # Konstanten
 LIFESPAN_YEARS = 25
 DISCOUNT_RATE = 0.04
@@ -213,8 +216,8 @@ def calculate_net_present_value(investment: float,
     period = max(1, int(years))
     rate = safe_float(discount_rate, DISCOUNT_RATE)
     
-    cash_flows = [savings] * period
-    return npf.npv(rate, cash_flows) - investment_val
+    cash_flows = np.full(period, savings)
+    return npv(rate, cash_flows) - investment_val
 
 def calculate_irr(investment: float,
                   annual_savings: float,
@@ -237,13 +240,8 @@ def calculate_irr(investment: float,
     if investment_val <= 0 or savings <= 0:
         return 0.0
         
-    cash_flows = [-investment_val] + [savings] * period
-    
-    try:
-        irr_result = npf.irr(cash_flows)
-        return safe_float(irr_result * 100, 0.0)
-    except:
-        return 0.0
+    irr_result = irr(investment_cash_flows(investment_val, savings, period))
+    return safe_float(irr_result * 100, 0.0)
 
 def calculate_total_roi(investment: float, 
                         annual_savings: float,
@@ -292,13 +290,19 @@ def calculate_storage_coverage_degree(stored_self_consumption_kwh: float,
     return safe_divide(stored * 100, total, 0.0)
 
 def calculate_optimal_storage_size(daily_consumption_kwh: float, 
-                                   losses_percent: float = 10.0) -> float:
+                                   losses_percent: float = 10.0,
+                                   annual_pv_production_kwh: Optional[float] = None) -> float:
     """
     Optimale Batteriespeichergröße in kWh.
     
+    Mit annual_pv_production_kwh wird die Größe aus der stündlichen
+    Jahressimulation (H0-Last, PV-Profil) über ein Kapazitätsraster bestimmt,
+    sonst über die Faustformel Tagesverbrauch abzüglich Verluste.
+    
     Args:
         daily_consumption_kwh: Täglicher Verbrauch
         losses_percent: Verluste in Prozent
+        annual_pv_production_kwh: Jahresertrag der PV-Anlage (optional)
         
     Returns:
         Empfohlene Speicherkapazität in kWh
@@ -307,6 +311,15 @@ def calculate_optimal_storage_size(daily_consumption_kwh: float,
     losses = safe_float(losses_percent, 10.0)
     losses = max(0.0, min(50.0, losses))  # Begrenze auf 0-50%
     
+    annual_pv = safe_float(annual_pv_production_kwh)
+    if annual_pv > 0 and daily_cons > 0:
+        grid = simulate_storage_sizing(
+            daily_cons * 365,
+            annual_production_kwh=annual_pv,
+            round_trip_efficiency=1 - losses / 100,
+        )
+        return optimal_storage_size(grid)
+    
     return daily_cons * (1 - losses / 100)
 
 def calculate_emergency_power_capacity(storage_kwh: float, 
@@ -582,46 +595,21 @@ class PVCalculationsAdvanced:
         if base_investment <= 0 or base_annual_benefit <= 0:
             return {"error": "Ungültige Basisdaten für Simulation"}
         
-        np.random.seed(42)  # Für reproduzierbare Ergebnisse
-        npv_distribution = []
-        
-        for _ in range(n_simulations):
-            # Parameter variieren (normalverteilt)
-            investment = max(0, np.random.normal(base_investment, base_investment * 0.1))
-            annual_benefit = max(0, np.random.normal(base_annual_benefit, base_annual_benefit * 0.15))
-            discount_rate = max(0, np.random.normal(0.04, 0.01))
-            
-            # NPV berechnen
-            npv = -investment
-            for year in range(1, self.years + 1):
-                npv += annual_benefit / (1 + discount_rate) ** year
-            
-            npv_distribution.append(npv)
-        
-        npv_array = np.array(npv_distribution)
-        
-        # Statistiken berechnen
-        npv_mean = np.mean(npv_array)
-        npv_std = np.std(npv_array)
-        
-        # Konfidenzintervall
-        alpha = (100 - confidence_level) / 2
-        npv_lower = np.percentile(npv_array, alpha)
-        npv_upper = np.percentile(npv_array, 100 - alpha)
-        
-        # Value at Risk (5% Quantil)
-        var_5 = np.percentile(npv_array, 5)
-        
-        # Erfolgswahrscheinlichkeit (NPV > 0)
-        success_prob = (npv_array > 0).sum() / n_simulations * 100
+        npv_array = simulate_npv_distribution(
+            base_investment, base_annual_benefit, self.years, n_simulations,
+            clip_at_zero=True
+        )
+        summary = summarize_distribution(npv_array, confidence_level)
         
         return {
-            "npv_mean": round(npv_mean, 2),
-            "npv_std": round(npv_std, 2),
-            "npv_lower_bound": round(npv_lower, 2),
-            "npv_upper_bound": round(npv_upper, 2),
-            "var_5": round(var_5, 2),
-            "success_probability": round(success_prob, 1),
+            "npv_mean": round(summary["mean"], 2),
+            "npv_std": round(summary["std"], 2),
+            "npv_lower_bound": round(summary["lower_bound"], 2),
+            "npv_upper_bound": round(summary["upper_bound"], 2),
+            "var_5": round(summary["var_5"], 2),
+            "success_probability": round(summary["success_probability"], 1),
+            "npv_percentiles": {k: round(v, 2) for k, v in summary["percentiles"].items()},
+            "npv_histogram": summary["histogram"],
             "simulations_count": n_simulations,
             "confidence_level": confidence_level
         }
@@ -11,6 +11,7 @@ import pandas as pd
 import plotly.graph_objects as go
 from typing import Dict, Any, Optional
 import math # <--- KORREKTUR: Fehlender Import hinzugefügt
+import chart_render_service
 
 # Hilfsfunktion für Texte innerhalb dieses Moduls
 def get_text_pv_viz(texts: Dict[str, str], key: str, fallback_text: Optional[str] = None) -> str:
@@ -46,8 +47,7 @@ def _export_plotly_fig_to_bytes_pv_viz(fig: Optional[go.Figure], texts: Dict[str
         return None
     try:
         # Erhöhe die Skalierung und definiere eine Standardgröße für bessere Qualität im PDF
-        img_bytes = fig.to_image(format="png", scale=2, width=900, height=550)
-        return img_bytes
+        return chart_render_service.render_png(fig, format="png", scale=2, width=900, height=550)
     except Exception as e:
         # Fehlerbehandlung wurde aus der Originaldatei übernommen
         # Im Idealfall würde dieser Fehler an eine zentrale Logging-Stelle gemeldet
@@ -0,0 +1,211 @@
+# pvgis_cache.py - Persistenter Cache für PVGIS-Antworten
+"""
+Speichert PVGIS-Ergebnisse normiert auf 1 kWp in einer SQLite-Datei neben der
+App-Datenbank (data/pvgis_cache.db). Der Schlüssel besteht aus gerundeten
+Koordinaten, Neigung, Azimut und Systemverlust; die Anlagengröße gehört nicht
+dazu, weil der PVGIS-Ertrag linear mit der Leistung skaliert. Eine neue
+Modulanzahl auf demselben Dach löst daher keinen Netzwerkzugriff aus.
+
+Einträge verfallen nach DEFAULT_TTL_DAYS; die Tabelle wird auf MAX_ENTRIES
+begrenzt (zuletzt benutzte Einträge bleiben). Im Offline-Modus liefert
+nearest() den nächstgelegenen gecachten Standort mit gleicher Ausrichtung.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+CACHE_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pvgis_cache.db")
+
+COORD_DECIMALS = 2  # ~1 km Rasterweite
+LOSS_DECIMALS = 1
+DEFAULT_TTL_DAYS = 365
+MAX_ENTRIES = 5000
+DEFAULT_MAX_DISTANCE_KM = 50.0
+
+# Offline-Modus global per Umgebungsvariable (z.B. für Außendienst ohne Netz)
+OFFLINE_ENV_VAR = "KAKERLAKE_PVGIS_OFFLINE"
+
+CacheKey = Tuple[float, float, int, int, float]
+
+
+def is_offline_mode() -> bool:
+    return os.environ.get(OFFLINE_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def make_key(latitude: float, longitude: float, tilt: int, azimuth: int, system_loss_percent: float) -> CacheKey:
+    """Gerundeter Cache-Schlüssel; Nachbarpunkte im selben Raster teilen sich einen Eintrag."""
+    return (
+        round(float(latitude), COORD_DECIMALS),
+        round(float(longitude), COORD_DECIMALS),
+        int(tilt),
+        int(azimuth),
+        round(float(system_loss_percent), LOSS_DECIMALS),
+    )
+
+
+def _connect(db_path: Optional[str] = None) -> sqlite3.Connection:
+    path = db_path or CACHE_DB_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pvgis_cache (
+            lat REAL NOT NULL,
+            lon REAL NOT NULL,
+            tilt INTEGER NOT NULL,
+            azimuth INTEGER NOT NULL,
+            loss REAL NOT NULL,
+            monthly_kwh_per_kwp TEXT NOT NULL,
+            annual_kwh_per_kwp REAL NOT NULL,
+            specific_yield_kwh_kwp_pa REAL NOT NULL,
+            source TEXT,
+            fetched_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            PRIMARY KEY (lat, lon, tilt, azimuth, loss)
+        )
+        """
+    )
+    return conn
+
+
+@contextmanager
+def _open(db_path: Optional[str] = None) -> Iterator[sqlite3.Connection]:
+    """Verbindung mit Commit am Ende des Blocks; wird immer geschlossen."""
+    conn = _connect(db_path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _row_to_entry(row) -> Dict[str, Any]:
+    lat, lon, tilt, azimuth, loss, monthly_json, annual, specific, source, fetched_at = row
+    return {
+        "key": (lat, lon, tilt, azimuth, loss),
+        "monthly_kwh_per_kwp": json.loads(monthly_json),
+        "annual_kwh_per_kwp": annual,
+        "specific_yield_kwh_kwp_pa": specific,
+        "pvgis_source": source,
+        "fetched_at": fetched_at,
+    }
+
+
+_SELECT_COLUMNS = (
+    "lat, lon, tilt, azimuth, loss, monthly_kwh_per_kwp, annual_kwh_per_kwp, "
+    "specific_yield_kwh_kwp_pa, source, fetched_at"
+)
+
+
+def _touch(conn: sqlite3.Connection, key: CacheKey) -> None:
+    conn.execute(
+        "UPDATE pvgis_cache SET last_used_at = ? WHERE lat = ? AND lon = ? AND tilt = ? AND azimuth = ? AND loss = ?",
+        (time.time(), *key),
+    )
+
+
+def get(key: CacheKey, ttl_days: float = DEFAULT_TTL_DAYS, db_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Normierter Eintrag für genau diesen Schlüssel oder None (fehlt/abgelaufen)."""
+    min_fetched_at = time.time() - ttl_days * 86400
+    with _open(db_path) as conn:
+        row = conn.execute(
+            f"SELECT {_SELECT_COLUMNS} FROM pvgis_cache "
+            "WHERE lat = ? AND lon = ? AND tilt = ? AND azimuth = ? AND loss = ? AND fetched_at >= ?",
+            (*key, min_fetched_at),
+        ).fetchone()
+        if row is None:
+            return None
+        _touch(conn, key)
+    return _row_to_entry(row)
+
+
+def nearest(
+    key: CacheKey, max_distance_km: float = DEFAULT_MAX_DISTANCE_KM, db_path: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Nächstgelegener gecachter Standort mit gleicher Neigung, Ausrichtung und Verlust,
+    unabhängig vom Alter. Liefert None, wenn keiner innerhalb max_distance_km liegt.
+    """
+    lat, lon, tilt, azimuth, loss = key
+    # Grobe Vorauswahl über ein Koordinatenfenster, danach exakte Distanz
+    lat_window = max_distance_km / 111.0
+    lon_window = max_distance_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+    with _open(db_path) as conn:
+        rows = conn.execute(
+            f"SELECT {_SELECT_COLUMNS} FROM pvgis_cache "
+            "WHERE tilt = ? AND azimuth = ? AND loss = ? AND lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?",
+            (tilt, azimuth, loss, lat - lat_window, lat + lat_window, lon - lon_window, lon + lon_window),
+        ).fetchall()
+        if not rows:
+            return None
+        best = min(rows, key=lambda row: _distance_km(lat, lon, row[0], row[1]))
+        distance = _distance_km(lat, lon, best[0], best[1])
+        if distance > max_distance_km:
+            return None
+        _touch(conn, tuple(best[:5]))
+    entry = _row_to_entry(best)
+    entry["distance_km"] = distance
+    return entry
+
+
+def put(
+    key: CacheKey,
+    monthly_kwh_per_kwp,
+    annual_kwh_per_kwp: float,
+    specific_yield_kwh_kwp_pa: float,
+    source: Optional[str],
+    ttl_days: float = DEFAULT_TTL_DAYS,
+    max_entries: int = MAX_ENTRIES,
+    db_path: Optional[str] = None,
+) -> None:
+    """Speichert einen normierten Eintrag und räumt abgelaufene/überzählige Einträge ab."""
+    now = time.time()
+    with _open(db_path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO pvgis_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                *key,
+                json.dumps([float(value) for value in monthly_kwh_per_kwp]),
+                float(annual_kwh_per_kwp),
+                float(specific_yield_kwh_kwp_pa),
+                source,
+                now,
+                now,
+            ),
+        )
+        _evict(conn, now - ttl_days * 86400, max_entries)
+
+
+def _evict(conn: sqlite3.Connection, min_fetched_at: float, max_entries: int) -> None:
+    conn.execute("DELETE FROM pvgis_cache WHERE fetched_at < ?", (min_fetched_at,))
+    conn.execute(
+        "DELETE FROM pvgis_cache WHERE rowid NOT IN "
+        "(SELECT rowid FROM pvgis_cache ORDER BY last_used_at DESC LIMIT ?)",
+        (max_entries,),
+    )
+
+
+def scale_to_peak_power(entry: Dict[str, Any], peak_power_kwp: float) -> Dict[str, Any]:
+    """Rechnet einen normierten Eintrag auf die Anlagenleistung hoch (Format wie get_pvgis_data)."""
+    return {
+        "monthly_production_kwh": [value * peak_power_kwp for value in entry["monthly_kwh_per_kwp"]],
+        "annual_production_kwh": entry["annual_kwh_per_kwp"] * peak_power_kwp,
+        "specific_yield_kwh_kwp_pa": entry["specific_yield_kwh_kwp_pa"],
+        "pvgis_source": entry["pvgis_source"],
+    }
+
+
+def _distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Großkreisdistanz (Haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
@@ -0,0 +1,151 @@
+# scenario_batch.py - Stapelberechnung vieler Projektvarianten
+"""
+Berechnet N Varianten eines Projekts mit einem Aufruf. Jede Variante ist ein
+kleines Override-Dict gegenüber den Basis-Projektdaten (Modulanzahl,
+Speichergröße, Strompreissteigerung, Einspeiseart). Admin-Settings,
+Preis-Matrix, Produktdaten und PVGIS-Antworten werden über
+calculations.shared_calculation_inputs() nur einmal je Block geladen.
+
+Optional werden die Varianten in Blöcken auf einen Prozess-Pool verteilt;
+jeder Worker lädt die gemeinsamen Eingaben dann einmal für seinen Block.
+Das Ergebnis ist eine Tabelle (pandas.DataFrame) mit einer Zeile pro Variante.
+"""
+
+from __future__ import annotations
+
+import copy
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from calculations import perform_calculations, shared_calculation_inputs
+
+# Kennzahlen, die pro Variante in die Ergebnistabelle übernommen werden
+DEFAULT_KPI_KEYS = (
+    "anlage_kwp",
+    "total_investment_netto",
+    "annual_pv_production_kwh",
+    "self_supply_rate_percent",
+    "annual_financial_benefit_year1",
+    "amortization_time_years",
+    "npv_value",
+    "irr_percent",
+    "lcoe_euro_per_kwh",
+    "annual_co2_savings_kg",
+)
+
+# Ab dieser Variantenzahl lohnt sich der Start eines Prozess-Pools
+MIN_VARIANTS_PER_WORKER = 8
+
+
+def apply_scenario_overrides(base_project_data: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Erzeugt die Projektdaten einer Variante, ohne die Basisdaten zu verändern.
+
+    Unterstützte Overrides:
+        module_quantity: Anzahl Module
+        storage_capacity_kwh: Speichergröße in kWh (0 = ohne Speicher)
+        feed_in_type: "Teileinspeisung" oder "Volleinspeisung"
+        project_details / economic_data: Dicts, die flach in den jeweiligen Block übernommen werden
+
+    Strompreissteigerung und Laufzeit wirken direkt auf perform_calculations
+    und werden in evaluate_scenarios ausgewertet.
+    """
+    project_data = copy.deepcopy(base_project_data)
+    project_details = project_data.setdefault("project_details", {})
+    economic_data = project_data.setdefault("economic_data", {})
+
+    if overrides.get("module_quantity") is not None:
+        project_details["module_quantity"] = int(overrides["module_quantity"])
+    if overrides.get("storage_capacity_kwh") is not None:
+        capacity = float(overrides["storage_capacity_kwh"])
+        project_details["include_storage"] = capacity > 0
+        project_details["selected_storage_storage_power_kw"] = capacity
+    if overrides.get("feed_in_type"):
+        project_details["feed_in_type"] = str(overrides["feed_in_type"])
+    project_details.update(overrides.get("project_details") or {})
+    economic_data.update(overrides.get("economic_data") or {})
+    return project_data
+
+
+def _scenario_name(overrides: Dict[str, Any], index: int) -> str:
+    return str(overrides.get("name") or f"Variante {index + 1}")
+
+
+def _evaluate_block(
+    base_project_data: Dict[str, Any],
+    scenarios: Sequence[Dict[str, Any]],
+    start_index: int,
+    texts: Dict[str, str],
+    kpi_keys: Sequence[str],
+) -> List[Dict[str, Any]]:
+    """Rechnet einen Block von Varianten mit gemeinsam geladenen Eingaben."""
+    rows: List[Dict[str, Any]] = []
+    with shared_calculation_inputs():
+        for offset, overrides in enumerate(scenarios):
+            index = start_index + offset
+            row: Dict[str, Any] = {"scenario_index": index, "scenario_name": _scenario_name(overrides, index)}
+            errors: List[str] = []
+            try:
+                results = perform_calculations(
+                    apply_scenario_overrides(base_project_data, overrides),
+                    texts,
+                    errors,
+                    simulation_duration_user=overrides.get("simulation_duration_years"),
+                    electricity_price_increase_user=overrides.get("electricity_price_increase_percent"),
+                )
+                row.update({key: results.get(key) for key in kpi_keys})
+                row["error"] = None
+            except Exception as e:
+                row.update({key: None for key in kpi_keys})
+                row["error"] = str(e)
+            row["warnings"] = len(errors)
+            rows.append(row)
+    return rows
+
+
+def evaluate_scenarios(
+    base_project_data: Dict[str, Any],
+    scenarios: Sequence[Dict[str, Any]],
+    texts: Optional[Dict[str, str]] = None,
+    max_workers: Optional[int] = None,
+    kpi_keys: Sequence[str] = DEFAULT_KPI_KEYS,
+) -> pd.DataFrame:
+    """
+    Berechnet alle Varianten und liefert eine Tabelle der Kennzahlen.
+
+    Args:
+        base_project_data: Gemeinsame Projektdaten aller Varianten
+        scenarios: Liste von Override-Dicts (siehe apply_scenario_overrides),
+            optional mit "name", "electricity_price_increase_percent" und
+            "simulation_duration_years"
+        texts: Übersetzungen für Meldungen aus perform_calculations
+        max_workers: Anzahl Prozesse; None oder 1 rechnet im aktuellen Prozess
+        kpi_keys: Ergebnis-Schlüssel, die als Spalten übernommen werden
+
+    Returns:
+        DataFrame mit einer Zeile pro Variante in Eingabereihenfolge und den
+        Spalten scenario_index, scenario_name, KPIs, error, warnings
+    """
+    texts = texts or {}
+    scenarios = list(scenarios)
+    kpi_keys = tuple(kpi_keys)
+    workers = min(int(max_workers or 1), max(1, len(scenarios) // MIN_VARIANTS_PER_WORKER))
+
+    if workers <= 1:
+        rows = _evaluate_block(base_project_data, scenarios, 0, texts, kpi_keys)
+    else:
+        block_size = -(-len(scenarios) // workers)
+        starts = range(0, len(scenarios), block_size)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _evaluate_block, base_project_data, scenarios[start:start + block_size], start, texts, kpi_keys
+                )
+                for start in starts
+            ]
+            rows = [row for future in futures for row in future.result()]
+
+    columns = ["scenario_index", "scenario_name", *kpi_keys, "error", "warnings"]
+    return pd.DataFrame(rows, columns=columns)
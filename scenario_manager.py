@@ -1,28 +1,42 @@
-# scenario_manager.py (Placeholder Modul)
-# Imports für zukünftige Funktionen
-from typing import Dict, Any, List # KORREKTUR: Dict und List hinzugefügt
-import streamlit as st # Streamlit ist hier erforderlich, da st.warning verwendet wird.
-# from analysis import calculate_economics # Benötigt die Wirtschafts-Berechnungen
-# from ai_models import predict_yield # Benötigt KI-Modelle
+# scenario_manager.py
+# Dieses Modul verwaltet die Szenarien (A.7, Features 9, 10)
+from typing import Dict, Any, List
 
+from scenario_batch import evaluate_scenarios
 
-# Dieses Modul verwaltet die Szenarien (A.7, Features 9, 10)
-# Beispiel: Funktion zur Simulation eines spezifischen Szenarios (z.B. mit/ohne Speicher)
+# Speichergröße für das Vergleichsszenario "mit Speicher", wenn das Basisprojekt keinen hat
+DEFAULT_COMPARISON_STORAGE_KWH = 10.0
+
+
+def _rows_to_scenarios(table) -> List[Dict[str, Any]]:
+    """KPI-Tabelle aus scenario_batch in das bisherige Format {scenario_name, results} umwandeln."""
+    scenarios = []
+    for row in table.to_dict(orient="records"):
+        name = row.pop("scenario_name")
+        row.pop("scenario_index", None)
+        scenarios.append({"scenario_name": name, "results": row})
+    return scenarios
+
+
+# Simulation eines spezifischen Szenarios (z.B. mit/ohne Speicher)
 def simulate_scenario(base_project_data: Dict[str, Any], scenario_options: Dict[str, Any]) -> Dict[str, Any]:
-    """Placeholder Funktion zur Simulation eines Szenarios."""
-    print("scenario_manager: Placeholder simulate_scenario called") # Debugging
-    st.warning("Szenarien-Simulation ist ein Platzhalter.") # Info
-    # Hier kommt die Logik zur Anpassung der Basisdaten basierend auf Szenario-Optionen
-    # und dann der Aufruf der Analysefunktionen mit den angepassten Daten.
-    # Rückgabe sind die Ergebnisse für dieses Szenario.
-    return {"scenario_name": scenario_options.get("name", "Unbekanntes Szenario"), "results": {"placeholder": "Daten hier"}} # Dummy Ergebnis
-
-# Beispiel: Funktion zur Generierung mehrerer Vergleichsszenarien
+    """Rechnet ein Szenario; scenario_options sind Overrides wie in scenario_batch.apply_scenario_overrides."""
+    return _rows_to_scenarios(evaluate_scenarios(base_project_data, [scenario_options]))[0]
+
+
+# Generierung der Kern-Vergleichsszenarien
 def generate_comparison_scenarios(base_project_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """Placeholder Funktion zur Generierung vordefinierter Vergleichsszenarien."""
-    print("scenario_manager: Placeholder generate_comparison_scenarios called") # Debugging
-    st.warning("Generierung von Vergleichsszenarien ist ein Platzhalter.") # Info
-    # Hier kommt die Logik zur Definition und Simulation der 4-5 Kernszenarien (mit/ohne Speicher, mit/ohne EV/WP)
-    # Nutzt simulate_scenario
-    return [{"scenario_name": "Basis Szenario (Placeholder)", "results": {}},
-            {"scenario_name": "Szenario mit Speicher (Placeholder)", "results": {}}] # Dummy Liste
\ No newline at end of file
+    """Basis, mit/ohne Speicher, Volleinspeisung und +20 % Module in einem Stapelaufruf."""
+    project_details = base_project_data.get("project_details", {})
+    module_quantity = int(project_details.get("module_quantity", 0) or 0)
+    storage_kwh = float(project_details.get("selected_storage_storage_power_kw", 0.0) or 0.0)
+
+    scenarios = [
+        {"name": "Basis Szenario"},
+        {"name": "Szenario mit Speicher", "storage_capacity_kwh": storage_kwh or DEFAULT_COMPARISON_STORAGE_KWH},
+        {"name": "Szenario ohne Speicher", "storage_capacity_kwh": 0.0},
+        {"name": "Szenario Volleinspeisung", "feed_in_type": "Volleinspeisung"},
+    ]
+    if module_quantity > 0:
+        scenarios.append({"name": "Szenario +20 % Module", "module_quantity": round(module_quantity * 1.2)})
+    return _rows_to_scenarios(evaluate_scenarios(base_project_data, scenarios))
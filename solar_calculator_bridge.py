@@ -450,12 +450,16 @@ class SolarCalculatorProductBridge:
         return {"success": bool(ok)}
 
     # --- Produkte auflisten/löschen ---
-    def list_products(self, category: Optional[str] = None, company_id: Optional[int] = None) -> Dict[str, Any]:
+    def list_products(self, category: Optional[str] = None, company_id: Optional[int] = None,
+                      limit: Optional[int] = None, offset: int = 0, include_images: bool = False) -> Dict[str, Any]:
         """Listet Produkte aus der DB und mappt sie auf standardisierte deutsche Keys.
 
         Parameter:
         - category: Optional. Wenn gesetzt, filtere nach exakter Kategorie (z.B. 'PV Modul', 'Wechselrichter').
         - company_id: Optional. Wenn gesetzt, filtere nach Firmen-ID (falls Feld in DB vorhanden ist).
+        - limit/offset: Optional. Seitenweise Abfrage; 'total' enthält die Gesamtanzahl.
+        - include_images: Standardmäßig ohne image_base64 (nur 'has_image'); Bilder einzeln per
+          get_product_image laden.
         """
         try:
             import product_db  # type: ignore
@@ -463,7 +467,14 @@ class SolarCalculatorProductBridge:
             return {"success": False, "error": f"product_db nicht verfügbar: {e}", "items": []}
 
         try:
-            rows = product_db.list_products(category=category, company_id=company_id)
+            if include_images:
+                rows = product_db.list_products(category=category, company_id=company_id)
+                if limit is not None:
+                    rows = rows[max(0, int(offset)):max(0, int(offset)) + max(0, int(limit))]
+            else:
+                rows = product_db.list_product_summaries(category=category, company_id=company_id,
+                                                         limit=limit, offset=offset)
+            total = product_db.count_products(category=category, company_id=company_id) if limit is not None else len(rows)
         except Exception as e:
             return {"success": False, "error": str(e), "items": []}
 
@@ -472,12 +483,33 @@ class SolarCalculatorProductBridge:
             try:
                 cat = r.get('category') or ''
                 brand = r.get('brand') or r.get('manufacturer') or ''
-                std_items.append(self._to_standard_product_dict(cat, brand, r))
+                std = self._to_standard_product_dict(cat, brand, r)
+                std['has_image'] = bool(r.get('has_image', r.get('image_base64')))
+                std_items.append(std)
             except Exception:
                 # Fallback: rohen Datensatz durchreichen
                 std_items.append(r)
 
-        return {"success": True, "items": std_items}
+        return {"success": True, "items": std_items, "total": total, "limit": limit, "offset": offset}
+
+    def get_product_image(self, product_id: int, max_size_px: Optional[int] = None) -> Dict[str, Any]:
+        """Produktbild per ID (optional als Vorschaubild mit max. Kantenlänge max_size_px)."""
+        try:
+            import product_db  # type: ignore
+        except Exception as e:
+            return {"success": False, "error": f"product_db nicht verfügbar: {e}"}
+        image = product_db.get_product_image(int(product_id), max_size_px=max_size_px)
+        return {"success": image is not None, "id": int(product_id), "image_base64": image}
+
+    def get_product_datasheet(self, product_id: int) -> Dict[str, Any]:
+        """Datenblatt-Pfad eines Produkts per ID."""
+        try:
+            import product_db  # type: ignore
+        except Exception as e:
+            return {"success": False, "error": f"product_db nicht verfügbar: {e}"}
+        path = product_db.get_product_datasheet_path(int(product_id))
+        return {"success": path is not None, "id": int(product_id), "datasheet_path": path,
+                "exists": bool(path) and os.path.exists(path)}
 
     def delete_product_single(self, product_id: int) -> Dict[str, Any]:
         """Löscht ein einzelnes Produkt per ID."""
@@ -911,7 +943,8 @@ class SolarCalculatorProductBridge:
                         pv_modul_leistung, kapazitaet_speicher_kwh, wr_leistung_kw, ladezyklen_speicher,
                         garantie_zeit, mass_laenge, mass_breite, mass_gewicht_kg, wirkungsgrad_prozent,
                         hersteller_land, beschreibung_info, eigenschaft_info, spezial_merkmal,
-                        rating_null_zehn, image_base64, created_at, updated_at
+                        rating_null_zehn, created_at, updated_at,
+                        (image_base64 IS NOT NULL AND image_base64 != '') AS has_image
                     FROM products_complete 
                     WHERE kategorie = ? AND hersteller = ?
                     ORDER BY produkt_modell
@@ -923,6 +956,7 @@ class SolarCalculatorProductBridge:
                 for row in cursor.fetchall():
                     d = dict(row)
                     std = self._to_standard_product_dict(category, manufacturer, d)
+                    std['has_image'] = bool(d.get('has_image'))
                     results.append(std)
 
                 if results:
@@ -1367,10 +1401,24 @@ if __name__ == "__main__":
                 payload = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
                 category = payload.get('category')
                 company_id = payload.get('company_id')
-                res = bridge.list_products(category=category, company_id=company_id)
+                res = bridge.list_products(category=category, company_id=company_id,
+                                           limit=payload.get('limit'), offset=payload.get('offset') or 0,
+                                           include_images=bool(payload.get('include_images')))
                 print(json.dumps(res, default=str))
             except Exception as e:
                 print(json.dumps({"success": False, "error": str(e), "items": []}))
+        elif command == "product_image" and len(sys.argv) > 2:
+            try:
+                pid = int(sys.argv[2])
+                size = int(sys.argv[3]) if len(sys.argv) > 3 else None
+                print(json.dumps(bridge.get_product_image(pid, max_size_px=size), default=str))
+            except Exception as e:
+                print(json.dumps({"success": False, "error": str(e)}))
+        elif command == "product_datasheet" and len(sys.argv) > 2:
+            try:
+                print(json.dumps(bridge.get_product_datasheet(int(sys.argv[2])), default=str))
+            except Exception as e:
+                print(json.dumps({"success": False, "error": str(e)}))
         elif command == "delete_product_single" and len(sys.argv) > 2:
             try:
                 pid = int(sys.argv[2])
@@ -0,0 +1,30 @@
+# conftest.py
+"""
+Gemeinsame Fixtures: leere SQLite-DB unter tmp_path (Pool geleert, DATA_DIR
+und DB_PATH umgebogen) und dieselbe DB mit admin_settings-Tabelle.
+"""
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def temp_db(monkeypatch, tmp_path):
+    """Leere Datenbank für einen Test; liefert den Pfad der DB-Datei."""
+    database.close_all_connections()
+    monkeypatch.setattr(database, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+    yield tmp_path / "app_data.db"
+    database.close_all_connections()
+
+
+@pytest.fixture
+def admin_settings_db(temp_db):
+    """temp_db mit admin_settings-Tabelle und geleertem Settings-Cache."""
+    with database.db_connection() as conn:
+        conn.execute(
+            "CREATE TABLE admin_settings (key TEXT PRIMARY KEY, value TEXT, last_modified TEXT DEFAULT CURRENT_TIMESTAMP)"
+        )
+    database.invalidate_admin_settings_cache()
+    return temp_db
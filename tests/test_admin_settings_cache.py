@@ -0,0 +1,104 @@
+# test_admin_settings_cache.py
+"""
+Read-Through-Cache für Admin-Settings: Wiederholte Aufrufe ohne erneutes
+Parsen, Invalidierung durch save_admin_setting und durch Schreibzugriffe
+anderer Verbindungen (PRAGMA data_version), Bulk-Laden mehrerer Schlüssel.
+"""
+
+import json
+import sqlite3
+import threading
+
+import database
+
+
+def test_repeated_loads_parse_json_once(admin_settings_db, monkeypatch):
+    database.save_admin_setting("price_matrix_csv_data", {"rows": [1, 2, 3]})
+    calls = []
+    original = database.json.loads
+    monkeypatch.setattr(database.json, "loads", lambda value: (calls.append(1), original(value))[1])
+
+    for _ in range(5):
+        value = database.load_admin_setting("price_matrix_csv_data")
+    value["rows"].append(4)  # Kopie: Cache bleibt unverändert
+
+    assert len(calls) == 1
+    assert database.load_admin_setting("price_matrix_csv_data") == {"rows": [1, 2, 3]}
+
+
+def test_save_invalidates_cache_and_bumps_version(admin_settings_db):
+    database.save_admin_setting("company_name", "Alt GmbH")
+    assert database.load_admin_setting("company_name") == "Alt GmbH"
+    version = database.get_admin_settings_version()
+
+    database.save_admin_setting("company_name", "Neu GmbH")
+
+    assert database.load_admin_setting("company_name") == "Neu GmbH"
+    assert database.get_admin_settings_version() > version
+
+
+def test_write_from_other_connection_is_detected(admin_settings_db):
+    database.save_admin_setting("vat_rate", "19")
+    assert database.load_admin_setting("vat_rate") == "19"
+
+    other = sqlite3.connect(str(admin_settings_db))
+    other.execute("UPDATE admin_settings SET value = '7' WHERE key = 'vat_rate'")
+    other.commit()
+    other.close()
+
+    assert database.load_admin_setting("vat_rate") == "7"
+
+
+def test_bulk_load_uses_defaults_for_missing_keys(admin_settings_db):
+    database.save_admin_setting("company_name", "Solar GmbH")
+    database.save_admin_setting("feed_in_tariffs", json.dumps({"parts": [8.2]}))
+
+    values = database.load_admin_settings(
+        ["company_name", "feed_in_tariffs", "unknown_key"], defaults={"unknown_key": 42}
+    )
+
+    assert values == {"company_name": "Solar GmbH", "feed_in_tariffs": {"parts": [8.2]}, "unknown_key": 42}
+    # fehlender Schlüssel wird mit gecacht, Default bleibt aufruferspezifisch
+    assert database.load_admin_setting("unknown_key", "x") == "x"
+
+
+def test_version_is_stable_across_threads_without_writes(admin_settings_db):
+    database.save_admin_setting("vat_rate", "19")
+    version = database.get_admin_settings_version()
+    seen = []
+
+    def reader():
+        database.load_admin_setting("vat_rate")
+        seen.append(database.get_admin_settings_version())
+
+    for _ in range(5):
+        thread = threading.Thread(target=reader)
+        thread.start()
+        thread.join()
+
+    assert seen == [version] * 5
+
+
+def test_pool_writes_outside_save_admin_setting_bump_version(admin_settings_db):
+    database.save_admin_setting("vat_rate", "19")
+    version = database.get_admin_settings_version()
+
+    with database.db_connection() as conn:
+        conn.execute("UPDATE admin_settings SET value = '7' WHERE key = 'vat_rate'")
+
+    assert database.get_admin_settings_version() > version
+    assert database.load_admin_setting("vat_rate") == "7"
+
+
+def test_calculation_data_fingerprint_follows_settings_and_products(admin_settings_db):
+    import product_db
+
+    empty = database.get_calculation_data_fingerprint()
+    database.save_admin_setting("global_constants", {"vat_rate_percent": 19})
+    with_setting = database.get_calculation_data_fingerprint()
+    product_id = product_db.add_product({"category": "Modul", "model_name": "M1", "capacity_w": 400})
+    with_product = database.get_calculation_data_fingerprint()
+    product_db.update_product(product_id, {"capacity_w": 410})
+
+    assert len({empty, with_setting, with_product, database.get_calculation_data_fingerprint()}) == 4
+    assert database.get_calculation_data_fingerprint() == database.get_calculation_data_fingerprint()
@@ -0,0 +1,43 @@
+# test_atomic_files.py
+"""
+Atomares Schreiben und Generationswechsel: keine Reste bei Fehlern, Manifest
+wird zuletzt umgeschaltet, die vorige Generation bleibt erhalten.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from atomic_files import manifest_files, new_generation, publish_generation, write_array_atomic, write_bytes_atomic
+
+
+def _publish(directory, value):
+    generation = new_generation()
+    files = {"values": f"values-{generation}.npy"}
+    write_array_atomic(str(directory / files["values"]), np.array([value]))
+    publish_generation(str(directory), "manifest.json", {"files": files})
+    return set(files.values())
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path):
+    target = tmp_path / "sub" / "asset.png"
+    write_bytes_atomic(str(target), b"alt")
+
+    with pytest.raises(TypeError):
+        write_bytes_atomic(str(target), "kein bytes-Objekt")
+
+    assert target.read_bytes() == b"alt"
+    assert sorted(p.name for p in (tmp_path / "sub").iterdir()) == ["asset.png"]
+
+
+def test_publish_keeps_the_previous_generation_only(tmp_path):
+    first = _publish(tmp_path, 1)
+    second = _publish(tmp_path, 2)
+    third = _publish(tmp_path, 3)
+
+    assert {p.name for p in tmp_path.glob("*.npy")} == second | third
+    assert manifest_files(str(tmp_path / "manifest.json")) == third
+    assert json.loads((tmp_path / "manifest.json").read_text(encoding="utf-8"))["files"]["values"] in third
+    assert not first & {p.name for p in tmp_path.iterdir()}
+    assert manifest_files(str(tmp_path / "fehlt.json")) == set()
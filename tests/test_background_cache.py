@@ -0,0 +1,85 @@
+# test_background_cache.py
+"""
+Cache der vorbereiteten Hintergrundseiten in merge_with_background: Die
+Hintergrund-PDFs werden nur einmal gelesen, bei Änderungen neu aufgebaut,
+und jede Ausgabe enthält Hintergrund und Overlay.
+"""
+
+import io
+import os
+
+import pytest
+from pypdf import PdfReader
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from pdf_template_engine import dynamic_overlay
+
+
+def _pdf(texts):
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    for text in texts:
+        c.drawString(100, 700, text)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def bg_dir(tmp_path, monkeypatch):
+    for page in range(1, 8):
+        (tmp_path / f"nt_nt_{page:02d}.pdf").write_bytes(_pdf([f"Hintergrund {page}"]))
+    (tmp_path / "haus.pdf").write_bytes(_pdf(["Haus"]))
+    dynamic_overlay.clear_background_cache()
+
+    opened = []
+    original = dynamic_overlay.PdfReader
+
+    def counting_reader(stream, *args, **kwargs):
+        if isinstance(stream, str):
+            opened.append(os.path.basename(stream))
+        return original(stream, *args, **kwargs)
+
+    monkeypatch.setattr(dynamic_overlay, "PdfReader", counting_reader)
+    yield tmp_path, opened
+    dynamic_overlay.clear_background_cache()
+
+
+def _page_texts(pdf_bytes):
+    return [page.extract_text() for page in PdfReader(io.BytesIO(pdf_bytes)).pages]
+
+
+def test_backgrounds_are_read_once_for_many_offers(bg_dir):
+    path, opened = bg_dir
+    overlay = _pdf([f"Overlay {page}" for page in range(1, 8)])
+
+    for _ in range(5):
+        texts = _page_texts(dynamic_overlay.merge_with_background(overlay, path))
+
+    assert sorted(opened) == sorted([f"nt_nt_{page:02d}.pdf" for page in range(1, 8)] + ["haus.pdf"])
+    assert "Hintergrund 1" in texts[0] and "Haus" in texts[0] and "Overlay 1" in texts[0]
+    assert "Hintergrund 7" in texts[6] and "Overlay 7" in texts[6]
+
+
+def test_changed_background_is_reloaded(bg_dir):
+    path, opened = bg_dir
+    overlay = _pdf([f"Overlay {page}" for page in range(1, 8)])
+    dynamic_overlay.merge_with_background(overlay, path)
+
+    (path / "nt_nt_02.pdf").write_bytes(_pdf(["Neuer Hintergrund mit anderer Größe"]))
+    texts = _page_texts(dynamic_overlay.merge_with_background(overlay, path))
+
+    assert "Neuer Hintergrund" in texts[1]
+    assert len(opened) == 16
+
+
+def test_missing_background_falls_back_to_overlay(bg_dir):
+    path, _ = bg_dir
+    (path / "nt_nt_05.pdf").unlink()
+    overlay = _pdf([f"Overlay {page}" for page in range(1, 8)])
+
+    texts = _page_texts(dynamic_overlay.merge_with_background(overlay, path))
+
+    assert len(texts) == 7
+    assert texts[4].strip() == "Overlay 5"
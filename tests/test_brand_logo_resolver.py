@@ -0,0 +1,91 @@
+# test_brand_logo_resolver.py
+"""
+Gebündelte Logo-Auflösung für ein Angebot (Admin-Setting, Logo-Map, Tabelle;
+case-insensitiv, eine Tabellenabfrage) und LRU der dekodierten Bilder im Overlay.
+"""
+
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+import brand_logo_db
+import database
+import image_asset_store
+from pdf_template_engine import dynamic_overlay
+
+
+def _image_b64(color, image_format="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 4), color).save(buffer, image_format)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+@pytest.fixture
+def logo_db(admin_settings_db, monkeypatch, tmp_path):
+    monkeypatch.setattr(image_asset_store, "ASSET_DIR", str(tmp_path / "image_assets"))
+    return admin_settings_db
+
+
+def test_logos_are_resolved_in_one_batch(logo_db, monkeypatch):
+    database.save_admin_setting("brand_logo_Huawei", "SETTING_LOGO")
+    database.save_admin_setting("brand_logos", {"byd": "MAP_LOGO"})
+    brand_logo_db.add_brand_logo("Aiko", _image_b64("red"))
+    brand_logo_db.add_brand_logo("Fronius", "/9j/JPEGDATA", logo_format="JPEG")
+
+    queries = []
+    original = brand_logo_db.get_logos_for_brands
+    monkeypatch.setattr(
+        brand_logo_db, "get_logos_for_brands", lambda names, **kw: (queries.append(names), original(names, **kw))[1]
+    )
+
+    logos = brand_logo_db.resolve_brand_logos(["Huawei", "BYD", " aiko ", "FRONIUS", "Unbekannt"])
+
+    assert logos["Huawei"]["logo_base64"] == "SETTING_LOGO"
+    assert logos["BYD"]["logo_base64"] == "MAP_LOGO"
+    assert logos[" aiko "]["source"] == "brand_logos_table"
+    assert logos["FRONIUS"]["logo_format"] == "JPEG"
+    assert "Unbekannt" not in logos
+    assert queries == [[" aiko ", "FRONIUS", "Unbekannt"]]
+
+
+def test_database_get_brand_logo_uses_case_insensitive_table(logo_db):
+    brand_logo_db.add_brand_logo("SolarEdge", "TABLE_LOGO")
+
+    assert database.get_brand_logo("solaredge") == "TABLE_LOGO"
+    assert database.get_brand_logos(["SOLAREDGE", "Keine"]) == {"SOLAREDGE": "TABLE_LOGO", "Keine": None}
+
+
+def test_image_readers_are_cached_by_content(monkeypatch):
+    dynamic_overlay.clear_image_reader_cache()
+    monkeypatch.setattr(dynamic_overlay, "_IMAGE_READER_CACHE_SIZE", 2)
+    decoded = []
+    original = dynamic_overlay.base64.b64decode
+    monkeypatch.setattr(dynamic_overlay.base64, "b64decode", lambda s: (decoded.append(1), original(s))[1])
+    red, green, blue = _image_b64("red"), _image_b64("green"), _image_b64("blue")
+
+    first = dynamic_overlay._as_image_reader(red)
+    second = dynamic_overlay._as_image_reader("data:image/png;base64," + red)
+
+    assert len(decoded) == 1
+    assert first is not second and first.getSize() == second.getSize() == (8, 4)
+    dynamic_overlay._as_image_reader(green)
+    dynamic_overlay._as_image_reader(blue)  # verdrängt red
+    dynamic_overlay._as_image_reader(red)
+    assert len(decoded) == 4
+    assert dynamic_overlay._as_image_reader(base64.b64encode(b"<svg/>").decode()) is None
+    dynamic_overlay.clear_image_reader_cache()
+
+
+def test_jpeg_clones_have_their_own_file_handle():
+    dynamic_overlay.clear_image_reader_cache()
+    jpeg = _image_b64("red", "JPEG")
+
+    first = dynamic_overlay._as_image_reader(jpeg)
+    second = dynamic_overlay._as_image_reader(jpeg)
+
+    assert first.jpeg_fh() is first.fp and second.jpeg_fh() is second.fp
+    assert first.jpeg_fh() is not second.jpeg_fh()
+    assert first.jpeg_fh().read() == base64.b64decode(jpeg)
+    dynamic_overlay.clear_image_reader_cache()
@@ -0,0 +1,71 @@
+# test_calculation_bridge_worker.py
+"""
+Worker-Modus der Calculation-Bridge (apps/main/calculation_bridge.py --worker)
+im selben Prozess: zeilenweises JSON-RPC über Streams, ready-Meldung,
+Berechnung, Fehlercodes und shutdown; stdout trägt nur Protokollzeilen.
+"""
+
+import importlib.util
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+import calculations
+
+BRIDGE_PATH = Path(__file__).resolve().parent.parent / "apps" / "main" / "calculation_bridge.py"
+
+
+@pytest.fixture
+def bridge(temp_db, monkeypatch):
+    monkeypatch.setattr(
+        calculations, "real_load_admin_setting",
+        lambda key, default=None: calculations.Dummy_load_admin_setting_calc(key, default),
+    )
+    spec = importlib.util.spec_from_file_location("calculation_bridge_worker", BRIDGE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run(bridge, lines):
+    output = io.StringIO()
+    bridge.run_worker(io.StringIO("".join(line + "\n" for line in lines)), output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_worker_serves_requests_until_shutdown(bridge, capsys):
+    configuration = {
+        "selectedModules": [{"id": 1, "power_wp": 400, "count": 20}],
+        "consumptionData": {"annual_consumption_kwh": 4500},
+    }
+    requests = [
+        {"jsonrpc": "2.0", "id": 1, "method": "ping"},
+        {"jsonrpc": "2.0", "id": 2, "method": "perform_calculations", "params": {"configuration": configuration}},
+        {"jsonrpc": "2.0", "id": 3, "method": "unbekannt"},
+        {"jsonrpc": "2.0", "id": 4, "method": "shutdown"},
+        {"jsonrpc": "2.0", "id": 5, "method": "ping"},
+    ]
+    lines = [json.dumps(r) for r in requests[:3]] + ["", "{kaputt", "[1, 2]"] + [json.dumps(r) for r in requests[3:]]
+
+    ready, ping, calc, unknown, parse_error, invalid, shutdown = _run(bridge, lines)
+
+    assert ready["method"] == "ready" and ready["params"]["pid"] == ping["result"]["pid"]
+    assert ping == {"jsonrpc": "2.0", "id": 1, "result": {"success": True, "pid": ready["params"]["pid"]}}
+    assert calc["id"] == 2 and calc["result"]["success"] is True
+    assert "total_investment_netto" in calc["result"]["calculation_results"]
+    assert unknown["error"]["code"] == bridge.JSONRPC_METHOD_NOT_FOUND
+    assert parse_error["id"] is None and parse_error["error"]["code"] == bridge.JSONRPC_PARSE_ERROR
+    assert invalid["error"]["code"] == bridge.JSONRPC_INVALID_REQUEST
+    # Nach shutdown wird nichts mehr beantwortet; Debug-Ausgaben landen nicht auf stdout
+    assert shutdown == {"jsonrpc": "2.0", "id": 4, "result": {"success": True}}
+    assert capsys.readouterr().out == ""
+
+
+def test_worker_replaces_non_finite_floats(bridge, monkeypatch):
+    monkeypatch.setattr(bridge, "dispatch_rpc", lambda method, params: {"success": True, "irr": float("nan")})
+
+    _, response = _run(bridge, [json.dumps({"jsonrpc": "2.0", "id": 1, "method": "perform_calculations"})])
+
+    assert response["result"] == {"success": True, "irr": None}
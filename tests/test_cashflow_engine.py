@@ -0,0 +1,166 @@
+# test_cashflow_engine.py
+"""
+Parität der vektorisierten Cashflow-Engine mit der bisherigen Jahresschleife
+aus calculations.perform_calculations.
+"""
+
+import random
+
+import numpy as np
+
+import cashflow_engine
+from cashflow_engine import project_costs_without_pv, simulate_yearly_cash_flows
+
+
+def _reference_loop(p):
+    """Die ursprüngliche Jahresschleife aus perform_calculations (unverändert übernommen)."""
+    cash_flows = [-p["investment"]]
+    productions, benefits, maintenance, yearly_cfs, prices, tariffs, feed_in_revs = ([] for _ in range(7))
+    for year_idx in range(1, p["years"] + 1):
+        current_year_production = p["production"] * (p["degradation"] ** (year_idx - 1))
+        productions.append(current_year_production)
+        ev_share = p["ev"] / p["production"] if p["production"] > 0 else 0
+        feed_share = p["feed_in"] / p["production"] if p["production"] > 0 else 0
+        current_year_ev = current_year_production * ev_share
+        current_year_feed_in = current_year_production * feed_share
+        elec_price = p["price"] * ((1 + p["increase_percent"] / 100.0) ** (year_idx - 1))
+        prices.append(elec_price)
+        tariff = p["tariff"]
+        if year_idx > p["eeg_years"]:
+            tariff = p["market_value"]
+        tariffs.append(tariff)
+        savings = current_year_ev * elec_price
+        feed_in_rev = current_year_feed_in * tariff
+        feed_in_revs.append(feed_in_rev)
+        tax = feed_in_rev * (p["tax_percent"] / 100.0) if p["gewerblich"] else 0.0
+        maint = p["maint1"] * ((1 + p["maint_rate"]) ** (year_idx - 1))
+        maintenance.append(maint)
+        benefit = savings + feed_in_rev + tax
+        benefits.append(benefit)
+        cash_flows.append(benefit - maint)
+        yearly_cfs.append(benefit - maint)
+    return {
+        "annual_productions": productions,
+        "annual_benefits": benefits,
+        "annual_maintenance_costs": maintenance,
+        "annual_cash_flows": yearly_cfs,
+        "annual_elec_prices": prices,
+        "annual_feed_in_tariffs": tariffs,
+        "annual_revenue_from_feed_in": feed_in_revs,
+        "cumulative_cash_flows": np.cumsum(cash_flows).tolist(),
+    }
+
+
+def _random_params(rng):
+    production = rng.choice([0.0, rng.uniform(2000, 60000)])
+    return {
+        "production": production,
+        "ev": production * rng.uniform(0.1, 0.8),
+        "feed_in": production * rng.uniform(0.1, 0.6),
+        "years": rng.randint(1, 40),
+        "degradation": 1 - rng.uniform(0, 1) / 100,
+        "price": rng.uniform(0.2, 0.5),
+        "increase_percent": rng.uniform(0, 6),
+        "tariff": rng.uniform(0.05, 0.13),
+        "eeg_years": rng.randint(10, 20),
+        "market_value": rng.uniform(0.01, 0.05),
+        "gewerblich": rng.random() < 0.5,
+        "tax_percent": rng.uniform(0, 45),
+        "maint1": rng.uniform(0, 500),
+        "maint_rate": rng.uniform(0, 0.04),
+        "investment": rng.uniform(5000, 80000),
+    }
+
+
+def _engine(p):
+    return simulate_yearly_cash_flows(
+        annual_production_kwh=p["production"],
+        self_consumption_kwh=p["ev"],
+        feed_in_kwh=p["feed_in"],
+        years=p["years"],
+        degradation_factor=p["degradation"],
+        electricity_price_kwh=p["price"],
+        electricity_price_increase_percent=p["increase_percent"],
+        feed_in_tariff_eur_kwh=p["tariff"],
+        eeg_period_years=p["eeg_years"],
+        market_value_after_eeg_eur_kwh=p["market_value"],
+        tax_rate_percent=p["tax_percent"] if p["gewerblich"] else 0.0,
+        maintenance_costs_year1=p["maint1"],
+        maintenance_increase_rate=p["maint_rate"],
+        total_investment_netto=p["investment"],
+    )
+
+
+def test_engine_matches_reference_loop():
+    rng = random.Random(1234)
+    for _ in range(200):
+        params = _random_params(rng)
+        expected = _reference_loop(params)
+        actual = _engine(params)
+        for key, values in expected.items():
+            assert len(actual[key]) == len(values), key
+            np.testing.assert_allclose(actual[key], values, rtol=1e-12, atol=1e-9, err_msg=key)
+
+
+def test_batch_matches_single_variants():
+    rng = random.Random(99)
+    variants = [_random_params(rng) for _ in range(50)]
+    for v in variants:
+        v["years"] = 25
+        v["eeg_years"] = 20
+    batch_params = {key: np.array([v[key] for v in variants]) for key in variants[0]}
+    batch_params["years"] = 25
+    batch_params["eeg_years"] = 20
+    batch_params["gewerblich"] = True
+    batch_params["tax_percent"] = np.array([v["tax_percent"] if v["gewerblich"] else 0.0 for v in variants])
+    batch = _engine(batch_params)
+
+    assert batch["annual_cash_flows"].shape == (50, 25)
+    assert batch["cumulative_cash_flows"].shape == (50, 26)
+    for i, v in enumerate(variants):
+        single = _engine(v)
+        np.testing.assert_allclose(batch["annual_cash_flows"][i], single["annual_cash_flows"], rtol=1e-12)
+        np.testing.assert_allclose(batch["cumulative_cash_flows"][i], single["cumulative_cash_flows"], rtol=1e-12)
+
+
+def test_cost_projection_matches_reference_loop():
+    consumption, price, increase, years = 4500.0, 0.34, 3.5, 25
+    expected = [consumption * price * ((1 + increase / 100.0) ** y) for y in range(years)]
+    projection = project_costs_without_pv(consumption, price, increase, years)
+    np.testing.assert_allclose(projection["annual_costs"], expected, rtol=1e-12)
+    assert abs(float(projection["total_with_increase"]) - sum(expected)) < 1e-6
+    assert abs(float(projection["total_without_increase"]) - consumption * price * years) < 1e-6
+
+
+def test_many_variants_run_in_one_vectorized_pass(monkeypatch):
+    # Pro Reihe (Strompreis, Wartung) genau ein growth_factors-Aufruf, unabhängig von n
+    calls = []
+    original = cashflow_engine.growth_factors
+    monkeypatch.setattr(cashflow_engine, "growth_factors", lambda rate, years: calls.append(np.shape(rate)) or original(rate, years))
+    n = 5000
+    rng = np.random.default_rng(7)
+    params = dict(
+        annual_production_kwh=rng.uniform(3000, 20000, n),
+        self_consumption_kwh=rng.uniform(1000, 3000, n),
+        feed_in_kwh=rng.uniform(1000, 8000, n),
+        years=40,
+        degradation_factor=0.995,
+        electricity_price_kwh=rng.uniform(0.25, 0.45, n),
+        electricity_price_increase_percent=3.0,
+        feed_in_tariff_eur_kwh=0.0786,
+        eeg_period_years=20,
+        market_value_after_eeg_eur_kwh=0.03,
+        tax_rate_percent=0.0,
+        maintenance_costs_year1=150.0,
+        maintenance_increase_rate=0.02,
+        total_investment_netto=rng.uniform(10000, 40000, n),
+    )
+    result = simulate_yearly_cash_flows(**params)
+
+    assert result["annual_cash_flows"].shape == (n, 40)
+    assert len(calls) == 2
+    for i in (0, n // 2, n - 1):
+        single = simulate_yearly_cash_flows(
+            **{key: value[i] if isinstance(value, np.ndarray) else value for key, value in params.items()}
+        )
+        np.testing.assert_allclose(result["cumulative_cash_flows"][i], single["cumulative_cash_flows"], rtol=1e-12)
@@ -0,0 +1,139 @@
+# test_chart_render_service.py
+"""
+Chart-Render-Service: kurze Hash-Schlüssel, LRU im Speicher, Platten-Cache
+über Neustarts, paralleles Rendern und Messwerte je Diagramm. Kaleido wird
+durch einen Fake-Renderer ersetzt.
+"""
+
+import threading
+import time
+
+import plotly.graph_objects as go
+import pytest
+
+import chart_render_service as crs
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    monkeypatch.setattr(crs, "CACHE_DIR", str(tmp_path / "chart_cache"))
+    crs.clear_memory_cache()
+    crs.reset_render_metrics()
+    calls = []
+
+    def fake_render(fig, options):
+        calls.append(threading.get_ident())
+        time.sleep(0.05)
+        return f"PNG:{fig.layout.title.text}:{options['width']}".encode()
+
+    yield fake_render, calls
+    crs.clear_memory_cache()
+
+
+def _fig(title):
+    return go.Figure(go.Bar(x=[1, 2], y=[3, 4]), layout={"title": {"text": title}})
+
+
+def test_key_is_short_and_depends_on_export_options():
+    fig_json = _fig("a").to_json()
+    key = crs.chart_key(fig_json)
+    assert len(key) == 32
+    assert key == crs.chart_key(fig_json)
+    assert key != crs.chart_key(fig_json, width=900)
+
+
+def test_disk_cache_survives_memory_reset(service):
+    renderer, calls = service
+    first = crs.render_png(_fig("A"), renderer=renderer)
+    crs.clear_memory_cache()  # wie nach einem Neustart
+    second = crs.render_png(_fig("A"), renderer=renderer)
+    third = crs.render_png(_fig("A"), renderer=renderer)
+
+    assert first == second == third == b"PNG:A:800"
+    assert len(calls) == 1
+    assert [m["source"] for m in crs.get_render_metrics()] == ["render", "disk", "memory"]
+
+
+def test_memory_lru_evicts_single_entries(service, monkeypatch):
+    renderer, _ = service
+    monkeypatch.setattr(crs, "MAX_MEMORY_ENTRIES", 2)
+    for title in ("A", "B", "C"):
+        crs.render_png(_fig(title), renderer=renderer)
+
+    assert len(crs._MEMORY) == 2
+
+
+def test_render_many_runs_concurrently_with_metrics(service):
+    renderer, calls = service
+    figures = {f"chart_{i}": _fig(str(i)) for i in range(4)}
+    figures["missing_chart"] = None
+
+    started = time.perf_counter()
+    results = crs.render_many(figures, renderer=renderer)
+    elapsed = time.perf_counter() - started
+
+    assert results["chart_2"] == b"PNG:2:800"
+    assert results["missing_chart"] is None
+    assert len(set(calls)) > 1
+    assert elapsed < 4 * 0.05
+    metrics = {m["chart"]: m for m in crs.get_render_metrics()}
+    assert set(metrics) == {f"chart_{i}" for i in range(4)}
+    assert all(m["seconds"] >= 0.05 for m in metrics.values())
+
+
+def test_render_errors_are_reported(service):
+    def broken(fig, options):
+        raise RuntimeError("Kaleido requires Google Chrome")
+
+    errors = []
+    results = crs.render_many({"a": _fig("x"), "b": _fig("y")}, renderer=broken, on_error=lambda n, e: errors.append(n))
+
+    assert results == {"a": None, "b": None}
+    assert sorted(errors) == ["a", "b"]
+
+
+def test_analysis_chart_exports_are_batched_into_one_render_many(service, monkeypatch):
+    analysis = pytest.importorskip("analysis")
+    fake_render, calls = service
+    batches = []
+    render_many = crs.render_many
+
+    def recording_render_many(figures, **kwargs):
+        batches.append(sorted(figures))
+        return render_many(figures, renderer=fake_render, **kwargs)
+
+    monkeypatch.setattr(crs, "render_many", recording_render_many)
+    monkeypatch.setattr(analysis, "_export_plotly_fig_to_bytes", lambda *a: pytest.fail("Einzel-Export statt Batch"))
+    results, other = {}, {}
+
+    with analysis._deferred_chart_exports({}):
+        analysis._queue_chart_export(results, "a_chart_bytes", _fig("alt"), {})
+        analysis._queue_chart_export(results, "a_chart_bytes", _fig("a"), {})
+        analysis._queue_chart_export(results, "b_chart_bytes", _fig("b"), {})
+        analysis._queue_chart_export(other, "a_chart_bytes", _fig("c"), {})
+        analysis._queue_chart_export(results, "leer_chart_bytes", None, {})
+        assert results["a_chart_bytes"] is None
+
+    assert batches == [["a_chart_bytes#0", "a_chart_bytes#2", "b_chart_bytes"]]
+    assert results == {"a_chart_bytes": b"PNG:a:800", "b_chart_bytes": b"PNG:b:800", "leer_chart_bytes": None}
+    assert other == {"a_chart_bytes": b"PNG:c:800"}
+    assert len(calls) == 3
+
+
+def test_disk_cache_is_only_scanned_when_the_limit_is_crossed(service, monkeypatch):
+    monkeypatch.setattr(crs, "MAX_DISK_BYTES", 100)
+    scans = []
+    scan_disk = crs._scan_disk
+    monkeypatch.setattr(crs, "_scan_disk", lambda: (scans.append(1), scan_disk())[1])
+
+    def renderer(fig, options):
+        return b"x" * 30
+
+    for title in ("A", "B", "C"):
+        crs.render_png(_fig(title), renderer=renderer)
+    assert len(scans) == 1  # nur die Erfassung beim ersten Schreiben
+
+    crs.render_png(_fig("D"), renderer=renderer)  # 120 > 100 Bytes
+
+    assert len(scans) == 2
+    assert len(scan_disk()) == 3 and crs._DISK_USAGE["bytes"] == 90
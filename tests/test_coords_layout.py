@@ -0,0 +1,77 @@
+# test_coords_layout.py
+"""
+Kompiliertes Koordinaten-Layout: gleiche Elemente wie der zeilenweise Parser,
+Wiederverwendung über den Platten-Cache und Neuaufbau nach Änderungen.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from pdf_template_engine import coords_layout
+
+COORDS_DIR = Path(__file__).resolve().parent.parent / "coords"
+
+SAMPLE = """Text: 36.958,00 EUR*
+Position: (458.78, 343.09, 533.52, 355.26)
+Schriftart: Helvetica-Regular
+Schriftgröße: 10,5
+Farbe: 0x1B3670
+----------------------------------------
+Text: Kopfzeile
+Position: (10, 20, 110, 40)
+Schriftart: Helvetica-Bold
+Schriftgröße: 12
+Farbe: 0
+"""
+
+
+@pytest.fixture
+def layout_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(coords_layout, "CACHE_DIR", tmp_path / "layout_cache")
+    coords_layout.clear_memory_cache()
+    yield tmp_path
+    coords_layout.clear_memory_cache()
+
+
+def test_compiled_elements_are_resolved(layout_cache):
+    path = layout_cache / "seite1.yml"
+    path.write_text(SAMPLE, encoding="utf-8")
+
+    first, second = coords_layout.load_layout(path, page_height=800.0)
+
+    assert first["position"] == (458.78, 343.09, 533.52, 355.26)
+    assert first["resolved_font"] == "Helvetica"
+    assert first["font_size"] == 10.5
+    assert first["color"] == 0x1B3670
+    assert first["placeholder_key"] == "anlage_kwp"
+    assert (first["draw_x"], first["draw_y"]) == pytest.approx((458.78, 800.0 - 355.26))
+    assert second["placeholder_key"] is None
+
+
+def test_disk_cache_is_reused_until_content_changes(layout_cache, monkeypatch):
+    path = layout_cache / "seite2.yml"
+    path.write_text(SAMPLE, encoding="utf-8")
+    coords_layout.load_layout(path)
+
+    calls = []
+    original = coords_layout.parse_coords_text
+    monkeypatch.setattr(coords_layout, "parse_coords_text", lambda text: (calls.append(1), original(text))[1])
+
+    coords_layout.clear_memory_cache()
+    coords_layout.load_layout(path)
+    os.utime(path, ns=(1, 1))  # nur mtime geändert: Hash passt noch
+    coords_layout.load_layout(path)
+    assert calls == []
+
+    path.write_text(SAMPLE.replace("Kopfzeile", "Fußzeile"), encoding="utf-8")
+    assert coords_layout.load_layout(path)[1]["text"] == "Fußzeile"
+    assert calls == [1]
+
+
+def test_repository_coords_files_compile(layout_cache):
+    for page in range(1, 8):
+        elements = coords_layout.load_layout(COORDS_DIR / f"seite{page}.yml")
+        assert elements
+        assert all(elem["resolved_font"] in ("Helvetica", "Helvetica-Bold") for elem in elements)
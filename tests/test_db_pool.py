@@ -0,0 +1,121 @@
+# test_db_pool.py
+"""
+Verbindungs-Pool in database.py: Wiederverwendung pro Thread, Pragmas,
+close()-Semantik und einmalige Schema-Prüfungen.
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+import database
+import product_db
+
+
+def test_connection_is_reused_per_thread(temp_db):
+    first = database.get_db_connection()
+    first.close()
+    second = database.get_db_connection()
+    second.close()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(database.get_db_connection().raw_connection))
+    thread.start()
+    thread.join()
+
+    assert first.raw_connection is second.raw_connection
+    assert other[0] is not first.raw_connection
+
+
+def test_pragmas_are_applied(temp_db):
+    conn = database.get_db_connection()
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert isinstance(conn.execute("SELECT 1 AS one").fetchone(), sqlite3.Row)
+    finally:
+        conn.close()
+
+
+def test_close_discards_uncommitted_changes_only_at_outermost_level(temp_db):
+    with database.db_connection() as conn:
+        conn.execute("CREATE TABLE items (name TEXT)")
+
+    outer = database.get_db_connection()
+    outer.execute("INSERT INTO items VALUES ('outer')")
+    inner = database.get_db_connection()
+    inner.close()  # verschachtelter Aufruf darf die äußere Transaktion nicht verwerfen
+    outer.commit()
+    outer.execute("INSERT INTO items VALUES ('discarded')")
+    outer.close()
+
+    with database.db_connection() as conn:
+        names = [row["name"] for row in conn.execute("SELECT name FROM items")]
+    assert names == ["outer"]
+
+
+def test_db_connection_rolls_back_on_error(temp_db):
+    with database.db_connection() as conn:
+        conn.execute("CREATE TABLE items (name TEXT)")
+    with pytest.raises(RuntimeError):
+        with database.db_connection() as conn:
+            conn.execute("INSERT INTO items VALUES ('x')")
+            raise RuntimeError("boom")
+
+    with database.db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+
+def test_product_schema_check_runs_once_per_process(temp_db, monkeypatch):
+    calls = []
+    original = product_db._create_product_table
+    monkeypatch.setattr(product_db, "_create_product_table", lambda conn: (calls.append(1), original(conn)))
+
+    for _ in range(5):
+        product_db.list_products()
+    assert len(calls) == 1
+
+    database.close_all_connections()  # z.B. nach Restore: Prüfung erneut
+    product_db.list_products()
+    assert len(calls) == 2
+
+
+def test_dropped_checkout_is_rolled_back_and_not_committed_by_next_caller(temp_db):
+    with database.db_connection() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER)")
+
+    def leaky_writer():
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO items VALUES (1)")
+        raise RuntimeError("Fehlerpfad ohne close()")
+
+    with pytest.raises(RuntimeError):
+        leaky_writer()
+    with database.db_connection() as conn:
+        conn.execute("INSERT INTO items VALUES (2)")
+
+    other = sqlite3.connect(str(temp_db))
+    try:
+        assert other.execute("SELECT id FROM items").fetchall() == [(2,)]
+        other.execute("INSERT INTO items VALUES (3)")  # keine Schreibsperre mehr offen
+        other.commit()
+    finally:
+        other.close()
+
+
+def test_connections_are_closed_when_threads_exit(temp_db):
+    opened = []
+
+    def worker():
+        conn = database.get_db_connection()
+        opened.append(conn.raw_connection)
+        conn.close()
+
+    for _ in range(20):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+    assert len(opened) == 20 and all(conn.pool_closed for conn in opened)
+    assert not any(conn in database._POOL_CONNECTIONS for conn in opened)
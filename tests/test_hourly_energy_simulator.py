@@ -0,0 +1,152 @@
+# test_hourly_energy_simulator.py
+"""
+Stündliche Energiebilanz: Profile, Übereinstimmung des Phasen-Kernels mit einer
+einfachen Stundenschleife, Energieerhaltung und Speicherdimensionierung.
+"""
+
+import copy
+import math
+import os
+import time
+
+import numpy as np
+import pytest
+
+import calculations
+from hourly_energy_simulator import (
+    HOURS_PER_YEAR,
+    optimal_storage_size,
+    pv_production_profile,
+    simulate_storage_grid,
+    simulate_storage_sizing,
+    standard_load_profile,
+)
+
+GRID_BUDGET_MS = float(os.environ.get("KAKERLAKE_STORAGE_GRID_BUDGET_MS", "50"))
+
+
+@pytest.fixture(scope="module")
+def profiles():
+    return pv_production_profile(annual_production_kwh=8000.0), standard_load_profile(4500.0)
+
+
+def _reference_dispatch(pv, load, capacity, round_trip_efficiency=0.9, c_rate=0.5):
+    """Unvektorisierte Stundenschleife als Referenz."""
+    eta = math.sqrt(round_trip_efficiency)
+    soc = 0.0
+    delivered = 0.0
+    for production, consumption in zip(pv, load):
+        if production > consumption:
+            soc = min(capacity, soc + min(production - consumption, c_rate * capacity) * eta)
+        else:
+            new_soc = max(0.0, soc - min(consumption - production, c_rate * capacity) / eta)
+            delivered += (soc - new_soc) * eta
+            soc = new_soc
+    return delivered
+
+
+def test_profiles_match_annual_totals(profiles):
+    pv, load = profiles
+    assert pv.shape == load.shape == (HOURS_PER_YEAR,)
+    assert pv.sum() == pytest.approx(8000.0)
+    assert load.sum() == pytest.approx(4500.0)
+    # Nachts keine Erzeugung, Winterabend-Spitze im Lastprofil
+    assert pv.reshape(365, 24)[:, 0].max() == 0.0
+    january = load[: 31 * 24].reshape(31, 24).mean(axis=0)
+    assert january.argmax() in (18, 19)
+
+
+def test_pv_profile_follows_monthly_values():
+    monthly = [100.0 * (m + 1) for m in range(12)]
+    pv = pv_production_profile(monthly)
+    month_of_hour = np.repeat(np.repeat(np.arange(12), (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)), 24)
+    assert np.bincount(month_of_hour, weights=pv) == pytest.approx(monthly)
+
+
+def test_kernel_matches_hourly_loop(profiles):
+    pv, load = profiles
+    capacities = [0.0, 3.0, 7.5, 15.0]
+    result = simulate_storage_grid(pv, load, capacities)
+
+    expected = [_reference_dispatch(pv, load, c) for c in capacities]
+    assert result["battery_discharge_kwh"] == pytest.approx(expected, rel=1e-9, abs=1e-6)
+
+
+def test_energy_balance_is_conserved(profiles):
+    pv, load = profiles
+    result = simulate_storage_grid(pv, load, [0.0, 5.0, 10.0], include_hourly=True)
+
+    losses = result["battery_charge_kwh"] - result["battery_discharge_kwh"] - result["soc_kwh"][:, -1]
+    assert result["direct_consumption_kwh"] + result["battery_charge_kwh"] + result["feed_in_kwh"] == pytest.approx(
+        np.full(3, pv.sum())
+    )
+    assert result["self_consumption_kwh"] + result["grid_purchase_kwh"] == pytest.approx(np.full(3, load.sum()))
+    assert np.all(losses >= -1e-9)
+    assert result["battery_discharge_kwh"][0] == 0.0
+    assert np.all(np.diff(result["autarky_percent"]) >= 0)
+    assert np.all(result["soc_kwh"].max(axis=1) <= np.array([0.0, 5.0, 10.0]) + 1e-9)
+
+
+def test_optimal_size_saturates():
+    grid = simulate_storage_sizing(4500.0, annual_production_kwh=8000.0)
+    size = optimal_storage_size(grid)
+
+    assert 2.0 <= size <= 10.0
+    assert optimal_storage_size(grid, min_marginal_gain_kwh_per_kwh=1e9) == 0.0
+
+
+def test_grid_stays_within_budget(profiles):
+    pv, load = profiles
+    simulate_storage_grid(pv, load)
+    start = time.perf_counter()
+    for _ in range(5):
+        simulate_storage_grid(pv, load)
+    elapsed_ms = (time.perf_counter() - start) / 5 * 1000
+    assert elapsed_ms < GRID_BUDGET_MS
+
+
+def test_perform_calculations_sizes_storage_by_simulation(monkeypatch):
+    monkeypatch.setattr(calculations, "real_load_admin_setting", calculations.Dummy_load_admin_setting_calc)
+    monkeypatch.setattr(calculations, "real_get_product_by_id", lambda pid: {"id": pid, "capacity_w": 400.0})
+    project = {
+        "project_details": {
+            "module_quantity": 20,
+            "selected_module_id": 1,
+            "annual_consumption_kwh_yr": 4500,
+            "electricity_price_kwh": 0.32,
+            "include_storage": True,
+            "selected_storage_storage_power_kw": 6.0,
+        },
+        "economic_data": {},
+    }
+
+    results = calculations.perform_calculations(copy.deepcopy(project), {}, [])
+
+    grid = results["storage_sizing_simulation"]
+    assert len(grid["capacities_kwh"]) == len(grid["autarky_percent"])
+    assert results["optimale_speichergröße_kwh_geschaetzt"] in grid["capacities_kwh"]
+
+
+def test_energy_flows_use_storage_from_real_results(monkeypatch):
+    monkeypatch.setattr(calculations, "real_load_admin_setting", calculations.Dummy_load_admin_setting_calc)
+    monkeypatch.setattr(calculations, "real_get_product_by_id", lambda pid: {"id": pid, "capacity_w": 400.0})
+    project = {
+        "project_details": {
+            "module_quantity": 20,
+            "selected_module_id": 1,
+            "annual_consumption_kwh_yr": 4500,
+            "electricity_price_kwh": 0.32,
+            "include_storage": True,
+            "selected_storage_storage_power_kw": 6.0,
+        },
+        "economic_data": {},
+    }
+    with_storage = calculations.perform_calculations(copy.deepcopy(project), {}, [])
+    project["project_details"]["include_storage"] = False
+    without_storage = calculations.perform_calculations(copy.deepcopy(project), {}, [])
+
+    balance = calculations._simulated_energy_balance(with_storage, include_hourly=True)
+    assert with_storage["include_storage"] is True
+    assert balance["battery_discharge_kwh"] > 0
+    assert any(value != 0 for value in balance["daily_battery_kw"])
+    assert calculations._simulated_energy_balance(without_storage)["battery_discharge_kwh"] == 0.0
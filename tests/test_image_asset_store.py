@@ -0,0 +1,179 @@
+# test_image_asset_store.py
+"""
+Normalisierte Bild-Assets: Deduplizierung nach Inhalt, vorberechnete
+Slot-Varianten (JPEG für Fotos, PNG für Logos), keine Vergrößerung kleiner
+Bilder und einmalige Einbettung desselben Logos pro Dokument.
+"""
+
+import base64
+import io
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+from reportlab.pdfgen import canvas
+
+import image_asset_store
+from image_asset_store import SLOT_SIZES_PT, print_variant, register_image
+from pdf_template_engine import dynamic_overlay
+
+
+@pytest.fixture(autouse=True)
+def asset_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(image_asset_store, "ASSET_DIR", str(tmp_path / "image_assets"))
+    image_asset_store.clear_memory_cache()
+    dynamic_overlay.clear_image_reader_cache()
+    yield tmp_path / "image_assets"
+    image_asset_store.clear_memory_cache()
+    dynamic_overlay.clear_image_reader_cache()
+
+
+def _photo_png(size=(1000, 700)):
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 255, size=(size[1], size[0], 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, "RGB").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _bmp(color, size=(40, 20)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "BMP")  # unkomprimiert: gleiche Länge je Größe
+    return buffer.getvalue()
+
+
+def _logo_png(size=(1200, 600)):
+    img = Image.new("RGBA", size, (0, 0, 0, 0))
+    img.paste((20, 90, 200, 255), (100, 100, size[0] - 100, size[1] - 100))
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _max_px(slot):
+    width, height = SLOT_SIZES_PT[slot]
+    return width / 72 * image_asset_store.PRINT_DPI, height / 72 * image_asset_store.PRINT_DPI
+
+
+def test_register_dedupes_and_precomputes_slot_variants(asset_dir):
+    raw = _photo_png()
+    b64 = base64.b64encode(raw).decode()
+
+    first = register_image(b64)
+    second = register_image("data:image/png;base64," + b64)
+    assert image_asset_store.wait_for_variants(timeout=30)
+
+    assert first == second
+    files = sorted(os.listdir(asset_dir / first[:2]))
+    suffix = f"{image_asset_store.PRINT_DPI:g}dpi_q{image_asset_store.JPEG_QUALITY}"
+    assert files.count(f"{first}.orig") == 1
+    assert {f"{first}_{slot}_{suffix}.jpg" for slot in SLOT_SIZES_PT} <= set(files)
+    with Image.open(io.BytesIO(print_variant(raw, "page4_component"))) as variant:
+        max_w, max_h = _max_px("page4_component")
+        assert variant.format == "JPEG"
+        assert variant.width <= max_w + 1 and variant.height <= max_h + 1
+
+
+def test_logo_stays_png_and_small_images_are_not_upscaled():
+    logo = _logo_png()
+    with Image.open(io.BytesIO(print_variant(logo, "brand_logo"))) as variant:
+        assert variant.format == "PNG" and variant.mode == "RGBA"
+        assert variant.width <= _max_px("brand_logo")[0] + 1
+
+    tiny = _logo_png((40, 20))
+    assert print_variant(tiny, "title_image") == tiny
+
+
+def test_variant_is_reused_from_disk_and_unreadable_input_falls_back():
+    raw = _photo_png((1000, 800))
+    variant = print_variant(raw, "product_image")
+    image_asset_store.clear_memory_cache()
+
+    assert print_variant(raw, "product_image") == variant
+    assert print_variant(b"keine Bilddaten", "product_image") == b"keine Bilddaten"
+    assert print_variant("none", "product_image") is None
+
+
+def test_same_logo_is_embedded_once_and_small():
+    logo_b64 = base64.b64encode(_photo_png((1600, 800))).decode()
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    for _ in range(3):
+        c.drawImage(dynamic_overlay._as_image_reader(logo_b64, "brand_logo"), 10, 10, 60, 30)
+        c.showPage()
+    c.save()
+    pdf = buffer.getvalue()
+
+    assert pdf.count(b"/Subtype /Image") == 1
+    assert len(pdf) < len(base64.b64decode(logo_b64)) / 10
+
+
+def test_product_image_is_registered_on_save(monkeypatch, asset_dir):
+    import product_db
+
+    registered = []
+    monkeypatch.setattr(image_asset_store, "register_image", lambda data: registered.append(data))
+    product_db._register_image_asset("QUJD")
+    product_db._register_image_asset(None)
+
+    assert registered == ["QUJD"]
+
+
+def test_register_renders_variants_in_background(monkeypatch, asset_dir):
+    import threading
+
+    release = threading.Event()
+    rendered = []
+    render_variant = image_asset_store.render_variant
+
+    def slow_render(raw, size_pt, dpi=None):
+        release.wait(10)
+        rendered.append(size_pt)
+        return render_variant(raw, size_pt, dpi)
+
+    monkeypatch.setattr(image_asset_store, "render_variant", slow_render)
+    aid = register_image(_photo_png((400, 300)))
+
+    assert rendered == [] and (asset_dir / aid[:2] / f"{aid}.orig").exists()
+    release.set()
+    assert image_asset_store.wait_for_variants(timeout=30)
+    assert len(rendered) == len(SLOT_SIZES_PT)
+
+
+def test_print_settings_are_part_of_the_variant_key(monkeypatch):
+    raw = _photo_png((1000, 700))
+    low = print_variant(raw, "title_image")
+    monkeypatch.setattr(image_asset_store, "JPEG_QUALITY", 40)
+
+    lower_quality = print_variant(raw, "title_image")
+    monkeypatch.setattr(image_asset_store, "PRINT_DPI", 72.0)
+    image_asset_store.clear_memory_cache()
+
+    assert lower_quality != low and len(lower_quality) < len(low)
+    with Image.open(io.BytesIO(print_variant(raw, "title_image"))) as variant:
+        assert variant.width <= SLOT_SIZES_PT["title_image"][0] + 1
+
+
+def test_known_base64_is_neither_decoded_nor_hashed_again(monkeypatch):
+    b64 = base64.b64encode(_photo_png((600, 400))).decode()
+    variant = print_variant(b64, "product_image")
+    image_asset_store._memory.clear()  # Variante von Platte, Asset-ID aus dem Cache
+
+    monkeypatch.setattr(image_asset_store, "decode_image_input", lambda data: pytest.fail("dekodiert"))
+    monkeypatch.setattr(image_asset_store, "asset_id", lambda raw: pytest.fail("gehasht"))
+    assert print_variant(b64, "product_image") == variant
+
+
+def test_asset_ids_are_keyed_on_content_not_hash(monkeypatch):
+    # Auch bei kollidierendem hash() bekommt jedes Bild seine eigene Asset-ID
+    monkeypatch.setattr(image_asset_store, "hash", lambda data: 0, raising=False)
+    first, second = (base64.b64encode(_bmp(color)).decode() for color in ("red", "blue"))
+    assert len(first) == len(second) and first != second
+
+    red = print_variant(first, "brand_logo")
+    blue = print_variant(second, "brand_logo")
+
+    assert red != blue
+    assert Image.open(io.BytesIO(blue)).convert("RGB").getpixel((0, 0)) == (0, 0, 255)
+    assert image_asset_store._input_key("kurz") == (str, 4, "kurz")
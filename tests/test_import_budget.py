@@ -0,0 +1,47 @@
+# test_import_budget.py
+"""
+Import-Budget des Rechenkerns: Ein kalter Import von calculations bzw. der
+PDF-Platzhalter darf weder Streamlit noch pandas/requests laden und muss unter
+dem Zeitbudget bleiben (gemessen mit python -X importtime in einem frischen
+Prozess). Das Budget lässt sich per KAKERLAKE_IMPORT_BUDGET_MS anheben.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+IMPORT_BUDGET_MS = float(os.environ.get("KAKERLAKE_IMPORT_BUDGET_MS", "400"))
+HEAVY_MODULES = {"streamlit", "pandas", "requests"}
+
+
+def _cold_import(module: str):
+    """Liefert (kumulierte Importzeit in ms, Menge importierter Module)."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if cumulative_us.strip().isdigit():
+            cumulative[name.strip()] = int(cumulative_us) / 1000.0
+    return cumulative.get(module, 0.0), set(cumulative)
+
+
+@pytest.mark.parametrize("module", ["calculations", "pdf_template_engine.placeholders"])
+def test_core_import_is_headless(module):
+    _, imported = _cold_import(module)
+    assert not HEAVY_MODULES & imported
+
+
+def test_calculations_import_within_budget():
+    elapsed_ms, _ = _cold_import("calculations")
+    assert 0 < elapsed_ms < IMPORT_BUDGET_MS
@@ -0,0 +1,78 @@
+# test_irr_engine.py
+"""
+NPV-, IRR- und MIRR-Engine: Übereinstimmung mit den Definitionen aus
+numpy_financial, Stapelverarbeitung und Fälle ohne Lösung.
+"""
+
+import numpy as np
+import pytest
+
+from irr_engine import investment_cash_flows, irr, mirr, npv
+
+
+def _reference_npv(rate, cash_flows):
+    return sum(cf / (1 + rate) ** year for year, cf in enumerate(cash_flows))
+
+
+def _reference_mirr(cash_flows, finance_rate, reinvest_rate):
+    periods = len(cash_flows) - 1
+    future_value = sum(cf * (1 + reinvest_rate) ** (periods - t) for t, cf in enumerate(cash_flows) if cf > 0)
+    present_cost = -sum(cf / (1 + finance_rate) ** t for t, cf in enumerate(cash_flows) if cf < 0)
+    return (future_value / present_cost) ** (1 / periods) - 1
+
+
+def test_npv_matches_reference_and_accepts_rate_grid():
+    flows = [-20000.0] + [1500.0] * 25
+    rates = np.arange(0.01, 0.10, 0.01)
+
+    assert npv(0.04, flows) == pytest.approx(_reference_npv(0.04, flows), rel=1e-12)
+    np.testing.assert_allclose(npv(rates, flows), [_reference_npv(r, flows) for r in rates], rtol=1e-12)
+
+
+def test_irr_is_root_of_npv_for_batch():
+    rng = np.random.default_rng(3)
+    investment = rng.uniform(5000, 40000, 500)
+    benefit = rng.uniform(500, 4000, 500)
+    flows = investment_cash_flows(investment, benefit, 25)
+
+    rates = irr(flows)
+
+    assert rates.shape == (500,)
+    assert np.all(np.isfinite(rates))
+    residual = np.array([_reference_npv(r, row) for r, row in zip(rates, flows)])
+    np.testing.assert_allclose(residual / investment, 0.0, atol=1e-8)
+
+
+def test_irr_single_series_returns_float():
+    result = irr([-100.0, 60.0, 60.0])
+    assert isinstance(result, float)
+    assert result == pytest.approx(0.13066238629, abs=1e-9)
+
+
+def test_irr_without_sign_change_is_nan():
+    assert np.isnan(irr([100.0, 10.0, 10.0]))
+    assert np.isnan(irr([-100.0, -10.0]))
+
+
+def test_irr_above_initial_bound_widens_the_bracket():
+    # numpy_financial.irr([-100, 300]) == 2.0
+    assert irr([-100.0, 300.0]) == pytest.approx(2.0, abs=1e-9)
+    np.testing.assert_allclose(irr([[-100.0, 300.0, 0.0], [-100.0, 60.0, 60.0], [-1.0, 500.0, 0.0]]), [2.0, 0.13066238629, 499.0], atol=1e-8)
+    assert np.isnan(irr([-1.0, 5000.0]))  # jenseits von IRR_MAX_UPPER_BOUND
+
+
+def test_irr_prefers_root_closest_to_zero():
+    # NPV-Nullstellen bei 10 % und 20 %
+    assert irr([-100.0, 230.0, -132.0]) == pytest.approx(0.10, abs=1e-9)
+
+
+def test_mirr_matches_reference():
+    flows = investment_cash_flows([20000.0, 15000.0], [1500.0, 2000.0], 25)
+    expected = [_reference_mirr(row, 0.04, 0.03) for row in flows]
+    np.testing.assert_allclose(mirr(flows, 0.04, 0.03), expected, rtol=1e-12)
+    assert np.isnan(mirr([100.0, 10.0], 0.04, 0.03))
+
+
+def test_empty_cash_flows_raise():
+    with pytest.raises(ValueError):
+        irr([])
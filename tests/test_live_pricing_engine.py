@@ -0,0 +1,180 @@
+# test_live_pricing_engine.py
+"""
+Inkrementelle Live-Preisberechnung: Übereinstimmung mit perform_calculations,
+Wiederverwendung der preisunabhängigen Stufen und Live-Vorschauwerte.
+"""
+
+import copy
+import math
+
+import pytest
+
+import calculations
+import live_calculation_engine
+from live_pricing_engine import (
+    FINANCIAL_TAIL_KEYS,
+    IncrementalPricingEvaluator,
+    apply_price_modifications,
+    clear_evaluator_cache,
+    compute_financial_tail,
+    get_evaluator,
+)
+
+BASE_PROJECT = {
+    "project_details": {
+        "module_quantity": 20,
+        "selected_module_id": 1,
+        "annual_consumption_kwh_yr": 4500,
+        "electricity_price_kwh": 0.32,
+    },
+    "economic_data": {},
+}
+
+
+def _patch_inputs(monkeypatch, one_time_bonus_eur=0.0):
+    def load_admin_setting(key, default=None):
+        value = calculations.Dummy_load_admin_setting_calc(key, default)
+        if key == "global_constants":
+            value = dict(value, one_time_bonus_eur=one_time_bonus_eur)
+        return value
+
+    monkeypatch.setattr(calculations, "real_load_admin_setting", load_admin_setting)
+    monkeypatch.setattr(calculations, "real_get_product_by_id", lambda pid: {"id": pid, "capacity_w": 400.0})
+
+
+def _calculate(monkeypatch, one_time_bonus_eur=0.0):
+    _patch_inputs(monkeypatch, one_time_bonus_eur)
+    return calculations.perform_calculations(copy.deepcopy(BASE_PROJECT), {}, [])
+
+
+def _assert_close(actual, expected):
+    if isinstance(expected, float) and math.isnan(expected):
+        assert math.isnan(actual)
+    else:
+        assert actual == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_evaluators():
+    clear_evaluator_cache()
+    yield
+    clear_evaluator_cache()
+
+
+def test_changed_investment_matches_full_calculation(monkeypatch):
+    base = _calculate(monkeypatch)
+    discounted = _calculate(monkeypatch, one_time_bonus_eur=1500.0)
+    assert discounted["total_investment_netto"] == pytest.approx(base["total_investment_netto"] - 1500.0)
+
+    live = IncrementalPricingEvaluator(base).evaluate(discounted["total_investment_netto"])
+
+    for key in FINANCIAL_TAIL_KEYS:
+        if key in discounted:
+            _assert_close(live[key], discounted[key])
+
+
+def test_stages_are_reused_for_repeated_inputs(monkeypatch):
+    evaluator = IncrementalPricingEvaluator(_calculate(monkeypatch))
+    financing = {"interest_rate": 3.5, "duration_years": 15}
+
+    evaluator.evaluate(20000.0)
+    evaluator.evaluate(20000.0, financing)
+    evaluator.evaluate(20000.0, financing)
+    evaluator.evaluate(20000.0, dict(financing, duration_years=10))
+
+    assert evaluator.stage_runs == {"energy": 1, "kpis": 1, "financing": 2}
+
+    evaluator.evaluate(18000.0)
+    assert evaluator.stage_runs["kpis"] == 2
+    assert evaluator.stage_runs["energy"] == 1
+
+
+def test_financing_terms_follow_annuity_formula(monkeypatch):
+    evaluator = IncrementalPricingEvaluator(_calculate(monkeypatch))
+    result = evaluator.evaluate(
+        20000.0, {"interest_rate": 6.0, "duration_years": 10, "down_payment_eur": 1000.0}
+    )
+
+    principal = result["total_investment_brutto"] - 1000.0
+    monthly_rate = 0.06 / 12
+    expected = principal * monthly_rate / (1 - (1 + monthly_rate) ** -120)
+    assert result["financing"]["monthly_payment"] == pytest.approx(expected)
+
+
+def test_price_modifications_match_ui_formula():
+    pricing = apply_price_modifications(
+        10000.0,
+        {
+            "discount_percent": 10.0,
+            "rebates_eur": 500.0,
+            "surcharge_percent": 5.0,
+            "special_costs_eur": 200.0,
+            "miscellaneous_eur": 100.0,
+        },
+    )
+
+    after_discounts = 10000.0 - 1000.0 - 500.0
+    assert pricing["price_after_discounts"] == pytest.approx(after_discounts)
+    assert pricing["final_price"] == pytest.approx(after_discounts * 1.05 + 300.0)
+
+
+def test_get_evaluator_is_shared_for_same_base(monkeypatch):
+    base = _calculate(monkeypatch)
+    assert get_evaluator(base) is get_evaluator(dict(base))
+    assert get_evaluator(base) is not get_evaluator(base, cheat_settings={"enabled": True})
+
+
+def test_live_values_cache_ignores_investment():
+    live_calculation_engine._price_independent_live_values.cache_clear()
+    results = {
+        "annual_pv_production_kwh": 8000.0,
+        "annual_consumption_kwh": 4500.0,
+        "monthly_electricity_cost": 120.0,
+        "total_investment_netto": 15000.0,
+    }
+
+    first = live_calculation_engine.calculate_correct_live_values(results)
+    second = live_calculation_engine.calculate_correct_live_values(dict(results, total_investment_netto=12000.0))
+
+    info = live_calculation_engine._price_independent_live_values.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert second["amortisationszeit_jahre"] < first["amortisationszeit_jahre"]
+
+
+def test_irr_failure_is_reported_in_errors_list(monkeypatch):
+    import live_pricing_engine
+
+    def failing_irr(flows):
+        raise ArithmeticError("keine Konvergenz")
+
+    monkeypatch.setattr(live_pricing_engine, "irr", failing_irr)
+    _patch_inputs(monkeypatch)
+    errors = []
+    results = calculations.perform_calculations(
+        copy.deepcopy(BASE_PROJECT), {"error_irr_calculation": "IRR: {error_details}"}, errors
+    )
+
+    assert math.isnan(results["irr_percent"])
+    assert "IRR: keine Konvergenz" in errors
+
+
+def test_npv_falls_when_price_rises(monkeypatch):
+    evaluator = IncrementalPricingEvaluator(_calculate(monkeypatch))
+
+    npvs = [evaluator.evaluate(price)["npv_value"] for price in (15000.0, 20000.0, 25000.0)]
+
+    assert npvs[0] > npvs[1] > npvs[2]
+    assert npvs[0] - npvs[1] == pytest.approx(5000.0)
+
+
+def test_npv_subtracts_investment_from_discounted_cash_flows():
+    params = {
+        "discount_rate_percent": 10.0,
+        "vat_rate_percent": 19.0,
+        "afa_period_years": 20,
+        "alternative_investment_interest_rate_percent": 0.0,
+        "co2_emission_factor_kg_per_kwh": 0.4,
+    }
+    tail = compute_financial_tail(1000.0, [500.0] * 3, [1000.0] * 3, [0.0] * 3, 500.0, 1.0, 3, params)
+
+    assert tail["npv_value"] == pytest.approx(-1000.0 + 500.0 / 1.1 + 500.0 / 1.21 + 500.0 / 1.331)
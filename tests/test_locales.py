@@ -0,0 +1,73 @@
+# test_locales.py
+"""
+Übersetzungskatalog: einmaliges Laden je Prozess, Neuladen bei geänderter
+Datei, vorab ermittelte Format-Felder, Bulk-Abfrage und schreibgeschützte
+Ansicht statt Kopien.
+"""
+
+import copy
+import json
+import os
+import pickle
+
+import pytest
+
+import locales
+from locales import TextsView, TranslationCatalog
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / "xx.json"
+    path.write_text(json.dumps({"hello": "Hallo {name}", "plain": "Text", "broken": "Wert {"}), encoding="utf-8")
+    return TranslationCatalog("xx", str(path), check_interval_s=0.0), path
+
+
+def test_get_text_reads_locale_file_once(monkeypatch):
+    catalog = locales.get_catalog("de")
+    catalog.view()
+    loads = catalog.loads
+    monkeypatch.setattr(locales.json, "load", lambda *a, **k: pytest.fail("de.json erneut gelesen"))
+
+    for _ in range(1000):
+        assert locales.get_text("app_title") == catalog.view()["app_title"]
+
+    assert catalog.loads == loads
+    assert locales.load_translations("de") is catalog.view()
+
+
+def test_catalog_reloads_when_file_changes(catalog):
+    catalog, path = catalog
+    view = catalog.view()
+    assert catalog.view() is view
+
+    path.write_text(json.dumps({"hello": "Moin {name}!"}), encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert catalog.get("hello", name="Ada") == "Moin Ada!"
+    assert catalog.loads == 2
+
+
+def test_formatting_and_bulk_lookup(catalog):
+    catalog, _ = catalog
+
+    assert catalog.get("hello", name="Ada") == "Hallo Ada"
+    assert catalog.get("hello", other=1) == "Hallo {name}"
+    assert catalog.get("broken", name="x") == "Wert {"
+    assert catalog.get("missing", fallback="Nr. {n}", n=3) == "Nr. 3"
+    assert catalog.get_many(["plain", "missing"]) == {"plain": "Text", "missing": "missing"}
+
+
+def test_view_is_shared_read_only_and_picklable(catalog):
+    catalog, _ = catalog
+    view = catalog.view()
+
+    assert isinstance(view, dict) and isinstance(view, TextsView)
+    assert copy.copy(view) is view and copy.deepcopy({"texts": view})["texts"] is view
+    with pytest.raises(TypeError):
+        view["plain"] = "neu"
+    mutable = dict(view)
+    mutable["plain"] = "neu"
+    assert view["plain"] == "Text"
+    assert pickle.loads(pickle.dumps(view)) == view
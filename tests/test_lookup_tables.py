@@ -0,0 +1,190 @@
+# test_lookup_tables.py
+"""
+Versionierte Lookup-Tabellen: Erzeugen/Laden per mmap, Neuaufbau bei
+Versionswechsel, Interpolation der spezifischen Erträge und Nutzung in
+perform_calculations.
+"""
+
+import copy
+import json
+
+import numpy as np
+import pytest
+
+import calculations
+import lookup_tables
+from lookup_tables import (
+    DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT,
+    MANIFEST_NAME,
+    TABLE_VERSION,
+    compile_yield_grid,
+    get_tables,
+    load_tables,
+)
+
+
+def test_tables_are_built_and_memory_mapped(tmp_path):
+    tables = load_tables(str(tmp_path))
+
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert manifest["version"] == TABLE_VERSION
+    assert isinstance(load_tables(str(tmp_path)).pv_shapes, np.memmap)
+    assert tables.load_profiles.shape == (7, 8760)
+    assert tables.load_profiles.sum(axis=1) == pytest.approx(np.ones(7), rel=1e-4)
+
+
+def test_outdated_tables_are_rebuilt(tmp_path):
+    load_tables(str(tmp_path))
+    manifest_path = tmp_path / MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest["version"] = TABLE_VERSION - 1
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+
+    tables = load_tables(str(tmp_path))
+
+    assert tables.version == TABLE_VERSION
+    assert json.loads(manifest_path.read_text(encoding="utf-8"))["version"] == TABLE_VERSION
+
+
+def test_tables_are_loaded_once_per_process():
+    assert get_tables() is get_tables()
+
+
+def test_grid_points_match_admin_mapping_exactly():
+    tables = get_tables()
+    for key, expected in DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT.items():
+        orientation, _, tilt = key.rpartition("_")
+        assert tables.specific_yield(orientation, float(tilt)) == pytest.approx(expected)
+
+
+def test_yield_interpolates_tilt_azimuth_and_latitude():
+    tables = get_tables()
+    mapping = {"Süd_15": 900.0, "Süd_30": 1200.0, "Südwest_15": 800.0, "Südwest_30": 1000.0}
+
+    assert tables.specific_yield("Süd", 20, mapping=mapping) == pytest.approx(1000.0)
+    assert tables.specific_yield("Süd", 75, mapping=mapping) == pytest.approx(1200.0)
+    assert tables.specific_yield(22.5, 30, mapping=mapping) == pytest.approx(1100.0)
+    assert tables.specific_yield("Unbekannt", 30, mapping=mapping) is None
+    assert tables.specific_yield("Süd", 30, latitude=51.0) == pytest.approx(1100.0)
+    assert tables.specific_yield("Süd", 30, latitude=48.0) > tables.specific_yield("Süd", 30, latitude=54.0)
+    assert compile_yield_grid(dict(mapping)) is compile_yield_grid(mapping)
+
+
+def test_shading_matrix_follows_sun_height():
+    matrix = get_tables().shading_matrix(range(6, 19), base_percent=5.0, max_percent=30.0)
+
+    assert matrix.shape == (12, 13)
+    assert matrix.min() >= 5.0 and matrix.max() <= 30.0
+    # Mittags im Juni weniger Verschattung als morgens im Dezember
+    assert matrix[5, 6] < matrix[11, 2]
+
+
+def test_manual_yield_is_interpolated_in_perform_calculations(monkeypatch):
+    def load_admin_setting(key, default=None):
+        value = calculations.Dummy_load_admin_setting_calc(key, default)
+        if key == "global_constants":
+            value = dict(value, pvgis_enabled=False)
+        return value
+
+    monkeypatch.setattr(calculations, "real_load_admin_setting", load_admin_setting)
+    monkeypatch.setattr(calculations, "real_get_product_by_id", lambda pid: {"id": pid, "capacity_w": 400.0})
+    project = {
+        "project_details": {
+            "module_quantity": 20,
+            "selected_module_id": 1,
+            "annual_consumption_kwh_yr": 4500,
+            "electricity_price_kwh": 0.32,
+            "roof_orientation": "Süd",
+            "roof_inclination_deg": 30,
+        },
+        "economic_data": {},
+    }
+    yields = calculations.Dummy_load_admin_setting_calc("global_constants")["specific_yields_by_orientation_tilt"]
+
+    exact = calculations.perform_calculations(copy.deepcopy(project), {}, [])
+    project["project_details"]["roof_inclination_deg"] = 20
+    between = calculations.perform_calculations(copy.deepcopy(project), {}, [])
+
+    assert exact["specific_annual_yield_kwh_per_kwp"] == pytest.approx(yields["Süd_30"])
+    expected = yields["Süd_15"] + (yields["Süd_30"] - yields["Süd_15"]) / 3
+    assert between["specific_annual_yield_kwh_per_kwp"] == pytest.approx(expected)
+
+
+def test_placeholders_expose_shared_yields():
+    from pdf_template_engine import placeholders
+
+    assert placeholders.DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT is lookup_tables.DEFAULT_SPECIFIC_YIELDS_BY_ORIENTATION_TILT
+
+
+def test_rebuild_leaves_mapped_tables_intact(tmp_path):
+    tables = load_tables(str(tmp_path))
+    before = np.array(tables.pv_shapes)
+
+    first = json.loads((tmp_path / MANIFEST_NAME).read_text(encoding="utf-8"))
+    manifest = lookup_tables.build_tables(str(tmp_path))
+
+    assert isinstance(tables.pv_shapes, np.memmap)
+    assert np.array_equal(tables.pv_shapes, before)
+    # Die vorige Generation bleibt für Prozesse mit gerade gelesenem Manifest erhalten
+    npy_files = sorted(p.name for p in tmp_path.glob("*.npy"))
+    assert npy_files == sorted([*manifest["files"].values(), *first["files"].values()])
+    assert np.array_equal(load_tables(str(tmp_path)).pv_shapes, before)
+    latest = lookup_tables.build_tables(str(tmp_path))
+    npy_files = sorted(p.name for p in tmp_path.glob("*.npy"))
+    assert npy_files == sorted([*latest["files"].values(), *manifest["files"].values()])
+
+
+def test_generation_removed_while_loading_is_reread(tmp_path, monkeypatch):
+    load_tables(str(tmp_path))
+    stale = lookup_tables._read_manifest(str(tmp_path))
+    stale["files"] = {name: f"{name}-entfernt.npy" for name in stale["files"]}
+    reads = []
+    original = lookup_tables._read_manifest
+
+    def read_manifest(directory):
+        # Erstes Lesen: Manifest einer Generation, die ein anderer Prozess schon entfernt hat
+        reads.append(directory)
+        return stale if len(reads) == 1 else original(directory)
+
+    monkeypatch.setattr(lookup_tables, "_read_manifest", read_manifest)
+
+    tables = load_tables(str(tmp_path))
+    assert tables.source == str(tmp_path) and len(reads) == 2
+
+    monkeypatch.setattr(lookup_tables, "_read_manifest", lambda directory: stale)
+    in_memory = load_tables(str(tmp_path))
+    assert in_memory.source is None and in_memory.load_profiles.shape == (7, 8760)
+
+
+def test_latitude_corrections_are_off_by_default(monkeypatch):
+    constants = calculations.Dummy_load_admin_setting_calc("global_constants")
+
+    def load_admin_setting(key, default=None):
+        value = calculations.Dummy_load_admin_setting_calc(key, default)
+        if key == "global_constants":
+            value = dict(value, pvgis_enabled=False, latitude_corrections_enabled=enabled)
+        return value
+
+    monkeypatch.setattr(calculations, "real_load_admin_setting", load_admin_setting)
+    monkeypatch.setattr(calculations, "real_get_product_by_id", lambda pid: {"id": pid, "capacity_w": 400.0})
+    project = {
+        "project_details": {
+            "module_quantity": 20, "selected_module_id": 1, "annual_consumption_kwh_yr": 4500,
+            "electricity_price_kwh": 0.32, "roof_orientation": "Süd", "roof_inclination_deg": 30,
+            "latitude": 48.0,
+        },
+        "economic_data": {},
+    }
+    integrator = calculations.AdvancedCalculationsIntegrator()
+
+    enabled = False
+    plain = calculations.perform_calculations(copy.deepcopy(project), {}, [])
+    plain_shading = integrator.calculate_shading_analysis({"latitude": 48.0})["shading_matrix"]
+    enabled = True
+    corrected = calculations.perform_calculations(copy.deepcopy(project), {}, [])
+
+    assert constants["latitude_corrections_enabled"] is False
+    assert plain["specific_annual_yield_kwh_per_kwp"] == pytest.approx(constants["specific_yields_by_orientation_tilt"]["Süd_30"])
+    assert corrected["specific_annual_yield_kwh_per_kwp"] > plain["specific_annual_yield_kwh_per_kwp"]
+    assert plain_shading[0][0] == 30 and plain_shading[5][5] == 5
+    assert integrator.calculate_shading_analysis({"latitude": 48.0})["shading_matrix"] != plain_shading
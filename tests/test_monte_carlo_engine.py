@@ -0,0 +1,78 @@
+# test_monte_carlo_engine.py
+"""
+Vektorisierte Monte-Carlo-Engine: Übereinstimmung mit der bisherigen
+Schleifen-Diskontierung, Blockverarbeitung, Korrelation und Laufzeit.
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from monte_carlo_engine import simulate_npv_distribution, summarize_distribution
+
+
+def _reference_npv(investment, annual_benefit, discount_rate, lifetime):
+    """Diskontierung wie in der bisherigen Schleife pro Simulation."""
+    npv = -investment
+    for year in range(1, lifetime + 1):
+        npv += annual_benefit / (1 + discount_rate) ** year
+    return npv
+
+
+def test_npv_matches_reference_discounting():
+    rng = np.random.default_rng(42)
+    standard = rng.standard_normal((200, 3))
+    samples = np.array([20000.0, 1500.0, 0.04]) + standard * np.array([2000.0, 225.0, 0.01])
+
+    npv = simulate_npv_distribution(20000.0, 1500.0, 25, 200, seed=42)
+
+    expected = [_reference_npv(inv, ben, rate, 25) for inv, ben, rate in samples]
+    np.testing.assert_allclose(npv, expected, rtol=1e-10)
+
+
+def test_result_does_not_depend_on_chunk_size():
+    full = simulate_npv_distribution(20000.0, 1500.0, 25, 10_001, seed=7)
+    chunked = simulate_npv_distribution(20000.0, 1500.0, 25, 10_001, seed=7, chunk_size=999)
+    np.testing.assert_array_equal(full, chunked)
+
+
+def test_global_random_state_is_untouched():
+    np.random.seed(123)
+    expected = np.random.random()
+    np.random.seed(123)
+    simulate_npv_distribution(20000.0, 1500.0, 25, 1000)
+    assert np.random.random() == expected
+
+
+def test_correlated_parameters():
+    correlation = [[1.0, 0.8, 0.0], [0.8, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    independent = simulate_npv_distribution(20000.0, 1500.0, 25, 50_000, seed=1)
+    correlated = simulate_npv_distribution(20000.0, 1500.0, 25, 50_000, seed=1, correlation=correlation)
+    # Investition und Nutzen steigen gemeinsam -> Effekte heben sich teilweise auf
+    assert correlated.std() < independent.std()
+
+    with pytest.raises(ValueError):
+        simulate_npv_distribution(20000.0, 1500.0, 25, 10, correlation=[[1.0, 2.0], [2.0, 1.0]])
+
+
+def test_summary_contains_percentiles_and_histogram():
+    values = np.linspace(-100.0, 300.0, 401)
+    summary = summarize_distribution(values, confidence_level=90, histogram_bins=20)
+
+    assert summary["mean"] == pytest.approx(100.0)
+    assert summary["var_5"] == pytest.approx(np.percentile(values, 5))
+    assert summary["lower_bound"] == pytest.approx(np.percentile(values, 5))
+    assert summary["upper_bound"] == pytest.approx(np.percentile(values, 95))
+    assert summary["percentiles"]["p50"] == pytest.approx(100.0)
+    assert summary["success_probability"] == pytest.approx(300 / 401 * 100)
+    assert sum(summary["histogram"]["counts"]) == values.size
+    assert len(summary["histogram"]["bin_edges"]) == 21
+
+
+def test_hundred_thousand_draws_are_fast():
+    start = time.perf_counter()
+    npv = simulate_npv_distribution(20000.0, 1500.0, 25, 100_000)
+    summarize_distribution(npv)
+    assert time.perf_counter() - start < 0.5
+    assert npv.shape == (100_000,)
@@ -0,0 +1,107 @@
+# test_multi_offer_pipeline.py
+"""
+Parallele Multi-Firmen-Angebote: PDFs werden im Prozess-Pool gerendert und in
+Fertigstellungsreihenfolge ins ZIP geschrieben; Fehler einzelner Firmen
+brechen den Lauf nicht ab.
+"""
+
+import importlib.util
+import io
+import zipfile
+from pathlib import Path
+
+import multi_offer_generator
+import multi_offer_pipeline
+
+
+def _render(payload):
+    if payload.get("fail"):
+        raise RuntimeError(f"Vorlage fehlt für {payload['name']}")
+    return f"%PDF-1.4 {payload['name']}".encode()
+
+
+def _jobs(names, fail=()):
+    return [
+        {"name": name, "filename": f"Angebot_{name}.pdf", "payload": {"name": name, "fail": name in fail}}
+        for name in names
+    ]
+
+
+def test_failures_do_not_abort_batch_and_progress_is_reported():
+    events = []
+    target = io.BytesIO()
+
+    result = multi_offer_pipeline.generate_offer_zip(
+        _jobs(["A", "B", "C", "D"], fail={"C"}), _render, target, max_workers=2, on_progress=events.append
+    )
+
+    with zipfile.ZipFile(target) as archive:
+        assert sorted(archive.namelist()) == ["Angebot_A.pdf", "Angebot_B.pdf", "Angebot_D.pdf"]
+        assert archive.read("Angebot_B.pdf") == b"%PDF-1.4 B"
+    assert result["total"] == 4 and len(result["succeeded"]) == 3
+    assert result["failed"] == [{"name": "C", "filename": "Angebot_C.pdf", "error": "Vorlage fehlt für C"}]
+    assert [e["completed"] for e in events] == [1, 2, 3, 4]
+    assert {e["name"]: e["status"] for e in events}["C"] == "error"
+
+
+def test_duplicate_filenames_are_made_unique(tmp_path):
+    jobs = _jobs(["A", "B"])
+    for job in jobs:
+        job["filename"] = "Angebot.pdf"
+
+    result = multi_offer_pipeline.generate_offer_zip(jobs, _render, str(tmp_path / "out.zip"), executor="thread")
+
+    with zipfile.ZipFile(tmp_path / "out.zip") as archive:
+        assert sorted(archive.namelist()) == ["Angebot.pdf", "Angebot_2.pdf"]
+    assert sorted(item["filename"] for item in result["succeeded"]) == ["Angebot.pdf", "Angebot_2.pdf"]
+
+
+def test_unpicklable_payload_falls_back_to_main_process():
+    jobs = _jobs(["A", "B"])
+    jobs[1]["payload"]["callback"] = lambda: None  # nicht an Worker-Prozesse übertragbar
+
+    result = multi_offer_pipeline.generate_offer_zip(jobs, _render, io.BytesIO(), keep_bytes=True)
+
+    assert sorted(item["name"] for item in result["succeeded"]) == ["A", "B"]
+    assert not result["failed"]
+    assert {item["name"]: item["pdf_content"] for item in result["succeeded"]}["B"] == b"%PDF-1.4 B"
+
+
+def _load_bridge():
+    path = Path(__file__).resolve().parent.parent / "apps" / "main" / "pdf_generation_bridge.py"
+    spec = importlib.util.spec_from_file_location("pdf_generation_bridge_under_test", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_bridge_streams_company_pdfs_into_zip(tmp_path, monkeypatch):
+    bridge = _load_bridge()
+    monkeypatch.setattr(bridge, "generate_pv_pdf", lambda project, calc, company: io.BytesIO(company["name"].encode()))
+    companies = [{"name": "Sonne & Co"}, {"name": "Dach GmbH"}]
+
+    zip_buffer = bridge.generate_multi_company_pdfs({}, {}, companies, "pv", max_workers=1)
+    summary = bridge.generate_multi_company_pdfs({}, {}, companies, "pv", output=str(tmp_path / "multi.zip"))
+
+    with zipfile.ZipFile(zip_buffer) as archive:
+        assert sorted(archive.namelist()) == ["PV_Angebot_Dach_GmbH.pdf", "PV_Angebot_Sonne__Co.pdf"]
+    assert len(summary["succeeded"]) == 2 and not summary["failed"]
+
+
+def test_company_payload_carries_live_final_price(monkeypatch):
+    session = {
+        "calculation_results": {"total_investment_netto": 20000.0},
+        "live_pricing_calculations": {"final_price": 18500.0},
+        "multi_offer_settings": {"price_increment_percent": 10},
+    }
+    monkeypatch.setattr(multi_offer_generator.st, "session_state", session)
+    monkeypatch.setattr(multi_offer_generator, "load_admin_setting", lambda key, default=None: default)
+    generator = multi_offer_generator.MultiCompanyOfferGenerator.__new__(multi_offer_generator.MultiCompanyOfferGenerator)
+    shared = generator._shared_pdf_context()
+
+    payloads = [generator._build_company_pdf_kwargs({}, {"id": i, "name": f"F{i}"}, i, shared) for i in range(2)]
+
+    # Worker-Prozesse haben keinen Session-State: der Preis muss im Payload stehen
+    assert [p["analysis_results"]["final_price"] for p in payloads] == [18500.0, 18500.0]
+    assert payloads[1]["analysis_results"]["total_investment_netto"] == 22000.0
+    assert "final_price" not in session["calculation_results"]
@@ -0,0 +1,90 @@
+# test_offer_benchmark.py
+"""
+Benchmark-Suite der Angebots-Pipeline: Stufenstruktur, Offline-Stubs und
+Baseline-Vergleich. Der vollständige Lauf gegen die Baseline ist
+maschinenabhängig und läuft nur mit KAKERLAKE_BENCHMARK=1.
+"""
+
+import os
+
+import pytest
+
+import calculations
+import chart_render_service
+import offer_benchmark
+from offer_benchmark import STAGES, compare_to_baseline, load_baseline, offline_stubs, run_suite
+
+
+def _report(seconds, peak_kib=100.0):
+    return {"fixtures": {"small_home": {"calculation": {"seconds": seconds, "peak_kib": peak_kib}}}}
+
+
+def test_suite_measures_every_stage_offline():
+    report = run_suite(["small_home"], repeats=1)
+
+    stages = report["fixtures"]["small_home"]
+    assert tuple(stages) == STAGES
+    assert all(entry["seconds"] > 0 and entry["peak_kib"] >= 0 for entry in stages.values())
+
+
+def test_stubs_replace_network_and_kaleido_and_are_restored():
+    original_pvgis = calculations.get_pvgis_data
+    original_render = chart_render_service._render
+
+    with offline_stubs() as chart_dir:
+        assert calculations.get_pvgis_data is not original_pvgis
+        assert chart_render_service.CACHE_DIR == chart_dir
+        data = calculations.get_pvgis_data(51.0, 9.0, 10.0, 30, 0, 14.0, {}, [], False)
+        assert data["pvgis_source"] == "benchmark-stub"
+        assert sum(data["monthly_production_kwh"]) == pytest.approx(data["annual_production_kwh"])
+
+    assert calculations.get_pvgis_data is original_pvgis
+    assert chart_render_service._render is original_render
+    assert not os.path.exists(chart_dir)
+
+
+def test_charts_and_heatpump_stages_follow_the_offer_code_path(monkeypatch):
+    batches = []
+    render_many = chart_render_service.render_many
+    monkeypatch.setattr(
+        chart_render_service, "render_many", lambda figs, **kw: batches.append(sorted(figs)) or render_many(figs, **kw)
+    )
+    fixture = offer_benchmark.FIXTURES["heatpump"]
+
+    with offline_stubs():
+        run = offer_benchmark._PipelineRun(fixture, b"")
+        run.calculation()
+        run.dynamic_data()
+        run.charts()
+
+    keys = [key for key, _, _ in offer_benchmark.ANALYSIS_CHARTS]
+    assert batches == [sorted(keys)]
+    assert all(run.state["charts"][key].startswith(b"\x89PNG") for key in keys)
+    wp_company = fixture["company_information_wp"]["name"]
+    assert wp_company in run.state["dynamic_data_wp"].values()
+    assert wp_company not in run.state["dynamic_data"].values()
+
+
+def test_comparison_flags_only_regressions_beyond_tolerance():
+    baseline = _report(0.100)
+
+    assert compare_to_baseline(_report(0.140), baseline, tolerance=0.5) == []
+    regressions = compare_to_baseline(_report(0.200), baseline, tolerance=0.5)
+    assert [(r["stage"], r["metric"]) for r in regressions] == [("calculation", "seconds")]
+    assert compare_to_baseline(_report(0.100, peak_kib=5000.0), baseline, tolerance=0.5)[0]["metric"] == "peak_kib"
+    # Neue Fixtures/Stufen ohne Baseline-Wert sind keine Regression
+    assert compare_to_baseline(_report(9.0), {"fixtures": {}}, tolerance=0.5) == []
+
+
+def test_committed_baseline_covers_all_fixtures_and_stages():
+    baseline = load_baseline()
+
+    assert baseline is not None
+    assert set(baseline["fixtures"]) == set(offer_benchmark.FIXTURES)
+    assert all(tuple(stages) == STAGES for stages in baseline["fixtures"].values())
+
+
+@pytest.mark.skipif(os.environ.get("KAKERLAKE_BENCHMARK") != "1", reason="Benchmark nur mit KAKERLAKE_BENCHMARK=1")
+def test_pipeline_within_baseline_tolerance():
+    regressions = compare_to_baseline(run_suite(), load_baseline())
+    assert regressions == []
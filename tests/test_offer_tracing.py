@@ -0,0 +1,200 @@
+# test_offer_tracing.py
+"""
+Opt-in Stufen-Tracing: No-op ohne KAKERLAKE_TRACE, verschachtelte Spans mit
+Zeiten und Speicher-Peaks, eine JSON-Datei je Anfrage (auch bei Fehlern),
+Diagramm-Spans aus dem Thread-Pool und p50/p95 je Stufe über die letzten
+N Traces.
+"""
+
+import importlib.util
+import json
+import os
+import threading
+import tracemalloc
+from pathlib import Path
+
+import plotly.graph_objects as go
+import pytest
+
+import chart_render_service as crs
+import offer_tracing
+from offer_tracing import aggregate_report, percentile, span, trace_request, traced
+
+
+@pytest.fixture
+def tracing(monkeypatch, tmp_path):
+    monkeypatch.setenv("KAKERLAKE_TRACE", "1")
+    monkeypatch.setenv("KAKERLAKE_TRACE_DIR", str(tmp_path / "traces"))
+    return tmp_path / "traces"
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def test_disabled_tracing_is_a_noop(monkeypatch, tmp_path):
+    monkeypatch.delenv("KAKERLAKE_TRACE", raising=False)
+    monkeypatch.setenv("KAKERLAKE_TRACE_DIR", str(tmp_path / "traces"))
+
+    with trace_request("offer") as trace:
+        with span("calculation") as active:
+            active.set("ignored", True)
+    assert trace is None
+    assert traced("x", root=True)(lambda v: v * 2)(21) == 42
+    assert not os.path.exists(tmp_path / "traces")
+
+
+def test_nested_spans_record_time_and_memory(tracing):
+    with trace_request("offer", customer="A") as trace:
+        with span("calculation") as calc:
+            with span("pvgis"):
+                blob = bytearray(4 * 1024 * 1024)
+                del blob
+            calc.set("modules", 20)
+        with span("overlay", segment="pv"):
+            sum(range(10000))
+
+    data = _load(trace.path)
+    root = data["root"]
+    assert os.path.dirname(trace.path) == str(tracing)
+    assert data["name"] == "offer" and data["memory_traced"] is True
+    assert root["attrs"] == {"customer": "A"}
+    assert [child["name"] for child in root["children"]] == ["calculation", "overlay"]
+    calc, overlay = root["children"]
+    pvgis = calc["children"][0]
+    assert calc["attrs"] == {"modules": 20} and overlay["attrs"] == {"segment": "pv"}
+    assert pvgis["peak_kib"] >= 4096
+    assert calc["peak_kib"] >= pvgis["peak_kib"] and root["peak_kib"] >= calc["peak_kib"]
+    assert root["wall_s"] >= calc["wall_s"] >= pvgis["wall_s"] > 0
+    assert overlay["start_s"] >= calc["start_s"] + calc["wall_s"]
+    assert all(key in overlay for key in ("cpu_s", "status"))
+
+
+def test_trace_is_written_on_error_and_nested_roots_become_spans(tracing):
+    @traced("calculation", root=True)
+    def calculate():
+        with span("pvgis"):
+            raise ValueError("PVGIS nicht erreichbar")
+
+    with pytest.raises(ValueError):
+        calculate()
+
+    files = offer_tracing.list_trace_files()
+    assert len(files) == 1
+    root = _load(files[0])["root"]
+    assert root["name"] == "calculation" and root["status"] == "error"
+    assert root["children"][0]["error"] == "ValueError: PVGIS nicht erreichbar"
+
+    with trace_request("offer"):
+        with trace_request("calculation") as inner:
+            pass
+    assert len(offer_tracing.list_trace_files()) == 2
+    assert _load(inner.path)["root"]["children"][0]["name"] == "calculation"
+
+
+def test_chart_exports_from_thread_pool_land_in_the_offer_trace(tracing, monkeypatch, tmp_path):
+    monkeypatch.setattr(crs, "CACHE_DIR", str(tmp_path / "chart_cache"))
+    crs.clear_memory_cache()
+    figures = {name: go.Figure(go.Bar(x=[1], y=[i]), layout={"title": {"text": name}}) for i, name in enumerate("abc")}
+
+    with trace_request("offer") as trace:
+        crs.render_many(figures, renderer=lambda fig, options: b"PNG")
+
+    charts = _load(trace.path)["root"]["children"][0]
+    assert charts["name"] == "charts" and charts["attrs"] == {"count": 3}
+    assert sorted(child["attrs"]["chart"] for child in charts["children"]) == ["a", "b", "c"]
+    assert {child["attrs"]["source"] for child in charts["children"]} == {"render"}
+    crs.clear_memory_cache()
+
+
+def test_aggregate_report_uses_last_n_traces(tracing, monkeypatch):
+    monkeypatch.setenv("KAKERLAKE_TRACE_MEMORY", "0")
+    walls = [0.1, 0.2, 0.3, 0.4, 10.0]
+    for index, wall in enumerate(walls):
+        trace = offer_tracing.Trace("offer", {})
+        trace.started_at = trace.started_at.replace(year=2000 + index)
+        trace.root.wall_s = wall + 1
+        overlay = offer_tracing.Span("overlay", trace.root, 0.0, {})
+        overlay.wall_s = wall / 2
+        trace.root.children += [overlay, overlay]  # zwei Overlays je Angebot werden summiert
+        offer_tracing.write_trace(trace)
+
+    report = aggregate_report(last_n=4)
+
+    assert report["traces"] == 4
+    stage = report["stages"]["offer/overlay"]
+    assert stage["traces"] == 4 and stage["calls"] == 8
+    assert stage["wall_p50_s"] == pytest.approx(0.35)
+    assert stage["wall_p95_s"] == pytest.approx(percentile([0.2, 0.3, 0.4, 10.0], 95))
+    assert stage["peak_p95_kib"] is None
+    assert "\n  overlay " in offer_tracing.format_report(report)
+    assert percentile([], 50) == 0.0
+
+
+def test_old_traces_are_pruned(tracing, monkeypatch):
+    monkeypatch.setenv("KAKERLAKE_TRACE_KEEP", "2")
+    for _ in range(4):
+        with trace_request("offer"):
+            pass
+    assert len(offer_tracing.list_trace_files()) == 2
+
+
+def test_overlapping_traces_share_tracemalloc_and_flag_peaks(tracing):
+    assert not tracemalloc.is_tracing()
+    first_open = threading.Event()
+    second_done = threading.Event()
+    paths = {}
+
+    def long_offer():
+        with trace_request("offer-a") as trace:
+            with span("calculation"):
+                first_open.set()
+                second_done.wait(5)
+        paths["a"] = trace.path
+
+    worker = threading.Thread(target=long_offer)
+    worker.start()
+    first_open.wait(5)
+    with trace_request("offer-b") as trace:
+        with span("overlay"):
+            pass
+    paths["b"] = trace.path
+    # Der zweite Trace darf tracemalloc nicht unter dem ersten wegstoppen
+    assert tracemalloc.is_tracing()
+    second_done.set()
+    worker.join(5)
+    assert not tracemalloc.is_tracing()
+
+    first, second = _load(paths["a"])["root"], _load(paths["b"])["root"]
+    assert first["peak_kib"] is not None and first["children"][0]["peak_kib"] is not None
+    assert first["peak_overlap"] and first["children"][0]["peak_overlap"] and second["peak_overlap"]
+    assert aggregate_report()["stages"]["offer-a"]["peak_p95_kib"] is None
+
+    with trace_request("offer-c") as alone:
+        with span("calculation"):
+            pass
+    assert "peak_overlap" not in _load(alone.path)["root"]
+
+
+def test_invalid_keep_setting_does_not_fail_the_request(tracing, monkeypatch, capsys):
+    monkeypatch.setenv("KAKERLAKE_TRACE_KEEP", "viele")
+    with trace_request("offer") as trace:
+        pass
+    assert os.path.exists(trace.path)
+    assert "KAKERLAKE_TRACE_KEEP" in capsys.readouterr().err
+
+
+def test_pdf_bridge_returns_trace_file(tracing, monkeypatch, capsys):
+    path = Path(__file__).resolve().parent.parent / "apps" / "main" / "pdf_generation_bridge.py"
+    spec = importlib.util.spec_from_file_location("pdf_generation_bridge_traced", path)
+    bridge = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bridge)
+    monkeypatch.setattr(bridge.sys, "argv", ["pdf_generation_bridge.py", "unbekannt"])
+
+    bridge.main()
+
+    out = capsys.readouterr().out
+    result = json.loads(out[out.index("{\n"):])
+    assert result["error"] == "Unknown command: unbekannt"
+    assert _load(result["trace_file"])["name"] == "pdf_bridge.unbekannt"
@@ -0,0 +1,136 @@
+# test_pdf_output_stream.py
+"""
+Streamende PDF-Ausgabe: Zusammenführen direkt in Datei oder Pipe,
+Datenblätter per Pfad-Referenz statt vollständigem Einlesen, ZIP-Einträge
+über temporäre Dateien.
+"""
+
+import builtins
+import io
+import os
+import threading
+import zipfile
+
+from pypdf import PdfReader, PdfWriter
+
+import multi_offer_pipeline
+import pdf_output_stream
+
+
+def _pdf_bytes(pages, width=200):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width, 300)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def _page_widths(data):
+    return [float(page.mediabox.width) for page in PdfReader(io.BytesIO(data)).pages]
+
+
+def test_merge_to_file_keeps_order_and_skips_missing(tmp_path):
+    datasheet = tmp_path / "datenblatt.pdf"
+    datasheet.write_bytes(_pdf_bytes(2, width=300))
+    target = tmp_path / "out" / "angebot.pdf"
+
+    pages = pdf_output_stream.write_merged_pdf(
+        [_pdf_bytes(1), str(datasheet), None, str(tmp_path / "fehlt.pdf"), io.BytesIO(_pdf_bytes(1, width=400))],
+        str(target),
+    )
+
+    assert pages == 4
+    assert _page_widths(target.read_bytes()) == [200, 300, 300, 400]
+    assert [p.name for p in target.parent.iterdir()] == ["angebot.pdf"]  # keine Temp-Reste
+
+
+def test_merge_to_pipe_produces_valid_pdf(tmp_path):
+    read_fd, write_fd = os.pipe()
+    received = []
+    reader_thread = threading.Thread(target=lambda: received.append(os.fdopen(read_fd, "rb").read()))
+    reader_thread.start()
+    with os.fdopen(write_fd, "wb") as pipe:
+        pdf_output_stream.write_merged_pdf([_pdf_bytes(1), _pdf_bytes(2)], pipe)
+    reader_thread.join()
+
+    assert len(PdfReader(io.BytesIO(received[0])).pages) == 3
+
+
+def test_datasheet_paths_are_not_read_into_memory(tmp_path, monkeypatch):
+    datasheet = tmp_path / "datenblatt.pdf"
+    datasheet.write_bytes(_pdf_bytes(3))
+    full_reads = []
+    real_open = builtins.open
+
+    class _Guarded:
+        def __init__(self, handle):
+            self._handle = handle
+
+        def read(self, size=-1):
+            if size is None or size < 0:
+                full_reads.append(self._handle.name)
+            return self._handle.read(size)
+
+        def __getattr__(self, name):
+            return getattr(self._handle, name)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._handle.close()
+
+    def guarded_open(file, mode="r", *args, **kwargs):
+        handle = real_open(file, mode, *args, **kwargs)
+        return _Guarded(handle) if str(file) == str(datasheet) else handle
+
+    monkeypatch.setattr(builtins, "open", guarded_open)
+    merged = pdf_output_stream.merge_pdfs_to_bytes([_pdf_bytes(1), str(datasheet)])
+
+    assert len(PdfReader(io.BytesIO(merged)).pages) == 4
+    assert not full_reads
+
+
+def test_pdf_generator_merge_pdfs_accepts_paths(tmp_path):
+    import pdf_generator
+
+    path = tmp_path / "anhang.pdf"
+    path.write_bytes(_pdf_bytes(2, width=250))
+
+    merged = pdf_generator.merge_pdfs([_pdf_bytes(1), str(path)])
+    written = pdf_generator.merge_pdfs_to_file([str(path), _pdf_bytes(1)], str(tmp_path / "gesamt.pdf"))
+
+    assert _page_widths(merged) == [200, 250, 250]
+    assert _page_widths((tmp_path / "gesamt.pdf").read_bytes()) == [250, 250, 200]
+    assert written == str(tmp_path / "gesamt.pdf")
+
+
+def test_append_additional_pages_streams_to_output(tmp_path):
+    from pdf_template_engine.dynamic_overlay import append_additional_pages
+
+    extra = tmp_path / "zusatz.pdf"
+    extra.write_bytes(_pdf_bytes(2, width=350))
+    out = io.BytesIO()
+
+    assert append_additional_pages(_pdf_bytes(1), str(extra), output=out) is None
+    assert _page_widths(out.getvalue()) == [200, 350, 350]
+    assert _page_widths(append_additional_pages(_pdf_bytes(1), None)) == [200]
+
+
+def _render(payload):
+    return _pdf_bytes(payload["pages"])
+
+
+def test_spooled_zip_entries_are_cleaned_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(multi_offer_pipeline.tempfile, "tempdir", str(tmp_path))
+    jobs = [{"name": n, "filename": f"{n}.pdf", "payload": {"pages": i + 1}} for i, n in enumerate("ABC")]
+    target = tmp_path / "angebote.zip"
+
+    result = multi_offer_pipeline.generate_offer_zip(jobs, _render, str(target), executor="thread", spool=True)
+
+    with zipfile.ZipFile(target) as archive:
+        assert {name: len(PdfReader(io.BytesIO(archive.read(name))).pages) for name in archive.namelist()} == {
+            "A.pdf": 1, "B.pdf": 2, "C.pdf": 3}
+    assert len(result["succeeded"]) == 3
+    assert sorted(os.listdir(tmp_path)) == ["angebote.zip"]
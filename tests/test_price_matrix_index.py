@@ -0,0 +1,137 @@
+# test_price_matrix_index.py
+"""
+Kompilierte Preis-Matrix: searchsorted-Lookup wie der bisherige
+DataFrame-Filter, Batch-Lookup, Cache je Admin-Settings-Version und
+mmap-Index neben der DB für frische Prozesse.
+"""
+
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import calculations
+import database
+from price_matrix_index import CompiledPriceMatrix, index_dir, load_index, save_index
+
+CSV_MATRIX = "Anzahl Module;Ohne Speicher;Speicher X\n10;10.000,00;16.000,00\n20;12.000,00;\n30;15.000,00;21.000,00\n"
+
+
+@pytest.fixture
+def matrix_db(admin_settings_db, monkeypatch):
+    monkeypatch.setattr(calculations, "real_load_admin_setting", database.load_admin_setting)
+    monkeypatch.setattr(calculations, "_DB_LOAD_ADMIN_SETTING", database.load_admin_setting)
+    monkeypatch.setattr(calculations, "_PRICE_INDEX_CACHE", {"version": None, "index": None, "source": "Keine"})
+    return admin_settings_db.parent
+
+
+def _dataframe_lookup(df, module_quantity, column):
+    rows = df[df.index <= module_quantity]
+    if rows.empty:
+        return None
+    value = rows.iloc[-1][column]
+    return None if pd.isna(value) else float(value)
+
+
+def test_lookup_matches_dataframe_filter():
+    rng = np.random.default_rng(3)
+    counts = np.sort(rng.choice(np.arange(6, 400), size=40, replace=False))
+    prices = rng.uniform(5000, 90000, size=(40, 3))
+    prices[rng.random((40, 3)) < 0.2] = np.nan
+    df = pd.DataFrame(prices, index=counts, columns=["Ohne Speicher", "Speicher A", "Speicher B"])
+    compiled = CompiledPriceMatrix.from_dataframe(df.sample(frac=1.0, random_state=1), "CSV")
+
+    for quantity in range(0, 420, 7):
+        for column in df.columns:
+            _, price, used = compiled.lookup(quantity, f" {column.upper()} ")
+            assert price == _dataframe_lookup(df, quantity, column)
+            assert used == (column if price is not None else None)
+
+
+def test_batch_lookup_with_fallback_column():
+    df = pd.DataFrame({"Ohne Speicher": [10000.0, 12000.0], "Speicher X": [16000.0, np.nan]}, index=[10, 20])
+    compiled = CompiledPriceMatrix.from_dataframe(df)
+
+    prices = compiled.lookup_many([5, 10, 25], "Speicher X", "Ohne Speicher")
+
+    assert np.isnan(prices[0])
+    assert prices[1:].tolist() == [16000.0, 12000.0]
+    assert compiled.lookup(25, "Speicher X", "Ohne Speicher") == (20, 12000.0, "Ohne Speicher")
+
+
+def test_perform_calculations_uses_matrix_price(monkeypatch):
+    def load_admin_setting(key, default=None):
+        if key == "price_matrix_csv_data":
+            return CSV_MATRIX
+        return calculations.Dummy_load_admin_setting_calc(key, default)
+
+    monkeypatch.setattr(calculations, "real_load_admin_setting", load_admin_setting)
+    monkeypatch.setattr(calculations, "real_get_product_by_id", lambda pid: {"id": pid, "capacity_w": 400.0})
+    project = {
+        "project_details": {
+            "module_quantity": 25,
+            "selected_module_id": 1,
+            "annual_consumption_kwh_yr": 4500,
+            "electricity_price_kwh": 0.32,
+        },
+        "economic_data": {},
+    }
+
+    results = calculations.perform_calculations(copy.deepcopy(project), {}, [])
+
+    assert results["price_matrix_source_type"] == "CSV"
+    assert results["base_matrix_price_netto"] == pytest.approx(12000.0)
+
+
+def test_index_is_compiled_once_per_settings_version(matrix_db, monkeypatch):
+    database.save_admin_setting("price_matrix_csv_data", CSV_MATRIX)
+    index, source = calculations.load_price_matrix_index([])
+    assert source == "CSV" and index.lookup(30, "Speicher X")[1] == 21000.0
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Matrix darf nicht erneut geladen werden")
+
+    monkeypatch.setattr(calculations, "load_price_matrix_df_with_cache", fail)
+    assert calculations.load_price_matrix_index([])[0] is index
+
+    # Frischer Prozess: Index kommt per mmap aus dem Verzeichnis neben der DB
+    monkeypatch.setattr(calculations, "_PRICE_INDEX_CACHE", {"version": None, "index": None, "source": "Keine"})
+    reloaded, source = calculations.load_price_matrix_index([])
+    assert isinstance(reloaded.prices, np.memmap)
+    assert source == "CSV" and reloaded.lookup(30, "Speicher X")[1] == 21000.0
+
+
+def test_changed_matrix_invalidates_stored_index(matrix_db):
+    database.save_admin_setting("price_matrix_csv_data", CSV_MATRIX)
+    calculations.load_price_matrix_index([])
+    old_fingerprint = database.get_admin_settings_fingerprint(calculations._PRICE_MATRIX_SETTING_KEYS)
+
+    database.save_admin_setting("price_matrix_csv_data", CSV_MATRIX + "40;18.000,00;24.000,00\n")
+    index, _ = calculations.load_price_matrix_index([])
+
+    assert index.lookup(45, "Ohne Speicher")[1] == 18000.0
+    assert load_index(index_dir(str(matrix_db)), old_fingerprint) is None
+
+
+def test_saving_a_new_generation_leaves_mapped_arrays_intact(tmp_path):
+    big = pd.DataFrame({"Ohne Speicher": np.arange(1.0, 201.0)}, index=np.arange(1, 201))
+    small = pd.DataFrame({"Ohne Speicher": [5.0], "Speicher X": [7.0]}, index=[10])
+    directory = str(tmp_path / "index")
+    save_index(CompiledPriceMatrix.from_dataframe(big, "CSV"), directory, "v1")
+    mapped = load_index(directory, "v1")
+
+    save_index(CompiledPriceMatrix.from_dataframe(small, "CSV"), directory, "v2")
+
+    # Der alte Stand bleibt lesbar (kein Überschreiben/Verkürzen gemappter Dateien)
+    assert mapped.lookup(150, "Ohne Speicher")[1] == 150.0
+    assert float(mapped.prices.sum()) == pytest.approx(20100.0)
+    assert load_index(directory, "v2").lookup(10, "Speicher X")[1] == 7.0
+    assert load_index(directory, "v1") is None
+    # Vorige Generation bleibt bis zum nächsten Umschalten erhalten
+    first_files = {name for name in os.listdir(directory) if name.endswith(".npy")}
+    assert len(first_files) == 4
+    save_index(CompiledPriceMatrix.from_dataframe(big, "CSV"), directory, "v3")
+    remaining = {name for name in os.listdir(directory) if name.endswith(".npy")}
+    assert len(remaining) == 4 and len(remaining & first_files) == 2
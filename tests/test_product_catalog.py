@@ -0,0 +1,104 @@
+# test_product_catalog.py
+"""
+Schlanke Katalog-Abfragen: Listen ohne image_base64, seitenweise Abfrage,
+Bilder/Vorschaubilder und Datenblätter per ID.
+"""
+
+import base64
+import io
+
+import pytest
+
+import product_db
+from solar_calculator_bridge import SolarCalculatorProductBridge
+
+
+def _png_base64(size=(400, 200)):
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(out, format="PNG")
+    return base64.b64encode(out.getvalue()).decode("ascii")
+
+
+@pytest.fixture(autouse=True)
+def _clear_image_cache():
+    product_db.clear_product_image_cache()
+
+
+@pytest.fixture
+def catalog(temp_db):
+    image = _png_base64()
+    ids = {}
+    for i in range(5):
+        ids[f"Modul {i}"] = product_db.add_product({
+            "category": "Modul", "model_name": f"Modul {i}", "brand": "Sonne AG", "capacity_w": 400 + i,
+            "description": "x" * 5000, "image_base64": image if i % 2 == 0 else None,
+            "datasheet_link_db_path": "/tmp/datenblatt.pdf" if i == 0 else None,
+        })
+    ids["WR 1"] = product_db.add_product({"category": "Wechselrichter", "model_name": "WR 1", "brand": "Strom GmbH"})
+    return ids
+
+
+def test_summaries_exclude_blobs_and_report_flags(catalog):
+    items = product_db.list_product_summaries(category="Modul")
+
+    assert [p["model_name"] for p in items] == [f"Modul {i}" for i in range(5)]
+    assert all("image_base64" not in p and "description" not in p for p in items)
+    assert [p["has_image"] for p in items] == [True, False, True, False, True]
+    assert items[0]["has_datasheet"] and not items[1]["has_datasheet"]
+
+
+def test_summaries_paginate_and_count(catalog):
+    page = product_db.list_product_summaries(category="Modul", limit=2, offset=2)
+
+    assert [p["model_name"] for p in page] == ["Modul 2", "Modul 3"]
+    assert product_db.count_products(category="Modul") == 5
+    assert product_db.count_products(brand="strom gmbh") == 1
+
+
+def test_product_image_thumbnail_is_cached_per_update(catalog, monkeypatch):
+    from PIL import Image
+    pid = catalog["Modul 0"]
+    calls = []
+    original = product_db._make_thumbnail
+    monkeypatch.setattr(product_db, "_make_thumbnail", lambda img, px: (calls.append(px), original(img, px))[1])
+
+    thumb = product_db.get_product_image(pid, max_size_px=64)
+    assert product_db.get_product_image(pid, max_size_px=64) == thumb
+    assert Image.open(io.BytesIO(base64.b64decode(thumb))).size == (64, 32)
+    assert len(calls) == 1
+
+    product_db.update_product_image(pid, _png_base64((100, 100)))
+    assert Image.open(io.BytesIO(base64.b64decode(product_db.get_product_image(pid, max_size_px=64)))).size == (64, 64)
+    assert product_db.get_product_image(catalog["Modul 1"]) is None
+    assert product_db.get_product_datasheet_path(pid) == "/tmp/datenblatt.pdf"
+
+
+def test_bridge_list_is_paginated_without_images(temp_db, catalog):
+    bridge = SolarCalculatorProductBridge(db_path=str(temp_db))
+
+    res = bridge.list_products(category="Modul", limit=3)
+
+    assert res["success"] and res["total"] == 5 and len(res["items"]) == 3
+    assert all(item["image_base64"] is None for item in res["items"])
+    assert res["items"][0]["has_image"] and res["items"][0]["produkt_modell"] == "Modul 0"
+    full = bridge.list_products(category="Modul", include_images=True)
+    assert full["items"][0]["image_base64"]
+
+
+def test_calculation_bridge_product_commands_skip_images(catalog, monkeypatch):
+    import importlib.util
+    from pathlib import Path
+
+    path = Path(__file__).resolve().parent.parent / "apps" / "main" / "calculation_bridge.py"
+    spec = importlib.util.spec_from_file_location("calculation_bridge_products", path)
+    bridge = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bridge)
+    product_db.add_product({"category": "Modul", "model_name": "Modul X", "brand": "Alpha Solar"})
+    monkeypatch.setattr(product_db, "list_products", lambda *a, **k: pytest.fail("list_products lädt Bilder"))
+
+    assert bridge.run_product_command("get_pv_manufacturers") == ["Alpha Solar", "Sonne AG"]
+    models = bridge.run_product_command("get_pv_models", "Sonne AG")
+    assert [p["model_name"] for p in models] == [f"Modul {i}" for i in range(5)]
+    assert all("image_base64" not in p for p in models)
+    assert bridge.run_product_command("get_inverter_manufacturers") == ["Strom GmbH"]
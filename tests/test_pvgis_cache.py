@@ -0,0 +1,89 @@
+# test_pvgis_cache.py
+"""
+Persistenter PVGIS-Cache: Wiederholte Abrufe ohne Netzwerk, lineare Skalierung
+über kWp, Offline-Modus mit nächstgelegenem Standort und Eviction.
+"""
+
+import time
+
+import pytest
+
+import calculations
+import pvgis_cache
+
+MONTHLY_PER_KWP = [30.0, 45.0, 80.0, 110.0, 130.0, 135.0, 140.0, 125.0, 95.0, 65.0, 35.0, 25.0]
+
+
+class _FakeResponse:
+    def __init__(self, peak_power):
+        self.peak_power = peak_power
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {
+            "outputs": {
+                "monthly": [{"E_m": value * self.peak_power} for value in MONTHLY_PER_KWP],
+                "totals": {"fixed": {"E_y": sum(MONTHLY_PER_KWP) * self.peak_power, "Yield_y": sum(MONTHLY_PER_KWP)}},
+            },
+            "meta": {"source": "PVGIS-TEST"},
+        }
+
+
+@pytest.fixture
+def fake_api(monkeypatch, tmp_path):
+    monkeypatch.setattr(pvgis_cache, "CACHE_DB_PATH", str(tmp_path / "pvgis_cache.db"))
+    monkeypatch.delenv(pvgis_cache.OFFLINE_ENV_VAR, raising=False)
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(params)
+        return _FakeResponse(params["peakpower"])
+
+    monkeypatch.setattr(calculations.requests, "get", fake_get)
+    return calls
+
+
+def test_repeat_and_resized_requests_use_cache(fake_api):
+    first = calculations.get_pvgis_data(50.1109, 8.6821, 8.0, 30, 0, 14.0)
+    repeat = calculations.get_pvgis_data(50.1112, 8.6819, 8.0, 30, 0, 14.0)
+    resized = calculations.get_pvgis_data(50.1109, 8.6821, 12.0, 30, 0, 14.0)
+
+    assert len(fake_api) == 1
+    assert repeat["annual_production_kwh"] == pytest.approx(first["annual_production_kwh"])
+    assert resized["monthly_production_kwh"] == pytest.approx([v * 12.0 for v in MONTHLY_PER_KWP])
+    assert resized["pvgis_source"] == "PVGIS-TEST"
+
+
+def test_other_orientation_is_fetched(fake_api):
+    calculations.get_pvgis_data(50.11, 8.68, 8.0, 30, 0, 14.0)
+    calculations.get_pvgis_data(50.11, 8.68, 8.0, 30, -90, 14.0)
+    assert len(fake_api) == 2
+
+
+def test_offline_mode_serves_nearest_location(fake_api, monkeypatch):
+    calculations.get_pvgis_data(50.11, 8.68, 10.0, 30, 0, 14.0)
+    monkeypatch.setenv(pvgis_cache.OFFLINE_ENV_VAR, "1")
+
+    nearby = calculations.get_pvgis_data(50.20, 8.75, 5.0, 30, 0, 14.0)
+    errors = []
+    far_away = calculations.get_pvgis_data(53.55, 9.99, 5.0, 30, 0, 14.0, errors_list=errors)
+
+    assert len(fake_api) == 1
+    assert nearby["annual_production_kwh"] == pytest.approx(sum(MONTHLY_PER_KWP) * 5.0)
+    assert far_away is None
+    assert errors
+
+
+def test_eviction_by_ttl_and_size(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    for index in range(5):
+        key = pvgis_cache.make_key(50.0 + index, 8.0, 30, 0, 14.0)
+        pvgis_cache.put(key, MONTHLY_PER_KWP, 1000.0, 1000.0, "x", max_entries=3, db_path=db_path)
+
+    assert pvgis_cache.get(pvgis_cache.make_key(50.0, 8.0, 30, 0, 14.0), db_path=db_path) is None
+    assert pvgis_cache.get(pvgis_cache.make_key(54.0, 8.0, 30, 0, 14.0), db_path=db_path) is not None
+
+    time.sleep(0.01)
+    assert pvgis_cache.get(pvgis_cache.make_key(54.0, 8.0, 30, 0, 14.0), ttl_days=1e-8, db_path=db_path) is None
@@ -0,0 +1,107 @@
+# test_query_plans.py
+"""
+EXPLAIN QUERY PLAN für die häufigsten Abfragen in product_db, crm,
+crm_pipeline_ui und crm_calendar_ui: Die Abfragen werden über die echten
+Funktionen ausgeführt, per Trace-Callback mitgeschnitten und müssen einen
+Index aus database.SCHEMA_INDEXES nutzen (kein vollständiger Tabellenscan).
+"""
+
+import re
+from datetime import datetime
+
+import pytest
+
+import database
+import product_db
+
+
+def _traced_selects(func, *args, **kwargs):
+    """Führt func aus und liefert alle dabei ausgeführten SELECT-Anweisungen (mit eingesetzten Parametern)."""
+    conn = database.get_db_connection()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        func(*args, **kwargs)
+    finally:
+        conn.set_trace_callback(None)
+        conn.close()
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT") and "sqlite_master" not in s]
+
+
+def _plan(sql):
+    with database.db_connection() as conn:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def _assert_indexed(statements, table):
+    relevant = [s for s in statements if re.search(rf"\bFROM\s+{table}\b", s)]
+    assert relevant, f"keine Abfrage auf {table} mitgeschnitten"
+    for sql in relevant:
+        plan = _plan(sql)
+        full_scans = [step for step in plan if re.fullmatch(rf"SCAN {table}( AS \w+)?|SCAN \w+", step)]
+        assert not full_scans, f"Tabellenscan für {sql!r}: {plan}"
+        assert any("INDEX" in step or "PRIMARY KEY" in step for step in plan), plan
+    return relevant
+
+
+def test_product_listing_queries_use_indexes(temp_db):
+    product_db.add_product({"category": "Modul", "model_name": "M1", "brand": "Sonne AG", "company_id": 1})
+
+    _assert_indexed(_traced_selects(product_db.list_products, category="Modul"), "products")
+    _assert_indexed(_traced_selects(product_db.list_products, category="Modul", company_id=1), "products")
+    _assert_indexed(_traced_selects(product_db.list_product_summaries, brand="sonne ag"), "products")
+    _assert_indexed(_traced_selects(product_db.get_product_by_model_name, "m1"), "products")
+
+    # Kategorie-Liste kommt ohne zusätzliche Sortierung aus
+    sql = _traced_selects(product_db.list_products, category="Modul")[-1]
+    assert not any("TEMP B-TREE" in step for step in _plan(sql))
+
+
+def test_crm_project_queries_use_indexes(temp_db):
+    try:
+        import crm
+    except SyntaxError:  # crm.py nutzt f-Strings ab Python 3.12
+        pytest.skip("crm.py benötigt Python >= 3.12")
+
+    conn = database.get_db_connection()
+    crm.create_tables_crm(conn)
+    conn.close()
+
+    statements = _traced_selects(lambda: crm.load_projects_for_customer(database.get_db_connection(), 1))
+    _assert_indexed(statements, "projects")
+
+
+def test_active_customers_query_uses_index(temp_db):
+    _assert_indexed(_traced_selects(database.get_all_active_customers), "crm_customers")
+
+
+def test_pipeline_queries_use_indexes(temp_db):
+    from crm_pipeline_ui import CRMPipeline
+
+    pipeline = CRMPipeline()
+    _assert_indexed(_traced_selects(pipeline._get_leads_by_stage, "lead"), "crm_leads")
+    _assert_indexed(_traced_selects(pipeline._get_recent_closed_leads, "won"), "crm_leads")
+    _assert_indexed(_traced_selects(pipeline._get_filtered_leads, "all", "Website", "created_at"), "crm_leads")
+
+
+def test_calendar_queries_use_indexes(temp_db):
+    from crm_calendar_ui import CRMCalendar
+
+    database.get_all_active_customers()  # legt crm_customers für den JOIN an
+    now = datetime.now()
+    calendar = CRMCalendar()
+    _assert_indexed(_traced_selects(calendar._get_appointments_for_month, now.year, now.month), "crm_appointments")
+    _assert_indexed(_traced_selects(calendar._get_filtered_appointments, "all", "upcoming", "all"), "crm_appointments")
+    _assert_indexed(_traced_selects(calendar._get_filtered_appointments, "all", "all", "scheduled"), "crm_appointments")
+
+
+def test_schema_migration_v15_creates_indexes_on_existing_tables(temp_db):
+    with database.db_connection() as conn:
+        conn.execute("CREATE TABLE crm_leads (id INTEGER PRIMARY KEY, stage TEXT, stage_changed_at TEXT, lead_source TEXT)")
+
+    database.init_db()
+
+    with database.db_connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == database.DB_SCHEMA_VERSION == 15
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_crm_leads_stage_changed", "idx_crm_leads_source"} <= names
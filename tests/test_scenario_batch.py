@@ -0,0 +1,142 @@
+# test_scenario_batch.py
+"""
+Stapelberechnung von Projektvarianten: Overrides, Übereinstimmung mit
+Einzelaufrufen von perform_calculations und einmaliges Laden der Eingaben.
+"""
+
+import contextvars
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import calculations
+from calculations_extended import compare_scenarios
+from scenario_batch import apply_scenario_overrides, evaluate_scenarios
+
+BASE_PROJECT = {
+    "project_details": {
+        "module_quantity": 20,
+        "selected_module_id": 1,
+        "annual_consumption_kwh_yr": 4500,
+        "electricity_price_kwh": 0.32,
+    },
+    "economic_data": {},
+}
+
+
+@pytest.fixture
+def counted_inputs(monkeypatch):
+    """Admin-Settings und Produktdaten ohne Datenbank, mit Aufrufzähler."""
+    calls = {"admin_setting": 0, "product": 0}
+
+    def load_admin_setting(key, default=None):
+        calls["admin_setting"] += 1
+        return calculations.Dummy_load_admin_setting_calc(key, default)
+
+    def get_product_by_id(product_id):
+        calls["product"] += 1
+        return {"id": product_id, "capacity_w": 400.0}
+
+    monkeypatch.setattr(calculations, "real_load_admin_setting", load_admin_setting)
+    monkeypatch.setattr(calculations, "real_get_product_by_id", get_product_by_id)
+    return calls
+
+
+def test_overrides_do_not_touch_base_project():
+    base = copy.deepcopy(BASE_PROJECT)
+    variant = apply_scenario_overrides(
+        base, {"module_quantity": 30, "storage_capacity_kwh": 8.0, "feed_in_type": "Volleinspeisung"}
+    )
+
+    assert base == BASE_PROJECT
+    assert variant["project_details"]["module_quantity"] == 30
+    assert variant["project_details"]["include_storage"] is True
+    assert variant["project_details"]["selected_storage_storage_power_kw"] == 8.0
+    assert variant["project_details"]["feed_in_type"] == "Volleinspeisung"
+
+
+def test_batch_matches_single_calculations(counted_inputs):
+    scenarios = [{"name": "klein", "module_quantity": 12}, {"module_quantity": 24}, {"electricity_price_increase_percent": 5.0}]
+
+    table = evaluate_scenarios(BASE_PROJECT, scenarios)
+
+    assert list(table["scenario_name"]) == ["klein", "Variante 2", "Variante 3"]
+    assert table["error"].isna().all()
+    assert list(table["anlage_kwp"]) == pytest.approx([4.8, 9.6, 8.0])
+    for overrides, (_, row) in zip(scenarios, table.iterrows()):
+        single = calculations.perform_calculations(
+            apply_scenario_overrides(BASE_PROJECT, overrides),
+            {},
+            [],
+            electricity_price_increase_user=overrides.get("electricity_price_increase_percent"),
+        )
+        assert row["total_investment_netto"] == pytest.approx(single["total_investment_netto"])
+        assert row["annual_financial_benefit_year1"] == pytest.approx(single["annual_financial_benefit_year1"])
+
+
+def test_invariant_inputs_are_loaded_once_per_batch(counted_inputs):
+    evaluate_scenarios(BASE_PROJECT, [{}])
+    single_run = dict(counted_inputs)
+
+    counted_inputs.update({"admin_setting": 0, "product": 0})
+    evaluate_scenarios(BASE_PROJECT, [{"module_quantity": q} for q in range(10, 60)])
+
+    assert counted_inputs == single_run
+
+
+def test_shared_inputs_are_loaded_once_across_threads():
+    loads = []
+    release = threading.Event()
+
+    def slow_loader(key):
+        loads.append(key)
+        release.wait(5)
+        return {"key": key}
+
+    with calculations.shared_calculation_inputs():
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, calculations._shared_input, ("test", 1), slow_loader, 1)
+                for _ in range(16)
+            ]
+            # Während Schlüssel 1 lädt, blockiert ein anderer Schlüssel nicht
+            assert calculations._shared_input(("test", 2), lambda: "frei") == "frei"
+            release.set()
+            values = [future.result() for future in futures]
+        with calculations.shared_calculation_inputs():
+            calculations._shared_input(("test", 3), slow_loader, 3)
+        assert calculations._SHARED_INPUTS.get() is not None  # innerer Block beendet den äußeren nicht
+
+    assert loads == [1, 3] and values == [{"key": 1}] * 16
+    assert calculations._SHARED_INPUTS.get() is None
+
+
+def test_shared_inputs_stay_in_their_context():
+    outside = []
+    with calculations.shared_calculation_inputs():
+        calculations._shared_input(("test",), lambda: "im Block")
+        # Ein fremder Thread ohne übernommenen Kontext teilt den Speicher nicht
+        worker = threading.Thread(target=lambda: outside.append(calculations._SHARED_INPUTS.get()))
+        worker.start()
+        worker.join()
+    assert outside == [None]
+
+
+def test_shared_loader_errors_reach_every_caller():
+    def loader(errors):
+        errors.append("Preis-Matrix-CSV-Daten sind leer.")
+        return None
+
+    collected = [[], [], []]
+    with calculations.shared_calculation_inputs():
+        for errors in collected:
+            calculations._shared_input(("price_matrix",), loader, errors_list=errors)
+    assert collected == [["Preis-Matrix-CSV-Daten sind leer."]] * 3
+
+
+def test_compare_scenarios_keeps_single_argument_form(counted_inputs):
+    assert compare_scenarios([{"name": "A"}]) == [{"name": "A", "payback": 10}]
+    rows = compare_scenarios([{"name": "klein", "module_quantity": 12}], BASE_PROJECT)
+    assert rows[0]["name"] == "klein" and rows[0]["anlage_kwp"] == pytest.approx(4.8)